@@ -0,0 +1,389 @@
+import argparse
+import asyncio
+import hmac
+import multiprocessing
+import queue
+import sys, os
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+from fastapi import Depends, FastAPI, HTTPException
+from fastapi.responses import JSONResponse
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+from pydantic import BaseModel, Field
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from api import workers
+from config.settings import (
+    API_TOKENS, API_WORKERS, LOCAL_SUMMARY_MODEL, MOOD_BATCH_MAX_TEXTS, SENTIMENT_BATCH_SIZE, SENTIMENT_BATCH_WAIT_MS
+)
+from core.action_items import save_action_items
+from core.calendar_integration import listar_eventos_google_calendar, CalendarError, CalendarOfflineError
+from core.calendar_sync import sincronizar_tarefas_com_calendario
+from core.email_summary import EmailSummarizer, SummarizerBackend
+from core.free_slots import free_busy, next_free_slot, place_untimed_tasks, schedule_task
+from core.moods import save_mood
+from core.nlp import interpret_command
+from core.scheduler import list_tasks, mark_task_done, delete_task
+from core.token_budget import usage_summary
+from data.database import DEFAULT_USER
+from data.fulltext import search as fulltext_search
+
+
+class PooledLocalBackend(SummarizerBackend):
+    """Local summarization model running in the API's worker processes."""
+
+    def __init__(self, pool, model=LOCAL_SUMMARY_MODEL):
+        self.pool = pool
+        self.name = model
+        self.model = model
+
+    def summarize(self, email_text, max_tokens, temperature, user_id=None):
+        return self.pool.submit(workers.summarize_local, self.model, email_text, max_tokens, temperature).result()
+
+
+class SentimentBatcher:
+    """
+    Groups concurrent sentiment requests into batches: a batch is sent to
+    the worker pool when it reaches `max_batch` texts or when the first
+    request has waited `max_wait` seconds, whichever comes first.
+    """
+
+    def __init__(self, pool, max_batch=SENTIMENT_BATCH_SIZE, max_wait=SENTIMENT_BATCH_WAIT_MS / 1000):
+        self.pool = pool
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self._queue = asyncio.Queue()
+        self.batches = 0
+        self.requests = 0
+
+    async def classify(self, text, language=None):
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((text, language, future))
+        return await future
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            # Batches run concurrently, one per free worker
+            asyncio.create_task(self._dispatch(batch))
+
+    async def _dispatch(self, batch):
+        self.batches += 1
+        self.requests += len(batch)
+        try:
+            results = await asyncio.wrap_future(
+                self.pool.submit(workers.classify, [(text, language) for text, language, _ in batch])
+            )
+        except Exception as e:
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for (_, _, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+
+class WarmUp:
+    """Tracks which worker processes have loaded their models."""
+
+    def __init__(self, workers_count):
+        self.workers = workers_count
+        self.warm = {}  # pid -> loaded checkpoints
+        self.errors = []
+        self.started_at = datetime.now()
+        self.finished_at = None
+
+    @property
+    def ready(self):
+        return len(self.warm) >= self.workers and not self.errors
+
+    async def run(self, pool, status):
+        # A job per worker makes the pool start all its processes; each one
+        # reports on `status` when its initializer has loaded the models
+        for _ in range(self.workers):
+            pool.submit(workers.ping)
+        while len(self.warm) + len(self.errors) < self.workers:
+            try:
+                pid, loaded, error = await asyncio.to_thread(status.get, True, 1.0)
+            except queue.Empty:
+                continue
+            if error:
+                self.errors.append(error)
+            else:
+                self.warm[pid] = loaded
+        self.finished_at = datetime.now()
+
+    def report(self):
+        return {
+            "ready": self.ready,
+            "workers": self.workers,
+            "warm_workers": len(self.warm),
+            "models": sorted({checkpoint for loaded in self.warm.values() for checkpoint in loaded}),
+            "errors": self.errors,
+            "warm_up_started": self.started_at.isoformat(),
+            "warm_up_seconds": (self.finished_at - self.started_at).total_seconds() if self.finished_at else None,
+        }
+
+
+@asynccontextmanager
+async def lifespan(app):
+    # Worker processes are spawned, not forked, so they never inherit the
+    # server's threads, open SQLite connections or event loop
+    context = multiprocessing.get_context("spawn")
+    status = context.Queue()
+    pool = ProcessPoolExecutor(
+        max_workers=API_WORKERS,
+        mp_context=context,
+        initializer=workers.init_worker,
+        initargs=(status,)
+    )
+    app.state.pool = pool
+    app.state.warm_up = WarmUp(API_WORKERS)
+    app.state.batcher = SentimentBatcher(pool)
+    app.state.summarizer = EmailSummarizer(local_backend=PooledLocalBackend(pool))
+    background = [
+        asyncio.create_task(app.state.warm_up.run(pool, status)),
+        asyncio.create_task(app.state.batcher.run()),
+    ]
+    try:
+        yield
+    finally:
+        for task in background:
+            task.cancel()
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+app = FastAPI(title="SmartRoutine AI", lifespan=lifespan)
+
+
+# --- Authentication ---
+
+def parse_tokens(value):
+    """{token: user_id} from comma-separated token:user_id pairs."""
+    tokens = {}
+    for pair in value.split(","):
+        token, _, user_id = pair.strip().partition(":")
+        if token and user_id:
+            tokens[token] = user_id
+    return tokens
+
+API_USERS = parse_tokens(API_TOKENS)
+_bearer = HTTPBearer(auto_error=False)
+
+def current_user(credentials: Optional[HTTPAuthorizationCredentials] = Depends(_bearer)):
+    """
+    The user a request acts for, from its bearer token. Without configured
+    tokens every request is the default user; with them, a missing or
+    unknown token is refused.
+    """
+    if not API_USERS:
+        return DEFAULT_USER
+    if credentials is not None:
+        for token, user_id in API_USERS.items():
+            if hmac.compare_digest(credentials.credentials.encode(), token.encode()):
+                return user_id
+    raise HTTPException(status_code=401, detail="Invalid or missing API token",
+                        headers={"WWW-Authenticate": "Bearer"})
+
+
+# --- Request bodies ---
+
+class CommandIn(BaseModel):
+    text: str
+
+class TaskIn(BaseModel):
+    title: str
+    date_time: Optional[str] = None
+
+class MoodIn(BaseModel):
+    text: str
+    language: Optional[str] = None
+    save: bool = False
+
+class MoodBatchIn(BaseModel):
+    texts: List[str] = Field(max_length=MOOD_BATCH_MAX_TEXTS)
+    language: Optional[str] = None
+
+class EmailIn(BaseModel):
+    text: str
+    max_tokens: int = 250
+    temperature: float = 0.7
+
+class ActionItemsIn(BaseModel):
+    text: str
+    create_tasks: bool = False
+
+
+def _task_dict(task):
+    return {"id": task.id, "title": task.title, "date_time": task.date_time, "status": task.status}
+
+
+# --- Health ---
+
+@app.get("/health")
+async def health():
+    """Liveness: the server is up and answering."""
+    return {"status": "ok"}
+
+@app.get("/ready")
+async def ready():
+    """Readiness: every worker process has loaded its models. Answers 503 until then."""
+    report = app.state.warm_up.report()
+    report["sentiment_batches"] = app.state.batcher.batches
+    report["sentiment_requests"] = app.state.batcher.requests
+    return JSONResponse(report, status_code=200 if report["ready"] else 503)
+
+
+# --- Commands and tasks ---
+# Plain `def` endpoints run in FastAPI's thread pool, so SQLite calls never block the event loop
+
+@app.post("/commands", dependencies=[Depends(current_user)])
+def command(body: CommandIn):
+    return interpret_command(body.text)
+
+@app.get("/tasks")
+def get_tasks(user_id: str = Depends(current_user)):
+    return [_task_dict(task) for task in list_tasks(user_id)]
+
+@app.post("/tasks", status_code=201)
+def create_task(body: TaskIn, user_id: str = Depends(current_user)):
+    """Adds a task; tasks without a time go to the next free slot. Conflicts are reported, not refused."""
+    return schedule_task(body.title, body.date_time, user_id)
+
+@app.post("/tasks/{task_id}/done")
+def complete_task(task_id: int, user_id: str = Depends(current_user)):
+    mark_task_done(task_id, user_id)
+    return {"id": task_id, "status": "done"}
+
+@app.delete("/tasks/{task_id}")
+def remove_task(task_id: int, user_id: str = Depends(current_user)):
+    delete_task(task_id, user_id)
+    return {"id": task_id, "deleted": True}
+
+
+# --- Search ---
+
+@app.get("/search")
+def get_search(q: str, kinds: Optional[str] = None, limit: int = 10, offset: int = 0,
+               user_id: str = Depends(current_user)):
+    """Ranked prefix search; `kinds` is a comma-separated subset of task, mood, interaction."""
+    try:
+        return fulltext_search(q, kinds.split(",") if kinds else None, user_id, limit, offset)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+# --- Scheduling ---
+
+@app.get("/schedule/free-busy")
+def get_free_busy(start: datetime, end: datetime, user_id: str = Depends(current_user)):
+    return free_busy(start, end, user_id)
+
+@app.get("/schedule/next-free-slot")
+def get_next_free_slot(duration_min: int = 30, after: Optional[datetime] = None, user_id: str = Depends(current_user)):
+    slot = next_free_slot(duration_min, after, user_id)
+    return {"start": slot.isoformat() if slot else None}
+
+@app.post("/schedule/place-untimed")
+def post_place_untimed(user_id: str = Depends(current_user)):
+    return [
+        {"id": task_id, "title": title, "date_time": date_time}
+        for task_id, title, date_time in place_untimed_tasks(user_id)
+    ]
+
+
+# --- Moods ---
+
+@app.post("/moods/analyze")
+async def analyze(body: MoodIn, user_id: str = Depends(current_user)):
+    result = await app.state.batcher.classify(body.text, body.language)
+    if "error" in result:
+        raise HTTPException(status_code=500, detail=result["error"])
+    if body.save:
+        await asyncio.to_thread(save_mood, body.text, result["mood"], result["confidence"], user_id)
+    return result
+
+@app.post("/moods/analyze/batch", dependencies=[Depends(current_user)])
+async def analyze_batch(body: MoodBatchIn):
+    """Classifies up to MOOD_BATCH_MAX_TEXTS texts; fails like /moods/analyze if any of them fails."""
+    results = await asyncio.gather(*(app.state.batcher.classify(text, body.language) for text in body.texts))
+    errors = [{"index": i, "error": result["error"]} for i, result in enumerate(results) if "error" in result]
+    if errors:
+        raise HTTPException(status_code=500, detail=errors)
+    return results
+
+
+# --- Emails ---
+# The summarizer blocks on the hosted model's HTTP call or on a worker
+# process, so it runs in a thread while the event loop keeps serving
+
+@app.post("/emails/summarize")
+async def summarize(body: EmailIn, user_id: str = Depends(current_user)):
+    try:
+        return await asyncio.to_thread(
+            app.state.summarizer.summarize_email, body.text, body.max_tokens, body.temperature, user_id
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=502, detail=str(e))
+
+@app.post("/emails/action-items")
+async def action_items(body: ActionItemsIn, user_id: str = Depends(current_user)):
+    items = await asyncio.to_thread(app.state.summarizer.extract_action_items, body.text, user_id)
+    result = {"items": items}
+    if body.create_tasks:
+        result.update(await asyncio.to_thread(save_action_items, items, user_id))
+    return result
+
+@app.get("/usage/tokens")
+def get_token_usage(days: int = 30, user_id: str = Depends(current_user)):
+    """Hosted model tokens by operation and model over the last `days` days."""
+    return usage_summary(days, user_id)
+
+
+# --- Calendar ---
+
+@app.get("/calendar/events", dependencies=[Depends(current_user)])
+async def calendar_events(days: int = 7, max_results: int = 50):
+    inicio = datetime.now()
+    try:
+        return await asyncio.to_thread(
+            listar_eventos_google_calendar, inicio, inicio + timedelta(days=days), max_results
+        )
+    except CalendarOfflineError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except CalendarError as e:
+        raise HTTPException(status_code=502, detail=str(e))
+
+@app.post("/calendar/sync")
+async def calendar_sync(user_id: str = Depends(current_user)):
+    try:
+        return await asyncio.to_thread(sincronizar_tarefas_com_calendario, None, user_id)
+    except CalendarOfflineError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except CalendarError as e:
+        raise HTTPException(status_code=502, detail=str(e))
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Run the SmartRoutine AI HTTP API.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    args = parser.parse_args()
+    uvicorn.run(app, host=args.host, port=args.port)
@@ -0,0 +1,40 @@
+import os
+
+from core.email_summary import LocalBackend
+from core.emotion_analysis import analyze_moods
+from core.mood_models import get_registry, default_language
+
+# Functions run in the API's worker processes. Each process loads its own
+# models once and keeps them for its lifetime.
+
+def init_worker(status):
+    """
+    Process initializer: loads the default language's mood model and puts
+    (pid, loaded checkpoints, error) on the `status` queue read by the server.
+    """
+    error = None
+    try:
+        get_registry().get(default_language())
+    except Exception as e:
+        # Raising here would break the whole pool; the server reports it instead
+        error = str(e)
+    status.put((os.getpid(), get_registry().loaded(), error))
+
+def ping():
+    return os.getpid()
+
+def classify(requests):
+    """
+    Classifies a batch of (text, language) requests, with one model call
+    per language. Returns one analyze_mood-style dictionary per request.
+    """
+    results = [None] * len(requests)
+    languages = [language for _, language in requests]
+    for language in dict.fromkeys(languages):
+        positions = [i for i, requested in enumerate(languages) if requested == language]
+        for i, result in zip(positions, analyze_moods([requests[i][0] for i in positions], language)):
+            results[i] = result
+    return results
+
+def summarize_local(model, email_text, max_tokens, temperature):
+    return LocalBackend(model).summarize(email_text, max_tokens, temperature)
@@ -9,3 +9,66 @@ OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 GOOGLE_CALENDAR_API_KEY = os.getenv("GOOGLE_CALENDAR_API_KEY")
 IDIOMA_PADRAO = os.getenv("IDIOMA_PADRAO", "pt-BR")
 DEBUG = os.getenv("DEBUG", "False") == "True"
+
+# Storage: "shared" keeps every user in DB_PATH, partitioned by user_id;
+# "sharded" gives each user their own SQLite file under USER_DB_DIR
+DB_PATH = os.getenv("DB_PATH", "data/user_data.db")
+STORAGE_MODE = os.getenv("STORAGE_MODE", "shared")
+USER_DB_DIR = os.getenv("USER_DB_DIR", "data/users")
+MAX_OPEN_DATABASES = int(os.getenv("MAX_OPEN_DATABASES", "32"))
+
+# Task and mood storage engine: "sqlite", or "memory" for tests and benchmarks
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "sqlite")
+
+# Done tasks and moods older than ARCHIVE_AFTER_DAYS are moved out of SQLite
+# into compressed Parquet files under ARCHIVE_DIR
+ARCHIVE_DIR = os.getenv("ARCHIVE_DIR", "data/archive")
+ARCHIVE_AFTER_DAYS = int(os.getenv("ARCHIVE_AFTER_DAYS", "90"))
+
+# Semantic search: sentence-transformer used for embeddings and where the
+# per-user embedding matrices are stored
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
+SEARCH_INDEX_DIR = os.getenv("SEARCH_INDEX_DIR", "data/search")
+
+# Memory budget for the sentiment models kept loaded (one per language)
+MOOD_MODEL_MEMORY_MB = int(os.getenv("MOOD_MODEL_MEMORY_MB", "1024"))
+
+# Users whose mood analytics are kept cached; the least recently used are dropped
+MOOD_ANALYTICS_CACHE_SIZE = int(os.getenv("MOOD_ANALYTICS_CACHE_SIZE", "128"))
+
+# Email summaries: local CPU model used for short emails and whenever the
+# hosted model is rate limited, saturated or unreachable
+LOCAL_SUMMARY_MODEL = os.getenv("LOCAL_SUMMARY_MODEL", "sshleifer/distilbart-cnn-6-6")
+SHORT_EMAIL_WORDS = int(os.getenv("SHORT_EMAIL_WORDS", "120"))
+OPENAI_MAX_CONCURRENT = int(os.getenv("OPENAI_MAX_CONCURRENT", "4"))
+# Longest email (in tokens, after boilerplate is removed) sent to the hosted model
+MAX_EMAIL_TOKENS = int(os.getenv("MAX_EMAIL_TOKENS", "3000"))
+
+# Mailbox ingested by the Email tab: mbox:/path, maildir:/path,
+# imap://user@host/INBOX or imaps://user@host/INBOX (password in MAIL_PASSWORD)
+MAIL_SOURCE = os.getenv("MAIL_SOURCE", "")
+MAIL_PASSWORD = os.getenv("MAIL_PASSWORD", "")
+
+# HTTP API (api/server.py): processes running the models, and how long
+# sentiment requests wait to be batched together
+API_WORKERS = int(os.getenv("API_WORKERS", "2"))
+SENTIMENT_BATCH_SIZE = int(os.getenv("SENTIMENT_BATCH_SIZE", "16"))
+SENTIMENT_BATCH_WAIT_MS = int(os.getenv("SENTIMENT_BATCH_WAIT_MS", "10"))
+# Most texts accepted by one /moods/analyze/batch request
+MOOD_BATCH_MAX_TEXTS = int(os.getenv("MOOD_BATCH_MAX_TEXTS", "256"))
+# API credentials as comma-separated token:user_id pairs; sent as
+# "Authorization: Bearer <token>". When empty, the API serves only the
+# default user (single-user, local use)
+API_TOKENS = os.getenv("API_TOKENS", "")
+
+# Working hours used when tasks without a time are placed automatically
+WORKDAY_START = os.getenv("WORKDAY_START", "09:00")
+WORKDAY_END = os.getenv("WORKDAY_END", "18:00")
+
+# Voice commands with a lower recognition confidence are rejected
+VOICE_MIN_CONFIDENCE = float(os.getenv("VOICE_MIN_CONFIDENCE", "0.6"))
+
+# Hands-free mode: recordings of the wake word (WAV templates) and the
+# largest match distance accepted (0 derives it from the recordings)
+WAKE_WORD_DIR = os.getenv("WAKE_WORD_DIR", "data/wake_word")
+WAKE_WORD_THRESHOLD = float(os.getenv("WAKE_WORD_THRESHOLD", "0"))
@@ -0,0 +1,134 @@
+import hashlib
+import re
+from datetime import date, datetime, timedelta
+
+from core.nlp import extract_datetime
+from core.scheduler import add_tasks
+from data.database import connect, DEFAULT_USER
+
+# Time given to deadlines that only name a day ("by friday")
+DEFAULT_DUE_TIME = "9am"
+
+_DUE_PREFIX_RE = re.compile(r"^(?:due\s+)?(?:by|before|until|on|due)\s+")
+_DATE_HINT_RE = re.compile(
+    r"\d|today|tomorrow|monday|tuesday|wednesday|thursday|friday|saturday|sunday|"
+    r"\b(?:mon|tue|wed|thu|fri|sat|sun|jan|feb|mar|apr|may|jun|jul|aug|sep|oct|nov|dec)"
+)
+# A time of day anywhere in the phrase: '3pm', '10:30 am', 'at 17:00', '17:00'
+_TIME_RE = re.compile(
+    r"(?:\bat\s+)?\b(\d{1,2})(?::(\d{2}))?\s*(am|pm)\b|\bat\s+(\d{1,2})(?::(\d{2}))?\b|\b(\d{1,2}):(\d{2})\b"
+)
+_RELATIVE_DAY_RE = re.compile(r"\b(today|tomorrow)\b")
+# An ISO date ('2026-11-01'), possibly followed by 'T' and a time
+_ISO_DATE_RE = re.compile(r"\b(\d{4}-\d{2}-\d{2})(?:t(?=\d))?")
+
+def _parse_time(match):
+    """(hour, minute) of a _TIME_RE match, in 24-hour time."""
+    hour, minute, meridian = match.group(1), match.group(2), match.group(3)
+    if hour is None:
+        hour, minute = match.group(4) or match.group(6), match.group(5) or match.group(7)
+    hour, minute = int(hour), int(minute or 0)
+    if meridian == "pm" and hour < 12:
+        hour += 12
+    elif meridian == "am" and hour == 12:
+        hour = 0
+    return hour, minute
+
+def normalize_due(phrase, now=None):
+    """
+    Converts a deadline as written in an email ('by friday', 'on May 26 at 5pm',
+    'due 3pm today', 'tomorrow', '2026-11-01') into an ISO datetime. ISO dates
+    are read as such, and 'today' and 'tomorrow' are resolved from `now`
+    wherever they appear; other dates are read by core.nlp.extract_datetime.
+    Deadlines without a time get DEFAULT_DUE_TIME. Returns None when the
+    phrase names no date or one that can't be read ('in 2 days').
+    """
+    if not phrase:
+        return None
+    phrase = _DUE_PREFIX_RE.sub("", phrase.lower().strip())
+    if not _DATE_HINT_RE.search(phrase):
+        return None
+
+    now = now or datetime.now()
+    day = None
+    iso = _ISO_DATE_RE.search(phrase)
+    if iso:
+        try:
+            day = date.fromisoformat(iso.group(1))
+        except ValueError:
+            return None
+        phrase = phrase[:iso.start()] + " " + phrase[iso.end():]
+    phrase = re.sub(r"\bnoon\b", "12pm", phrase)
+    time_match = _TIME_RE.search(phrase)
+    hour, minute = _parse_time(time_match or _TIME_RE.search(DEFAULT_DUE_TIME))
+    if hour > 23 or minute > 59:
+        return None
+    rest = (phrase[:time_match.start()] + " " + phrase[time_match.end():]) if time_match else phrase
+    rest = " ".join(rest.replace(",", " ").split())
+
+    relative = _RELATIVE_DAY_RE.search(rest)
+    if relative:
+        day = now.date() + timedelta(days=1 if relative.group(1) == "tomorrow" else 0)
+    if day:
+        return datetime(day.year, day.month, day.day, hour, minute).isoformat()
+
+    rest = _DUE_PREFIX_RE.sub("", rest)
+    if rest and not rest.startswith(("this ", "next ")):
+        rest = "on " + rest
+    try:
+        due = extract_datetime(f"{rest} at {hour}:{minute:02d}".strip())
+    except ValueError:
+        # Phrases extract_datetime half-recognizes ('in 2 days', 'by the 15th', '31/02')
+        return None
+    # Weekday deadlines are computed from now; keep only the minute
+    return datetime.fromisoformat(due).replace(second=0, microsecond=0).isoformat() if due else None
+
+def item_hash(title, due):
+    """Content hash of an action item: its title and deadline, ignoring case, spacing and punctuation."""
+    normalize = lambda text: " ".join(re.findall(r"\w+", (text or "").lower()))
+    return hashlib.sha1(f"{normalize(title)}|{normalize(due)}".encode("utf-8")).hexdigest()
+
+def save_action_items(items, user_id=DEFAULT_USER):
+    """
+    Creates tasks for action items extracted from an email.
+
+    Deadlines are normalized with normalize_due and all new tasks are added
+    with one batched scheduler write. Items already created by an earlier
+    analysis (same content hash) are skipped.
+
+    Args:
+        items (list): Dictionaries with title and due, as returned by
+            EmailSummarizer.extract_action_items.
+        user_id (str): Owner of the tasks.
+
+    Returns:
+        dict: task_ids of the created tasks and the number of duplicates skipped.
+    """
+    unique = {}
+    for item in items:
+        unique.setdefault(item_hash(item["title"], item.get("due")), item)
+
+    with connect(user_id) as conn:
+        cursor = conn.cursor()
+        hashes = list(unique)
+        known = set()
+        if hashes:
+            cursor.execute(
+                f"SELECT hash FROM action_items WHERE user_id = ? AND hash IN ({', '.join('?' * len(hashes))})",
+                [user_id] + hashes
+            )
+            known = {row[0] for row in cursor.fetchall()}
+
+    new = [(digest, item) for digest, item in unique.items() if digest not in known]
+    rows = [(item["title"], normalize_due(item.get("due"))) for _, item in new]
+    task_ids = add_tasks(rows, user_id) if rows else []
+
+    with connect(user_id) as conn:
+        cursor = conn.cursor()
+        cursor.executemany(
+            "INSERT OR IGNORE INTO action_items (user_id, hash, task_id, title, due) VALUES (?, ?, ?, ?, ?)",
+            [(user_id, digest, task_id, title, due) for (digest, _), task_id, (title, due) in zip(new, task_ids, rows)]
+        )
+        conn.commit()
+
+    return {"task_ids": task_ids, "duplicates": len(items) - len(new)}
@@ -0,0 +1,204 @@
+import argparse
+import csv
+import json
+import multiprocessing
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from core.emotion_analysis import analyze_moods
+from core.mood_models import get_registry, default_language
+from core.nlp import interpret_command
+
+FORMATS = ("jsonl", "csv")
+CHUNK_SIZE = 256
+# Chunks in flight per worker; bounds memory to workers * IN_FLIGHT * chunk_size records
+IN_FLIGHT = 2
+PROGRESS_SECONDS = 5
+
+# Columns added to each record in CSV output
+CSV_RESULT_COLUMNS = ["intent", "title", "datetime", "mood", "confidence", "language", "error"]
+
+
+def _format_for(path, fmt=None):
+    fmt = fmt or os.path.splitext(path)[1].lstrip(".").lower()
+    if fmt not in FORMATS:
+        raise ValueError(f"Unsupported format '{fmt}'. Use one of: {', '.join(FORMATS)}")
+    return fmt
+
+def _read_records(path, fmt):
+    with open(path, encoding="utf-8", newline="") as f:
+        if fmt == "csv":
+            yield from csv.DictReader(f)
+        else:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+def _chunks(records, size):
+    chunk = []
+    for record in records:
+        chunk.append(record)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+# --- Worker side ---
+
+def _init_worker(moods=True):
+    # Load the default language's model once per process, before the first
+    # chunk; runs without sentiment analysis never need it
+    if not moods:
+        return
+    try:
+        get_registry().get(default_language())
+    except Exception as e:
+        print(f"Worker {os.getpid()} could not preload the mood model: {str(e)}", file=sys.stderr)
+
+def process_chunk(texts, interpret=True, moods=True):
+    """
+    Interprets and classifies a chunk of texts in a worker process.
+    Sentiment runs as one model call per language in the chunk.
+    Returns one dictionary per text with 'interpretation' and/or 'mood';
+    a text that fails gets {'error': ...} there instead, like a failed mood.
+    """
+    results = [{} for _ in texts]
+    if interpret:
+        for result, text in zip(results, texts):
+            try:
+                result["interpretation"] = interpret_command(text)
+            except Exception as e:
+                result["interpretation"] = {"error": str(e)}
+    if moods:
+        for result, mood in zip(results, analyze_moods(texts)):
+            mood.pop("original_text", None)
+            result["mood"] = mood
+    return results
+
+
+# --- Output ---
+
+class _JsonlWriter:
+    def __init__(self, f):
+        self.f = f
+
+    def write(self, record, result):
+        self.f.write(json.dumps(dict(record, **result), ensure_ascii=False) + "\n")
+
+class _CsvWriter:
+    def __init__(self, f):
+        self.f = f
+        self.writer = None
+
+    def write(self, record, result):
+        interpretation = result.get("interpretation", {})
+        mood = result.get("mood", {})
+        row = dict(
+            record,
+            intent=interpretation.get("intent"),
+            title=interpretation.get("title"),
+            datetime=interpretation.get("datetime"),
+            mood=mood.get("mood"),
+            confidence=mood.get("confidence"),
+            language=mood.get("language"),
+            error=interpretation.get("error") or mood.get("error"),
+        )
+        if self.writer is None:
+            self.writer = csv.DictWriter(self.f, fieldnames=list(row), extrasaction="ignore")
+            self.writer.writeheader()
+        self.writer.writerow(row)
+
+
+def process_file(input_path, output_path, field="text", workers=None, chunk_size=CHUNK_SIZE,
+                 interpret=True, moods=True, progress=True):
+    """
+    Streams a JSONL or CSV file of commands or journal entries through
+    interpret_command and the mood models on a pool of worker processes.
+
+    Records are sent in chunks; at most IN_FLIGHT chunks per worker are
+    pending at once, and results are written in input order as soon as
+    the oldest chunk completes, so memory stays bounded whatever the file
+    size. Each worker loads its models once. The output (same format rules
+    as the input) is written under a temporary name and renamed when done.
+
+    Returns a report with records, chunks, seconds and records_per_second.
+    """
+    in_fmt = _format_for(input_path)
+    out_fmt = _format_for(output_path)
+    workers = workers or os.cpu_count() or 1
+    started = last_report = time.monotonic()
+    records = chunks = errors = 0
+
+    context = multiprocessing.get_context("spawn")
+    try:
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=_init_worker,
+                                 initargs=(moods,)) as pool, \
+                open(output_path + ".tmp", "w", encoding="utf-8", newline="") as out:
+            writer = _CsvWriter(out) if out_fmt == "csv" else _JsonlWriter(out)
+            pending = deque()
+
+            def drain_one():
+                nonlocal records, chunks, errors, last_report
+                batch, future = pending.popleft()
+                for record, result in zip(batch, future.result()):
+                    writer.write(record, result)
+                    errors += "error" in result.get("interpretation", {}) or "error" in result.get("mood", {})
+                records += len(batch)
+                chunks += 1
+                now = time.monotonic()
+                if progress and now - last_report >= PROGRESS_SECONDS:
+                    last_report = now
+                    print(f"{records} records ({records / (now - started):.0f}/s)", file=sys.stderr)
+
+            for batch in _chunks(_read_records(input_path, in_fmt), chunk_size):
+                texts = [str(record.get(field) or "") for record in batch]
+                pending.append((batch, pool.submit(process_chunk, texts, interpret, moods)))
+                if len(pending) >= workers * IN_FLIGHT:
+                    drain_one()
+            while pending:
+                drain_one()
+    except BaseException:
+        # A failed run leaves no partial output behind
+        if os.path.exists(output_path + ".tmp"):
+            os.remove(output_path + ".tmp")
+        raise
+
+    os.replace(output_path + ".tmp", output_path)
+    seconds = time.monotonic() - started
+    return {
+        "records": records,
+        "chunks": chunks,
+        "errors": errors,
+        "workers": workers,
+        "seconds": round(seconds, 2),
+        "records_per_second": round(records / seconds, 1) if seconds else None,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Interpret commands and classify moods of a JSONL/CSV file on several processes."
+    )
+    parser.add_argument("input")
+    parser.add_argument("output")
+    parser.add_argument("--field", default="text", help="Record field holding the text (default: text)")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    parser.add_argument("--no-interpret", action="store_true", help="Skip command interpretation")
+    parser.add_argument("--no-moods", action="store_true", help="Skip sentiment analysis")
+    args = parser.parse_args()
+
+    report = process_file(
+        args.input, args.output, args.field, args.workers, args.chunk_size,
+        interpret=not args.no_interpret, moods=not args.no_moods
+    )
+    print(
+        f"{report['records']} records in {report['seconds']}s "
+        f"({report['records_per_second']}/s) with {report['workers']} workers, "
+        f"{report['chunks']} chunks, {report['errors']} errors"
+    )
@@ -11,11 +11,16 @@ from googleapiclient.errors import HttpError
 SCOPES = ['https://www.googleapis.com/auth/calendar.events']
 CREDENTIALS_FILE = 'config/credentials.json'
 TOKEN_FILE = 'config/token.json'
+TIMEZONE = 'America/Sao_Paulo'
 
 class CalendarError(Exception):
     """Exceção personalizada para erros do Google Calendar"""
     pass
 
+class CalendarOfflineError(CalendarError):
+    """Exceção para quando a API do Google Calendar não está acessível (sem conexão)"""
+    pass
+
 def autenticar_google_calendar():
     """
     Autentica o usuário via OAuth2 e retorna um serviço da API do Google Calendar.
@@ -46,6 +51,43 @@ def autenticar_google_calendar():
     except Exception as e:
         raise CalendarError(f"Erro na autenticação do Google Calendar: {str(e)}")
 
+def montar_corpo_evento(titulo, data_hora_inicio, data_hora_fim, descricao=None, local=None, convidados=None):
+    """
+    Monta o corpo de um evento no formato da API do Google Calendar.
+    
+    Args:
+        titulo (str): Título do evento
+        data_hora_inicio (datetime): Data e hora de início do evento
+        data_hora_fim (datetime): Data e hora de fim do evento
+        descricao (str, optional): Descrição do evento. Defaults to None.
+        local (str, optional): Local do evento. Defaults to None.
+        convidados (list, optional): Lista de emails dos convidados. Defaults to None.
+    
+    Returns:
+        dict: Corpo do evento
+    """
+    evento = {
+        'summary': titulo,
+        'start': {
+            'dateTime': data_hora_inicio.isoformat(),
+            'timeZone': TIMEZONE,
+        },
+        'end': {
+            'dateTime': data_hora_fim.isoformat(),
+            'timeZone': TIMEZONE,
+        },
+    }
+
+    # Adiciona campos opcionais se fornecidos
+    if descricao:
+        evento['description'] = descricao
+    if local:
+        evento['location'] = local
+    if convidados:
+        evento['attendees'] = [{'email': email} for email in convidados]
+
+    return evento
+
 def criar_evento_google_calendar(titulo, data_hora_inicio, duracao_min=30, descricao=None, local=None, convidados=None):
     """
     Cria um evento no calendário principal do usuário.
@@ -68,26 +110,7 @@ def criar_evento_google_calendar(titulo, data_hora_inicio, duracao_min=30, descr
         service = autenticar_google_calendar()
         data_hora_fim = data_hora_inicio + timedelta(minutes=duracao_min)
 
-        evento = {
-            'summary': titulo,
-            'start': {
-                'dateTime': data_hora_inicio.isoformat(),
-                'timeZone': 'America/Sao_Paulo',
-            },
-            'end': {
-                'dateTime': data_hora_fim.isoformat(),
-                'timeZone': 'America/Sao_Paulo',
-            },
-        }
-
-        # Adiciona campos opcionais se fornecidos
-        if descricao:
-            evento['description'] = descricao
-        if local:
-            evento['location'] = local
-        if convidados:
-            evento['attendees'] = [{'email': email} for email in convidados]
-
+        evento = montar_corpo_evento(titulo, data_hora_inicio, data_hora_fim, descricao, local, convidados)
         evento = service.events().insert(calendarId='primary', body=evento).execute()
         return evento.get('htmlLink')
     except HttpError as e:
@@ -0,0 +1,596 @@
+import itertools
+from abc import ABC, abstractmethod
+from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
+
+import httplib2
+from googleapiclient.errors import HttpError
+
+from data.database import connect, DEFAULT_USER
+from data.repository import require_sqlite
+from core import scheduler
+from core.calendar_integration import (
+    autenticar_google_calendar,
+    montar_corpo_evento,
+    CalendarError,
+    CalendarOfflineError,
+    TIMEZONE,
+)
+
+# Duração padrão dos eventos criados a partir de tarefas
+DEFAULT_DURATION_MIN = 30
+# Limite de requisições por lote da API do Google
+BATCH_SIZE = 50
+# Janela de eventos passados trazida na primeira sincronização
+INITIAL_SYNC_DAYS = 30
+# Propriedades privadas que ligam um evento à tarefa (ou tarefa recorrente) que o originou
+TASK_PROPERTY = 'smartroutine_task_id'
+RULE_PROPERTY = 'smartroutine_rule_id'
+
+class SyncTokenExpired(CalendarError):
+    """O token de sincronização incremental expirou e é preciso refazer a sincronização completa"""
+    pass
+
+def _utc_now():
+    return datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.%fZ')
+
+def _parse_utc(valor):
+    """Converte um timestamp RFC 3339 (ex: '2024-05-01T10:00:00.000Z') para datetime UTC."""
+    if not valor:
+        return None
+    return datetime.fromisoformat(valor.replace('Z', '+00:00'))
+
+def _to_local(valor):
+    """
+    Converte o início/fim de um evento para o formato usado nas tarefas
+    ('YYYY-MM-DDTHH:MM:SS', horário local sem fuso).
+    """
+    if 'dateTime' in valor:
+        data = datetime.fromisoformat(valor['dateTime'].replace('Z', '+00:00'))
+        if data.tzinfo:
+            data = data.astimezone(ZoneInfo(TIMEZONE)).replace(tzinfo=None)
+        return data.isoformat()
+    return datetime.fromisoformat(valor['date']).isoformat()
+
+def _same_time(a, b):
+    """Compara dois horários ISO ignorando frações de segundo (o calendário não as guarda)."""
+    try:
+        return datetime.fromisoformat(a).replace(microsecond=0) == datetime.fromisoformat(b).replace(microsecond=0)
+    except (TypeError, ValueError):
+        return a == b
+
+def _event_property(evento, nome):
+    valor = evento.get('extendedProperties', {}).get('private', {}).get(nome)
+    return int(valor) if valor else None
+
+def _event_task_id(evento):
+    return _event_property(evento, TASK_PROPERTY)
+
+
+class CalendarBackend(ABC):
+    """
+    Interface usada pelo motor de sincronização para falar com um calendário.
+
+    `list_changes` retorna os eventos alterados desde o token informado
+    (incluindo os cancelados) e o próximo token. `batch` executa uma lista
+    de operações ({'op': 'insert' | 'patch' | 'delete', 'event_id', 'body'})
+    e retorna um resultado por operação, na mesma ordem.
+    """
+
+    @abstractmethod
+    def list_changes(self, sync_token=None):
+        pass
+
+    @abstractmethod
+    def batch(self, operations):
+        pass
+
+
+class GoogleCalendarBackend(CalendarBackend):
+    """Backend que usa a API do Google Calendar, com sincronização incremental e requisições em lote."""
+
+    def __init__(self, service=None, calendar_id='primary'):
+        self._service = service
+        self.calendar_id = calendar_id
+
+    @property
+    def service(self):
+        if self._service is None:
+            self._service = autenticar_google_calendar()
+        return self._service
+
+    def list_changes(self, sync_token=None):
+        params = {
+            'calendarId': self.calendar_id,
+            'singleEvents': True,
+            'showDeleted': True,
+            'maxResults': 250,
+        }
+        if sync_token:
+            params['syncToken'] = sync_token
+        else:
+            inicio = datetime.now(timezone.utc) - timedelta(days=INITIAL_SYNC_DAYS)
+            params['timeMin'] = inicio.isoformat()
+
+        eventos = []
+        try:
+            while True:
+                resposta = self.service.events().list(**params).execute()
+                eventos.extend(resposta.get('items', []))
+                if 'nextPageToken' not in resposta:
+                    return eventos, resposta.get('nextSyncToken')
+                params['pageToken'] = resposta['nextPageToken']
+        except HttpError as e:
+            if e.resp.status == 410:
+                raise SyncTokenExpired("Token de sincronização expirado.")
+            raise CalendarError(f"Erro ao listar alterações do Google Calendar: {str(e)}")
+        except (httplib2.HttpLib2Error, OSError) as e:
+            raise CalendarOfflineError(f"Google Calendar inacessível: {str(e)}")
+
+    def batch(self, operations):
+        resultados = [None] * len(operations)
+
+        def callback(request_id, resposta, excecao):
+            indice = int(request_id)
+            if excecao is None:
+                resultados[indice] = {'ok': True, 'event': resposta}
+            else:
+                status = excecao.resp.status if isinstance(excecao, HttpError) else None
+                resultados[indice] = {'ok': False, 'status': status, 'error': str(excecao)}
+
+        eventos = self.service.events()
+        for inicio in range(0, len(operations), BATCH_SIZE):
+            lote = self.service.new_batch_http_request(callback=callback)
+            for indice in range(inicio, min(inicio + BATCH_SIZE, len(operations))):
+                operacao = operations[indice]
+                if operacao['op'] == 'insert':
+                    requisicao = eventos.insert(calendarId=self.calendar_id, body=operacao['body'])
+                elif operacao['op'] == 'patch':
+                    requisicao = eventos.patch(calendarId=self.calendar_id, eventId=operacao['event_id'], body=operacao['body'])
+                else:
+                    requisicao = eventos.delete(calendarId=self.calendar_id, eventId=operacao['event_id'])
+                lote.add(requisicao, request_id=str(indice))
+            try:
+                lote.execute()
+            except (httplib2.HttpLib2Error, OSError) as e:
+                raise CalendarOfflineError(f"Google Calendar inacessível: {str(e)}")
+
+        return resultados
+
+
+class FakeCalendarBackend(CalendarBackend):
+    """
+    Calendário em memória com a mesma semântica do backend do Google
+    (tokens incrementais, eventos cancelados, lotes). Usado em testes e
+    benchmarks; `online = False` simula a falta de conexão.
+    """
+
+    def __init__(self):
+        self.events = {}
+        self.online = True
+        self.calls = {'list': 0, 'batch': 0, 'requests': 0}
+        self._ids = itertools.count(1)
+        self._changes = {}
+        self._seq = 0
+
+    def _check_online(self):
+        if not self.online:
+            raise CalendarOfflineError("Google Calendar inacessível: modo offline simulado")
+
+    def _touch(self, evento):
+        self._seq += 1
+        evento['updated'] = _utc_now()
+        self._changes[evento['id']] = self._seq
+
+    # Alterações feitas "do lado do calendário", para simular o usuário editando eventos
+    def insert_event(self, body):
+        evento = dict(body, id=f"evt{next(self._ids)}", status='confirmed')
+        self.events[evento['id']] = evento
+        self._touch(evento)
+        return evento
+
+    def update_event(self, event_id, **campos):
+        evento = self.events[event_id]
+        evento.update(campos)
+        self._touch(evento)
+        return evento
+
+    def delete_event(self, event_id):
+        evento = self.events[event_id]
+        evento['status'] = 'cancelled'
+        self._touch(evento)
+
+    def list_changes(self, sync_token=None):
+        self._check_online()
+        self.calls['list'] += 1
+        # A sincronização completa (sem token) não traz eventos já cancelados
+        desde = int(sync_token) if sync_token else None
+        eventos = [
+            dict(self.events[event_id])
+            for event_id, seq in sorted(self._changes.items(), key=lambda item: item[1])
+            if (seq > desde if desde is not None else self.events[event_id]['status'] != 'cancelled')
+        ]
+        return eventos, str(self._seq)
+
+    def batch(self, operations):
+        self._check_online()
+        self.calls['batch'] += (len(operations) + BATCH_SIZE - 1) // BATCH_SIZE
+        self.calls['requests'] += len(operations)
+        resultados = []
+        for operacao in operations:
+            if operacao['op'] == 'insert':
+                resultados.append({'ok': True, 'event': dict(self.insert_event(operacao['body']))})
+                continue
+            evento = self.events.get(operacao['event_id'])
+            if evento is None or evento['status'] == 'cancelled':
+                resultados.append({'ok': False, 'status': 410 if evento else 404, 'error': 'Evento não encontrado'})
+            elif operacao['op'] == 'patch':
+                resultados.append({'ok': True, 'event': dict(self.update_event(evento['id'], **operacao['body']))})
+            else:
+                self.delete_event(evento['id'])
+                resultados.append({'ok': True, 'event': None})
+        return resultados
+
+
+class CalendarSyncEngine:
+    """
+    Sincronização bidirecional entre as tarefas locais e o calendário.
+
+    Cada alteração em uma tarefa incrementa sua `version` (via trigger);
+    tarefas com `version` maior que `synced_version` são as alterações
+    pendentes e funcionam como fila offline. O calendário é lido de forma
+    incremental (token de sincronização) e espelhado na tabela
+    `calendar_events`, e só as diferenças são enviadas, em lotes.
+    Conflitos são resolvidos pela alteração mais recente.
+
+    Tarefas removidas ou alteradas pelo calendário passam pelo scheduler
+    depois do commit, para que lembretes, busca e caches sejam avisados.
+    """
+
+    def __init__(self, backend=None, user_id=DEFAULT_USER):
+        require_sqlite("Calendar sync")
+        self.backend = backend or GoogleCalendarBackend()
+        self.user_id = user_id
+
+    def sync(self):
+        """
+        Executa um ciclo completo: traz as alterações do calendário e envia as locais.
+
+        Returns:
+            dict: Contadores da sincronização. Se o calendário estiver
+                inacessível, 'offline' é True e as alterações continuam na fila.
+        """
+        resultado = {'pulled': 0, 'created': 0, 'updated': 0, 'deleted': 0,
+                     'errors': [], 'offline': False}
+        try:
+            resultado['pulled'] = self.pull()
+            resultado.update(self.push())
+        except CalendarOfflineError:
+            resultado['offline'] = True
+        resultado['pending'] = self.pending_count()
+        return resultado
+
+    def pending_count(self):
+        """Número de tarefas com alterações ainda não enviadas ao calendário."""
+        with connect(self.user_id) as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                "SELECT (SELECT COUNT(*) FROM tasks WHERE user_id = ? AND version > synced_version) + "
+                "(SELECT COUNT(*) FROM recurring_tasks WHERE user_id = ? AND ((event_id IS NULL AND deleted = 0) OR deleted = 1))",
+                (self.user_id, self.user_id)
+            )
+            return cursor.fetchone()[0]
+
+    # --- Calendário -> tarefas ---
+
+    def pull(self):
+        """Aplica localmente as alterações feitas no calendário desde a última sincronização."""
+        token = self._get_state('sync_token')
+        try:
+            eventos, proximo_token = self.backend.list_changes(token)
+        except SyncTokenExpired:
+            with connect(self.user_id) as conn:
+                conn.execute("DELETE FROM calendar_events WHERE user_id = ?", (self.user_id,))
+                conn.commit()
+            eventos, proximo_token = self.backend.list_changes(None)
+
+        removidas, alteradas = [], []
+        with connect(self.user_id) as conn:
+            cursor = conn.cursor()
+            for evento in eventos:
+                self._apply_remote(cursor, evento, removidas, alteradas)
+            if proximo_token:
+                cursor.execute(
+                    "INSERT OR REPLACE INTO sync_state (user_id, key, value) VALUES (?, 'sync_token', ?)",
+                    (self.user_id, proximo_token)
+                )
+            conn.commit()
+
+        for task_id in removidas:
+            scheduler.delete_task(task_id, self.user_id)
+        for task_id, titulo, inicio in alteradas:
+            scheduler.notify_task_listeners('rescheduled', task_id, titulo, inicio, self.user_id)
+        return len(eventos)
+
+    def _apply_remote(self, cursor, evento, removidas, alteradas):
+        """
+        Aplica um evento alterado no calendário. Tarefas cujo evento foi
+        cancelado vão para `removidas` e as que mudaram para `alteradas`,
+        tratadas depois do commit.
+        """
+        rule_id = _event_property(evento, RULE_PROPERTY)
+        if rule_id is not None:
+            self._apply_remote_occurrence(cursor, evento, rule_id)
+            return
+
+        cursor.execute("SELECT task_id FROM calendar_events WHERE id = ? AND user_id = ?", (evento['id'], self.user_id))
+        espelho = cursor.fetchone()
+        task_id = _event_task_id(evento) or (espelho[0] if espelho else None)
+
+        tarefa = None
+        if task_id is not None:
+            cursor.execute(
+                "SELECT id, title, datetime, version, synced_version, updated_at, deleted, event_id FROM tasks "
+                "WHERE id = ? AND user_id = ?",
+                (task_id, self.user_id)
+            )
+            tarefa = cursor.fetchone()
+            # O evento pode ser um duplicado de uma tarefa que já tem outro evento
+            if tarefa and tarefa[7] not in (None, evento['id']):
+                tarefa = None
+
+        local_mais_recente = False
+        if tarefa and tarefa[3] > tarefa[4]:
+            local = _parse_utc(tarefa[5])
+            remoto = _parse_utc(evento.get('updated'))
+            local_mais_recente = bool(local and remoto and local > remoto)
+
+        if evento.get('status') == 'cancelled':
+            cursor.execute("DELETE FROM calendar_events WHERE id = ?", (evento['id'],))
+            if tarefa is None:
+                return
+            if local_mais_recente and not tarefa[6]:
+                # A tarefa mudou depois da exclusão do evento: será recriada no push
+                cursor.execute("UPDATE tasks SET event_id = NULL WHERE id = ?", (tarefa[0],))
+            else:
+                # Sem evento, scheduler.delete_task a remove de vez
+                cursor.execute("UPDATE tasks SET event_id = NULL WHERE id = ?", (tarefa[0],))
+                removidas.append(tarefa[0])
+            return
+
+        inicio = _to_local(evento['start'])
+        fim = _to_local(evento['end'])
+        cursor.execute(
+            "INSERT OR REPLACE INTO calendar_events (id, user_id, summary, start, end, updated, task_id) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (evento['id'], self.user_id, evento.get('summary'), inicio, fim, evento.get('updated'), tarefa[0] if tarefa else None)
+        )
+        if tarefa is None or tarefa[6] or local_mais_recente:
+            return
+
+        titulo = evento.get('summary') or tarefa[1]
+        if titulo != tarefa[1] or not _same_time(tarefa[2], inicio) or tarefa[7] != evento['id']:
+            cursor.execute(
+                "UPDATE tasks SET title = ?, datetime = ?, event_id = ? WHERE id = ?",
+                (titulo, inicio, evento['id'], tarefa[0])
+            )
+            if titulo != tarefa[1] or not _same_time(tarefa[2], inicio):
+                alteradas.append((tarefa[0], titulo, inicio))
+        cursor.execute("UPDATE tasks SET synced_version = version WHERE id = ?", (tarefa[0],))
+
+    def _apply_remote_occurrence(self, cursor, evento, rule_id):
+        """
+        Ocorrências de tarefas recorrentes só são espelhadas (para consultas de
+        horários livres); uma ocorrência cancelada no calendário é marcada
+        como 'skipped' localmente.
+        """
+        if evento.get('status') == 'cancelled':
+            cursor.execute("DELETE FROM calendar_events WHERE id = ?", (evento['id'],))
+            if evento.get('originalStartTime'):
+                cursor.execute(
+                    "INSERT INTO task_occurrences (rule_id, occurs_at, status) "
+                    "SELECT id, ?, 'skipped' FROM recurring_tasks WHERE id = ? AND user_id = ? "
+                    "ON CONFLICT(rule_id, occurs_at) DO UPDATE SET status = 'skipped'",
+                    (_to_local(evento['originalStartTime']), rule_id, self.user_id)
+                )
+            return
+
+        cursor.execute(
+            "INSERT OR REPLACE INTO calendar_events (id, user_id, summary, start, end, updated, task_id) VALUES (?, ?, ?, ?, ?, ?, NULL)",
+            (evento['id'], self.user_id, evento.get('summary'), _to_local(evento['start']), _to_local(evento['end']),
+             evento.get('updated'))
+        )
+
+    # --- Tarefas -> calendário ---
+
+    def push(self):
+        """
+        Envia ao calendário as tarefas alteradas localmente, em lotes, e
+        só com os campos que mudaram.
+        """
+        contadores = {'created': 0, 'updated': 0, 'deleted': 0, 'errors': []}
+        self._propagadas = []
+        with connect(self.user_id) as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                "SELECT id, title, datetime, deleted, event_id, version FROM tasks WHERE user_id = ? AND version > synced_version",
+                (self.user_id,)
+            )
+            tarefas = cursor.fetchall()
+
+            operacoes = []
+            for tarefa in tarefas:
+                operacao = self._diff(cursor, tarefa)
+                if operacao is None:
+                    self._mark_synced(cursor, tarefa[0], tarefa[5])
+                else:
+                    operacoes.append(operacao)
+
+            # Tarefas recorrentes viram um único evento recorrente (RRULE)
+            cursor.execute(
+                "SELECT id, title, rule, dtstart, deleted, event_id FROM recurring_tasks "
+                "WHERE user_id = ? AND ((event_id IS NULL AND deleted = 0) OR deleted = 1)",
+                (self.user_id,)
+            )
+            for rule_id, titulo, regra, dtstart, deleted, event_id in cursor.fetchall():
+                if deleted:
+                    operacoes.append({'op': 'delete', 'event_id': event_id, 'rule_id': rule_id})
+                    continue
+                inicio = datetime.fromisoformat(dtstart)
+                corpo = montar_corpo_evento(
+                    titulo, inicio, inicio + timedelta(minutes=DEFAULT_DURATION_MIN),
+                    descricao=f"Task from SmartRoutine AI: {titulo}"
+                )
+                corpo['recurrence'] = [f"RRULE:{regra}"]
+                corpo['extendedProperties'] = {'private': {RULE_PROPERTY: str(rule_id)}}
+                operacoes.append({'op': 'insert', 'body': corpo, 'rule_id': rule_id})
+            conn.commit()
+
+        if operacoes:
+            resultados = self.backend.batch(operacoes)
+            with connect(self.user_id) as conn:
+                cursor = conn.cursor()
+                for operacao, resultado in zip(operacoes, resultados):
+                    self._apply_result(cursor, operacao, resultado, contadores)
+                conn.commit()
+
+        for task_id in self._propagadas:
+            scheduler.delete_task(task_id, self.user_id)
+        return contadores
+
+    def _diff(self, cursor, tarefa):
+        """Calcula a operação necessária para levar uma tarefa ao calendário (ou None)."""
+        task_id, titulo, data_hora, deleted, event_id, version = tarefa
+
+        if deleted or not data_hora:
+            if event_id:
+                return {'op': 'delete', 'event_id': event_id, 'task_id': task_id, 'version': version}
+            return None
+
+        try:
+            inicio = datetime.fromisoformat(data_hora).replace(microsecond=0)
+        except ValueError:
+            return None
+
+        if not event_id:
+            # Um evento desta tarefa pode já existir (ex: envio interrompido antes de salvar o id)
+            cursor.execute("SELECT id FROM calendar_events WHERE task_id = ? AND user_id = ?", (task_id, self.user_id))
+            existente = cursor.fetchone()
+            if existente:
+                cursor.execute("UPDATE tasks SET event_id = ?, synced_version = ? WHERE id = ?",
+                               (existente[0], version, task_id))
+                return None
+
+            corpo = montar_corpo_evento(
+                titulo, inicio, inicio + timedelta(minutes=DEFAULT_DURATION_MIN),
+                descricao=f"Task from SmartRoutine AI: {titulo}"
+            )
+            corpo['extendedProperties'] = {'private': {TASK_PROPERTY: str(task_id)}}
+            return {'op': 'insert', 'body': corpo, 'task_id': task_id, 'version': version}
+
+        cursor.execute("SELECT summary, start, end FROM calendar_events WHERE id = ?", (event_id,))
+        espelho = cursor.fetchone()
+        corpo = {}
+        if espelho is None or espelho[0] != titulo:
+            corpo['summary'] = titulo
+        if espelho is None or espelho[1] != inicio.isoformat():
+            # Mantém a duração que o evento tem no calendário
+            duracao = timedelta(minutes=DEFAULT_DURATION_MIN)
+            if espelho:
+                duracao = datetime.fromisoformat(espelho[2]) - datetime.fromisoformat(espelho[1])
+            evento = montar_corpo_evento(titulo, inicio, inicio + duracao)
+            corpo['start'] = evento['start']
+            corpo['end'] = evento['end']
+        if not corpo:
+            return None
+        return {'op': 'patch', 'event_id': event_id, 'body': corpo, 'task_id': task_id, 'version': version}
+
+    def _apply_result(self, cursor, operacao, resultado, contadores):
+        if 'rule_id' in operacao:
+            self._apply_rule_result(cursor, operacao, resultado, contadores)
+            return
+
+        task_id = operacao['task_id']
+
+        if not resultado['ok']:
+            if resultado.get('status') in (404, 410) and operacao['op'] != 'insert':
+                # O evento já não existe no calendário
+                cursor.execute("DELETE FROM calendar_events WHERE id = ?", (operacao['event_id'],))
+                if operacao['op'] == 'delete':
+                    self._mark_synced(cursor, task_id, operacao['version'])
+                else:
+                    cursor.execute("UPDATE tasks SET event_id = NULL WHERE id = ?", (task_id,))
+            else:
+                contadores['errors'].append(f"Task {task_id}: {resultado.get('error')}")
+            return
+
+        if operacao['op'] == 'delete':
+            cursor.execute("DELETE FROM calendar_events WHERE id = ?", (operacao['event_id'],))
+            cursor.execute("UPDATE tasks SET event_id = NULL WHERE id = ?", (task_id,))
+            self._mark_synced(cursor, task_id, operacao['version'])
+            contadores['deleted'] += 1
+            return
+
+        evento = resultado['event']
+        cursor.execute(
+            "INSERT OR REPLACE INTO calendar_events (id, user_id, summary, start, end, updated, task_id) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (evento['id'], self.user_id, evento.get('summary'), _to_local(evento['start']), _to_local(evento['end']),
+             evento.get('updated'), task_id)
+        )
+        cursor.execute("UPDATE tasks SET event_id = ? WHERE id = ?", (evento['id'], task_id))
+        self._mark_synced(cursor, task_id, operacao['version'])
+        contadores['created' if operacao['op'] == 'insert' else 'updated'] += 1
+
+    def _apply_rule_result(self, cursor, operacao, resultado, contadores):
+        rule_id = operacao['rule_id']
+        if not resultado['ok'] and not (operacao['op'] == 'delete' and resultado.get('status') in (404, 410)):
+            contadores['errors'].append(f"Recurring task {rule_id}: {resultado.get('error')}")
+            return
+
+        if operacao['op'] == 'delete':
+            cursor.execute("DELETE FROM recurring_tasks WHERE id = ? AND deleted = 1", (rule_id,))
+            contadores['deleted'] += 1
+        else:
+            cursor.execute("UPDATE recurring_tasks SET event_id = ? WHERE id = ?", (resultado['event']['id'], rule_id))
+            contadores['created'] += 1
+
+    def _mark_synced(self, cursor, task_id, version):
+        """
+        Marca a versão enviada como sincronizada. Tombstones já propagados
+        perdem o evento e são removidos por scheduler.delete_task no fim do
+        push. Se a tarefa mudou durante o envio, continua pendente.
+        """
+        cursor.execute("UPDATE tasks SET synced_version = ? WHERE id = ? AND synced_version < ?",
+                       (version, task_id, version))
+        cursor.execute("UPDATE tasks SET event_id = NULL WHERE id = ? AND deleted = 1 AND version = synced_version",
+                       (task_id,))
+        if cursor.rowcount:
+            self._propagadas.append(task_id)
+
+    def _get_state(self, chave):
+        with connect(self.user_id) as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT value FROM sync_state WHERE user_id = ? AND key = ?", (self.user_id, chave))
+            linha = cursor.fetchone()
+        return linha[0] if linha else None
+
+
+def sincronizar_tarefas_com_calendario(backend=None, user_id=DEFAULT_USER):
+    """
+    Sincroniza as tarefas com o Google Calendar nos dois sentidos.
+
+    Args:
+        backend (CalendarBackend, optional): Backend do calendário. Defaults to Google Calendar.
+        user_id (str, optional): Usuário dono das tarefas. Defaults to DEFAULT_USER.
+
+    Returns:
+        dict: Contadores da sincronização (ver CalendarSyncEngine.sync)
+    """
+    from core import free_slots, task_cache
+    try:
+        return CalendarSyncEngine(backend, user_id).sync()
+    finally:
+        # Eventos e horários de tarefas podem ter mudado, mesmo quando a
+        # sincronização falha depois de gravar o pull: o índice de horários
+        # livres e o cache de tarefas pendentes são refeitos
+        free_slots.invalidate(user_id)
+        task_cache.invalidate(user_id)
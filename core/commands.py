@@ -0,0 +1,88 @@
+from datetime import datetime
+
+from core.emotion_analysis import analyze_mood
+from core.free_slots import schedule_task
+from core.moods import save_mood
+from core.recommender import suggest_routine
+from core.recurrence import first_occurrence
+from core.scheduler import add_recurring_task, list_tasks
+from data.database import connect, DEFAULT_USER
+
+# Pending tasks read out by a 'list tasks' command
+SPOKEN_TASKS = 3
+
+
+def _add_task(result, user_id, place):
+    if result.get("recurrence"):
+        # Recurring task: store the rule once, starting at its first occurrence
+        if result.get("datetime"):
+            dtstart = datetime.fromisoformat(result["datetime"]).replace(second=0, microsecond=0)
+        else:
+            dtstart = datetime.now().replace(hour=9, minute=0, second=0, microsecond=0)
+        dtstart = first_occurrence(result["recurrence"], dtstart) or dtstart
+        rule_id = add_recurring_task(result["title"], result["recurrence"], dtstart.isoformat(), user_id)
+        return {"rule_id": rule_id, "message": f"Recurring task added: {result['title']}"}
+
+    scheduled = schedule_task(result["title"], result.get("datetime"), user_id, place=place)
+    message = f"Task added: {result['title']}"
+    if scheduled["placed"]:
+        placed_at = datetime.fromisoformat(scheduled["date_time"]).strftime("%A at %I:%M %p")
+        message += f", scheduled {placed_at}"
+    if scheduled["conflicts"]:
+        message += f". It overlaps {len(scheduled['conflicts'])} other item(s)"
+    return {"scheduled": scheduled, "message": message}
+
+def _list_tasks(result, user_id, place):
+    tasks = list_tasks(user_id)
+    if not tasks:
+        return {"tasks": tasks, "message": "You have no pending tasks."}
+    titles = ", ".join(task.title for task in tasks[:SPOKEN_TASKS])
+    more = f", and {len(tasks) - SPOKEN_TASKS} more" if len(tasks) > SPOKEN_TASKS else ""
+    return {"tasks": tasks, "message": f"You have {len(tasks)} pending tasks: {titles}{more}."}
+
+def _analyze_mood(result, user_id, place):
+    mood = analyze_mood(result["text"])
+    if "error" in mood:
+        return {"ok": False, "mood": mood, "message": f"Error: {mood['error']}"}
+    save_mood(mood["original_text"], mood["mood"], mood["confidence"], user_id)
+    return {"mood": mood, "message": f"Your mood is {mood['mood']}"}
+
+def _suggest_routine(result, user_id, place):
+    suggestion = suggest_routine(user_id)
+    return {"routine": suggestion, "message": suggestion}
+
+# Handler of each intent returned by interpret_command
+HANDLERS = {
+    "add_task": _add_task,
+    "list_tasks": _list_tasks,
+    "analyze_mood": _analyze_mood,
+    "suggest_routine": _suggest_routine,
+}
+
+
+def execute_command(result, user_id=DEFAULT_USER, place=True):
+    """
+    Carries out a command interpreted by interpret_command.
+
+    Returns a dictionary with the intent, ok, a short confirmation in
+    'message' (meant to be shown or spoken) and the intent's own data:
+    'scheduled' or 'rule_id' for add_task, 'tasks', 'mood' or 'routine'.
+    """
+    handler = HANDLERS.get(result["intent"])
+    if handler is None:
+        return {"intent": result["intent"], "ok": False,
+                "message": "Sorry, I didn't understand. Try 'add task ...', 'list tasks' or 'I feel ...'."}
+    outcome = handler(result, user_id, place)
+    outcome.setdefault("ok", True)
+    outcome["intent"] = result["intent"]
+    return outcome
+
+def save_interaction(command, response, user_id=DEFAULT_USER):
+    """Records a command and the assistant's reply in the interaction history."""
+    with connect(user_id) as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            "INSERT INTO interactions (command, response, timestamp, user_id) VALUES (?, ?, ?, ?)",
+            (command, response, datetime.now().strftime("%Y-%m-%d %H:%M:%S"), user_id)
+        )
+        conn.commit()
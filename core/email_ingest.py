@@ -0,0 +1,493 @@
+import hashlib
+import html
+import imaplib
+import os
+import queue
+import re
+import threading
+from abc import ABC, abstractmethod
+from email import policy
+from email.parser import BytesFeedParser, BytesHeaderParser
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlparse, unquote
+
+from data.database import connect, DEFAULT_USER
+
+# Text kept from each email body; enough for a summary, bounded for storage
+MAX_BODY_CHARS = 20000
+# Messages written per transaction (and fetched per IMAP request)
+BATCH_SIZE = 50
+READ_CHUNK = 64 * 1024
+
+_TAG_RE = re.compile(r"<[^>]+>")
+_UID_RE = re.compile(rb"UID (\d+)")
+
+
+def _new_parser():
+    return BytesFeedParser(policy=policy.default)
+
+def _body_text(message):
+    """Plain-text body of a message, from its text/plain part or its HTML stripped of tags."""
+    part = message.get_body(preferencelist=("plain", "html"))
+    if part is None:
+        return ""
+    try:
+        text = part.get_content()
+    except (LookupError, UnicodeDecodeError):
+        text = part.get_payload(decode=True).decode("utf-8", errors="replace")
+    if part.get_content_subtype() == "html":
+        text = html.unescape(_TAG_RE.sub(" ", text))
+    return re.sub(r"[ \t]+", " ", text).strip()[:MAX_BODY_CHARS]
+
+def _message_id(message, body):
+    """The Message-ID header, or a stable hash of the message when it has none."""
+    message_id = (message.get("Message-ID") or "").strip()
+    if message_id:
+        return message_id
+    digest = hashlib.sha1(
+        "\0".join([str(message.get("From", "")), str(message.get("Date", "")),
+                   str(message.get("Subject", "")), body]).encode("utf-8")
+    ).hexdigest()
+    return f"<sha1-{digest}@smartroutine>"
+
+def _parse_date(value):
+    try:
+        return parsedate_to_datetime(value).isoformat() if value else None
+    except (TypeError, ValueError):
+        return None
+
+def parse_email(message):
+    """
+    Extracts the fields stored for an email from a parsed message.
+    Returns a dictionary with message_id, sender, subject, date and body.
+    """
+    body = _body_text(message)
+    return {
+        "message_id": _message_id(message, body),
+        "sender": str(message.get("From", "")),
+        "subject": str(message.get("Subject", "")),
+        "date": _parse_date(message.get("Date")),
+        "body": body,
+    }
+
+
+class MailSource(ABC):
+    """
+    Interface for mailboxes.
+
+    `key` identifies the mailbox in sync_state. `fetch(state, is_known, is_seen)`
+    yields (uid, message, state) for each message newer than `state` (a
+    string saved from a previous fetch, or None); `is_known(message_ids)`
+    returns the ids already stored, so sources that can read headers
+    first skip downloading known messages.
+
+    Sources whose messages have no order to resume from set `tracks_seen`:
+    every uid they yield is recorded, and `is_seen(uids)` returns the ones
+    recorded by previous fetches.
+    """
+    key = None
+    tracks_seen = False
+
+    @abstractmethod
+    def fetch(self, state, is_known, is_seen):
+        ...
+
+
+class MboxSource(MailSource):
+    """
+    mbox file read incrementally from the byte offset where the last fetch
+    stopped. Messages are fed line by line to a feed parser, so the file is
+    never loaded whole.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.key = f"mbox:{os.path.abspath(path)}"
+
+    def fetch(self, state, is_known, is_seen):
+        offset = int(state or 0)
+        if offset > os.path.getsize(self.path):
+            offset = 0  # The file was rewritten; Message-ID dedupe skips the old messages
+
+        with open(self.path, "rb") as f:
+            f.seek(offset)
+            parser, start, previous_blank = None, offset, True
+            while True:
+                line_start = f.tell()
+                line = f.readline()
+                if not line or (line.startswith(b"From ") and previous_blank):
+                    if parser is not None:
+                        yield str(start), parser.close(), str(line_start)
+                    if not line:
+                        return
+                    parser, start = _new_parser(), line_start
+                elif parser is not None:
+                    # mboxrd escapes body lines starting with "From " as ">From "
+                    if line.startswith(b">") and line.lstrip(b">").startswith(b"From "):
+                        line = line[1:]
+                    parser.feed(line)
+                previous_blank = line in (b"\n", b"\r\n")
+
+
+class MaildirSource(MailSource):
+    """
+    Maildir folder. Files are named uniquely when delivered and keep that
+    name (up to the ":" flags) when moved from new to cur, so the names
+    already read are recorded and only the other files are read, each fed
+    to the parser in chunks. Modification times are not used: delivery
+    and sync tools keep or reuse them, so a message can arrive with an
+    older or equal time than one already read.
+    """
+    tracks_seen = True
+
+    def __init__(self, path):
+        self.path = path
+        self.key = f"maildir:{os.path.abspath(path)}"
+
+    def fetch(self, state, is_known, is_seen):
+        entries = {}
+        for folder in ("new", "cur"):
+            directory = os.path.join(self.path, folder)
+            if not os.path.isdir(directory):
+                continue
+            with os.scandir(directory) as it:
+                for entry in it:
+                    if entry.is_file() and not entry.name.startswith("."):
+                        entries[entry.name.split(":")[0]] = (entry.stat().st_mtime, entry.path)
+
+        names = list(entries)
+        seen = set()
+        for start in range(0, len(names), BATCH_SIZE * 10):
+            seen |= is_seen(names[start:start + BATCH_SIZE * 10])
+
+        # Oldest first, so summaries are queued in delivery order
+        for name in sorted(set(names) - seen, key=lambda name: (entries[name][0], name)):
+            parser = _new_parser()
+            with open(entries[name][1], "rb") as f:
+                for chunk in iter(lambda: f.read(READ_CHUNK), b""):
+                    parser.feed(chunk)
+            yield name, parser.close(), None
+
+
+class ImapSource(MailSource):
+    """
+    IMAP mailbox fetched by UID. Only UIDs above the last fetched one are
+    requested, their Message-ID headers are checked first, and full bodies
+    are downloaded only for unknown messages. A UIDVALIDITY change (mailbox
+    recreated) starts over from the first UID.
+    """
+
+    def __init__(self, host, username, password, mailbox="INBOX", port=None, ssl=True, client_factory=None):
+        self.host = host
+        self.username = username
+        self.password = password
+        self.mailbox = mailbox
+        self.port = port
+        self.ssl = ssl
+        self.client_factory = client_factory
+        self.key = f"imap:{username}@{host}/{mailbox}"
+
+    def _connect(self):
+        if self.client_factory is not None:
+            client = self.client_factory()
+        elif self.ssl:
+            client = imaplib.IMAP4_SSL(self.host, self.port or 993)
+        else:
+            client = imaplib.IMAP4(self.host, self.port or 143)
+        client.login(self.username, self.password)
+        return client
+
+    @staticmethod
+    def _fetched(data):
+        """(uid, bytes) pairs from an IMAP FETCH response."""
+        for item in data:
+            if isinstance(item, tuple):
+                match = _UID_RE.search(item[0])
+                if match:
+                    yield int(match.group(1)), item[1]
+
+    def fetch(self, state, is_known, is_seen):
+        client = self._connect()
+        try:
+            typ, _ = client.select(self.mailbox, readonly=True)
+            if typ != "OK":
+                raise ValueError(f"Mailbox not found: {self.mailbox}")
+            _, validity = client.response("UIDVALIDITY")
+            validity = validity[0].decode() if validity and validity[0] else "0"
+
+            saved_validity, _, last_uid = (state or "").partition(":")
+            last_uid = int(last_uid) if saved_validity == validity and last_uid else 0
+
+            _, data = client.uid("SEARCH", None, f"UID {last_uid + 1}:*")
+            # "n:*" always matches the newest message, even when its UID is below n
+            uids = sorted(uid for uid in map(int, data[0].split()) if uid > last_uid) if data and data[0] else []
+
+            for start in range(0, len(uids), BATCH_SIZE):
+                batch = uids[start:start + BATCH_SIZE]
+                uid_set = ",".join(map(str, batch))
+                _, data = client.uid("FETCH", uid_set, "(UID BODY.PEEK[HEADER.FIELDS (MESSAGE-ID)])")
+                header_parser = BytesHeaderParser(policy=policy.default)
+                message_ids = {
+                    uid: (header_parser.parsebytes(headers).get("Message-ID") or "").strip()
+                    for uid, headers in self._fetched(data)
+                }
+                known = is_known([mid for mid in message_ids.values() if mid])
+                wanted = [uid for uid in batch if not message_ids.get(uid) or message_ids[uid] not in known]
+
+                bodies = {}
+                if wanted:
+                    _, data = client.uid("FETCH", ",".join(map(str, wanted)), "(UID BODY.PEEK[])")
+                    for uid, raw in self._fetched(data):
+                        parser = _new_parser()
+                        parser.feed(raw)
+                        bodies[uid] = parser.close()
+
+                for uid in batch:
+                    yield str(uid), bodies.get(uid), f"{validity}:{uid}"
+        finally:
+            try:
+                client.logout()
+            except Exception:
+                pass
+
+
+def source_from_url(url, password=None):
+    """
+    Builds a MailSource from a URL: mbox:/path, maildir:/path,
+    imap://user@host/INBOX or imaps://user@host:993/INBOX.
+    """
+    scheme, _, rest = url.partition(":")
+    if scheme == "mbox":
+        return MboxSource(rest)
+    if scheme == "maildir":
+        return MaildirSource(rest)
+    if scheme in ("imap", "imaps"):
+        parsed = urlparse(url)
+        return ImapSource(
+            parsed.hostname,
+            unquote(parsed.username or ""),
+            password if password is not None else unquote(parsed.password or ""),
+            mailbox=unquote(parsed.path.lstrip("/")) or "INBOX",
+            port=parsed.port,
+            ssl=scheme == "imaps",
+        )
+    raise ValueError(f"Unsupported mail source: {url}")
+
+
+def _known_message_ids(user_id, message_ids):
+    if not message_ids:
+        return set()
+    with connect(user_id) as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            f"SELECT message_id FROM emails WHERE user_id = ? AND message_id IN ({', '.join('?' * len(message_ids))})",
+            [user_id] + list(message_ids)
+        )
+        return {row[0] for row in cursor.fetchall()}
+
+def _seen_uids(user_id, source_key, uids):
+    if not uids:
+        return set()
+    with connect(user_id) as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            f"SELECT uid FROM mail_seen WHERE user_id = ? AND source = ? AND uid IN ({', '.join('?' * len(uids))})",
+            [user_id, source_key] + list(uids)
+        )
+        return {row[0] for row in cursor.fetchall()}
+
+def ingest(source, user_id=DEFAULT_USER, summarize=True):
+    """
+    Fetches new messages from a MailSource into the emails table.
+
+    Messages are written in batches; the source's position is saved in
+    sync_state in the same transaction, so the next call continues after
+    the last stored message. Duplicates are dropped by Message-ID, and
+    new emails are queued for background summarization.
+
+    Returns a dictionary with the number of fetched, new and duplicate messages.
+    """
+    key = f"mail:{source.key}"
+    with connect(user_id) as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT value FROM sync_state WHERE user_id = ? AND key = ?", (user_id, key))
+        row = cursor.fetchone()
+    state = row[0] if row else None
+
+    counts = {"fetched": 0, "new": 0, "duplicates": 0}
+    new_ids = []
+    pending = []
+    fetched_uids = []
+
+    def flush(state):
+        with connect(user_id) as conn:
+            cursor = conn.cursor()
+            for uid, fields in pending:
+                cursor.execute(
+                    "INSERT OR IGNORE INTO emails (user_id, message_id, source, uid, sender, subject, date, body) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (user_id, fields["message_id"], source.key, uid, fields["sender"], fields["subject"],
+                     fields["date"], fields["body"])
+                )
+                if cursor.rowcount:
+                    counts["new"] += 1
+                    new_ids.append(cursor.lastrowid)
+                else:
+                    counts["duplicates"] += 1
+            if source.tracks_seen:
+                cursor.executemany(
+                    "INSERT OR IGNORE INTO mail_seen (user_id, source, uid) VALUES (?, ?, ?)",
+                    ((user_id, source.key, uid) for uid in fetched_uids)
+                )
+            cursor.execute(
+                "INSERT OR REPLACE INTO sync_state (user_id, key, value) VALUES (?, ?, ?)",
+                (user_id, key, state)
+            )
+            conn.commit()
+        pending.clear()
+        fetched_uids.clear()
+
+    last_state = state
+    fetched = source.fetch(
+        state,
+        lambda ids: _known_message_ids(user_id, ids),
+        lambda uids: _seen_uids(user_id, source.key, uids)
+    )
+    for uid, message, last_state in fetched:
+        counts["fetched"] += 1
+        fetched_uids.append(uid)
+        if message is None:
+            counts["duplicates"] += 1  # Skipped by its headers
+        else:
+            pending.append((uid, parse_email(message)))
+        if len(fetched_uids) >= BATCH_SIZE:
+            flush(last_state)
+    if last_state != state or fetched_uids:
+        flush(last_state)
+
+    if summarize and new_ids:
+        get_summary_queue(user_id).enqueue(new_ids)
+    return counts
+
+
+class SummaryQueue(threading.Thread):
+    """
+    Background thread that summarizes ingested emails one at a time with
+    EmailSummarizer and stores the summaries. Emails left pending by a
+    previous run are queued again on start.
+    """
+
+    def __init__(self, user_id=DEFAULT_USER, summarizer=None, on_summary=None):
+        """
+        Args:
+            user_id (str): User whose emails are summarized.
+            summarizer (EmailSummarizer, optional): Defaults to a new EmailSummarizer.
+            on_summary (callable, optional): Called with (email_id, summary) after each summary.
+        """
+        super().__init__(name=f"SummaryQueue-{user_id}", daemon=True)
+        self.user_id = user_id
+        self.summarizer = summarizer
+        self.on_summary = on_summary
+        self._queue = queue.Queue()
+
+    def start(self):
+        with connect(self.user_id) as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                "SELECT id FROM emails WHERE user_id = ? AND status = 'pending' ORDER BY id",
+                (self.user_id,)
+            )
+            self.enqueue([row[0] for row in cursor.fetchall()])
+        super().start()
+
+    def enqueue(self, email_ids):
+        for email_id in email_ids:
+            self._queue.put(email_id)
+
+    def pending(self):
+        """Number of emails waiting to be summarized."""
+        return self._queue.qsize()
+
+    def stop(self):
+        self._queue.put(None)
+
+    def join_queue(self):
+        """Blocks until every queued email was processed."""
+        self._queue.join()
+
+    def run(self):
+        while True:
+            email_id = self._queue.get()
+            try:
+                if email_id is None:
+                    return
+                self._summarize(email_id)
+            except Exception as e:
+                print(f"Error summarizing email {email_id}: {str(e)}")
+            finally:
+                self._queue.task_done()
+
+    def _summarize(self, email_id):
+        with connect(self.user_id) as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                "SELECT message_id, subject, body FROM emails WHERE id = ? AND user_id = ? AND status = 'pending'",
+                (email_id, self.user_id)
+            )
+            row = cursor.fetchone()
+        if row is None:
+            return
+        message_id, subject, body = row
+
+        if self.summarizer is None:
+            from core.email_summary import EmailSummarizer
+            self.summarizer = EmailSummarizer()
+        try:
+            result = self.summarizer.summarize_email(
+                f"Subject: {subject}\n\n{body}" if subject else body, user_id=self.user_id
+            )
+        except Exception as e:
+            with connect(self.user_id) as conn:
+                conn.execute("UPDATE emails SET status = 'error', error = ? WHERE id = ?", (str(e), email_id))
+                conn.commit()
+            return
+
+        summary = result["summary"]
+        with connect(self.user_id) as conn:
+            conn.execute(
+                "UPDATE emails SET status = 'summarized', summary = ?, summary_model = ?, error = NULL WHERE id = ?",
+                (summary, result["metadata"]["model"], email_id)
+            )
+            conn.commit()
+
+        from core.semantic_search import index_email_summary
+        index_email_summary(message_id, summary, self.user_id)
+        if self.on_summary is not None:
+            self.on_summary(email_id, summary)
+
+
+_queues = {}
+_queues_lock = threading.Lock()
+
+def get_summary_queue(user_id=DEFAULT_USER):
+    """Returns the user's running SummaryQueue, starting it on first use."""
+    with _queues_lock:
+        summary_queue = _queues.get(user_id)
+        if summary_queue is None or not summary_queue.is_alive():
+            summary_queue = SummaryQueue(user_id)
+            summary_queue.start()
+            _queues[user_id] = summary_queue
+        return summary_queue
+
+def list_emails(limit=20, user_id=DEFAULT_USER):
+    """
+    Retrieves the latest ingested emails, newest first, as
+    (id, sender, subject, date, summary, status) tuples.
+    """
+    with connect(user_id) as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            "SELECT id, sender, subject, date, summary, status FROM emails WHERE user_id = ? ORDER BY id DESC LIMIT ?",
+            (user_id, limit)
+        )
+        return cursor.fetchall()
@@ -1,105 +1,393 @@
+import json
 import openai
 import os
-from typing import Dict, Optional
+import re
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Dict, List, Optional
 from datetime import datetime
 
+from config.settings import LOCAL_SUMMARY_MODEL, SHORT_EMAIL_WORDS, OPENAI_MAX_CONCURRENT
+from core.token_budget import clean_email, count_tokens, fit_messages, output_budget, record_usage
+from data.database import DEFAULT_USER
+
+SYSTEM_PROMPT = """You are an email summarization assistant. Your task is to:
+                        1. Extract key points from the email
+                        2. Identify action items or requests
+                        3. Highlight important dates or deadlines
+                        4. Maintain a professional tone
+                        5. Keep the summary concise and clear"""
+
+ACTION_ITEMS_PROMPT = """Extract the action items (requests, tasks, deadlines) addressed to the reader of this email.
+Reply with a JSON array only, one object per action item:
+{"title": "<short imperative task title>", "due": "<deadline as written in the email, e.g. 'on May 26 at 5pm' or 'next friday'>" or null}
+Reply with [] when there are no action items."""
+
+# Sentences that read as requests, used when the hosted model is unavailable
+_REQUEST_RE = re.compile(
+    r"\b(please|could you|can you|would you|need to|needs to|must|make sure|don't forget|remember to|"
+    r"action required|deadline|due)\b",
+    re.IGNORECASE
+)
+_POLITE_PREFIX_RE = re.compile(r"^(please|could you|can you|would you|don't forget to|remember to|make sure to)\s+", re.IGNORECASE)
+_DUE_RE = re.compile(
+    r"\b(?:by|on|before|until|due)\s+("
+    r"today|tomorrow|(?:next |this )?(?:monday|tuesday|wednesday|thursday|friday|saturday|sunday)"
+    r"|\d{1,2}(?:st|nd|rd|th)?(?: of)? [a-z]+|[a-z]+ \d{1,2}(?:st|nd|rd|th)?|\d{1,2}[/.-]\d{1,2}"
+    r")(?:\s+at\s+\d{1,2}(?::\d{2})?\s*(?:am|pm)?)?",
+    re.IGNORECASE
+)
+
+def _parse_action_items(reply: str):
+    """Action items from a model reply holding a JSON array (possibly inside a code fence)."""
+    match = re.search(r"\[.*\]", reply, re.DOTALL)
+    items = json.loads(match.group(0)) if match else []
+    return [
+        {"title": str(item["title"]).strip(), "due": (str(item["due"]).strip() or None) if item.get("due") else None}
+        for item in items
+        if isinstance(item, dict) and str(item.get("title") or "").strip()
+    ]
+
+def heuristic_action_items(email_text: str):
+    """
+    Finds action items without a model: sentences phrased as requests,
+    with the deadline phrase they mention (if any).
+    """
+    items = []
+    for sentence in re.split(r"(?<=[.!?])\s+|\n+", email_text):
+        sentence = sentence.strip(" -*\t")
+        if not sentence or not _REQUEST_RE.search(sentence):
+            continue
+        due = _DUE_RE.search(sentence)
+        title = (sentence[:due.start()] + sentence[due.end():]) if due else sentence
+        title = _POLITE_PREFIX_RE.sub("", title.strip(" ,")).rstrip(" ,.!?")
+        items.append({"title": title[:1].upper() + title[1:120], "due": due.group(0) if due else None})
+    return items
+
+# How long the remote backend is skipped after a rate limit or connection failure
+REMOTE_COOLDOWN_SECONDS = 60
+REMOTE_TIMEOUT_SECONDS = 20
+
+
+class SummarizerUnavailable(Exception):
+    """Raised by a backend that cannot serve the request right now (rate limited, offline)."""
+    pass
+
+
+def _openai_errors(*names):
+    """Exception classes by name, from openai>=1.0 or the legacy openai.error module."""
+    modules = [openai, getattr(openai, "error", None)]
+    return tuple(
+        getattr(module, name) for module in modules if module is not None
+        for name in names
+        if isinstance(getattr(module, name, None), type) and issubclass(getattr(module, name), BaseException)
+    )
+
+
+class SummarizerBackend(ABC):
+    """
+    Interface for summarization backends.
+    `summarize` returns the summary text (`user_id` is who the request is
+    made for, used by backends that record usage); `available` tells the
+    router whether the backend can take a request now.
+    """
+    name = "backend"
+
+    @abstractmethod
+    def summarize(self, email_text: str, max_tokens: int, temperature: float, user_id: Optional[str] = None) -> str:
+        ...
+
+    def available(self) -> bool:
+        return True
+
+
+class OpenAIBackend(SummarizerBackend):
+    """
+    Hosted chat model. Tracks requests in flight and backs off after rate
+    limits or connection failures, so the router can send traffic elsewhere
+    instead of waiting on a failing API.
+    """
+
+    def __init__(self, api_key: str, model: str = "gpt-3.5-turbo", max_concurrent: int = OPENAI_MAX_CONCURRENT):
+        self.api_key = api_key
+        self.name = model
+        self.model = model
+        self.max_concurrent = max_concurrent
+        self._in_flight = 0
+        self._unavailable_until = 0.0
+        self._lock = threading.Lock()
+        self._client = openai.OpenAI(api_key=api_key) if hasattr(openai, "OpenAI") else None
+        if self._client is None:
+            openai.api_key = api_key
+
+    def available(self) -> bool:
+        with self._lock:
+            return self._in_flight < self.max_concurrent and time.monotonic() >= self._unavailable_until
+
+    def _back_off(self, seconds: float = REMOTE_COOLDOWN_SECONDS) -> None:
+        with self._lock:
+            self._unavailable_until = time.monotonic() + seconds
+
+    def chat(self, messages, max_tokens: int, temperature: float, operation: str = "chat",
+             user_id: str = DEFAULT_USER) -> str:
+        """
+        Sends a chat request and returns the reply text.
+        The last message is cut to fit the context window (and MAX_EMAIL_TOKENS),
+        and the tokens used are recorded under `operation`.
+        """
+        messages, max_tokens, budget = fit_messages(messages, self.model, max_tokens)
+        with self._lock:
+            self._in_flight += 1
+        started = time.perf_counter()
+        try:
+            if self._client is not None:
+                response = self._client.chat.completions.create(
+                    model=self.model, messages=messages, max_tokens=max_tokens,
+                    temperature=temperature, timeout=REMOTE_TIMEOUT_SECONDS
+                )
+            else:
+                response = openai.ChatCompletion.create(
+                    model=self.model, messages=messages, max_tokens=max_tokens,
+                    temperature=temperature, request_timeout=REMOTE_TIMEOUT_SECONDS
+                )
+            usage = getattr(response, "usage", None)
+            record_usage(
+                self.model, operation, budget["prompt_tokens"],
+                getattr(usage, "prompt_tokens", None), getattr(usage, "completion_tokens", None),
+                max_tokens, budget["trimmed_tokens"], (time.perf_counter() - started) * 1000, user_id
+            )
+            return response.choices[0].message.content.strip()
+        except _openai_errors("AuthenticationError"):
+            raise ValueError("Invalid OpenAI API key. Please check your credentials.")
+        except _openai_errors("RateLimitError") as e:
+            self._back_off()
+            raise SummarizerUnavailable(f"OpenAI API rate limit exceeded: {str(e)}")
+        except _openai_errors("APIConnectionError", "APITimeoutError", "Timeout", "ServiceUnavailableError",
+                              "InternalServerError") as e:
+            self._back_off()
+            raise SummarizerUnavailable(f"OpenAI API unreachable: {str(e)}")
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+
+    def summarize(self, email_text: str, max_tokens: int, temperature: float, user_id: Optional[str] = None) -> str:
+        return self.chat(
+            [
+                {"role": "system", "content": SYSTEM_PROMPT},
+                {"role": "user", "content": email_text}
+            ],
+            max_tokens, temperature, "summary", user_id or DEFAULT_USER
+        )
+
+
+# Hosted backends by API key, shared so every summarizer sees the same load and back-off
+_remote_backends = {}
+_remote_lock = threading.Lock()
+
+def get_remote_backend(api_key: str) -> OpenAIBackend:
+    with _remote_lock:
+        if api_key not in _remote_backends:
+            _remote_backends[api_key] = OpenAIBackend(api_key)
+        return _remote_backends[api_key]
+
+
+# Local pipelines by model name, loaded once per process and shared by every summarizer
+_local_pipelines = {}
+_local_lock = threading.Lock()
+
+
+class LocalBackend(SummarizerBackend):
+    """
+    Small seq2seq summarization model running on the CPU.
+    The model is loaded on first use and stays loaded for the life of the process.
+    """
+
+    def __init__(self, model: str = LOCAL_SUMMARY_MODEL):
+        self.name = model
+        self.model = model
+
+    def _pipeline(self):
+        with _local_lock:
+            if self.model not in _local_pipelines:
+                from transformers import pipeline
+                _local_pipelines[self.model] = pipeline("summarization", model=self.model, device=-1)
+            return _local_pipelines[self.model]
+
+    def summarize(self, email_text: str, max_tokens: int, temperature: float, user_id: Optional[str] = None) -> str:
+        summarizer = self._pipeline()
+        input_tokens = len(summarizer.tokenizer(email_text, truncation=True)["input_ids"])
+        # The summary can't be longer than the email itself
+        max_length = max(8, min(max_tokens, input_tokens))
+        result = summarizer(
+            email_text,
+            max_length=max_length,
+            min_length=min(20, max_length // 2),
+            do_sample=temperature > 0.5,
+            truncation=True
+        )
+        return result[0]["summary_text"].strip()
+
+
 class EmailSummarizer:
-    def __init__(self, api_key: Optional[str] = None):
+    def __init__(self, api_key: Optional[str] = None, local_backend: Optional[SummarizerBackend] = None,
+                 short_email_words: int = SHORT_EMAIL_WORDS):
         """
         Initialize the email summarizer.
-        
+
+        Emails are routed to the local model when they are short, when the
+        hosted model is saturated or backing off, or when there is no API key;
+        a failed hosted request falls back to the local model.
+
         Args:
             api_key (str, optional): OpenAI API key. If not provided, will use OPENAI_API_KEY from environment.
+                Without a key, only the local model is used.
+            local_backend (SummarizerBackend, optional): Local backend. Defaults to LocalBackend().
+            short_email_words (int): Emails with at most this many words are summarized locally.
         """
         self.api_key = api_key or os.getenv("OPENAI_API_KEY")
-        if not self.api_key:
-            raise ValueError("OpenAI API key not found. Please set OPENAI_API_KEY environment variable or provide it directly.")
-        
-        openai.api_key = self.api_key
-    
-    def summarize_email(self, email_text: str, max_tokens: int = 250, temperature: float = 0.7) -> Dict:
+        self.remote = get_remote_backend(self.api_key) if self.api_key else None
+        self.local = local_backend or LocalBackend()
+        self.short_email_words = short_email_words
+
+    def _route(self, email_text: str):
+        """Returns (backend, reason) for an email."""
+        if self.remote is None:
+            return self.local, "offline"
+        if len(email_text.split()) <= self.short_email_words:
+            return self.local, "short"
+        if not self.remote.available():
+            return self.local, "remote_saturated"
+        return self.remote, "remote"
+
+    def summarize_email(self, email_text: str, max_tokens: int = 250, temperature: float = 0.7,
+                        user_id: str = DEFAULT_USER) -> Dict:
         """
-        Summarize an email using OpenAI's GPT model.
-        
+        Summarize an email with the hosted model or the local one.
+
+        Signatures, disclaimers and extra whitespace are removed first, and
+        the summary length is scaled to the email (30% of its tokens, up to
+        `max_tokens`).
+
         Args:
             email_text (str): The email text to summarize
             max_tokens (int): Maximum number of tokens in the summary
             temperature (float): Controls randomness in the output (0.0 to 1.0)
-            
+            user_id (str): User the hosted model's token usage is recorded for
+
         Returns:
-            Dict: Contains summary and metadata
+            Dict: Contains summary and metadata (including the backend used and why)
         """
+        original_length = len(email_text)
+        email_text = clean_email(email_text) or email_text
+        input_tokens = count_tokens(email_text, self.remote.model if self.remote else "gpt-3.5-turbo")
+        max_tokens = output_budget(input_tokens, max_tokens)
+        backend, reason = self._route(email_text)
         try:
-            response = openai.ChatCompletion.create(
-                model="gpt-3.5-turbo",
-                messages=[
-                    {
-                        "role": "system",
-                        "content": """You are an email summarization assistant. Your task is to:
-                        1. Extract key points from the email
-                        2. Identify action items or requests
-                        3. Highlight important dates or deadlines
-                        4. Maintain a professional tone
-                        5. Keep the summary concise and clear"""
-                    },
-                    {"role": "user", "content": email_text}
-                ],
-                max_tokens=max_tokens,
-                temperature=temperature
-            )
-            
-            summary = response.choices[0].message.content.strip()
-            
-            return {
-                "summary": summary,
-                "metadata": {
-                    "timestamp": datetime.now().isoformat(),
-                    "model": "gpt-3.5-turbo",
-                    "max_tokens": max_tokens,
-                    "temperature": temperature,
-                    "original_length": len(email_text),
-                    "summary_length": len(summary)
-                }
-            }
-            
-        except openai.error.AuthenticationError:
-            raise ValueError("Invalid OpenAI API key. Please check your credentials.")
-        except openai.error.RateLimitError:
-            raise Exception("OpenAI API rate limit exceeded. Please try again later.")
+            try:
+                summary = backend.summarize(email_text, max_tokens, temperature, user_id)
+            except SummarizerUnavailable:
+                if backend is self.local:
+                    raise
+                backend, reason = self.local, "remote_failed"
+                summary = backend.summarize(email_text, max_tokens, temperature, user_id)
+        except ValueError:
+            raise
         except Exception as e:
             raise Exception(f"Error summarizing email: {str(e)}")
-    
-    def analyze_sentiment(self, email_text: str) -> Dict:
+
+        return {
+            "summary": summary,
+            "metadata": {
+                "timestamp": datetime.now().isoformat(),
+                "model": backend.name,
+                "backend": "local" if backend is self.local else "remote",
+                "route": reason,
+                "input_tokens": input_tokens,
+                "max_tokens": max_tokens,
+                "temperature": temperature,
+                "original_length": original_length,
+                "cleaned_length": len(email_text),
+                "summary_length": len(summary)
+            }
+        }
+
+    def extract_action_items(self, email_text: str, user_id: str = DEFAULT_USER) -> List[Dict]:
+        """
+        Extract the action items of an email.
+        Uses the hosted model when available and a local heuristic otherwise.
+
+        Args:
+            email_text (str): The email text to analyze
+            user_id (str): User the hosted model's token usage is recorded for
+
+        Returns:
+            List[Dict]: One dictionary per action item, with title and due
+                (the deadline as written in the email, or None)
+        """
+        email_text = clean_email(email_text) or email_text
+        if self.remote is not None and self.remote.available():
+            try:
+                reply = self.remote.chat(
+                    [
+                        {"role": "system", "content": ACTION_ITEMS_PROMPT},
+                        {"role": "user", "content": email_text}
+                    ],
+                    max_tokens=output_budget(count_tokens(email_text, self.remote.model), 300),
+                    temperature=0.0,
+                    operation="action_items",
+                    user_id=user_id
+                )
+                return _parse_action_items(reply)
+            except (SummarizerUnavailable, ValueError, KeyError):
+                pass
+        return heuristic_action_items(email_text)
+
+    def analyze_sentiment(self, email_text: str, user_id: str = DEFAULT_USER) -> Dict:
         """
         Analyze the sentiment of an email.
-        
+        Uses the local mood model when the hosted model is unavailable.
+
         Args:
             email_text (str): The email text to analyze
-            
+            user_id (str): User the hosted model's token usage is recorded for
+
         Returns:
             Dict: Contains sentiment analysis results
         """
+        email_text = clean_email(email_text) or email_text
         try:
-            response = openai.ChatCompletion.create(
-                model="gpt-3.5-turbo",
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "Analyze the sentiment of this email. Consider tone, urgency, and emotional content."
-                    },
-                    {"role": "user", "content": email_text}
-                ],
-                max_tokens=100,
-                temperature=0.3
-            )
-            
-            sentiment = response.choices[0].message.content.strip()
-            
+            if self.remote is not None and self.remote.available():
+                try:
+                    sentiment = self.remote.chat(
+                        [
+                            {
+                                "role": "system",
+                                "content": "Analyze the sentiment of this email. Consider tone, urgency, and emotional content."
+                            },
+                            {"role": "user", "content": email_text}
+                        ],
+                        max_tokens=100,
+                        temperature=0.3,
+                        operation="sentiment",
+                        user_id=user_id
+                    )
+                    return {
+                        "sentiment": sentiment,
+                        "timestamp": datetime.now().isoformat()
+                    }
+                except SummarizerUnavailable:
+                    pass
+
+            from core.emotion_analysis import analyze_mood
+            mood = analyze_mood(email_text)
+            if "error" in mood:
+                raise Exception(mood["error"])
             return {
-                "sentiment": sentiment,
+                "sentiment": f"{mood['mood'].capitalize()} ({mood['confidence'] * 100:.0f}% confidence, local model)",
                 "timestamp": datetime.now().isoformat()
             }
-            
+
         except Exception as e:
             raise Exception(f"Error analyzing sentiment: {str(e)}")
 
@@ -107,14 +395,14 @@ class EmailSummarizer:
 def summarize_email(email_text: str, api_key: Optional[str] = None) -> str:
     """
     Convenience function to quickly summarize an email.
-    
+
     Args:
         email_text (str): The email text to summarize
         api_key (str, optional): OpenAI API key
-        
+
     Returns:
         str: The email summary
     """
     summarizer = EmailSummarizer(api_key)
     result = summarizer.summarize_email(email_text)
-    return result["summary"] 
\ No newline at end of file
+    return result["summary"]
@@ -1,21 +1,19 @@
-from transformers import pipeline
+from core.mood_models import get_registry
 
-# Load a sentiment-analysis pipeline
-# This will download the model the first time it's used
-classifier = pipeline("sentiment-analysis")
+# Models are loaded on first use, per language, by the mood model registry
 
-def analyze_mood(text):
+def analyze_mood(text, language=None):
     """
-    Uses a pretrained model to analyze the sentiment of a text.
-    Returns a classification such as POSITIVE or NEGATIVE with a confidence score.
+    Uses a pretrained model for the text's language to analyze its sentiment.
+    The language is detected from the text unless given ('pt', 'en', ...).
+    Returns a classification such as positive, negative or neutral with a confidence score.
     """
     try:
-        result = classifier(text)[0]
-        label = result['label'].lower()  # e.g., 'positive', 'negative'
-        score = round(result['score'], 2)
+        result = get_registry().classify(text, language)
         return {
-            "mood": label,
-            "confidence": score,
+            "mood": result["mood"],
+            "confidence": result["confidence"],
+            "language": result["language"],
             "original_text": text
         }
     except Exception as e:
@@ -23,3 +21,14 @@ def analyze_mood(text):
             "error": str(e),
             "original_text": text
         }
+
+def analyze_moods(texts, language=None):
+    """
+    Analyzes several texts at once, batching the texts of each language
+    through its model. Returns one analyze_mood-style dictionary per text.
+    """
+    try:
+        results = get_registry().classify_batch(texts, language)
+        return [dict(result, original_text=text) for text, result in zip(texts, results)]
+    except Exception as e:
+        return [{"error": str(e), "original_text": text} for text in texts]
@@ -0,0 +1,294 @@
+import bisect
+import threading
+from datetime import datetime, timedelta, time
+
+from config.settings import WORKDAY_START, WORKDAY_END
+from core import scheduler
+from core.calendar_sync import DEFAULT_DURATION_MIN
+from data.database import connect, DEFAULT_USER
+from data.fulltext import similar_tasks
+from data.repository import get_backend, uses_sqlite
+
+# Automatically placed tasks start on multiples of this many minutes
+SLOT_STEP_MIN = 15
+# How far ahead next_free_slot looks before giving up
+SEARCH_DAYS = 60
+
+
+class IntervalIndex:
+    """
+    Busy time of one user, as two sorted structures:
+
+    - the intervals themselves, (start, end, key) sorted by start;
+    - their union, as parallel lists of the starts and ends of disjoint
+      busy blocks, both sorted.
+
+    Free/busy and conflict queries bisect the blocks, so they cost
+    O(log n) plus the blocks they return. Adding an interval merges it into
+    the blocks it touches; removing one rebuilds only its own block.
+    """
+
+    def __init__(self):
+        self._items = {}      # key -> (start, end)
+        self._by_start = []   # (start, end, key), sorted
+        self._starts = []     # busy block starts
+        self._ends = []       # busy block ends
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self._items)
+
+    def __contains__(self, key):
+        return key in self._items
+
+    def add(self, key, start, end):
+        """Adds or moves the interval [start, end) identified by `key`."""
+        with self._lock:
+            self.remove(key)
+            if end <= start:
+                return
+            self._items[key] = (start, end)
+            bisect.insort(self._by_start, (start, end, key))
+            # Blocks that overlap or touch the new interval collapse into one
+            i = bisect.bisect_left(self._ends, start)
+            j = bisect.bisect_right(self._starts, end)
+            if i < j:
+                start = min(start, self._starts[i])
+                end = max(end, self._ends[j - 1])
+            self._starts[i:j] = [start]
+            self._ends[i:j] = [end]
+
+    def remove(self, key):
+        with self._lock:
+            interval = self._items.pop(key, None)
+            if interval is None:
+                return
+            start, end = interval
+            del self._by_start[bisect.bisect_left(self._by_start, (start, end, key))]
+
+            block = bisect.bisect_right(self._starts, start) - 1
+            block_start, block_end = self._starts[block], self._ends[block]
+            lo = bisect.bisect_left(self._by_start, (block_start,))
+            hi = bisect.bisect_left(self._by_start, (block_end,))
+            starts, ends = [], []
+            for item_start, item_end, _ in self._by_start[lo:hi]:
+                if starts and item_start <= ends[-1]:
+                    ends[-1] = max(ends[-1], item_end)
+                else:
+                    starts.append(item_start)
+                    ends.append(item_end)
+            self._starts[block:block + 1] = starts
+            self._ends[block:block + 1] = ends
+
+    def busy(self, start, end):
+        """Busy blocks overlapping [start, end), clipped to it."""
+        with self._lock:
+            i = bisect.bisect_right(self._ends, start)
+            blocks = []
+            while i < len(self._starts) and self._starts[i] < end:
+                blocks.append((max(self._starts[i], start), min(self._ends[i], end)))
+                i += 1
+            return blocks
+
+    def free(self, start, end):
+        """Free gaps within [start, end)."""
+        gaps = []
+        cursor = start
+        for block_start, block_end in self.busy(start, end):
+            if block_start > cursor:
+                gaps.append((cursor, block_start))
+            cursor = max(cursor, block_end)
+        if cursor < end:
+            gaps.append((cursor, end))
+        return gaps
+
+    def overlapping(self, start, end):
+        """(key, start, end) of the intervals overlapping [start, end)."""
+        with self._lock:
+            found = []
+            i = bisect.bisect_right(self._ends, start)
+            while i < len(self._starts) and self._starts[i] < end:
+                lo = bisect.bisect_left(self._by_start, (self._starts[i],))
+                hi = bisect.bisect_left(self._by_start, (min(self._ends[i], end),))
+                found.extend((key, s, e) for s, e, key in self._by_start[lo:hi] if e > start)
+                i += 1
+            return found
+
+    def next_free(self, duration, after, before=None):
+        """
+        Earliest start at or after `after` where `duration` fits without
+        overlapping a busy block, or None if it would end after `before`.
+        """
+        with self._lock:
+            candidate = after
+            i = bisect.bisect_right(self._ends, after)
+            while i < len(self._starts) and self._starts[i] < candidate + duration:
+                candidate = max(candidate, self._ends[i])
+                i += 1
+            if before is not None and candidate + duration > before:
+                return None
+            return candidate
+
+
+def _parse(value):
+    try:
+        return datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        return None
+
+def _is_all_day(start, end):
+    # All-day events (birthdays, holidays) don't block the day's hours
+    return start.time() == time(0) and end.time() == time(0) and end - start >= timedelta(days=1)
+
+def _task_interval(date_time):
+    start = _parse(date_time)
+    return (start, start + timedelta(minutes=DEFAULT_DURATION_MIN)) if start else None
+
+def build_index(user_id=DEFAULT_USER):
+    """
+    Builds a user's IntervalIndex from the pending tasks and the local
+    mirror of the calendar (calendar_events). A task's event, when it has
+    one, gives the task its real duration.
+    """
+    index = IntervalIndex()
+    for task in get_backend().list_tasks(user_id):
+        interval = _task_interval(task.date_time)
+        if interval:
+            index.add(("task", task.id), *interval)
+
+    rows = []
+    # Calendar sync needs SQLite, so other backends have no calendar mirror
+    if uses_sqlite():
+        with connect(user_id) as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                "SELECT id, start, end, task_id FROM calendar_events WHERE user_id = ? AND end >= ?",
+                (user_id, (datetime.now() - timedelta(days=1)).isoformat())
+            )
+            rows = cursor.fetchall()
+    for event_id, start, end, task_id in rows:
+        start, end = _parse(start), _parse(end)
+        if start is None or end is None or _is_all_day(start, end):
+            continue
+        if task_id is None:
+            index.add(("event", event_id), start, end)
+        elif ("task", task_id) in index:
+            index.add(("task", task_id), start, end)
+    return index
+
+
+# Indexes by user, built on first use and kept current by the scheduler
+# listener below; a calendar sync invalidates the user's index
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+def get_index(user_id=DEFAULT_USER):
+    with _indexes_lock:
+        if user_id not in _indexes:
+            _indexes[user_id] = build_index(user_id)
+        return _indexes[user_id]
+
+def invalidate(user_id=DEFAULT_USER):
+    """Drops a user's index; it is rebuilt on the next query."""
+    with _indexes_lock:
+        _indexes.pop(user_id, None)
+
+def _on_task_event(event, task_id, title, date_time, user_id):
+    index = _indexes.get(user_id)
+    if index is None:
+        return
+    interval = _task_interval(date_time) if event in ("added", "rescheduled") else None
+    if interval:
+        index.add(("task", task_id), *interval)
+    else:
+        index.remove(("task", task_id))
+
+scheduler.add_task_listener(_on_task_event)
+
+
+def _workday(day):
+    return (datetime.combine(day, time.fromisoformat(WORKDAY_START)),
+            datetime.combine(day, time.fromisoformat(WORKDAY_END)))
+
+def _round_up(moment, step=SLOT_STEP_MIN):
+    moment = moment.replace(second=0, microsecond=0) + (timedelta(minutes=1) if moment.second or moment.microsecond else timedelta(0))
+    return moment + timedelta(minutes=-moment.minute % step)
+
+def free_busy(start, end, user_id=DEFAULT_USER):
+    """
+    Busy blocks and free gaps of a user between two datetimes.
+    Returns a dictionary with 'busy' and 'free' lists of (start, end) ISO pairs.
+    """
+    index = get_index(user_id)
+    iso = lambda intervals: [(s.isoformat(), e.isoformat()) for s, e in intervals]
+    return {"busy": iso(index.busy(start, end)), "free": iso(index.free(start, end))}
+
+def next_free_slot(duration_min=DEFAULT_DURATION_MIN, after=None, user_id=DEFAULT_USER, index=None):
+    """
+    Start of the first free slot of `duration_min` minutes within working
+    hours (WORKDAY_START-WORKDAY_END), at or after `after` (default: now).
+    Returns a datetime, or None if nothing is free in the next SEARCH_DAYS days.
+    """
+    index = index or get_index(user_id)
+    duration = timedelta(minutes=duration_min)
+    after = _round_up(after or datetime.now())
+    for offset in range(SEARCH_DAYS):
+        day_start, day_end = _workday(after.date() + timedelta(days=offset))
+        slot = index.next_free(duration, max(after, day_start), day_end)
+        if slot is not None:
+            return slot
+    return None
+
+def find_conflicts(date_time, duration_min=DEFAULT_DURATION_MIN, user_id=DEFAULT_USER, ignore=None):
+    """
+    Tasks and events overlapping a slot starting at `date_time` (ISO string).
+    Returns a list of dictionaries with kind ('task' or 'event'), id, start and end.
+    """
+    start = _parse(date_time)
+    if start is None:
+        return []
+    return [
+        {"kind": key[0], "id": key[1], "start": s.isoformat(), "end": e.isoformat()}
+        for key, s, e in get_index(user_id).overlapping(start, start + timedelta(minutes=duration_min))
+        if key != ignore
+    ]
+
+def schedule_task(title, date_time=None, user_id=DEFAULT_USER, duration_min=DEFAULT_DURATION_MIN, place=True):
+    """
+    Adds a task, placing it in the next free slot when it has no time
+    (unless `place` is False).
+
+    Returns a dictionary with the task id, its date_time, whether it was
+    placed automatically, the tasks and events it conflicts with, and the
+    pending tasks with nearly the same title (possible duplicates).
+    """
+    placed = False
+    if not date_time and place:
+        slot = next_free_slot(duration_min, user_id=user_id)
+        if slot is not None:
+            date_time, placed = slot.isoformat(), True
+    conflicts = find_conflicts(date_time, duration_min, user_id) if date_time else []
+    duplicates = similar_tasks(title, user_id)
+    task_id = scheduler.add_task(title, date_time, user_id)
+    return {"id": task_id, "date_time": date_time, "placed": placed, "conflicts": conflicts, "duplicates": duplicates}
+
+def place_untimed_tasks(user_id=DEFAULT_USER, after=None, duration_min=DEFAULT_DURATION_MIN):
+    """
+    Gives every pending task without a time the next free slot, oldest
+    task first, and saves them in one batch.
+    Returns the (task_id, title, date_time) placements.
+    """
+    index = get_index(user_id)
+    placements = []
+    for task in sorted(get_backend().list_tasks(user_id), key=lambda task: task.id):
+        if task.date_time:
+            continue
+        slot = next_free_slot(duration_min, after, index=index)
+        if slot is None:
+            break
+        # Reserve the slot so the next task goes after it
+        index.add(("task", task.id), slot, slot + timedelta(minutes=duration_min))
+        placements.append((task.id, task.title, slot.isoformat()))
+    if placements:
+        scheduler.reschedule_tasks(placements, user_id)
+    return placements
@@ -0,0 +1,156 @@
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+from config.settings import MOOD_ANALYTICS_CACHE_SIZE
+from data import database
+from data.archive import load_archive
+from data.repository import require_sqlite
+
+# Columns read from the moods table and their dtypes.
+# The free-text description is not needed for analytics, so it is never loaded.
+MOOD_DTYPES = {
+    "id": "int64",
+    "date": "string",
+    "classification": "string",
+}
+
+TIME_OF_DAY_BINS = [0, 6, 12, 18, 24]
+TIME_OF_DAY_LABELS = ["Night", "Morning", "Afternoon", "Evening"]
+
+# Last computed analytics per (database path, user), with the max mood id they
+# were computed at; the least recently used entries past MOOD_ANALYTICS_CACHE_SIZE are dropped
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+def _prepare_chunk(chunk):
+    """
+    Converts a raw chunk of mood rows into typed columns:
+    timestamp, mood label, confidence and signed score.
+    """
+    parsed = chunk["classification"].str.extract(r"^(?P<mood>\w+)\s*\((?P<confidence>\d+)%\)")
+    mood = parsed["mood"].str.lower()
+    confidence = pd.to_numeric(parsed["confidence"], errors="coerce").astype("float32") / 100
+    sign = mood.map({"positive": 1, "negative": -1}).fillna(0).astype("int8")
+
+    return pd.DataFrame({
+        "id": chunk["id"],
+        "timestamp": pd.to_datetime(chunk["date"], format="%Y-%m-%d %H:%M", errors="coerce"),
+        "mood": mood.astype("category"),
+        "confidence": confidence,
+        "score": (sign * confidence).astype("float32"),
+    })
+
+def load_moods(chunksize=10000, user_id=database.DEFAULT_USER):
+    """
+    Loads all moods ordered by id, archived ones included, reading the
+    table in chunks so that memory stays bounded by the typed columns
+    instead of the raw rows.
+    """
+    require_sqlite("Mood analytics")
+    chunks = []
+    archived = load_archive("moods", user_id, columns=list(MOOD_DTYPES))
+    if not archived.empty:
+        chunks.append(_prepare_chunk(archived))
+
+    with database.connect(user_id) as conn:
+        for chunk in pd.read_sql(
+            "SELECT id, date, classification FROM moods WHERE user_id = ? ORDER BY id",
+            conn,
+            params=(user_id,),
+            chunksize=chunksize,
+            dtype=MOOD_DTYPES,
+        ):
+            # Once old moods are archived the hot table can be empty
+            if not chunk.empty:
+                chunks.append(_prepare_chunk(chunk))
+
+    if not chunks:
+        return _prepare_chunk(pd.DataFrame({col: pd.Series(dtype=dtype) for col, dtype in MOOD_DTYPES.items()}))
+
+    moods = pd.concat(chunks, ignore_index=True)
+    moods["mood"] = moods["mood"].astype("category")
+    return moods.dropna(subset=["timestamp"])
+
+def daily_sentiment(moods, window=7):
+    """
+    Mean score per day with a rolling average over `window` days.
+    Days without entries are left empty and skipped by the rolling mean.
+    """
+    daily = moods.set_index("timestamp")["score"].resample("D").agg(["mean", "count"])
+    daily.columns = ["score", "entries"]
+    daily["rolling_score"] = daily["score"].rolling(window, min_periods=1).mean()
+    return daily
+
+def mood_streaks(moods):
+    """
+    Consecutive runs of the same mood label.
+    Returns the current streak and the longest streak for each label.
+    """
+    if moods.empty:
+        return {"current": None, "longest": {}}
+
+    labels = moods["mood"].astype("string")
+    # The first row has nothing to compare with (<NA>) and always starts a run
+    run_ids = labels.ne(labels.shift()).fillna(True).cumsum()
+    runs = pd.DataFrame({"mood": labels, "run": run_ids}).groupby("run").agg(
+        mood=("mood", "first"), length=("mood", "size")
+    )
+
+    last = runs.iloc[-1]
+    return {
+        "current": {"mood": last["mood"], "length": int(last["length"])},
+        "longest": {mood: int(length) for mood, length in runs.groupby("mood")["length"].max().items()},
+    }
+
+def time_of_day_distribution(moods):
+    """Number of entries of each mood per period of the day (night, morning, afternoon, evening)."""
+    period = pd.cut(
+        moods["timestamp"].dt.hour,
+        bins=TIME_OF_DAY_BINS,
+        labels=TIME_OF_DAY_LABELS,
+        right=False,
+    )
+    return pd.crosstab(period, moods["mood"]).reindex(TIME_OF_DAY_LABELS, fill_value=0)
+
+def hourly_average(moods):
+    """Average score for each hour of the day."""
+    return moods.groupby(moods["timestamp"].dt.hour)["score"].mean().rename_axis("hour")
+
+def compute_mood_analytics(moods=None, user_id=database.DEFAULT_USER):
+    """
+    Computes every mood aggregate shown in the UI.
+    Returns a dictionary with daily sentiment, streaks, time-of-day distribution and hourly average.
+    """
+    if moods is None:
+        moods = load_moods(user_id=user_id)
+    return {
+        "entries": len(moods),
+        "daily": daily_sentiment(moods),
+        "streaks": mood_streaks(moods),
+        "time_of_day": time_of_day_distribution(moods),
+        "hourly": hourly_average(moods),
+    }
+
+def get_mood_analytics(user_id=database.DEFAULT_USER):
+    """
+    Returns the mood analytics, recomputing them only when new moods were saved.
+    Uses the user's highest mood id as the cache key.
+    """
+    require_sqlite("Mood analytics")
+    with database.connect(user_id) as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT MAX(id) FROM moods WHERE user_id = ?", (user_id,))
+        max_id = cursor.fetchone()[0]
+
+    key = (database.database_path(user_id), user_id)
+    with _cache_lock:
+        cached = _cache.get(key)
+    if cached is None or cached[0] != max_id:
+        cached = (max_id, compute_mood_analytics(user_id=user_id))
+    with _cache_lock:
+        _cache[key] = cached
+        _cache.move_to_end(key)
+        while len(_cache) > MOOD_ANALYTICS_CACHE_SIZE:
+            _cache.popitem(last=False)
+    return cached[1]
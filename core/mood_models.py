@@ -0,0 +1,282 @@
+import json
+import os
+import re
+import threading
+from collections import OrderedDict
+
+from config.settings import IDIOMA_PADRAO, MOOD_MODEL_MEMORY_MB
+
+# Sentiment checkpoint used for each language; languages without an entry
+# use the multilingual one. `labels` maps the checkpoint's labels to ours.
+MOOD_MODELS = {
+    "pt": {
+        "checkpoint": "pysentimiento/bertweet-pt-sentiment",
+        "labels": {"pos": "positive", "neg": "negative", "neu": "neutral"},
+    },
+    "en": {
+        "checkpoint": "distilbert/distilbert-base-uncased-finetuned-sst-2-english",
+        "labels": {"positive": "positive", "negative": "negative"},
+    },
+    "multilingual": {
+        "checkpoint": "cardiffnlp/twitter-xlm-roberta-base-sentiment",
+        "labels": {"positive": "positive", "negative": "negative", "neutral": "neutral"},
+    },
+}
+
+# Frequent words of each language detected locally. Short, unambiguous
+# words are enough to tell the app's languages apart in a mood description.
+STOPWORDS = {
+    "pt": {
+        "não", "nao", "estou", "muito", "com", "para", "uma", "um", "que", "de", "do", "da", "em", "eu",
+        "meu", "minha", "hoje", "mas", "isso", "está", "esta", "tô", "to", "bem", "mal", "dia", "foi",
+        "sinto", "me", "ao", "os", "as", "por", "mais", "tudo", "cansado", "cansada", "feliz", "triste",
+    },
+    "en": {
+        "the", "and", "is", "i", "am", "i'm", "im", "not", "very", "with", "for", "a", "an", "of", "to",
+        "in", "my", "today", "but", "this", "it", "feel", "feeling", "was", "so", "really", "day", "have",
+        "tired", "happy", "sad", "good", "bad",
+    },
+    "es": {
+        "no", "estoy", "muy", "con", "para", "una", "un", "que", "de", "del", "la", "el", "en", "yo",
+        "mi", "hoy", "pero", "esto", "está", "bien", "mal", "día", "fue", "siento", "cansado", "feliz",
+    },
+}
+
+# Characters that only appear in Portuguese among the supported languages
+PORTUGUESE_CHARS = set("ãõç")
+
+_WORD_RE = re.compile(r"[\w']+", re.UNICODE)
+
+def default_language():
+    """Language of IDIOMA_PADRAO without the region ('pt-BR' -> 'pt')."""
+    return IDIOMA_PADRAO.split("-")[0].lower()
+
+def detect_language(text, default=None):
+    """
+    Guesses the language of a short text by counting stopwords of each
+    supported language. Runs in microseconds and needs no model.
+    Falls back to `default` (IDIOMA_PADRAO) when there is no clear winner.
+    """
+    default = default or default_language()
+    words = _WORD_RE.findall(text.lower())
+    if not words:
+        return default
+
+    scores = {language: sum(word in stopwords for word in words) for language, stopwords in STOPWORDS.items()}
+    if PORTUGUESE_CHARS & set(text.lower()):
+        scores["pt"] += 2
+
+    ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+    (best, top), (_, second) = ranked[0], ranked[1]
+    if top == 0:
+        return default
+    if top == second:
+        return default if scores.get(default) == top else best
+    return best
+
+def normalize_label(label, labels):
+    """Maps a checkpoint label (e.g. 'POS', 'NEGATIVE') to positive, negative or neutral."""
+    label = label.lower()
+    if label in labels:
+        return labels[label]
+    for prefix, mood in labels.items():
+        if label.startswith(prefix[:3]):
+            return mood
+    return label
+
+
+def _model_bytes(model):
+    return sum(tensor.numel() * tensor.element_size() for tensor in model.parameters())
+
+def _load_safetensors_shared(path):
+    """
+    Maps a .safetensors file into memory and returns its tensors as views of
+    the mapping. The file is mapped copy-on-write, so every process that
+    loads the same checkpoint shares its pages through the page cache
+    instead of holding a private copy of the weights.
+    """
+    import torch
+
+    dtypes = {
+        "F32": torch.float32, "F16": torch.float16, "BF16": torch.bfloat16,
+        "I64": torch.int64, "I32": torch.int32, "I8": torch.int8, "U8": torch.uint8, "BOOL": torch.bool,
+    }
+    with open(path, "rb") as f:
+        header_size = int.from_bytes(f.read(8), "little")
+        header = json.loads(f.read(header_size))
+    header.pop("__metadata__", None)
+
+    storage = torch.UntypedStorage.from_file(path, shared=False, nbytes=os.path.getsize(path))
+    buffer = torch.empty(0, dtype=torch.uint8).set_(storage)
+    data_start = 8 + header_size
+
+    tensors = {}
+    for name, info in header.items():
+        start, end = info["data_offsets"]
+        raw = buffer[data_start + start:data_start + end]
+        tensors[name] = raw.view(dtypes[info["dtype"]]).view(info["shape"])
+    return tensors
+
+def _unloaded_keys(model, result):
+    """
+    Keys of a load_state_dict(strict=False) result that leave the model
+    incomplete or the checkpoint partly unused. Missing tied weights (filled
+    by tie_weights) and buffers (e.g. position_ids) are expected.
+    """
+    buffers = {name for name, _ in model.named_buffers()}
+    tied = []
+    for module in model.modules():
+        keys = getattr(module, "_tied_weights_keys", None) or []
+        tied.extend(keys.keys() if isinstance(keys, dict) else keys)
+    missing = [
+        key for key in result.missing_keys
+        if key not in buffers and not any(re.search(pattern, key) for pattern in tied)
+    ]
+    unexpected = [key for key in result.unexpected_keys if key not in buffers]
+    return missing + unexpected
+
+
+class MoodModelRegistry:
+    """
+    Picks the sentiment checkpoint for a language and keeps recently used
+    models loaded.
+
+    Loaded models form an LRU pool bounded by `memory_budget_mb`: when a new
+    model does not fit, the least recently used ones are released. Weights
+    stored as safetensors are memory-mapped and shared between processes;
+    other checkpoints are loaded normally by transformers.
+
+    A model is loaded outside the registry lock, under a lock of its own
+    checkpoint, so loading one language never blocks requests for models
+    already in the pool or the loading of another checkpoint.
+    """
+
+    def __init__(self, models=None, memory_budget_mb=MOOD_MODEL_MEMORY_MB):
+        self.models = models or MOOD_MODELS
+        self.memory_budget = memory_budget_mb * 1024 * 1024
+        self._pool = OrderedDict()  # checkpoint -> (pipeline, bytes)
+        self._lock = threading.Lock()
+        self._load_locks = {}  # checkpoint -> lock held while it loads
+
+    def model_for(self, language):
+        """Registry entry used for a language."""
+        return self.models.get(language) or self.models["multilingual"]
+
+    def loaded(self):
+        """Checkpoints currently in the pool, least recently used first."""
+        with self._lock:
+            return list(self._pool)
+
+    def memory_used(self):
+        with self._lock:
+            return sum(size for _, size in self._pool.values())
+
+    def get(self, language):
+        """Returns (pipeline, entry) for a language, loading the model if needed."""
+        entry = self.model_for(language)
+        checkpoint = entry["checkpoint"]
+        with self._lock:
+            if checkpoint in self._pool:
+                self._pool.move_to_end(checkpoint)
+                return self._pool[checkpoint][0], entry
+            load_lock = self._load_locks.setdefault(checkpoint, threading.Lock())
+
+        with load_lock:
+            # Another thread may have loaded it while this one waited
+            with self._lock:
+                if checkpoint in self._pool:
+                    self._pool.move_to_end(checkpoint)
+                    return self._pool[checkpoint][0], entry
+
+            classifier = self._load(checkpoint)
+            size = _model_bytes(classifier.model)
+            with self._lock:
+                while self._pool and sum(s for _, s in self._pool.values()) + size > self.memory_budget:
+                    self._pool.popitem(last=False)
+                self._pool[checkpoint] = (classifier, size)
+            return classifier, entry
+
+    def _load(self, checkpoint):
+        from transformers import AutoConfig, AutoModelForSequenceClassification, AutoTokenizer, pipeline
+
+        local_dir = self._download(checkpoint)
+        weights = os.path.join(local_dir, "model.safetensors") if local_dir else None
+        if not weights or not os.path.exists(weights):
+            return self._load_pretrained(checkpoint)
+
+        config = AutoConfig.from_pretrained(local_dir)
+        model = AutoModelForSequenceClassification.from_config(config)
+        state = _load_safetensors_shared(weights)
+        # assign=True keeps the mapped tensors instead of copying into new ones
+        result = model.load_state_dict(state, strict=False, assign=True)
+        if _unloaded_keys(model, result):
+            # Renamed or missing weights: transformers knows how to map them
+            return self._load_pretrained(local_dir)
+        model.tie_weights()
+        model.eval()
+        tokenizer = AutoTokenizer.from_pretrained(local_dir)
+        return pipeline("sentiment-analysis", model=model, tokenizer=tokenizer, device=-1)
+
+    @staticmethod
+    def _load_pretrained(source):
+        """Pipeline loaded by transformers itself, with private copies of the weights."""
+        from transformers import pipeline
+        return pipeline("sentiment-analysis", model=source, device=-1)
+
+    @staticmethod
+    def _download(checkpoint):
+        """Local snapshot of a checkpoint, or None when it can't be fetched as files."""
+        try:
+            from huggingface_hub import snapshot_download
+            return snapshot_download(
+                checkpoint,
+                allow_patterns=["*.json", "*.safetensors", "*.txt", "*.model", "*.bpe", "*.codes"],
+            )
+        except Exception:
+            return None
+
+    def classify(self, text, language=None):
+        """
+        Classifies a text with its language's model.
+        Returns a dictionary with mood (positive, negative or neutral),
+        confidence and the language used.
+        """
+        language = language or detect_language(text)
+        classifier, entry = self.get(language)
+        result = classifier(text, truncation=True)[0]
+        return {
+            "mood": normalize_label(result["label"], entry["labels"]),
+            "confidence": round(result["score"], 2),
+            "language": language,
+        }
+
+    def classify_batch(self, texts, language=None, batch_size=16):
+        """
+        Classifies several texts, running each language's model once over
+        all texts in that language. Returns one result per text, in order.
+        """
+        languages = [language or detect_language(text) for text in texts]
+        results = [None] * len(texts)
+        for lang in dict.fromkeys(languages):
+            positions = [i for i, text_language in enumerate(languages) if text_language == lang]
+            classifier, entry = self.get(lang)
+            outputs = classifier([texts[i] for i in positions], truncation=True, batch_size=batch_size)
+            for i, result in zip(positions, outputs):
+                results[i] = {
+                    "mood": normalize_label(result["label"], entry["labels"]),
+                    "confidence": round(result["score"], 2),
+                    "language": lang,
+                }
+        return results
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+def get_registry():
+    """Returns the process-wide MoodModelRegistry."""
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = MoodModelRegistry()
+        return _registry
@@ -0,0 +1,19 @@
+from datetime import datetime
+
+from data.database import DEFAULT_USER
+from data.repository import get_backend
+
+def save_mood(text, mood, confidence, user_id=DEFAULT_USER, date=None):
+    """
+    Saves a mood entry classified by analyze_mood.
+    confidence is a fraction (0.98) and is stored as 'positive (98%)'.
+    Returns the saved Mood.
+    """
+    date = (date or datetime.now()).strftime("%Y-%m-%d %H:%M")
+    return get_backend().add_mood(user_id, date, text, f"{mood} ({confidence*100:.0f}%)")
+
+def get_mood_history(limit=10, user_id=DEFAULT_USER):
+    """
+    Retrieves the latest mood entries, newest first.
+    """
+    return get_backend().recent_moods(user_id, limit)
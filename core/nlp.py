@@ -1,5 +1,6 @@
 import re
 from datetime import datetime, timedelta
+from core.recurrence import extract_recurrence
 
 def interpret_command(text):
     """
@@ -12,7 +13,8 @@ def interpret_command(text):
         return {
             "intent": "add_task",
             "title": extract_task_title(text),
-            "datetime": extract_datetime(text)
+            "datetime": extract_datetime(text),
+            "recurrence": extract_recurrence(text)
         }
 
     # Check for task listing
@@ -21,6 +23,12 @@ def interpret_command(text):
             "intent": "list_tasks"
         }
 
+    # Routine suggestion
+    if "routine" in text or "what should i do" in text:
+        return {
+            "intent": "suggest_routine"
+        }
+
     # Mood analysis request
     if "i feel" in text or "mood" in text:
         return {
@@ -36,7 +44,7 @@ def interpret_command(text):
 
 def extract_task_title(text):
     # Very basic heuristic – improve this with NLP later
-    match = re.search(r"(add|create) task (.+?)( at| on|$)", text)
+    match = re.search(r"(add|create) task (.+?)( every| at| on|$)", text)
     if match:
         return match.group(2).strip()
     return "Untitled Task"
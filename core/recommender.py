@@ -1,37 +1,107 @@
 # core/recommender.py
 
-from datetime import datetime
-from data.database import connect  # <- Import corrigido
+from datetime import datetime, timedelta
+from data.database import DEFAULT_USER
+from data.repository import get_backend
 
-def get_latest_mood():
+WEEKDAY_NAMES = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+
+def get_latest_mood(user_id=DEFAULT_USER):
     """Retrieve the latest mood entry from the database."""
-    with connect() as conn:
-        cursor = conn.cursor()
-        cursor.execute("SELECT classification FROM moods ORDER BY id DESC LIMIT 1")
-        row = cursor.fetchone()
-        if row:
-            return row[0].split(" ")[0].lower()  # Extract mood type (e.g., 'positive')
+    moods = get_backend().recent_moods(user_id, limit=1)
+    if moods:
+        return moods[0].label  # Mood type (e.g., 'positive')
     return None
 
-def suggest_routine():
-    """Suggest a routine based on the latest mood and time of day."""
-    mood = get_latest_mood()
-    now = datetime.now().hour
+def get_mood_trend(days=7, now=None, user_id=DEFAULT_USER):
+    """
+    Average mood score over the last `days` days, from -1 (negative) to 1 (positive).
+    Reads at most `days` rows from the mood_daily summary table.
+    Returns None when there are no entries in the period.
+    """
+    now = now or datetime.now()
+    start = (now - timedelta(days=days - 1)).strftime("%Y-%m-%d")
+    score_sum, entries = get_backend().mood_totals(user_id, start)
+    if not entries:
+        return None
+    return score_sum / entries
+
+def get_slot_mood(weekday, hour, user_id=DEFAULT_USER):
+    """
+    Average mood score recorded on a given weekday (Monday = 0) and hour.
+    Returns a (score, entries) tuple, or (None, 0) when there is no history.
+    """
+    sqlite_weekday = (weekday + 1) % 7  # SQLite's %w uses Sunday = 0
+    score_sum, entries = get_backend().slot_totals(user_id, sqlite_weekday, hour)
+    if not entries:
+        return None, 0
+    return score_sum / entries, entries
+
+def get_pending_load(day=None, user_id=DEFAULT_USER):
+    """Number of pending tasks due on `day` (a date, defaults to today)."""
+    day = (day or datetime.now()).strftime("%Y-%m-%d")
+    return get_backend().pending_load(user_id, day)
 
+def _base_suggestion(mood, hour):
     if mood == "positive":
-        if 6 <= now <= 10:
+        if 6 <= hour <= 10:
             return "You're in a great mood! Start your day with a walk or journaling."
-        elif 12 <= now <= 14:
+        elif 12 <= hour <= 14:
             return "Feeling good? Take advantage and tackle something important now."
         else:
             return "Enjoy the rest of your day. Maybe plan something creative."
 
     elif mood == "negative":
-        if 6 <= now <= 10:
+        if 6 <= hour <= 10:
             return "Take your morning slow. Try stretching and drink some water."
-        elif 12 <= now <= 14:
+        elif 12 <= hour <= 14:
             return "Feeling down? Consider a short break or a calming activity."
         else:
             return "Rest is valid. Unplug and try something light like music or tea."
 
-    return "No recent mood detected. How are you feeling today?"
+    elif mood == "neutral":
+        if 6 <= hour <= 10:
+            return "A steady start. Pick one clear goal for the morning."
+        elif 12 <= hour <= 14:
+            return "Good time for routine work. Clear a few small tasks."
+        else:
+            return "Wind down gradually. A short walk or some reading could help."
+
+    return None
+
+def suggest_routine(user_id=DEFAULT_USER):
+    """
+    Suggest a routine based on the latest mood and time of day, adjusted by
+    the mood of the past week, how this weekday and hour usually feel, and
+    how many tasks are pending for today.
+    """
+    now = datetime.now()
+    mood = get_latest_mood(user_id)
+    suggestion = _base_suggestion(mood, now.hour)
+    if suggestion is None:
+        return "No recent mood detected. How are you feeling today?"
+
+    notes = []
+
+    trend = get_mood_trend(days=7, now=now, user_id=user_id)
+    if trend is not None:
+        if trend <= -0.3:
+            notes.append("Your week has been heavy so far, so keep today's plan light and leave room for breaks.")
+        elif trend >= 0.3:
+            notes.append("You've had a good week. It's a nice moment to make progress on a bigger goal.")
+
+    slot_score, slot_entries = get_slot_mood(now.weekday(), now.hour, user_id)
+    if slot_entries >= 3:
+        weekday = WEEKDAY_NAMES[now.weekday()]
+        if slot_score <= -0.3:
+            notes.append(f"{weekday}s around this time are usually harder for you. Schedule something you enjoy.")
+        elif slot_score >= 0.3:
+            notes.append(f"You usually feel good on {weekday}s around this time. Use it for focused work.")
+
+    pending = get_pending_load(now, user_id)
+    if pending >= 5:
+        notes.append(f"You have {pending} tasks due today. Pick the three that matter most and move the rest.")
+    elif pending == 0 and mood == "positive":
+        notes.append("Nothing is due today, so you're free to plan ahead.")
+
+    return " ".join([suggestion] + notes)
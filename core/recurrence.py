@@ -0,0 +1,179 @@
+import re
+from datetime import datetime, timedelta
+
+WEEKDAY_CODES = ["MO", "TU", "WE", "TH", "FR", "SA", "SU"]
+FREQUENCIES = ("DAILY", "WEEKLY", "MONTHLY")
+# Rule parts understood by parse_rule; any other (COUNT, BYMONTHDAY, ...) is rejected
+# rather than ignored, since ignoring it would change which occurrences the rule has
+RULE_KEYS = ("FREQ", "INTERVAL", "BYDAY", "UNTIL")
+
+WEEKDAY_NAMES = {
+    'monday': 0, 'tuesday': 1, 'wednesday': 2, 'thursday': 3,
+    'friday': 4, 'saturday': 5, 'sunday': 6,
+    'mon': 0, 'tue': 1, 'wed': 2, 'thu': 3,
+    'fri': 4, 'sat': 5, 'sun': 6
+}
+
+class RecurrenceError(ValueError):
+    """Raised when a recurrence rule can't be parsed"""
+    pass
+
+def parse_rule(rule):
+    """
+    Parses an RRULE-style string such as 'FREQ=WEEKLY;INTERVAL=1;BYDAY=MO,WE'.
+    Supports FREQ (DAILY, WEEKLY, MONTHLY), INTERVAL, BYDAY (not with MONTHLY)
+    and UNTIL (a date or date-time); any other part raises RecurrenceError.
+    Returns a dictionary with 'freq', 'interval', 'byday' (weekday numbers) and 'until'.
+    """
+    parts = {}
+    for part in rule.upper().split(";"):
+        if "=" not in part:
+            raise RecurrenceError(f"Invalid recurrence rule: {rule}")
+        key, value = part.split("=", 1)
+        parts[key.strip()] = value.strip()
+    unsupported = [key for key in parts if key not in RULE_KEYS]
+    if unsupported:
+        raise RecurrenceError(f"Unsupported recurrence rule part(s): {', '.join(unsupported)}")
+
+    freq = parts.get("FREQ")
+    if freq not in FREQUENCIES:
+        raise RecurrenceError(f"Unsupported recurrence frequency: {freq}")
+
+    try:
+        interval = int(parts.get("INTERVAL", 1))
+    except ValueError:
+        raise RecurrenceError(f"Invalid INTERVAL: {parts['INTERVAL']}")
+    if interval < 1:
+        raise RecurrenceError("INTERVAL must be a positive number")
+
+    byday = []
+    if parts.get("BYDAY") and freq == "MONTHLY":
+        raise RecurrenceError("BYDAY is not supported with FREQ=MONTHLY")
+    if parts.get("BYDAY"):
+        for code in parts["BYDAY"].split(","):
+            if code not in WEEKDAY_CODES:
+                raise RecurrenceError(f"Invalid weekday in BYDAY: {code}")
+            byday.append(WEEKDAY_CODES.index(code))
+
+    until = None
+    if parts.get("UNTIL"):
+        value = parts["UNTIL"].rstrip("Z")
+        try:
+            if "T" in value:
+                until = datetime.strptime(value, "%Y%m%dT%H%M%S")
+            else:
+                # A date-only UNTIL includes the whole day
+                until = datetime.strptime(value, "%Y%m%d").replace(hour=23, minute=59, second=59)
+        except ValueError:
+            raise RecurrenceError(f"Invalid UNTIL: {parts['UNTIL']}")
+
+    return {"freq": freq, "interval": interval, "byday": sorted(set(byday)), "until": until}
+
+def format_rule(freq, interval=1, byday=None, until=None):
+    """Builds an RRULE-style string from its parts."""
+    parts = [f"FREQ={freq}"]
+    if interval != 1:
+        parts.append(f"INTERVAL={interval}")
+    if byday:
+        parts.append("BYDAY=" + ",".join(WEEKDAY_CODES[day] for day in sorted(set(byday))))
+    if until:
+        parts.append("UNTIL=" + until.strftime("%Y%m%dT%H%M%S"))
+    return ";".join(parts)
+
+def _add_months(date, months):
+    month_index = date.month - 1 + months
+    year = date.year + month_index // 12
+    month = month_index % 12 + 1
+    return year, month
+
+def iter_occurrences(rule, dtstart, start, end):
+    """
+    Lazily yields the occurrences of a rule within [start, end), in order.
+
+    Instead of walking every period since dtstart, the generator jumps
+    straight to the first period that can overlap the window, so expanding
+    next week of a rule created years ago costs the same as a new one.
+    """
+    if isinstance(rule, str):
+        rule = parse_rule(rule)
+
+    start = max(start, dtstart)
+    if rule["until"] is not None:
+        end = min(end, rule["until"] + timedelta(seconds=1))
+    if start >= end:
+        return
+
+    interval = rule["interval"]
+
+    if rule["freq"] == "DAILY":
+        periods = max(0, (start - dtstart).days // interval)
+        current = dtstart + timedelta(days=periods * interval)
+        while current < end:
+            if current >= start and (not rule["byday"] or current.weekday() in rule["byday"]):
+                yield current
+            current += timedelta(days=interval)
+
+    elif rule["freq"] == "WEEKLY":
+        days = rule["byday"] or [dtstart.weekday()]
+        week_start = dtstart - timedelta(days=dtstart.weekday())
+        periods = max(0, (start - week_start).days // 7 // interval)
+        week = week_start + timedelta(weeks=periods * interval)
+        while week < end:
+            for day in days:
+                current = week + timedelta(days=day)
+                if current >= end:
+                    break
+                if current >= start:
+                    yield current
+            week += timedelta(weeks=interval)
+
+    else:  # MONTHLY, on the day of month of dtstart
+        months = (start.year - dtstart.year) * 12 + start.month - dtstart.month
+        period = max(0, months // interval)
+        while True:
+            year, month = _add_months(dtstart, period * interval)
+            if datetime(year, month, 1) >= end:
+                break
+            try:
+                current = dtstart.replace(year=year, month=month)
+            except ValueError:  # e.g. the 31st in a 30-day month
+                current = None
+            if current is not None and start <= current < end:
+                yield current
+            period += 1
+
+def first_occurrence(rule, dtstart, after=None):
+    """Returns the first occurrence at or after `after` (defaults to dtstart), or None."""
+    after = after or dtstart
+    for occurrence in iter_occurrences(rule, dtstart, after, after + timedelta(days=400)):
+        return occurrence
+    return None
+
+def extract_recurrence(text):
+    """
+    Detects a recurrence in a command such as 'every monday at 9',
+    'every weekday at 7am', 'every 2 weeks on friday' or 'every day'.
+    Returns an RRULE-style string, or None if the command is not recurring.
+    """
+    text = text.lower()
+    match = re.search(r'\bevery\s+(?:(\d+)\s+)?(day|days|weekday|weekdays|week|weeks|month|months|'
+                      r'(?:(?:monday|tuesday|wednesday|thursday|friday|saturday|sunday|mon|tue|wed|thu|fri|sat|sun)'
+                      r'(?:\s*(?:,|and)\s*)?)+)', text)
+    if not match:
+        return None
+
+    interval = int(match.group(1) or 1)
+    unit = match.group(2).strip()
+
+    if unit in ("day", "days"):
+        return format_rule("DAILY", interval)
+    if unit in ("weekday", "weekdays"):
+        return format_rule("WEEKLY", interval, byday=[0, 1, 2, 3, 4])
+    if unit in ("month", "months"):
+        return format_rule("MONTHLY", interval)
+
+    # "every week on friday" / "every 2 weeks on mon and thu"
+    rest = text[match.end(2):] if unit in ("week", "weeks") else unit
+    days = [WEEKDAY_NAMES[name] for name in re.findall(
+        r'\b(monday|tuesday|wednesday|thursday|friday|saturday|sunday|mon|tue|wed|thu|fri|sat|sun)\b', rest)]
+    return format_rule("WEEKLY", interval, byday=days)
@@ -0,0 +1,259 @@
+import heapq
+import itertools
+import threading
+from datetime import datetime, timedelta
+
+from data.database import DEFAULT_USER
+from data.repository import get_backend, uses_sqlite
+from core import scheduler
+from voice.voice_out import VoiceOutput
+
+class ReminderDaemon(threading.Thread):
+    """
+    Background thread that fires a reminder when a pending task is due.
+
+    Upcoming tasks are kept in a min-heap ordered by reminder time and the
+    thread sleeps until the earliest one instead of polling the database.
+    New, completed and deleted tasks and recurring tasks arrive through the
+    scheduler's listeners and update the heap incrementally; removed
+    entries are invalidated in place and skipped when they reach the top.
+    The heap is rebuilt from the database every `refresh_interval` to pick
+    up writes made outside the scheduler and the next window of recurring
+    task occurrences; tasks and rules changed by listeners while it is
+    being read keep their listener state.
+    """
+
+    def __init__(self, callback=None, lead_time=timedelta(0), refresh_interval=timedelta(hours=1),
+                 user_id=DEFAULT_USER):
+        """
+        Args:
+            callback (callable, optional): Called with a reminder dictionary
+                (task_id, title, due) when a task is due; occurrences of
+                recurring tasks have task_id None and rule_id instead.
+                Defaults to speaking the reminder with VoiceOutput.
+            lead_time (timedelta): How long before the due time to remind.
+            refresh_interval (timedelta): How often to reload from the database.
+            user_id (str): User whose tasks are watched.
+        """
+        super().__init__(name="ReminderDaemon", daemon=True)
+        self.callback = callback or self._speak
+        self.lead_time = lead_time
+        self.refresh_interval = refresh_interval
+        self.user_id = user_id
+        self._heap = []
+        self._entries = {}
+        self._counter = itertools.count()
+        self._condition = threading.Condition()
+        self._running = False
+        self._next_refresh = None
+        # Keys changed by task listeners while a reload reads the database
+        self._changed_during_load = None
+        self._voice_output = None
+
+    # --- Heap maintenance ---
+
+    def _push(self, key, title, due):
+        """Adds or replaces the reminder for `key` (must be called with the lock held)."""
+        self._invalidate(key)
+        remind_at = due - self.lead_time
+        entry = [remind_at, next(self._counter), key, title, due, True]
+        self._entries[key] = entry
+        heapq.heappush(self._heap, entry)
+
+    def _invalidate(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            entry[-1] = False
+
+    def _load(self, now):
+        """
+        Rebuilds the heap with every pending task and recurring occurrence
+        still ahead. Tasks added, moved or removed by listeners while the
+        database was being read keep the entry (or absence) the listener left.
+        """
+        horizon = now + self.refresh_interval
+        with self._condition:
+            self._changed_during_load = set()
+        try:
+            tasks = get_backend().list_tasks(self.user_id, due_from=(now + self.lead_time).isoformat())
+            occurrences = []
+            if uses_sqlite():  # recurring tasks are only stored in SQLite
+                occurrences = scheduler.list_occurrences(now + self.lead_time, horizon + self.lead_time,
+                                                         user_id=self.user_id)
+        except Exception:
+            with self._condition:
+                self._changed_during_load = None
+            raise
+
+        with self._condition:
+            changed = self._changed_during_load
+            self._changed_during_load = None
+            kept = [
+                entry for key, entry in self._entries.items()
+                if key in changed or (key[0] == "occurrence" and ("rule", key[1]) in changed)
+            ]
+            self._heap = []
+            self._entries = {}
+            for task in tasks:
+                if ("task", task.id) in changed:
+                    continue
+                try:
+                    self._push(("task", task.id), task.title, datetime.fromisoformat(task.date_time))
+                except ValueError:
+                    continue
+            for rule_id, title, occurs_at, _status in occurrences:
+                if ("rule", rule_id) in changed or ("occurrence", rule_id, occurs_at) in changed:
+                    continue
+                self._push(("occurrence", rule_id, occurs_at), title, datetime.fromisoformat(occurs_at))
+            for entry in kept:
+                self._entries[entry[2]] = entry
+                heapq.heappush(self._heap, entry)
+            self._next_refresh = horizon
+            self._condition.notify()
+
+    def _on_task_event(self, event, task_id, title, date_time, user_id):
+        if user_id != self.user_id:
+            return
+        with self._condition:
+            if self._changed_during_load is not None:
+                self._changed_during_load.add(("task", task_id))
+            if event in ("added", "rescheduled"):
+                self._invalidate(("task", task_id))
+                if not date_time:
+                    return
+                try:
+                    due = datetime.fromisoformat(date_time)
+                except ValueError:
+                    return
+                if due - self.lead_time < datetime.now():
+                    return
+                self._push(("task", task_id), title, due)
+            else:
+                self._invalidate(("task", task_id))
+            self._condition.notify()
+
+    def _on_recurring_event(self, event, rule_id, occurs_at, user_id):
+        if user_id != self.user_id:
+            return
+        occurrences = []
+        if event == "added":
+            # Occurrences due before the next refresh; later ones come with it
+            now = datetime.now()
+            with self._condition:
+                horizon = self._next_refresh or now + self.refresh_interval
+            occurrences = [
+                row for row in scheduler.list_occurrences(now + self.lead_time, horizon + self.lead_time,
+                                                          user_id=self.user_id)
+                if row[0] == rule_id
+            ]
+        with self._condition:
+            if event == "occurrence_done":
+                key = ("occurrence", rule_id, datetime.fromisoformat(occurs_at).isoformat())
+                if self._changed_during_load is not None:
+                    self._changed_during_load.add(key)
+                self._invalidate(key)
+            else:
+                if self._changed_during_load is not None:
+                    self._changed_during_load.add(("rule", rule_id))
+                for key in [key for key in self._entries if key[0] == "occurrence" and key[1] == rule_id]:
+                    self._invalidate(key)
+                for _, title, occurs, _status in occurrences:
+                    self._push(("occurrence", rule_id, occurs), title, datetime.fromisoformat(occurs))
+            self._condition.notify()
+
+    # --- Thread lifecycle ---
+
+    def start(self):
+        self._running = True
+        scheduler.add_task_listener(self._on_task_event)
+        scheduler.add_recurring_listener(self._on_recurring_event)
+        self._load(datetime.now())
+        super().start()
+
+    def stop(self):
+        """Stops the thread and unregisters from the scheduler."""
+        scheduler.remove_task_listener(self._on_task_event)
+        scheduler.remove_recurring_listener(self._on_recurring_event)
+        with self._condition:
+            self._running = False
+            self._condition.notify()
+
+    def pending_reminders(self):
+        """Number of reminders waiting to fire."""
+        with self._condition:
+            return len(self._entries)
+
+    def run(self):
+        while True:
+            due_entries = []
+            refresh = False
+            with self._condition:
+                if not self._running:
+                    return
+
+                now = datetime.now()
+                while self._heap and not self._heap[0][-1]:
+                    heapq.heappop(self._heap)
+
+                # Due reminders are taken first: a reload only looks ahead
+                # of now, so after a late wake it would drop them
+                while self._heap and self._heap[0][0] <= now:
+                    entry = heapq.heappop(self._heap)
+                    if entry[-1]:
+                        self._entries.pop(entry[2], None)
+                        due_entries.append(entry)
+                refresh = now >= self._next_refresh
+
+                if not due_entries and not refresh:
+                    # Sleep until the next reminder, the next refresh or a new task
+                    wake_at = self._next_refresh
+                    if self._heap:
+                        wake_at = min(wake_at, self._heap[0][0])
+                    self._condition.wait(timeout=max((wake_at - now).total_seconds(), 0))
+                    continue
+
+            for remind_at, _, key, title, due, _valid in due_entries:
+                try:
+                    self.callback(self._reminder(key, title, due))
+                except Exception as e:
+                    print(f"Error firing reminder: {str(e)}")
+
+            if refresh:
+                try:
+                    # From the same `now`, so nothing falls between the due
+                    # reminders just taken and the reload
+                    self._load(now)
+                except Exception as e:
+                    print(f"Error loading reminders: {str(e)}")
+                    with self._condition:
+                        self._next_refresh = datetime.now() + self.refresh_interval
+
+    @staticmethod
+    def _reminder(key, title, due):
+        """The dictionary passed to the callback for a heap key."""
+        if key[0] == "task":
+            return {"task_id": key[1], "title": title, "due": due}
+        return {"task_id": None, "rule_id": key[1], "occurs_at": key[2], "title": title, "due": due}
+
+    def _speak(self, reminder):
+        # pyttsx3 engines must be used from the thread that created them
+        if self._voice_output is None:
+            self._voice_output = VoiceOutput()
+        self._voice_output.speak(f"Reminder: {reminder['title']}")
+
+
+def start_reminder_daemon(callback=None, lead_time_min=0, user_id=DEFAULT_USER):
+    """
+    Convenience function to start a reminder daemon.
+
+    Args:
+        callback (callable, optional): Reminder callback. Defaults to voice output.
+        lead_time_min (int): Minutes before the due time to remind.
+        user_id (str): User whose tasks are watched.
+
+    Returns:
+        ReminderDaemon: The running daemon
+    """
+    daemon = ReminderDaemon(callback=callback, lead_time=timedelta(minutes=lead_time_min), user_id=user_id)
+    daemon.start()
+    return daemon
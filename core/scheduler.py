@@ -1,42 +1,224 @@
-from data.database import connect
+from data.database import connect, DEFAULT_USER
+from data.repository import get_backend, require_sqlite
 from datetime import datetime
+from core.recurrence import parse_rule, iter_occurrences
 
-def add_task(title, date_time=None):
+# Callbacks notified after every task write, as
+# callback(event, task_id, title, date_time, user_id)
+# with event in 'added', 'rescheduled', 'done' and 'deleted'
+_task_listeners = []
+
+def add_task_listener(callback):
+    """
+    Registers a callback called after tasks are added, completed or deleted.
+    """
+    _task_listeners.append(callback)
+
+def remove_task_listener(callback):
+    """
+    Unregisters a callback added with add_task_listener.
+    """
+    if callback in _task_listeners:
+        _task_listeners.remove(callback)
+
+def _notify(event, task_id, title=None, date_time=None, user_id=DEFAULT_USER):
+    for callback in list(_task_listeners):
+        try:
+            callback(event, task_id, title, date_time, user_id)
+        except Exception as e:
+            print(f"Error in task listener: {str(e)}")
+
+# Callbacks notified after every recurring task write, as
+# callback(event, rule_id, occurs_at, user_id) with event in 'added' and
+# 'deleted' (occurs_at None: the whole rule) and 'occurrence_done'
+_recurring_listeners = []
+
+def add_recurring_listener(callback):
+    """
+    Registers a callback called after recurring tasks are added or deleted
+    and after an occurrence is completed.
+    """
+    _recurring_listeners.append(callback)
+
+def remove_recurring_listener(callback):
+    """
+    Unregisters a callback added with add_recurring_listener.
+    """
+    if callback in _recurring_listeners:
+        _recurring_listeners.remove(callback)
+
+def _notify_recurring(event, rule_id, occurs_at=None, user_id=DEFAULT_USER):
+    for callback in list(_recurring_listeners):
+        try:
+            callback(event, rule_id, occurs_at, user_id)
+        except Exception as e:
+            print(f"Error in recurring task listener: {str(e)}")
+
+def notify_task_listeners(event, task_id, title=None, date_time=None, user_id=DEFAULT_USER):
+    """
+    Notifies the listeners of a task write made outside this module
+    (calendar sync, imports), once it is committed.
+    """
+    _notify(event, task_id, title, date_time, user_id)
+
+def add_task(title, date_time=None, user_id=DEFAULT_USER):
     """
     Adds a new task to the database.
     date_time must be in ISO format: 'YYYY-MM-DDTHH:MM:SS'
+    Returns the id of the new task.
+    """
+    task = get_backend().add_task(user_id, title, date_time)
+    _notify("added", task.id, title, date_time, user_id)
+    return task.id
+
+def add_tasks(items, user_id=DEFAULT_USER):
+    """
+    Adds several tasks in a single transaction.
+    items is a list of (title, date_time) pairs, date_time in ISO format or None.
+    Returns the ids of the new tasks, in the same order.
+    """
+    tasks = get_backend().add_tasks(user_id, items)
+    for task in tasks:
+        _notify("added", task.id, task.title, task.date_time, user_id)
+    return [task.id for task in tasks]
+
+def list_tasks(user_id=DEFAULT_USER):
+    """
+    Retrieves all pending tasks as Task records.
+    """
+    return get_backend().list_tasks(user_id)
+
+def reschedule_tasks(items, user_id=DEFAULT_USER):
+    """
+    Moves several tasks in a single transaction.
+    items is a list of (task_id, title, date_time) tuples, date_time in ISO format.
+    """
+    get_backend().set_task_datetimes(user_id, [(task_id, date_time) for task_id, _, date_time in items])
+    for task_id, title, date_time in items:
+        _notify("rescheduled", task_id, title, date_time, user_id)
+
+def mark_task_done(task_id, user_id=DEFAULT_USER):
+    """
+    Marks a task as completed.
+    """
+    get_backend().set_task_status(user_id, task_id, "done")
+    _notify("done", task_id, user_id=user_id)
+
+def delete_task(task_id, user_id=DEFAULT_USER):
+    """
+    Deletes a task from the database.
+    Tasks already synced to the calendar are kept as tombstones until the
+    next calendar sync removes their event.
+    """
+    get_backend().delete_task(user_id, task_id)
+    _notify("deleted", task_id, user_id=user_id)
+
+def add_recurring_task(title, rule, dtstart, user_id=DEFAULT_USER):
+    """
+    Adds a recurring task. The rule is stored once (RRULE-style, e.g.
+    'FREQ=WEEKLY;BYDAY=MO') and occurrences are expanded on demand.
+    dtstart must be in ISO format and sets the time of every occurrence.
+    Returns the id of the new recurring task.
     """
-    with connect() as conn:
+    require_sqlite("Recurring tasks")
+    parse_rule(rule)  # validate before storing
+    with connect(user_id) as conn:
         cursor = conn.cursor()
         cursor.execute(
-            "INSERT INTO tasks (title, datetime) VALUES (?, ?)",
-            (title, date_time)
+            "INSERT INTO recurring_tasks (user_id, title, rule, dtstart) VALUES (?, ?, ?, ?)",
+            (user_id, title, rule, dtstart)
         )
         conn.commit()
+        rule_id = cursor.lastrowid
+    _notify_recurring("added", rule_id, user_id=user_id)
+    return rule_id
 
-def list_tasks():
+def _index_occurrences(cursor, start, end, user_id):
     """
-    Retrieves all pending tasks.
+    Makes sure task_occurrences holds every occurrence in [start, end)
+    by expanding only the parts of the window not indexed yet.
     """
-    with connect() as conn:
+    cursor.execute(
+        "SELECT id, rule, dtstart, indexed_from, indexed_until FROM recurring_tasks "
+        "WHERE user_id = ? AND deleted = 0 AND (indexed_from IS NULL OR indexed_from > ? OR indexed_until < ?)",
+        (user_id, start.isoformat(), end.isoformat())
+    )
+    for rule_id, rule, dtstart, indexed_from, indexed_until in cursor.fetchall():
+        dtstart = datetime.fromisoformat(dtstart)
+        if indexed_from is None:
+            missing = [(start, end)]
+            new_from, new_until = start, end
+        else:
+            indexed_from = datetime.fromisoformat(indexed_from)
+            indexed_until = datetime.fromisoformat(indexed_until)
+            missing = []
+            if start < indexed_from:
+                missing.append((start, indexed_from))
+            if end > indexed_until:
+                missing.append((indexed_until, end))
+            new_from, new_until = min(start, indexed_from), max(end, indexed_until)
+
+        for window_start, window_end in missing:
+            cursor.executemany(
+                "INSERT OR IGNORE INTO task_occurrences (rule_id, occurs_at) VALUES (?, ?)",
+                ((rule_id, occurrence.isoformat()) for occurrence in
+                 iter_occurrences(rule, dtstart, window_start, window_end))
+            )
+        cursor.execute(
+            "UPDATE recurring_tasks SET indexed_from = ?, indexed_until = ? WHERE id = ?",
+            (new_from.isoformat(), new_until.isoformat(), rule_id)
+        )
+
+def list_occurrences(start, end, status='pending', user_id=DEFAULT_USER):
+    """
+    Retrieves the occurrences of recurring tasks between two datetimes,
+    as (rule_id, title, occurs_at, status) tuples ordered by time.
+    Only the requested window is expanded and indexed.
+    """
+    require_sqlite("Recurring tasks")
+    with connect(user_id) as conn:
         cursor = conn.cursor()
-        cursor.execute("SELECT id, title, datetime, status FROM tasks WHERE status = 'pending'")
+        _index_occurrences(cursor, start, end, user_id)
+        conn.commit()
+        cursor.execute(
+            "SELECT o.rule_id, r.title, o.occurs_at, o.status FROM task_occurrences o "
+            "JOIN recurring_tasks r ON r.id = o.rule_id "
+            "WHERE o.occurs_at >= ? AND o.occurs_at < ? AND o.status = ? AND r.user_id = ? AND r.deleted = 0 "
+            "ORDER BY o.occurs_at",
+            (start.isoformat(), end.isoformat(), status, user_id)
+        )
         return cursor.fetchall()
 
-def mark_task_done(task_id):
+def mark_occurrence_done(rule_id, occurs_at, user_id=DEFAULT_USER):
     """
-    Marks a task as completed.
+    Marks one occurrence of a recurring task as completed.
     """
-    with connect() as conn:
+    require_sqlite("Recurring tasks")
+    with connect(user_id) as conn:
         cursor = conn.cursor()
-        cursor.execute("UPDATE tasks SET status = 'done' WHERE id = ?", (task_id,))
+        cursor.execute(
+            "INSERT INTO task_occurrences (rule_id, occurs_at, status) "
+            "SELECT id, ?, 'done' FROM recurring_tasks WHERE id = ? AND user_id = ? "
+            "ON CONFLICT(rule_id, occurs_at) DO UPDATE SET status = 'done'",
+            (occurs_at, rule_id, user_id)
+        )
         conn.commit()
+    _notify_recurring("occurrence_done", rule_id, occurs_at, user_id)
 
-def delete_task(task_id):
+def delete_recurring_task(rule_id, user_id=DEFAULT_USER):
     """
-    Deletes a task from the database.
+    Deletes a recurring task and all of its occurrences.
+    Rules already synced to the calendar are kept as tombstones until the
+    next calendar sync removes their event.
     """
-    with connect() as conn:
+    require_sqlite("Recurring tasks")
+    with connect(user_id) as conn:
         cursor = conn.cursor()
-        cursor.execute("DELETE FROM tasks WHERE id = ?", (task_id,))
+        cursor.execute("SELECT id FROM recurring_tasks WHERE id = ? AND user_id = ?", (rule_id, user_id))
+        if cursor.fetchone() is None:
+            return
+        cursor.execute("DELETE FROM task_occurrences WHERE rule_id = ?", (rule_id,))
+        cursor.execute("UPDATE recurring_tasks SET deleted = 1 WHERE id = ? AND event_id IS NOT NULL", (rule_id,))
+        cursor.execute("DELETE FROM recurring_tasks WHERE id = ? AND event_id IS NULL", (rule_id,))
         conn.commit()
+    _notify_recurring("deleted", rule_id, user_id=user_id)
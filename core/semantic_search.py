@@ -0,0 +1,531 @@
+import json
+import os
+import threading
+
+import numpy as np
+
+from config.settings import EMBEDDING_MODEL, SEARCH_INDEX_DIR
+from data.database import connect, user_file_name, DEFAULT_USER
+from data.repository import require_sqlite, uses_sqlite
+from core import scheduler
+
+# Tasks changed since the last sync, in (updated_at, id) order, so edited
+# titles are re-embedded and deleted tasks dropped
+TASK_CHANGES = (
+    "SELECT id, title, deleted, COALESCE(updated_at, '') FROM tasks WHERE user_id = ? "
+    "AND (COALESCE(updated_at, '') > ? OR (COALESCE(updated_at, '') = ? AND id > ?)) "
+    "ORDER BY COALESCE(updated_at, ''), id LIMIT ?"
+)
+# Moods are never edited, so only those newer than the last indexed id are read
+NEW_MOODS = (
+    "SELECT id, description FROM moods WHERE user_id = ? AND id > ? "
+    "AND description IS NOT NULL AND description != '' ORDER BY id LIMIT ?"
+)
+# Rows of each kind that should be searchable. When the index has more
+# active items than this, rows were removed without the scheduler
+# (archiving, imports, other processes) and their items are dropped.
+REMAINING = {
+    "task": "SELECT COUNT(*) FROM tasks WHERE user_id = ? AND deleted = 0 AND title IS NOT NULL AND title != ''",
+    "mood": "SELECT COUNT(*) FROM moods WHERE user_id = ? AND description IS NOT NULL AND description != ''",
+}
+REMOVED = {
+    "task": (
+        "UPDATE search_items SET active = 0 WHERE user_id = ? AND kind = 'task' AND active = 1 AND NOT EXISTS ("
+        "SELECT 1 FROM tasks WHERE tasks.id = CAST(search_items.ref_id AS INTEGER) "
+        "AND tasks.user_id = search_items.user_id AND tasks.deleted = 0)"
+    ),
+    "mood": (
+        "UPDATE search_items SET active = 0 WHERE user_id = ? AND kind = 'mood' AND active = 1 AND NOT EXISTS ("
+        "SELECT 1 FROM moods WHERE moods.id = CAST(search_items.ref_id AS INTEGER) "
+        "AND moods.user_id = search_items.user_id)"
+    ),
+}
+
+# Below this many vectors an exact scan is already fast enough
+IVF_MIN_ITEMS = 20000
+# Rows scored at a time when scanning the memory-mapped matrix
+BLOCK_ROWS = 65536
+# Rows embedded per model call while catching up with new tasks and moods
+SYNC_BATCH = 256
+# Positions looked up per query when checking the best candidates
+LOOKUP_CHUNK = 500
+
+_model = None
+_model_lock = threading.Lock()
+
+def get_model():
+    """Loads the sentence-transformer once per process, on the CPU."""
+    global _model
+    with _model_lock:
+        if _model is None:
+            from sentence_transformers import SentenceTransformer
+            _model = SentenceTransformer(EMBEDDING_MODEL, device="cpu")
+        return _model
+
+def embed(texts, batch_size=64):
+    """Embeds a list of texts as L2-normalized float32 rows."""
+    vectors = get_model().encode(
+        list(texts),
+        batch_size=batch_size,
+        convert_to_numpy=True,
+        normalize_embeddings=True,
+        show_progress_bar=False,
+    )
+    return np.asarray(vectors, dtype=np.float32)
+
+
+class EmbeddingIndex:
+    """
+    Semantic search index of one user's task titles, mood descriptions and
+    email summaries.
+
+    Vectors are stored as float16 rows appended to a flat file, which is
+    memory-mapped for queries, so adding items never rewrites the matrix.
+    Which item each row belongs to is kept in the search_items table and
+    mirrored in memory as one kind code per row (-1 for rows of removed or
+    re-embedded items, which stay in the file), so queries drop them and
+    other kinds before ranking.
+    Past IVF_MIN_ITEMS rows, an IVF index (k-means centroids plus the list
+    of each row) narrows queries to the rows of the closest lists.
+    """
+
+    def __init__(self, user_id=DEFAULT_USER, directory=None, embed_fn=embed, model_name=EMBEDDING_MODEL):
+        self.user_id = user_id
+        self.directory = directory or os.path.join(SEARCH_INDEX_DIR, user_file_name(user_id))
+        self.embed_fn = embed_fn
+        self.model_name = model_name
+        self._lock = threading.RLock()
+        self._dim = None
+        self._count = 0
+        self._matrix = None
+        self._ivf_centroids = None
+        self._ivf_trained = 0
+        self._kind_codes = {}
+        self._row_kinds = np.empty(0, dtype=np.int16)
+        os.makedirs(self.directory, exist_ok=True)
+        self._open()
+
+    # --- Files ---
+
+    @property
+    def _vectors_path(self):
+        return os.path.join(self.directory, "vectors.f16")
+
+    @property
+    def _lists_path(self):
+        return os.path.join(self.directory, "ivf_lists.i32")
+
+    @property
+    def _centroids_path(self):
+        return os.path.join(self.directory, "ivf_centroids.npy")
+
+    @property
+    def _meta_path(self):
+        return os.path.join(self.directory, "meta.json")
+
+    def _open(self):
+        meta = {}
+        if os.path.exists(self._meta_path):
+            with open(self._meta_path, encoding="utf-8") as f:
+                meta = json.load(f)
+        if meta.get("model") not in (None, self.model_name):
+            # Vectors from another model are not comparable
+            self.reset()
+            return
+        self._dim = meta.get("dim")
+        self._ivf_trained = meta.get("ivf_trained", 0)
+
+        with connect(self.user_id) as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT MAX(position) FROM search_items WHERE user_id = ?", (self.user_id,))
+            last = cursor.fetchone()[0]
+        self._count = 0 if last is None else last + 1
+
+        # Rows appended by an interrupted add() have no item and are dropped
+        if self._dim and os.path.exists(self._vectors_path):
+            row_bytes = self._dim * 2
+            if os.path.getsize(self._vectors_path) != self._count * row_bytes:
+                with open(self._vectors_path, "r+b") as f:
+                    f.truncate(self._count * row_bytes)
+
+        if self._ivf_trained and os.path.exists(self._centroids_path) and os.path.exists(self._lists_path) \
+                and os.path.getsize(self._lists_path) == self._count * 4:
+            self._ivf_centroids = np.load(self._centroids_path)
+        else:
+            self._drop_ivf()
+        self._load_row_kinds()
+
+    def _kind_code(self, kind):
+        return self._kind_codes.setdefault(kind, len(self._kind_codes))
+
+    def _load_row_kinds(self):
+        """Reads the kind of every active row from search_items."""
+        row_kinds = np.full(self._count, -1, dtype=np.int16)
+        with connect(self.user_id) as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT position, kind FROM search_items WHERE user_id = ? AND active = 1", (self.user_id,))
+            for position, kind in cursor:
+                if position < self._count:
+                    row_kinds[position] = self._kind_code(kind)
+        self._row_kinds = row_kinds
+
+    def _forget(self, positions):
+        """Marks rows as inactive in memory (their items were already deactivated)."""
+        with self._lock:
+            positions = [position for position in positions if position < len(self._row_kinds)]
+            self._row_kinds[positions] = -1
+
+    def _save_meta(self):
+        with open(self._meta_path, "w", encoding="utf-8") as f:
+            json.dump({"model": self.model_name, "dim": self._dim, "ivf_trained": self._ivf_trained}, f)
+
+    def reset(self):
+        """Deletes every vector and item of this user's index."""
+        with self._lock:
+            for path in (self._vectors_path, self._lists_path, self._centroids_path, self._meta_path):
+                if os.path.exists(path):
+                    os.remove(path)
+            with connect(self.user_id) as conn:
+                conn.execute("DELETE FROM search_items WHERE user_id = ?", (self.user_id,))
+                conn.execute("DELETE FROM sync_state WHERE user_id = ? AND key LIKE 'search:%'", (self.user_id,))
+                conn.commit()
+            self._dim = None
+            self._count = 0
+            self._matrix = None
+            self._ivf_centroids = None
+            self._ivf_trained = 0
+            self._row_kinds = np.empty(0, dtype=np.int16)
+
+    def _drop_ivf(self):
+        self._ivf_centroids = None
+        self._ivf_trained = 0
+        for path in (self._lists_path, self._centroids_path):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def _vectors(self):
+        """Memory-mapped (count, dim) float16 matrix, reopened after appends."""
+        if self._matrix is None or self._matrix.shape[0] != self._count:
+            self._matrix = np.memmap(self._vectors_path, dtype=np.float16, mode="r", shape=(self._count, self._dim))
+        return self._matrix
+
+    def __len__(self):
+        return self._count
+
+    # --- Writes ---
+
+    def add(self, kind, items):
+        """
+        Embeds and stores (ref_id, text) items of a kind ('task', 'mood',
+        'email', ...). Items already indexed with the same text are skipped;
+        items whose text changed are re-embedded.
+        Returns the number of embedded items.
+        """
+        items = [(str(ref_id), text) for ref_id, text in items if text]
+        if not items:
+            return 0
+
+        with self._lock:
+            with connect(self.user_id) as conn:
+                cursor = conn.cursor()
+                known = {}
+                for start in range(0, len(items), LOOKUP_CHUNK):
+                    chunk = [ref_id for ref_id, _ in items[start:start + LOOKUP_CHUNK]]
+                    cursor.execute(
+                        f"SELECT ref_id, text, position, active FROM search_items WHERE user_id = ? AND kind = ? "
+                        f"AND ref_id IN ({', '.join('?' * len(chunk))})",
+                        [self.user_id, kind] + chunk
+                    )
+                    known.update((ref_id, (text, position, active)) for ref_id, text, position, active in cursor)
+                # Unchanged items are kept (and made searchable again if they were removed)
+                unchanged = [ref_id for ref_id, text in items if ref_id in known and known[ref_id][0] == text]
+                restored = [ref_id for ref_id in unchanged if not known[ref_id][2]]
+                if restored:
+                    cursor.executemany(
+                        "UPDATE search_items SET active = 1 WHERE user_id = ? AND kind = ? AND ref_id = ?",
+                        ((self.user_id, kind, ref_id) for ref_id in restored)
+                    )
+                    conn.commit()
+                    for ref_id in restored:
+                        if known[ref_id][1] < self._count:
+                            self._row_kinds[known[ref_id][1]] = self._kind_code(kind)
+                items = [(ref_id, text) for ref_id, text in items if ref_id not in known or known[ref_id][0] != text]
+                if not items:
+                    return 0
+
+                vectors = self.embed_fn([text for _, text in items])
+                if self._dim is None:
+                    self._dim = vectors.shape[1]
+                    self._save_meta()
+
+                # The vectors are on disk before their items are committed
+                with open(self._vectors_path, "ab") as f:
+                    f.write(vectors.astype(np.float16).tobytes())
+                if self._ivf_centroids is not None:
+                    with open(self._lists_path, "ab") as f:
+                        f.write(self._nearest_lists(vectors, 1)[:, 0].astype(np.int32).tobytes())
+
+                cursor.executemany(
+                    "INSERT INTO search_items (user_id, kind, ref_id, position, text) VALUES (?, ?, ?, ?, ?) "
+                    "ON CONFLICT(user_id, kind, ref_id) DO UPDATE SET "
+                    "position = excluded.position, text = excluded.text, active = 1",
+                    (
+                        (self.user_id, kind, ref_id, self._count + offset, text)
+                        for offset, (ref_id, text) in enumerate(items)
+                    )
+                )
+                conn.commit()
+                # Rows of re-embedded items are superseded by the new ones
+                self._row_kinds[[known[ref_id][1] for ref_id, _ in items if ref_id in known]] = -1
+                self._row_kinds = np.concatenate(
+                    [self._row_kinds, np.full(len(items), self._kind_code(kind), dtype=np.int16)]
+                )
+                self._count += len(items)
+            return len(items)
+
+    def remove(self, kind, ref_id):
+        """Excludes an item from search results."""
+        _deactivate(self.user_id, kind, [ref_id])
+
+    def sync(self):
+        """
+        Embeds the tasks and moods added since the last sync, re-embeds
+        tasks whose title changed and drops deleted, archived or otherwise
+        removed tasks and moods.
+        Returns the number of embedded items per kind.
+        """
+        with self._lock:
+            added = {"task": self._sync_tasks(), "mood": self._sync_moods()}
+            for kind in REMAINING:
+                self._drop_removed(kind)
+            if self._count >= IVF_MIN_ITEMS and self._count >= 2 * self._ivf_trained:
+                self.build_ivf()
+        return added
+
+    def _sync_state(self, key, default):
+        with connect(self.user_id) as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT value FROM sync_state WHERE user_id = ? AND key = ?", (self.user_id, key))
+            row = cursor.fetchone()
+        return row[0] if row else default
+
+    def _save_sync_state(self, key, value):
+        with connect(self.user_id) as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO sync_state (user_id, key, value) VALUES (?, ?, ?)",
+                (self.user_id, key, value)
+            )
+            conn.commit()
+
+    def _sync_tasks(self):
+        # Only the time is saved: tasks written later within the same
+        # millisecond are read again on the next sync instead of skipped
+        # (unchanged titles are not embedded twice)
+        changed_since = self._sync_state("search:task_updated", "")
+        last_id = 0
+        added = 0
+        while True:
+            with connect(self.user_id) as conn:
+                cursor = conn.cursor()
+                cursor.execute(TASK_CHANGES, (self.user_id, changed_since, changed_since, last_id, SYNC_BATCH))
+                rows = cursor.fetchall()
+            if not rows:
+                return added
+            _deactivate(self.user_id, "task", [task_id for task_id, _, deleted, _ in rows if deleted])
+            added += self.add("task", [(task_id, title) for task_id, title, deleted, _ in rows if not deleted])
+            last_id, changed_since = rows[-1][0], rows[-1][3]
+            self._save_sync_state("search:task_updated", changed_since)
+
+    def _sync_moods(self):
+        last_id = int(self._sync_state("search:mood", 0))
+        added = 0
+        while True:
+            with connect(self.user_id) as conn:
+                cursor = conn.cursor()
+                cursor.execute(NEW_MOODS, (self.user_id, last_id, SYNC_BATCH))
+                rows = cursor.fetchall()
+            if not rows:
+                return added
+            added += self.add("mood", rows)
+            last_id = rows[-1][0]
+            self._save_sync_state("search:mood", str(last_id))
+
+    def _drop_removed(self, kind):
+        code = self._kind_codes.get(kind)
+        if code is None:
+            return
+        with connect(self.user_id) as conn:
+            cursor = conn.cursor()
+            cursor.execute(REMAINING[kind], (self.user_id,))
+            if cursor.fetchone()[0] >= np.count_nonzero(self._row_kinds == code):
+                return
+            cursor.execute(REMOVED[kind], (self.user_id,))
+            conn.commit()
+        self._load_row_kinds()
+
+    # --- IVF ---
+
+    def _nearest_lists(self, vectors, nprobe):
+        scores = vectors @ self._ivf_centroids.T
+        nprobe = min(nprobe, scores.shape[1])
+        return np.argpartition(-scores, nprobe - 1, axis=1)[:, :nprobe]
+
+    def build_ivf(self, nlist=None, iterations=10, seed=0):
+        """
+        Trains an IVF index with spherical k-means on a sample of the rows
+        and assigns every row to its closest centroid.
+        Rebuilt automatically by sync() whenever the index doubles in size.
+        """
+        with self._lock:
+            if not self._count:
+                return
+            matrix = self._vectors()
+            nlist = nlist or max(1, int(np.sqrt(self._count)))
+            rng = np.random.default_rng(seed)
+            sample_size = min(self._count, nlist * 64)
+            sample = np.asarray(matrix[np.sort(rng.choice(self._count, sample_size, replace=False))], dtype=np.float32)
+
+            centroids = sample[rng.choice(sample_size, nlist, replace=False)]
+            for _ in range(iterations):
+                assignment = np.argmax(sample @ centroids.T, axis=1)
+                sums = np.zeros_like(centroids)
+                np.add.at(sums, assignment, sample)
+                norms = np.linalg.norm(sums, axis=1, keepdims=True)
+                # Empty lists keep their previous centroid
+                centroids = np.where(norms > 0, sums / np.maximum(norms, 1e-12), centroids)
+
+            self._ivf_centroids = centroids.astype(np.float32)
+            lists = np.empty(self._count, dtype=np.int32)
+            for start in range(0, self._count, BLOCK_ROWS):
+                block = np.asarray(matrix[start:start + BLOCK_ROWS], dtype=np.float32)
+                lists[start:start + len(block)] = self._nearest_lists(block, 1)[:, 0]
+
+            np.save(self._centroids_path, self._ivf_centroids)
+            lists.tofile(self._lists_path)
+            self._ivf_trained = self._count
+            self._save_meta()
+
+    # --- Queries ---
+
+    def _scores(self, query, ann, nprobe):
+        """Returns (positions, scores) of the candidate rows for a query vector."""
+        matrix = self._vectors()
+        if ann and self._ivf_centroids is not None:
+            probed = self._nearest_lists(query[None, :], nprobe)[0]
+            lists = np.fromfile(self._lists_path, dtype=np.int32, count=self._count)
+            positions = np.flatnonzero(np.isin(lists, probed))
+            scores = np.asarray(matrix[positions], dtype=np.float32) @ query
+            return positions, scores
+
+        scores = np.empty(self._count, dtype=np.float32)
+        for start in range(0, self._count, BLOCK_ROWS):
+            scores[start:start + BLOCK_ROWS] = np.asarray(matrix[start:start + BLOCK_ROWS], dtype=np.float32) @ query
+        return np.arange(self._count), scores
+
+    def search(self, query, k=10, kinds=None, ann=True, nprobe=8):
+        """
+        Returns the `k` items most similar to `query`, best first, as
+        dictionaries with kind, ref_id, text and score (cosine similarity).
+        `kinds` restricts results to some kinds; `ann=False` forces an
+        exact scan even when an IVF index exists.
+        """
+        with self._lock:
+            if not self._count or not query.strip():
+                return []
+            query_vector = self.embed_fn([query])[0]
+            positions, scores = self._scores(query_vector, ann, nprobe)
+
+            # Removed rows and other kinds are dropped before ranking
+            row_kinds = self._row_kinds[positions]
+            if kinds:
+                keep = np.isin(row_kinds, [self._kind_codes[kind] for kind in kinds if kind in self._kind_codes])
+            else:
+                keep = row_kinds >= 0
+            positions, scores = positions[keep], scores[keep]
+
+            while True:
+                top = min(k, len(scores))
+                if top == 0:
+                    return []
+                best = np.argpartition(-scores, top - 1)[:top]
+                best = best[np.argsort(-scores[best])]
+                found = self._lookup(positions[best], scores[best])
+                if len(found) == top:
+                    return sorted(found.values(), key=lambda result: result["score"], reverse=True)
+                # Items removed by another process since the kinds were read
+                stale = [position for position in positions[best].tolist() if position not in found]
+                self._forget(stale)
+                keep = ~np.isin(positions, stale)
+                positions, scores = positions[keep], scores[keep]
+
+    def _lookup(self, positions, scores):
+        """Results of the active items at `positions`, by position."""
+        score_by_position = dict(zip(positions.tolist(), scores.tolist()))
+        rows = []
+        with connect(self.user_id) as conn:
+            cursor = conn.cursor()
+            chunk_positions = list(score_by_position)
+            for start in range(0, len(chunk_positions), LOOKUP_CHUNK):
+                chunk = chunk_positions[start:start + LOOKUP_CHUNK]
+                cursor.execute(
+                    f"SELECT position, kind, ref_id, text FROM search_items WHERE user_id = ? AND active = 1 "
+                    f"AND position IN ({', '.join('?' * len(chunk))})",
+                    [self.user_id] + chunk
+                )
+                rows.extend(cursor.fetchall())
+        return {
+            position: {"kind": kind, "ref_id": ref_id, "text": text, "score": score_by_position[position]}
+            for position, kind, ref_id, text in rows
+        }
+
+
+def _deactivate(user_id, kind, ref_ids):
+    """Excludes items from search, in the database and in the user's open index."""
+    ref_ids = [str(ref_id) for ref_id in ref_ids]
+    if not ref_ids:
+        return
+    positions = []
+    with connect(user_id) as conn:
+        cursor = conn.cursor()
+        for start in range(0, len(ref_ids), LOOKUP_CHUNK):
+            chunk = ref_ids[start:start + LOOKUP_CHUNK]
+            params = [user_id, kind] + chunk
+            where = f"user_id = ? AND kind = ? AND ref_id IN ({', '.join('?' * len(chunk))})"
+            cursor.execute(f"SELECT position FROM search_items WHERE {where} AND active = 1", params)
+            positions.extend(row[0] for row in cursor.fetchall())
+            cursor.execute(f"UPDATE search_items SET active = 0 WHERE {where}", params)
+        conn.commit()
+    index = _indexes.get(user_id)
+    if index is not None:
+        index._forget(positions)
+
+def _on_task_event(event, task_id, title, date_time, user_id):
+    # New and edited tasks are embedded lazily on the next search; deleted ones are hidden right away
+    if event == "deleted" and uses_sqlite():
+        _deactivate(user_id, "task", [task_id])
+
+scheduler.add_task_listener(_on_task_event)
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+def get_index(user_id=DEFAULT_USER):
+    """Returns the user's EmbeddingIndex, opened once per process."""
+    require_sqlite("Semantic search")
+    with _indexes_lock:
+        if user_id not in _indexes:
+            _indexes[user_id] = EmbeddingIndex(user_id)
+        return _indexes[user_id]
+
+def search(query, k=10, kinds=None, user_id=DEFAULT_USER):
+    """
+    Semantic search over a user's tasks, moods and email summaries.
+    New tasks and moods are embedded first, so results are always current.
+    """
+    index = get_index(user_id)
+    index.sync()
+    return index.search(query, k=k, kinds=kinds)
+
+def index_email_summary(ref_id, summary, user_id=DEFAULT_USER):
+    """Adds an email summary to the user's search index."""
+    return get_index(user_id).add("email", [(ref_id, summary)])
@@ -0,0 +1,175 @@
+import sqlite3
+import threading
+from datetime import datetime
+
+from core import scheduler
+from data.database import connect, database_path, DEFAULT_USER
+from data.repository import get_backend, uses_sqlite
+
+# How a task's time is shown, e.g. 'Monday, January 01 at 09:00 AM'
+WHEN_FORMAT = "%A, %B %d at %I:%M %p"
+
+# Version of a user's tasks: the trigger-maintained change counter, the
+# last task it counted, and the highest task id (see data/database.py)
+VERSION_QUERY = (
+    "SELECT (SELECT version FROM task_versions WHERE user_id = ?), "
+    "(SELECT task_id FROM task_versions WHERE user_id = ?), "
+    "(SELECT MAX(id) FROM tasks WHERE user_id = ?)"
+)
+
+
+class TaskView:
+    """
+    A pending task ready for display: its date_time parsed once into
+    `moment` (None when missing or invalid) and formatted once into `when`
+    (None without a time; the raw string when it can't be parsed).
+    """
+
+    __slots__ = ("id", "title", "date_time", "moment", "when")
+
+    def __init__(self, id, title, date_time=None):
+        self.id = id
+        self.title = title
+        self.set_date_time(date_time)
+
+    def set_date_time(self, date_time):
+        self.date_time = date_time
+        try:
+            self.moment = datetime.fromisoformat(date_time) if date_time else None
+        except (TypeError, ValueError):
+            self.moment = None
+        self.when = self.moment.strftime(WHEN_FORMAT) if self.moment else date_time
+
+    def __repr__(self):
+        return f"TaskView(id={self.id!r}, title={self.title!r}, when={self.when!r})"
+
+
+class TaskCache:
+    """
+    A user's pending tasks as TaskViews, in the order list_tasks returns
+    them. Loaded once; after that, the scheduler listener below applies
+    each add, reschedule, completion and deletion to the one task it
+    touches, so nothing is read or formatted again.
+
+    With SQLite, writes made elsewhere (another process, or code that
+    bypasses the scheduler) are caught by checking the database before
+    each read: PRAGMA data_version on the cache's own connection tells
+    whether anyone committed since the last check, and only then is the
+    task version (VERSION_QUERY) read. An event is trusted when the
+    version moved by exactly its own change; otherwise the cache reloads.
+    """
+
+    def __init__(self, user_id=DEFAULT_USER):
+        self.user_id = user_id
+        self._lock = threading.Lock()
+        self._tracked = uses_sqlite()
+        self._conn = None
+        self._data_version = None
+        self._load()
+
+    def _load(self):
+        # The version is read first, so a write during the load is seen by the next check
+        self._version = self._read_version() if self._tracked else None
+        self._views = {
+            task.id: TaskView(task.id, task.title, task.date_time)
+            for task in get_backend().list_tasks(self.user_id)
+        }
+        self._untimed = sum(1 for view in self._views.values() if not view.date_time)
+        self._list = None
+
+    def _read_version(self):
+        if self._conn is None:
+            # data_version is per connection and only counts other connections' commits,
+            # so the cache keeps one of its own that never writes
+            self._conn = sqlite3.connect(database_path(self.user_id), check_same_thread=False)
+        self._data_version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+        with connect(self.user_id) as conn:
+            return tuple(conn.execute(VERSION_QUERY, (self.user_id,) * 3).fetchone())
+
+    def _validate(self):
+        """Reloads the tasks if the database changed in ways no event reported. Called under the lock."""
+        if not self._tracked:
+            return
+        if self._version is not None and self._conn is not None:
+            if self._conn.execute("PRAGMA data_version").fetchone()[0] == self._data_version:
+                return
+            if self._read_version() == self._version:
+                return
+        self._load()
+
+    def close(self):
+        """Closes the connection used to check the version."""
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def __len__(self):
+        with self._lock:
+            self._validate()
+            return len(self._views)
+
+    def tasks(self):
+        """Pending TaskViews. The list is rebuilt only after a change."""
+        with self._lock:
+            self._validate()
+            if self._list is None:
+                self._list = list(self._views.values())
+            return self._list
+
+    def has_untimed(self):
+        """Whether some pending task has no time."""
+        with self._lock:
+            self._validate()
+            return self._untimed > 0
+
+    def apply(self, event, task_id, title=None, date_time=None):
+        """Updates the cache for one scheduler event ('added', 'rescheduled', 'done' or 'deleted')."""
+        with self._lock:
+            view = self._views.get(task_id)
+            if view is not None:
+                self._untimed -= not view.date_time
+            if event == "added":
+                view = self._views[task_id] = TaskView(task_id, title, date_time)
+            elif event == "rescheduled" and view is not None:
+                view.set_date_time(date_time)
+            else:
+                self._views.pop(task_id, None)
+                view = None
+            if view is not None:
+                self._untimed += not view.date_time
+            self._list = None
+
+            if self._tracked and self._version is not None:
+                # The event accounts for one change of this task; any other
+                # change since the last check means a write the cache missed
+                version = self._read_version()
+                expected = (self._version[0] or 0) + 1
+                self._version = version if version[:2] == (expected, task_id) else None
+
+
+# Caches by user, shared by every session of that user in this process;
+# a calendar sync (which writes tasks directly) invalidates the user's cache
+# right away rather than waiting for the version check
+_caches = {}
+_caches_lock = threading.Lock()
+
+def get_task_cache(user_id=DEFAULT_USER):
+    with _caches_lock:
+        if user_id not in _caches:
+            _caches[user_id] = TaskCache(user_id)
+        return _caches[user_id]
+
+def invalidate(user_id=DEFAULT_USER):
+    """Drops a user's cache; it is loaded again on next use."""
+    with _caches_lock:
+        cache = _caches.pop(user_id, None)
+    if cache is not None:
+        cache.close()
+
+def _on_task_event(event, task_id, title, date_time, user_id):
+    cache = _caches.get(user_id)
+    if cache is not None:
+        cache.apply(event, task_id, title, date_time)
+
+scheduler.add_task_listener(_on_task_event)
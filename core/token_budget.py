@@ -0,0 +1,197 @@
+import math
+import re
+import sqlite3
+import threading
+from datetime import datetime, timedelta
+
+from config.settings import MAX_EMAIL_TOKENS
+from data.database import connect, DEFAULT_USER
+
+# Context window (prompt + reply) of the hosted models, by name prefix;
+# the longest matching prefix wins
+MODEL_CONTEXT_TOKENS = {
+    "gpt-3.5-turbo": 16385,
+    "gpt-4": 8192,
+    "gpt-4-turbo": 128000,
+    "gpt-4o": 128000,
+    "gpt-4.1": 1047576,
+}
+DEFAULT_CONTEXT_TOKENS = 4096
+# Tokens the chat format adds to every message and to prime the reply
+MESSAGE_OVERHEAD_TOKENS = 4
+REPLY_OVERHEAD_TOKENS = 3
+# Summaries get this fraction of the email's tokens, within [MIN_OUTPUT_TOKENS, the caller's cap]
+SUMMARY_RATIO = 0.3
+MIN_OUTPUT_TOKENS = 60
+
+
+# --- Counting ---
+
+_encodings = {}
+_encodings_lock = threading.Lock()
+
+def _encoding(model):
+    """tiktoken encoding of a model, or None when tiktoken (or its data) is unavailable."""
+    with _encodings_lock:
+        if model not in _encodings:
+            try:
+                import tiktoken
+                try:
+                    _encodings[model] = tiktoken.encoding_for_model(model)
+                except KeyError:
+                    _encodings[model] = tiktoken.get_encoding("cl100k_base")
+            except Exception:
+                _encodings[model] = None
+        return _encodings[model]
+
+def count_tokens(text, model="gpt-3.5-turbo"):
+    """
+    Tokens of `text` for `model`: exact with tiktoken, otherwise estimated
+    (about 4 characters or 3/4 of a word per token, whichever is more).
+    """
+    encoding = _encoding(model)
+    if encoding is not None:
+        return len(encoding.encode(text))
+    return max(math.ceil(len(text) / 4), math.ceil(len(text.split()) * 4 / 3))
+
+def count_message_tokens(messages, model="gpt-3.5-turbo"):
+    """Prompt tokens of a list of chat messages, including the chat format overhead."""
+    return REPLY_OVERHEAD_TOKENS + sum(
+        MESSAGE_OVERHEAD_TOKENS + count_tokens(message["content"], model) for message in messages
+    )
+
+def truncate_to_tokens(text, max_tokens, model="gpt-3.5-turbo"):
+    """The beginning of `text` that fits in `max_tokens` (cut on a word boundary, when possible, without tiktoken)."""
+    if max_tokens <= 0:
+        return ""
+    encoding = _encoding(model)
+    if encoding is not None:
+        tokens = encoding.encode(text)
+        return text if len(tokens) <= max_tokens else encoding.decode(tokens[:max_tokens])
+    words = text.split(" ")
+    while len(words) > 1 and count_tokens(" ".join(words), model) > max_tokens:
+        words = words[:max(1, int(len(words) * max_tokens / count_tokens(" ".join(words), model)))]
+    text = " ".join(words)
+    # One word longer than the budget (a URL, encoded data) is cut by characters
+    return text if count_tokens(text, model) <= max_tokens else text[:max_tokens * 4]
+
+def context_tokens(model):
+    matches = [prefix for prefix in MODEL_CONTEXT_TOKENS if model.startswith(prefix)]
+    return MODEL_CONTEXT_TOKENS[max(matches, key=len)] if matches else DEFAULT_CONTEXT_TOKENS
+
+
+# --- Trimming ---
+
+# RFC 3676 signature delimiter and mobile client footers
+_SIGNATURE_DELIMITER_RE = re.compile(r"^--\s*$")
+_CLIENT_FOOTER_RE = re.compile(
+    r"^(sent from my \w+|sent from (mail|outlook|yahoo mail) for \w+|get outlook for \w+|enviado do meu \w+)\b.*$",
+    re.IGNORECASE
+)
+# Sign-offs; the name, title and contact lines that follow them are dropped
+_SIGN_OFF_RE = re.compile(
+    r"^(best|kind|warm)?\s*(regards|wishes)[,.!]?$|^(thanks|thank you|many thanks|cheers|sincerely|best)[,.!]?$|"
+    r"^(atenciosamente|abraços|obrigad[oa]|att)[,.!]?$",
+    re.IGNORECASE
+)
+# Paragraphs of legal or mailing-list boilerplate at the end of an email
+_DISCLAIMER_RE = re.compile(
+    r"confidential|intended (solely |only )?for the (use of the )?(individual|addressee|named|intended)|"
+    r"received this (e-?mail|message|communication) in error|disclaimer|unsubscribe|"
+    r"consider the environment before printing|mensagem.{0,40}confidencial|"
+    r"you are receiving this (e-?mail|message)|update your (email )?preferences",
+    re.IGNORECASE
+)
+# Sign-offs are only looked for this close to the end of the email
+SIGN_OFF_WINDOW_LINES = 8
+
+def clean_email(text):
+    """
+    Removes what costs tokens without changing the summary: the signature
+    (after '-- ' or a sign-off near the end), mail client footers,
+    trailing disclaimer and unsubscribe paragraphs, and extra whitespace.
+    """
+    lines = [re.sub(r"[ \t ]+", " ", line).strip() for line in text.replace("\r\n", "\n").split("\n")]
+    lines = [line for line in lines if not _CLIENT_FOOTER_RE.match(line)]
+
+    for index, line in enumerate(lines):
+        if _SIGNATURE_DELIMITER_RE.match(line) and index > 0:
+            lines = lines[:index]
+            break
+    content = [index for index, line in enumerate(lines) if line]
+    for index in content[-SIGN_OFF_WINDOW_LINES:]:
+        if index != content[0] and _SIGN_OFF_RE.match(lines[index]):
+            lines = lines[:index]
+            break
+
+    paragraphs = [p for p in re.split(r"\n{2,}", "\n".join(lines).strip()) if p.strip()]
+    while len(paragraphs) > 1 and _DISCLAIMER_RE.search(paragraphs[-1]):
+        paragraphs.pop()
+    return "\n\n".join(paragraphs)
+
+def output_budget(input_tokens, cap, ratio=SUMMARY_RATIO, minimum=MIN_OUTPUT_TOKENS):
+    """max_tokens for a reply that grows with the input: ratio of it, at least `minimum`, at most `cap`."""
+    return max(min(minimum, cap), min(cap, math.ceil(input_tokens * ratio)))
+
+def fit_messages(messages, model, max_tokens, max_input_tokens=MAX_EMAIL_TOKENS):
+    """
+    Makes a chat request fit the model's context window.
+
+    The last message (the email or text being processed) is cut to
+    `max_input_tokens` and, if the prompt plus `max_tokens` would still
+    overflow the context window, to what is left. Returns (messages,
+    max_tokens, budget) where budget has prompt_tokens and trimmed_tokens.
+    """
+    *head, last = messages
+    fixed = count_message_tokens(head, model) + MESSAGE_OVERHEAD_TOKENS
+    content_tokens = count_tokens(last["content"], model)
+    allowed = min(max_input_tokens, context_tokens(model) - fixed - max_tokens)
+    trimmed = 0
+    if content_tokens > allowed:
+        last = dict(last, content=truncate_to_tokens(last["content"], allowed, model))
+        trimmed = content_tokens - count_tokens(last["content"], model)
+        content_tokens -= trimmed
+    prompt_tokens = fixed + content_tokens
+    max_tokens = max(1, min(max_tokens, context_tokens(model) - prompt_tokens))
+    return head + [last], max_tokens, {"prompt_tokens": prompt_tokens, "trimmed_tokens": trimmed}
+
+
+# --- Usage ---
+
+def record_usage(model, operation, estimated_prompt_tokens, prompt_tokens=None, completion_tokens=None,
+                 max_tokens=None, trimmed_tokens=0, latency_ms=None, user_id=DEFAULT_USER):
+    """Stores the tokens of one hosted model call. Never raises: usage is best effort."""
+    try:
+        with connect(user_id) as conn:
+            conn.execute(
+                "INSERT INTO token_usage (user_id, model, operation, estimated_prompt_tokens, prompt_tokens, "
+                "completion_tokens, max_tokens, trimmed_tokens, latency_ms) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (user_id, model, operation, estimated_prompt_tokens, prompt_tokens, completion_tokens,
+                 max_tokens, trimmed_tokens, latency_ms)
+            )
+            conn.commit()
+    except sqlite3.Error as e:
+        print(f"Error recording token usage: {str(e)}")
+
+def usage_summary(days=30, user_id=DEFAULT_USER):
+    """
+    Token usage of the last `days` days by operation and model: calls,
+    prompt and completion tokens (as billed), the local prompt estimate,
+    tokens trimmed before sending and average latency.
+    """
+    since = (datetime.now() - timedelta(days=days)).strftime("%Y-%m-%dT%H:%M:%S")
+    with connect(user_id) as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            "SELECT operation, model, COUNT(*), SUM(prompt_tokens), SUM(completion_tokens), "
+            "SUM(estimated_prompt_tokens), SUM(trimmed_tokens), AVG(latency_ms) "
+            "FROM token_usage WHERE user_id = ? AND timestamp >= ? GROUP BY operation, model ORDER BY operation, model",
+            (user_id, since)
+        )
+        rows = cursor.fetchall()
+    return [
+        {"operation": operation, "model": model, "calls": calls, "prompt_tokens": prompt or 0,
+         "completion_tokens": completion or 0, "estimated_prompt_tokens": estimated or 0,
+         "trimmed_tokens": trimmed or 0, "avg_latency_ms": round(latency, 1) if latency is not None else None}
+        for operation, model, calls, prompt, completion, estimated, trimmed, latency in rows
+    ]
@@ -0,0 +1,166 @@
+import argparse
+import glob
+import os
+from datetime import datetime, timedelta, timezone
+
+import pandas as pd
+
+from config.settings import ARCHIVE_DIR, ARCHIVE_AFTER_DAYS
+from data.database import connect, user_file_name, DEFAULT_USER
+from data.repository import require_sqlite
+
+# Columns moved to the archive for each table, with their dtypes
+ARCHIVE_COLUMNS = {
+    "tasks": {
+        "id": "int64",
+        "user_id": "string",
+        "title": "string",
+        "datetime": "string",
+        "status": "string",
+        "updated_at": "string",
+    },
+    "moods": {
+        "id": "int64",
+        "user_id": "string",
+        "date": "string",
+        "description": "string",
+        "classification": "string",
+    },
+}
+
+# Rows eligible for archiving. Done tasks with unsynced calendar changes
+# stay until the next sync; tasks never sent to the calendar can go anytime.
+ARCHIVE_QUERIES = {
+    "tasks": (
+        "SELECT id, user_id, title, datetime, status, updated_at FROM tasks "
+        "WHERE user_id = ? AND status = 'done' AND deleted = 0 "
+        "AND (event_id IS NULL OR version = synced_version) AND COALESCE(updated_at, '') < ? "
+        "ORDER BY id"
+    ),
+    "moods": (
+        "SELECT id, user_id, date, description, classification FROM moods "
+        "WHERE user_id = ? AND date < ? "
+        "ORDER BY id"
+    ),
+}
+
+def archive_path(table, user_id=DEFAULT_USER):
+    """Directory holding a user's archived rows of `table`."""
+    return os.path.join(ARCHIVE_DIR, user_file_name(user_id), table)
+
+def _write_part(table, user_id, rows):
+    """
+    Writes rows to a new zstd-compressed Parquet file.
+    The file is written under a temporary name and renamed once complete,
+    so readers never see a partial file.
+    """
+    directory = archive_path(table, user_id)
+    os.makedirs(directory, exist_ok=True)
+
+    columns = ARCHIVE_COLUMNS[table]
+    frame = pd.DataFrame.from_records(rows, columns=list(columns)).astype(columns)
+    name = f"part-{datetime.now().strftime('%Y%m%d%H%M%S%f')}-{int(frame['id'].min())}.parquet"
+    path = os.path.join(directory, name)
+    frame.to_parquet(path + ".tmp", engine="pyarrow", compression="zstd", index=False)
+    os.replace(path + ".tmp", path)
+    return path
+
+def _archive_table(cursor, table, user_id, cutoff, batch_size):
+    cursor.execute(ARCHIVE_QUERIES[table], (user_id, cutoff))
+    archived_ids = []
+    while True:
+        rows = cursor.fetchmany(batch_size)
+        if not rows:
+            break
+        _write_part(table, user_id, rows)
+        archived_ids.extend(row[0] for row in rows)
+    # Rows are deleted once the SELECT is done, never while it is still being read;
+    # only rows written to a part are removed from the hot table
+    cursor.executemany(f"DELETE FROM {table} WHERE id = ?", ((row_id,) for row_id in archived_ids))
+    return len(archived_ids)
+
+def archive_old_data(days=ARCHIVE_AFTER_DAYS, user_id=DEFAULT_USER, now=None, batch_size=50000, vacuum=False):
+    """
+    Moves done tasks and moods older than `days` days out of SQLite into
+    Parquet files, keeping the hot tables small. Mood summaries
+    (mood_daily, mood_slots) are append-only, so trends are unaffected.
+
+    A file is renamed into place before its rows are deleted; if the
+    process stops in between, the rows are archived again on the next run
+    and load_archive drops the duplicates by id.
+
+    Returns a dictionary with the number of archived tasks and moods.
+    """
+    require_sqlite("Archiving")
+    now = now or datetime.now()
+    # tasks.updated_at is UTC; moods.date is local time
+    task_cutoff = (now.astimezone(timezone.utc) - timedelta(days=days)).strftime("%Y-%m-%dT%H:%M:%S")
+    mood_cutoff = (now - timedelta(days=days)).strftime("%Y-%m-%d %H:%M")
+
+    with connect(user_id) as conn:
+        cursor = conn.cursor()
+        result = {
+            "tasks": _archive_table(cursor, "tasks", user_id, task_cutoff, batch_size),
+            "moods": _archive_table(cursor, "moods", user_id, mood_cutoff, batch_size),
+        }
+        conn.commit()
+        if vacuum and (result["tasks"] or result["moods"]):
+            # Returns the freed pages to the file system; locks the whole database while it runs
+            conn.execute("VACUUM")
+    return result
+
+def load_archive(table, user_id=DEFAULT_USER, columns=None, filters=None):
+    """
+    Reads a user's archived rows of `table` into a DataFrame.
+
+    Files are memory-mapped and only the requested columns are read;
+    `filters` is passed to pyarrow (e.g. [("date", ">=", "2024-01-01")])
+    so row groups outside the range are skipped.
+    """
+    columns = list(columns or ARCHIVE_COLUMNS[table])
+    read_columns = columns if "id" in columns else ["id"] + columns
+    paths = sorted(glob.glob(os.path.join(archive_path(table, user_id), "*.parquet")))
+
+    frames = [
+        pd.read_parquet(path, engine="pyarrow", columns=read_columns, filters=filters, memory_map=True)
+        for path in paths
+    ]
+    if not frames:
+        dtypes = ARCHIVE_COLUMNS[table]
+        return pd.DataFrame({col: pd.Series(dtype=dtypes[col]) for col in columns})
+
+    archived = pd.concat(frames, ignore_index=True).drop_duplicates(subset="id", keep="last")
+    return archived.sort_values("id", ignore_index=True)[columns]
+
+def iter_archive(table, user_id=DEFAULT_USER, columns=None, batch_size=50000):
+    """
+    Yields lists of up to `batch_size` archived rows of `table` as tuples,
+    one part after the other. Only one batch is in memory at a time;
+    rows archived twice are yielded once.
+    """
+    import pyarrow.parquet as pq
+
+    columns = list(columns or ARCHIVE_COLUMNS[table])
+    read_columns = columns if "id" in columns else ["id"] + columns
+    seen = set()
+    for path in sorted(glob.glob(os.path.join(archive_path(table, user_id), "*.parquet"))):
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=batch_size, columns=read_columns):
+            data = batch.to_pydict()
+            rows = []
+            for i, row_id in enumerate(data["id"]):
+                if row_id not in seen:
+                    seen.add(row_id)
+                    rows.append(tuple(data[col][i] for col in columns))
+            if rows:
+                yield rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Archive done tasks and old moods to Parquet files.")
+    parser.add_argument("--days", type=int, default=ARCHIVE_AFTER_DAYS)
+    parser.add_argument("--user", default=DEFAULT_USER)
+    parser.add_argument("--vacuum", action="store_true", help="Shrink the database file afterwards")
+    args = parser.parse_args()
+
+    result = archive_old_data(args.days, args.user, vacuum=args.vacuum)
+    print(f"Archived {result['tasks']} tasks and {result['moods']} moods.")
@@ -1,48 +1,612 @@
+import hashlib
+import os
+import re
 import sqlite3
+import threading
+import weakref
+from collections import OrderedDict
 from datetime import datetime
 
-DB_PATH = "data/user_data.db"
+from config.settings import DB_PATH, STORAGE_MODE, USER_DB_DIR, MAX_OPEN_DATABASES
+
+DEFAULT_USER = "default"
+
+# Paths whose schema was already checked by this process
+_initialized_paths = set()
+_schema_lock = threading.Lock()
+
+# Every thread keeps its own pool of open connections (by database path,
+# least recently used first), so no two threads ever share a transaction
+_local = threading.local()
+# All pooled connections of every thread, for close_all
+_all_connections = weakref.WeakSet()
+_connections_lock = threading.Lock()
+# Bumped by close_all so every thread drops its closed connections
+_generation = 0
+
+class PooledConnection(sqlite3.Connection):
+    """
+    A pooled connection that counts the `with` blocks using it, so the
+    pool never closes a connection that is still in use (a generator
+    paused inside its `with` block, for instance).
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.holders = 0
+        self.evicted = False
+
+    def __enter__(self):
+        self.holders += 1
+        return super().__enter__()
+
+    def __exit__(self, *exc_info):
+        try:
+            return super().__exit__(*exc_info)
+        finally:
+            self.holders -= 1
+            if self.evicted and self.holders == 0:
+                self.close()
+
+def user_file_name(user_id):
+    """
+    Returns a file system safe name for a user: the id itself when it is
+    a plain name, otherwise its SHA-1 hex digest.
+    """
+    if re.fullmatch(r"[A-Za-z0-9_.-]{1,64}", user_id) and not user_id.startswith("."):
+        return user_id
+    return hashlib.sha1(user_id.encode("utf-8")).hexdigest()
+
+def database_path(user_id=DEFAULT_USER):
+    """
+    Returns the SQLite file that holds a user's data: the shared DB_PATH,
+    or one file per user under USER_DB_DIR when STORAGE_MODE is 'sharded'.
+    """
+    if STORAGE_MODE != "sharded":
+        return DB_PATH
+    return os.path.join(USER_DB_DIR, f"{user_file_name(user_id)}.db")
+
+def _thread_pool():
+    """This thread's open connections, emptied after close_all."""
+    if getattr(_local, "generation", None) != _generation:
+        _local.connections = OrderedDict()
+        _local.generation = _generation
+    return _local.connections
 
 # Connect to the database
-def connect():
-    return sqlite3.connect(DB_PATH)
+def connect(user_id=DEFAULT_USER):
+    """
+    Returns an open connection to the database holding `user_id`'s data.
+
+    Connections belong to the calling thread and are reused from its LRU
+    pool (MAX_OPEN_DATABASES per thread). When the pool is full the least
+    recently used connection is closed, or, if a `with` block is still
+    using it, closed as soon as that block ends. Queries must still
+    filter by user_id, which also works in sharded mode.
+    """
+    path = database_path(user_id)
+    pool = _thread_pool()
+    conn = pool.get(path)
+    if conn is not None:
+        pool.move_to_end(path)
+        return conn
+
+    if os.path.dirname(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    # Not tied to the thread only so that close_all can close it
+    conn = sqlite3.connect(path, timeout=10, check_same_thread=False, factory=PooledConnection)
+    conn.execute("PRAGMA journal_mode=WAL")
+    with _schema_lock:
+        if path not in _initialized_paths:
+            _create_schema(conn.cursor())
+            conn.commit()
+            _initialized_paths.add(path)
+    with _connections_lock:
+        _all_connections.add(conn)
+
+    pool[path] = conn
+    while len(pool) > MAX_OPEN_DATABASES:
+        _, evicted = pool.popitem(last=False)
+        if evicted.holders:
+            evicted.evicted = True
+        else:
+            evicted.close()
+    return conn
+
+def close_all():
+    """Closes every pooled connection of every thread."""
+    global _generation
+    with _connections_lock:
+        _generation += 1
+        for conn in list(_all_connections):
+            conn.close()
+        _all_connections.clear()
 
 # Create tables if they don't exist
-def create_tables():
-    with connect() as conn:
-        cursor = conn.cursor()
+def create_tables(user_id=DEFAULT_USER):
+    """Creates whatever is missing from the schema; existing data is kept."""
+    with connect(user_id) as conn:
+        _create_schema(conn.cursor())
+        conn.commit()
 
-        # Drop the old tasks table if it exists
-        cursor.execute('DROP TABLE IF EXISTS tasks')
+def _create_schema(cursor):
+    """
+    Creates every table, index and trigger that is missing.
+    Safe to run on an existing database.
+    """
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS tasks (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            title TEXT NOT NULL,
+            datetime TEXT,
+            status TEXT DEFAULT 'pending'
+        )
+    ''')
 
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS tasks (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                title TEXT NOT NULL,
-                datetime TEXT,
-                status TEXT DEFAULT 'pending'
-            )
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS moods (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            date TEXT,
+            description TEXT,
+            classification TEXT
+        )
+    ''')
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS interactions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            command TEXT,
+            response TEXT,
+            timestamp TEXT
+        )
+    ''')
+
+    # Every user's rows are partitioned by user_id
+    for table in ('tasks', 'moods', 'interactions'):
+        _add_column_if_missing(cursor, table, 'user_id', f"TEXT NOT NULL DEFAULT '{DEFAULT_USER}'")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_moods_user ON moods (user_id, id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_interactions_user ON interactions (user_id, id)")
+
+    # Sync metadata: every change bumps `version`; the calendar sync engine
+    # pushes rows whose version is ahead of `synced_version`. Deleted tasks
+    # that were already on the calendar are kept as tombstones until synced.
+    _add_column_if_missing(cursor, 'tasks', 'updated_at', 'TEXT')
+    _add_column_if_missing(cursor, 'tasks', 'version', 'INTEGER NOT NULL DEFAULT 1')
+    _add_column_if_missing(cursor, 'tasks', 'synced_version', 'INTEGER NOT NULL DEFAULT 0')
+    _add_column_if_missing(cursor, 'tasks', 'deleted', 'INTEGER NOT NULL DEFAULT 0')
+    _add_column_if_missing(cursor, 'tasks', 'event_id', 'TEXT')
+
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_tasks_user_status ON tasks (user_id, status, deleted)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_tasks_dirty ON tasks (synced_version, version)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_tasks_event ON tasks (event_id)")
+    # Tasks changed since a time, for the semantic search index
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_tasks_user_updated ON tasks (user_id, COALESCE(updated_at, ''), id)")
+
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS tasks_touch_insert AFTER INSERT ON tasks
+        WHEN NEW.updated_at IS NULL
+        BEGIN
+            UPDATE tasks SET updated_at = strftime('%Y-%m-%dT%H:%M:%fZ', 'now') WHERE id = NEW.id;
+        END
+    ''')
+
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS tasks_touch_update AFTER UPDATE OF title, datetime, status, deleted ON tasks
+        WHEN NEW.version = OLD.version
+        BEGIN
+            UPDATE tasks
+            SET version = version + 1, updated_at = strftime('%Y-%m-%dT%H:%M:%fZ', 'now')
+            WHERE id = NEW.id;
+        END
+    ''')
+
+    # Per-user change counter of the tasks' displayed fields, with the last
+    # task changed, so caches in any process can tell their copy is stale
+    # (see core/task_cache.py). Sync bookkeeping does not bump it.
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS task_versions (
+            user_id TEXT PRIMARY KEY,
+            version INTEGER NOT NULL DEFAULT 0,
+            task_id INTEGER
+        )
+    ''')
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_tasks_user ON tasks (user_id, id)")
+    for trigger, event, row in (
+        ('tasks_version_insert', 'INSERT', 'NEW'),
+        ('tasks_version_update', 'UPDATE OF title, datetime, status, deleted', 'NEW'),
+        ('tasks_version_delete', 'DELETE', 'OLD'),
+    ):
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS {trigger} AFTER {event} ON tasks
+            BEGIN
+                INSERT INTO task_versions (user_id, version, task_id) VALUES ({row}.user_id, 1, {row}.id)
+                ON CONFLICT(user_id) DO UPDATE SET version = version + 1, task_id = excluded.task_id;
+            END
         ''')
 
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS moods (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                date TEXT,
-                description TEXT,
-                classification TEXT
+    # Local mirror of Google Calendar events, kept by the sync engine
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS calendar_events (
+            id TEXT PRIMARY KEY,
+            summary TEXT,
+            start TEXT,
+            end TEXT,
+            updated TEXT,
+            task_id INTEGER
+        )
+    ''')
+    _add_column_if_missing(cursor, 'calendar_events', 'user_id', f"TEXT NOT NULL DEFAULT '{DEFAULT_USER}'")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_calendar_events_task ON calendar_events (task_id)")
+    cursor.execute("DROP INDEX IF EXISTS idx_calendar_events_start")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_calendar_events_user_start ON calendar_events (user_id, start)")
+
+    # Sync tokens are only a cache, so an older table without user_id is recreated
+    if not _has_column(cursor, 'sync_state', 'user_id'):
+        cursor.execute("DROP TABLE IF EXISTS sync_state")
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS sync_state (
+            user_id TEXT NOT NULL,
+            key TEXT NOT NULL,
+            value TEXT,
+            PRIMARY KEY (user_id, key)
+        )
+    ''')
+
+    # Recurring tasks: the rule is stored once and occurrences are expanded
+    # on demand into task_occurrences, which covers [indexed_from, indexed_until)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS recurring_tasks (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            title TEXT NOT NULL,
+            rule TEXT NOT NULL,
+            dtstart TEXT NOT NULL,
+            indexed_from TEXT,
+            indexed_until TEXT,
+            event_id TEXT,
+            deleted INTEGER NOT NULL DEFAULT 0
+        )
+    ''')
+    _add_column_if_missing(cursor, 'recurring_tasks', 'user_id', f"TEXT NOT NULL DEFAULT '{DEFAULT_USER}'")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_recurring_tasks_user ON recurring_tasks (user_id, deleted)")
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS task_occurrences (
+            rule_id INTEGER NOT NULL,
+            occurs_at TEXT NOT NULL,
+            status TEXT NOT NULL DEFAULT 'pending',
+            PRIMARY KEY (rule_id, occurs_at)
+        ) WITHOUT ROWID
+    ''')
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_task_occurrences_time ON task_occurrences (occurs_at)")
+
+    # Items of the semantic search index; `position` is the item's row in
+    # the user's embedding matrix (see core/semantic_search.py)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS search_items (
+            user_id TEXT NOT NULL,
+            kind TEXT NOT NULL,
+            ref_id TEXT NOT NULL,
+            position INTEGER NOT NULL,
+            text TEXT,
+            active INTEGER NOT NULL DEFAULT 1,
+            PRIMARY KEY (user_id, kind, ref_id)
+        )
+    ''')
+    cursor.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_search_items_position ON search_items (user_id, position)")
+
+    # Emails ingested from a mailbox, deduplicated by Message-ID and
+    # summarized in the background (see core/email_ingest.py)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS emails (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id TEXT NOT NULL DEFAULT 'default',
+            message_id TEXT NOT NULL,
+            source TEXT,
+            uid TEXT,
+            sender TEXT,
+            subject TEXT,
+            date TEXT,
+            body TEXT,
+            summary TEXT,
+            summary_model TEXT,
+            status TEXT NOT NULL DEFAULT 'pending',
+            error TEXT,
+            received_at TEXT DEFAULT (strftime('%Y-%m-%dT%H:%M:%S', 'now', 'localtime'))
+        )
+    ''')
+    cursor.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_emails_message ON emails (user_id, message_id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_emails_status ON emails (user_id, status, id)")
+
+    # Messages already read from mailboxes that have no position to resume
+    # from (Maildir), by the message's unique name within the mailbox
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS mail_seen (
+            user_id TEXT NOT NULL,
+            source TEXT NOT NULL,
+            uid TEXT NOT NULL,
+            PRIMARY KEY (user_id, source, uid)
+        )
+    ''')
+
+    # Action items already turned into tasks, by content hash, so analyzing
+    # the same email again does not create the tasks twice
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS action_items (
+            user_id TEXT NOT NULL DEFAULT 'default',
+            hash TEXT NOT NULL,
+            task_id INTEGER,
+            title TEXT,
+            due TEXT,
+            created_at TEXT DEFAULT (strftime('%Y-%m-%dT%H:%M:%S', 'now', 'localtime')),
+            PRIMARY KEY (user_id, hash)
+        )
+    ''')
+
+    # Tokens of every hosted model call: the local estimate made before
+    # sending and the counts billed by the API (see core/token_budget.py)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS token_usage (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id TEXT NOT NULL DEFAULT 'default',
+            timestamp TEXT DEFAULT (strftime('%Y-%m-%dT%H:%M:%S', 'now', 'localtime')),
+            model TEXT,
+            operation TEXT,
+            estimated_prompt_tokens INTEGER,
+            prompt_tokens INTEGER,
+            completion_tokens INTEGER,
+            max_tokens INTEGER,
+            trimmed_tokens INTEGER DEFAULT 0,
+            latency_ms REAL
+        )
+    ''')
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_token_usage_user_time ON token_usage (user_id, timestamp)")
+
+    _create_aggregates(cursor)
+    _create_fulltext(cursor)
+
+def _has_column(cursor, table, column):
+    cursor.execute(f"PRAGMA table_info({table})")
+    return column in [row[1] for row in cursor.fetchall()]
+
+def _add_column_if_missing(cursor, table, column, definition):
+    """Adds a column to an existing table created by an older version of the schema."""
+    if not _has_column(cursor, table, column):
+        cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+
+def _create_aggregates(cursor):
+    """
+    Summary tables kept up to date by triggers, so the recommender never
+    has to scan the full mood or task history.
+
+    A mood score is +confidence for positive entries and -confidence for
+    negative ones; moods are stored as 'YYYY-MM-DD HH:MM' and classified
+    as 'positive (98%)'. Mood aggregates are append-only: archiving or
+    deleting old mood rows keeps them in the summaries.
+    """
+    mood_score = '''
+        (CASE
+            WHEN NEW.classification LIKE 'positive%' THEN 1
+            WHEN NEW.classification LIKE 'negative%' THEN -1
+            ELSE 0
+        END) * CAST(substr(NEW.classification, instr(NEW.classification, '(') + 1) AS REAL) / 100.0
+    '''
+
+    # Summaries from before per-user partitioning are rebuilt from the source rows
+    if not _has_column(cursor, 'mood_daily', 'user_id'):
+        for table in ('mood_daily', 'mood_slots', 'task_load'):
+            cursor.execute(f'DROP TABLE IF EXISTS {table}')
+        cursor.execute('DROP TRIGGER IF EXISTS moods_aggregate_insert')
+
+    # Per-day mood totals
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS mood_daily (
+            user_id TEXT NOT NULL,
+            day TEXT NOT NULL,
+            entries INTEGER NOT NULL DEFAULT 0,
+            positive INTEGER NOT NULL DEFAULT 0,
+            negative INTEGER NOT NULL DEFAULT 0,
+            score_sum REAL NOT NULL DEFAULT 0,
+            PRIMARY KEY (user_id, day)
+        )
+    ''')
+
+    # Mood totals per weekday (0 = Sunday, as in SQLite's %w) and hour
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS mood_slots (
+            user_id TEXT NOT NULL,
+            weekday INTEGER NOT NULL,
+            hour INTEGER NOT NULL,
+            entries INTEGER NOT NULL DEFAULT 0,
+            positive INTEGER NOT NULL DEFAULT 0,
+            negative INTEGER NOT NULL DEFAULT 0,
+            score_sum REAL NOT NULL DEFAULT 0,
+            PRIMARY KEY (user_id, weekday, hour)
+        )
+    ''')
+
+    # Pending tasks per due day ('' for tasks without a date)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS task_load (
+            user_id TEXT NOT NULL,
+            day TEXT NOT NULL,
+            pending INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (user_id, day)
+        )
+    ''')
+
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS moods_aggregate_insert AFTER INSERT ON moods
+        WHEN NEW.date IS NOT NULL
+        BEGIN
+            INSERT INTO mood_daily (user_id, day, entries, positive, negative, score_sum)
+            VALUES (
+                NEW.user_id, substr(NEW.date, 1, 10), 1,
+                NEW.classification LIKE 'positive%',
+                NEW.classification LIKE 'negative%',
+                {mood_score}
             )
+            ON CONFLICT(user_id, day) DO UPDATE SET
+                entries = entries + excluded.entries,
+                positive = positive + excluded.positive,
+                negative = negative + excluded.negative,
+                score_sum = score_sum + excluded.score_sum;
+
+            INSERT INTO mood_slots (user_id, weekday, hour, entries, positive, negative, score_sum)
+            VALUES (
+                NEW.user_id,
+                CAST(strftime('%w', NEW.date) AS INTEGER),
+                CAST(strftime('%H', NEW.date) AS INTEGER), 1,
+                NEW.classification LIKE 'positive%',
+                NEW.classification LIKE 'negative%',
+                {mood_score}
+            )
+            ON CONFLICT(user_id, weekday, hour) DO UPDATE SET
+                entries = entries + excluded.entries,
+                positive = positive + excluded.positive,
+                negative = negative + excluded.negative,
+                score_sum = score_sum + excluded.score_sum;
+        END
+    ''')
+
+    # Task load triggers are recreated so older databases pick up changes to them
+    for trigger in ('tasks_load_insert', 'tasks_load_delete', 'tasks_load_update'):
+        cursor.execute(f'DROP TRIGGER IF EXISTS {trigger}')
+
+    cursor.execute('''
+        CREATE TRIGGER tasks_load_insert AFTER INSERT ON tasks
+        WHEN NEW.status = 'pending' AND NEW.deleted = 0
+        BEGIN
+            INSERT INTO task_load (user_id, day, pending)
+            VALUES (NEW.user_id, COALESCE(substr(NEW.datetime, 1, 10), ''), 1)
+            ON CONFLICT(user_id, day) DO UPDATE SET pending = pending + 1;
+        END
+    ''')
+
+    cursor.execute('''
+        CREATE TRIGGER tasks_load_delete AFTER DELETE ON tasks
+        WHEN OLD.status = 'pending' AND OLD.deleted = 0
+        BEGIN
+            UPDATE task_load SET pending = pending - 1
+            WHERE user_id = OLD.user_id AND day = COALESCE(substr(OLD.datetime, 1, 10), '');
+        END
+    ''')
+
+    cursor.execute('''
+        CREATE TRIGGER tasks_load_update AFTER UPDATE OF status, datetime, deleted ON tasks
+        BEGIN
+            UPDATE task_load SET pending = pending - 1
+            WHERE OLD.status = 'pending' AND OLD.deleted = 0
+              AND user_id = OLD.user_id AND day = COALESCE(substr(OLD.datetime, 1, 10), '');
+
+            INSERT INTO task_load (user_id, day, pending)
+            SELECT NEW.user_id, COALESCE(substr(NEW.datetime, 1, 10), ''), 1
+            WHERE NEW.status = 'pending' AND NEW.deleted = 0
+            ON CONFLICT(user_id, day) DO UPDATE SET pending = pending + 1;
+        END
+    ''')
+
+    _backfill_aggregates(cursor)
+
+def _backfill_aggregates(cursor):
+    """
+    Fills the summary tables from existing rows the first time they are
+    created on a database that already has history.
+    """
+    cursor.execute("SELECT EXISTS (SELECT 1 FROM mood_daily)")
+    if not cursor.fetchone()[0]:
+        score = '''
+            (CASE
+                WHEN classification LIKE 'positive%' THEN 1
+                WHEN classification LIKE 'negative%' THEN -1
+                ELSE 0
+            END) * CAST(substr(classification, instr(classification, '(') + 1) AS REAL) / 100.0
+        '''
+        cursor.execute(f'''
+            INSERT INTO mood_daily (user_id, day, entries, positive, negative, score_sum)
+            SELECT user_id, substr(date, 1, 10), COUNT(*),
+                   SUM(classification LIKE 'positive%'),
+                   SUM(classification LIKE 'negative%'),
+                   SUM({score})
+            FROM moods WHERE date IS NOT NULL
+            GROUP BY 1, 2
+        ''')
+        cursor.execute(f'''
+            INSERT INTO mood_slots (user_id, weekday, hour, entries, positive, negative, score_sum)
+            SELECT user_id,
+                   CAST(strftime('%w', date) AS INTEGER),
+                   CAST(strftime('%H', date) AS INTEGER), COUNT(*),
+                   SUM(classification LIKE 'positive%'),
+                   SUM(classification LIKE 'negative%'),
+                   SUM({score})
+            FROM moods WHERE date IS NOT NULL
+            GROUP BY 1, 2, 3
         ''')
 
+    cursor.execute("SELECT EXISTS (SELECT 1 FROM task_load)")
+    if not cursor.fetchone()[0]:
         cursor.execute('''
-            CREATE TABLE IF NOT EXISTS interactions (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                command TEXT,
-                response TEXT,
-                timestamp TEXT
-            )
+            INSERT INTO task_load (user_id, day, pending)
+            SELECT user_id, COALESCE(substr(datetime, 1, 10), ''), COUNT(*)
+            FROM tasks WHERE status = 'pending' AND deleted = 0
+            GROUP BY 1, 2
         ''')
 
-        conn.commit()
+# Full-text indexes: FTS5 table -> (content table, indexed columns)
+FULLTEXT_TABLES = {
+    'tasks_fts': ('tasks', ('title',)),
+    'moods_fts': ('moods', ('description',)),
+    'interactions_fts': ('interactions', ('command', 'response')),
+}
+
+def _create_fulltext(cursor):
+    """
+    FTS5 indexes over task titles, mood descriptions and interactions.
+
+    They are external-content tables (the text is stored once, in the
+    original table) kept in sync by triggers, with prefix indexes so
+    search-as-you-type queries stay fast. Databases whose SQLite lacks
+    FTS5 are left without them; data/fulltext.py then falls back to LIKE.
+    """
+    for fts, (table, columns) in FULLTEXT_TABLES.items():
+        # Missing triggers mean a new index, or a content table that was
+        # dropped and recreated: either way, rebuild it
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'trigger' AND name = ?", (f'{fts}_insert',))
+        stale = cursor.fetchone() is None
+        try:
+            cursor.execute(f'''
+                CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5(
+                    {', '.join(columns)},
+                    content='{table}', content_rowid='id',
+                    tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+                )
+            ''')
+        except sqlite3.OperationalError:
+            return
+
+        new_values = ', '.join(f'NEW.{column}' for column in columns)
+        old_values = ', '.join(f'OLD.{column}' for column in columns)
+        column_list = ', '.join(columns)
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS {fts}_insert AFTER INSERT ON {table}
+            BEGIN
+                INSERT INTO {fts} (rowid, {column_list}) VALUES (NEW.id, {new_values});
+            END
+        ''')
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS {fts}_delete AFTER DELETE ON {table}
+            BEGIN
+                INSERT INTO {fts} ({fts}, rowid, {column_list}) VALUES ('delete', OLD.id, {old_values});
+            END
+        ''')
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS {fts}_update AFTER UPDATE OF {column_list} ON {table}
+            BEGIN
+                INSERT INTO {fts} ({fts}, rowid, {column_list}) VALUES ('delete', OLD.id, {old_values});
+                INSERT INTO {fts} (rowid, {column_list}) VALUES (NEW.id, {new_values});
+            END
+        ''')
+        if stale:
+            cursor.execute(f"INSERT INTO {fts} ({fts}) VALUES ('rebuild')")
 
 # Run this script to initialize the database
 if __name__ == '__main__':
@@ -0,0 +1,122 @@
+import re
+from difflib import SequenceMatcher
+
+from data.database import connect, DEFAULT_USER
+from data.repository import get_backend, require_sqlite, uses_sqlite
+
+# Searchable kinds: FTS5 table, content table, text expression, date column and extra filter
+SEARCH_KINDS = {
+    "task": ("tasks_fts", "tasks", "t.title", "t.datetime", "AND t.deleted = 0"),
+    "mood": ("moods_fts", "moods", "t.description", "t.date", ""),
+    "interaction": ("interactions_fts", "interactions",
+                    "COALESCE(t.command, '') || ' → ' || COALESCE(t.response, '')", "t.timestamp", ""),
+}
+
+# Fraction of matching characters above which two task titles are near-duplicates
+DUPLICATE_SIMILARITY = 0.8
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+def match_query(text, prefix=True, operator="AND"):
+    """
+    Builds an FTS5 MATCH expression from free text: every word quoted (so
+    user input can't inject FTS syntax) and, with `prefix`, matched as a
+    prefix, so 'meet' finds 'meeting' while the user is still typing.
+    """
+    tokens = _TOKEN_RE.findall(text.lower())
+    return f" {operator} ".join(f'"{token}"' + ("*" if prefix else "") for token in tokens)
+
+def _has_fulltext(cursor, fts):
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (fts,))
+    return cursor.fetchone() is not None
+
+def _search_kind(cursor, kind, match, words, user_id, limit):
+    fts, table, text, date, extra = SEARCH_KINDS[kind]
+    if _has_fulltext(cursor, fts):
+        cursor.execute(
+            f"SELECT t.id, {text}, snippet({fts}, -1, '**', '**', '…', 12), {date}, bm25({fts}) "
+            f"FROM {fts} JOIN {table} t ON t.id = {fts}.rowid "
+            f"WHERE {fts} MATCH ? AND t.user_id = ? {extra} "
+            f"ORDER BY bm25({fts}) LIMIT ?",
+            (match, user_id, limit)
+        )
+    else:
+        # SQLite without FTS5: unranked substring scan
+        conditions = " AND ".join(f"{text} LIKE ?" for _ in words)
+        cursor.execute(
+            f"SELECT t.id, {text}, {text}, {date}, 0 FROM {table} t "
+            f"WHERE {conditions} AND t.user_id = ? {extra} ORDER BY t.id DESC LIMIT ?",
+            [f"%{word}%" for word in words] + [user_id, limit]
+        )
+    return [
+        {"kind": kind, "id": row[0], "text": row[1], "snippet": row[2], "date": row[3], "rank": row[4]}
+        for row in cursor.fetchall()
+    ]
+
+def search(query, kinds=None, user_id=DEFAULT_USER, limit=10, offset=0):
+    """
+    Ranked full-text search over a user's tasks, moods and interactions.
+
+    Every word of `query` is matched as a prefix. Results from all kinds
+    are merged by BM25 rank (best first) and paged with `limit`/`offset`.
+    Each result is a dictionary with kind, id, text, snippet (matches in
+    **bold**), date and rank. Raises ValueError for a kind not in SEARCH_KINDS.
+    """
+    unknown = [kind for kind in kinds or () if kind not in SEARCH_KINDS]
+    if unknown:
+        raise ValueError(f"Unknown kind(s) {', '.join(unknown)}. Use any of: {', '.join(SEARCH_KINDS)}")
+    require_sqlite("Full-text search")
+    words = _TOKEN_RE.findall(query.lower())
+    if not words:
+        return []
+    match = match_query(query)
+    results = []
+    with connect(user_id) as conn:
+        cursor = conn.cursor()
+        for kind in kinds or SEARCH_KINDS:
+            results.extend(_search_kind(cursor, kind, match, words, user_id, offset + limit))
+    results.sort(key=lambda result: result["rank"])
+    return results[offset:offset + limit]
+
+def similar_tasks(title, user_id=DEFAULT_USER, min_similarity=DUPLICATE_SIMILARITY, limit=5):
+    """
+    Pending tasks whose title is nearly the same as `title`.
+
+    Candidates sharing any word with the title come from the index (best
+    BM25 first); they are kept when their normalized titles are at least
+    `min_similarity` alike. Returns dictionaries with id, title, date_time
+    and similarity, most similar first. Without SQLite every pending task
+    of the storage backend is a candidate.
+    """
+    normalized = " ".join(_TOKEN_RE.findall(title.lower()))
+    if not normalized:
+        return []
+    if not uses_sqlite():
+        candidates = [(task.id, task.title, task.date_time) for task in get_backend().list_tasks(user_id)]
+        return _most_similar(normalized, candidates, min_similarity, limit)
+    with connect(user_id) as conn:
+        cursor = conn.cursor()
+        if _has_fulltext(cursor, "tasks_fts"):
+            cursor.execute(
+                "SELECT t.id, t.title, t.datetime FROM tasks_fts JOIN tasks t ON t.id = tasks_fts.rowid "
+                "WHERE tasks_fts MATCH ? AND t.user_id = ? AND t.status = 'pending' AND t.deleted = 0 "
+                "ORDER BY bm25(tasks_fts) LIMIT 20",
+                (match_query(title, prefix=False, operator="OR"), user_id)
+            )
+        else:
+            cursor.execute(
+                "SELECT id, title, datetime FROM tasks WHERE user_id = ? AND status = 'pending' AND deleted = 0 "
+                "AND lower(title) LIKE ? LIMIT 20",
+                (user_id, f"%{normalized.split()[0]}%")
+            )
+        candidates = cursor.fetchall()
+    return _most_similar(normalized, candidates, min_similarity, limit)
+
+def _most_similar(normalized, candidates, min_similarity, limit):
+    similar = []
+    for task_id, task_title, date_time in candidates:
+        ratio = SequenceMatcher(None, normalized, " ".join(_TOKEN_RE.findall(task_title.lower()))).ratio()
+        if ratio >= min_similarity:
+            similar.append({"id": task_id, "title": task_title, "date_time": date_time, "similarity": round(ratio, 2)})
+    similar.sort(key=lambda task: task["similarity"], reverse=True)
+    return similar[:limit]
@@ -0,0 +1,445 @@
+import re
+import threading
+from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import Optional
+
+from config.settings import STORAGE_BACKEND
+from data.database import connect
+
+# Repository layer: every task and mood read or write used by the app goes
+# through a StorageBackend, so the SQL lives in one place and tests and
+# benchmarks can swap in the in-memory engine. Features that still query
+# SQLite directly (calendar sync, recurring tasks, full-text and semantic
+# search, archive, mood analytics, export/import) call require_sqlite and
+# refuse to run on another backend instead of splitting the data.
+
+class Task:
+    """A task row. date_time is an ISO string ('YYYY-MM-DDTHH:MM:SS') or None."""
+
+    __slots__ = ("id", "user_id", "title", "date_time", "status")
+    id: int
+    user_id: str
+    title: str
+    date_time: Optional[str]
+    status: str
+
+    def __init__(self, id: int, user_id: str, title: str, date_time: Optional[str] = None, status: str = "pending"):
+        self.id = id
+        self.user_id = user_id
+        self.title = title
+        self.date_time = date_time
+        self.status = status
+
+    def __repr__(self):
+        return f"Task(id={self.id!r}, title={self.title!r}, date_time={self.date_time!r}, status={self.status!r})"
+
+    def __eq__(self, other):
+        if not isinstance(other, Task):
+            return NotImplemented
+        return all(getattr(self, name) == getattr(other, name) for name in self.__slots__)
+
+
+class Mood:
+    """A mood entry. date is 'YYYY-MM-DD HH:MM' and classification like 'positive (98%)'."""
+
+    __slots__ = ("id", "user_id", "date", "description", "classification")
+    id: int
+    user_id: str
+    date: Optional[str]
+    description: Optional[str]
+    classification: Optional[str]
+
+    def __init__(self, id: int, user_id: str, date: Optional[str], description: Optional[str],
+                 classification: Optional[str]):
+        self.id = id
+        self.user_id = user_id
+        self.date = date
+        self.description = description
+        self.classification = classification
+
+    def __repr__(self):
+        return f"Mood(id={self.id!r}, date={self.date!r}, classification={self.classification!r})"
+
+    def __eq__(self, other):
+        if not isinstance(other, Mood):
+            return NotImplemented
+        return all(getattr(self, name) == getattr(other, name) for name in self.__slots__)
+
+    @property
+    def label(self) -> Optional[str]:
+        """Mood type in lower case, e.g. 'positive'."""
+        return self.classification.split(" ")[0].lower() if self.classification else None
+
+    @property
+    def score(self) -> float:
+        """+confidence for positive entries, -confidence for negative ones (as in the SQLite aggregates)."""
+        return mood_score(self.classification)
+
+
+def mood_score(classification: Optional[str]) -> float:
+    """Signed score of a classification such as 'positive (98%)' -> 0.98."""
+    if not classification:
+        return 0.0
+    if classification.startswith("positive"):
+        sign = 1
+    elif classification.startswith("negative"):
+        sign = -1
+    else:
+        return 0.0
+    match = re.search(r"\((\d+(?:\.\d+)?)", classification)
+    return sign * float(match.group(1)) / 100 if match else 0.0
+
+
+class StorageBackend(ABC):
+    """
+    Interface for task and mood storage.
+
+    Every method is scoped to one user. Mood totals come from per-day and
+    per-(weekday, hour) summaries kept up to date on write, and pending task
+    counts from a per-day summary, so none of the reads scan the history.
+    Weekdays follow SQLite's %w (0 = Sunday).
+    """
+
+    # --- Tasks ---
+
+    @abstractmethod
+    def add_task(self, user_id, title, date_time=None):
+        """Stores a pending task and returns it as a Task."""
+        pass
+
+    def add_tasks(self, user_id, items):
+        """Stores (title, date_time) pairs as pending tasks in one write and returns them as Tasks."""
+        return [self.add_task(user_id, title, date_time) for title, date_time in items]
+
+    @abstractmethod
+    def get_task(self, user_id, task_id):
+        """Returns the Task, or None when it does not exist for this user."""
+        pass
+
+    @abstractmethod
+    def list_tasks(self, user_id, status="pending", due_from=None):
+        """Tasks with the given status, optionally only those due at or after `due_from` (ISO string)."""
+        pass
+
+    @abstractmethod
+    def set_task_status(self, user_id, task_id, status):
+        pass
+
+    @abstractmethod
+    def set_task_datetimes(self, user_id, items):
+        """Sets the date_time of several tasks in one write; items are (task_id, date_time) pairs."""
+        pass
+
+    @abstractmethod
+    def delete_task(self, user_id, task_id):
+        pass
+
+    @abstractmethod
+    def pending_load(self, user_id, day):
+        """Number of pending tasks due on `day` ('YYYY-MM-DD')."""
+        pass
+
+    # --- Moods ---
+
+    @abstractmethod
+    def add_mood(self, user_id, date, description, classification):
+        """Stores a mood entry and returns it as a Mood."""
+        pass
+
+    @abstractmethod
+    def recent_moods(self, user_id, limit=10):
+        """The latest `limit` moods, newest first."""
+        pass
+
+    @abstractmethod
+    def mood_totals(self, user_id, since_day):
+        """(score_sum, entries) of the moods recorded since `since_day` ('YYYY-MM-DD')."""
+        pass
+
+    @abstractmethod
+    def slot_totals(self, user_id, weekday, hour):
+        """(score_sum, entries) of the moods recorded on a weekday (0 = Sunday) and hour."""
+        pass
+
+
+class SQLiteBackend(StorageBackend):
+    """Backend over the SQLite database in data/database.py; summaries are kept by triggers."""
+
+    def add_task(self, user_id, title, date_time=None):
+        with connect(user_id) as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                "INSERT INTO tasks (user_id, title, datetime) VALUES (?, ?, ?)",
+                (user_id, title, date_time)
+            )
+            conn.commit()
+            return Task(cursor.lastrowid, user_id, title, date_time)
+
+    def add_tasks(self, user_id, items):
+        tasks = []
+        with connect(user_id) as conn:
+            cursor = conn.cursor()
+            for title, date_time in items:
+                cursor.execute(
+                    "INSERT INTO tasks (user_id, title, datetime) VALUES (?, ?, ?)",
+                    (user_id, title, date_time)
+                )
+                tasks.append(Task(cursor.lastrowid, user_id, title, date_time))
+            conn.commit()
+        return tasks
+
+    def get_task(self, user_id, task_id):
+        with connect(user_id) as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                "SELECT id, user_id, title, datetime, status FROM tasks WHERE id = ? AND user_id = ? AND deleted = 0",
+                (task_id, user_id)
+            )
+            row = cursor.fetchone()
+        return Task(*row) if row else None
+
+    def list_tasks(self, user_id, status="pending", due_from=None):
+        query = "SELECT id, user_id, title, datetime, status FROM tasks WHERE user_id = ? AND status = ? AND deleted = 0"
+        params = [user_id, status]
+        if due_from is not None:
+            query += " AND datetime IS NOT NULL AND datetime >= ?"
+            params.append(due_from)
+        with connect(user_id) as conn:
+            cursor = conn.cursor()
+            cursor.execute(query, params)
+            return [Task(*row) for row in cursor.fetchall()]
+
+    def set_task_status(self, user_id, task_id, status):
+        with connect(user_id) as conn:
+            cursor = conn.cursor()
+            cursor.execute("UPDATE tasks SET status = ? WHERE id = ? AND user_id = ?", (status, task_id, user_id))
+            conn.commit()
+
+    def set_task_datetimes(self, user_id, items):
+        with connect(user_id) as conn:
+            cursor = conn.cursor()
+            cursor.executemany(
+                "UPDATE tasks SET datetime = ? WHERE id = ? AND user_id = ?",
+                [(date_time, task_id, user_id) for task_id, date_time in items]
+            )
+            conn.commit()
+
+    def delete_task(self, user_id, task_id):
+        # Tasks already synced to the calendar are kept as tombstones
+        # until the next calendar sync removes their event
+        with connect(user_id) as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                "UPDATE tasks SET deleted = 1 WHERE id = ? AND user_id = ? AND event_id IS NOT NULL",
+                (task_id, user_id)
+            )
+            cursor.execute(
+                "DELETE FROM tasks WHERE id = ? AND user_id = ? AND event_id IS NULL",
+                (task_id, user_id)
+            )
+            conn.commit()
+
+    def pending_load(self, user_id, day):
+        with connect(user_id) as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT pending FROM task_load WHERE user_id = ? AND day = ?", (user_id, day))
+            row = cursor.fetchone()
+        return row[0] if row else 0
+
+    def add_mood(self, user_id, date, description, classification):
+        with connect(user_id) as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                "INSERT INTO moods (user_id, date, description, classification) VALUES (?, ?, ?, ?)",
+                (user_id, date, description, classification)
+            )
+            conn.commit()
+            return Mood(cursor.lastrowid, user_id, date, description, classification)
+
+    def recent_moods(self, user_id, limit=10):
+        with connect(user_id) as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                "SELECT id, user_id, date, description, classification FROM moods "
+                "WHERE user_id = ? ORDER BY id DESC LIMIT ?",
+                (user_id, limit)
+            )
+            return [Mood(*row) for row in cursor.fetchall()]
+
+    def mood_totals(self, user_id, since_day):
+        with connect(user_id) as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                "SELECT SUM(score_sum), SUM(entries) FROM mood_daily WHERE user_id = ? AND day >= ?",
+                (user_id, since_day)
+            )
+            score_sum, entries = cursor.fetchone()
+        return score_sum or 0.0, entries or 0
+
+    def slot_totals(self, user_id, weekday, hour):
+        with connect(user_id) as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                "SELECT score_sum, entries FROM mood_slots WHERE user_id = ? AND weekday = ? AND hour = ?",
+                (user_id, weekday, hour)
+            )
+            row = cursor.fetchone()
+        return (row[0], row[1]) if row else (0.0, 0)
+
+
+class InMemoryBackend(StorageBackend):
+    """
+    Backend kept in process memory, for tests and benchmarks.
+
+    Mirrors the SQLite indexes and summary tables: tasks by user and by
+    (user, status), moods by user in id order, and the mood_daily,
+    mood_slots and task_load totals, all updated on write.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._next_task_id = 1
+        self._next_mood_id = 1
+        self._tasks = {}            # user_id -> {task_id: Task}
+        self._tasks_by_status = {}  # (user_id, status) -> {task_id: Task}
+        self._task_load = {}        # (user_id, day) -> pending count
+        self._moods = {}            # user_id -> [Mood] in id order
+        self._mood_daily = {}       # user_id -> {day: [score_sum, entries]}
+        self._mood_slots = {}       # (user_id, weekday, hour) -> [score_sum, entries]
+
+    @staticmethod
+    def _due_day(task):
+        return task.date_time[:10] if task.date_time else ""
+
+    def _index_task(self, task, delta):
+        """Adds (delta=1) or removes (delta=-1) a task from the status index and load totals."""
+        by_status = self._tasks_by_status.setdefault((task.user_id, task.status), {})
+        if delta > 0:
+            by_status[task.id] = task
+        else:
+            by_status.pop(task.id, None)
+        if task.status == "pending":
+            key = (task.user_id, self._due_day(task))
+            self._task_load[key] = self._task_load.get(key, 0) + delta
+
+    def add_task(self, user_id, title, date_time=None):
+        with self._lock:
+            task = Task(self._next_task_id, user_id, title, date_time)
+            self._next_task_id += 1
+            self._tasks.setdefault(user_id, {})[task.id] = task
+            self._index_task(task, 1)
+            return Task(task.id, user_id, title, date_time)
+
+    def get_task(self, user_id, task_id):
+        with self._lock:
+            task = self._tasks.get(user_id, {}).get(task_id)
+            return Task(task.id, task.user_id, task.title, task.date_time, task.status) if task else None
+
+    def list_tasks(self, user_id, status="pending", due_from=None):
+        with self._lock:
+            tasks = self._tasks_by_status.get((user_id, status), {}).values()
+            return [
+                Task(task.id, task.user_id, task.title, task.date_time, task.status)
+                for task in tasks
+                if due_from is None or (task.date_time is not None and task.date_time >= due_from)
+            ]
+
+    def set_task_status(self, user_id, task_id, status):
+        with self._lock:
+            task = self._tasks.get(user_id, {}).get(task_id)
+            if task is None or task.status == status:
+                return
+            self._index_task(task, -1)
+            task.status = status
+            self._index_task(task, 1)
+
+    def set_task_datetimes(self, user_id, items):
+        with self._lock:
+            for task_id, date_time in items:
+                task = self._tasks.get(user_id, {}).get(task_id)
+                if task is None:
+                    continue
+                self._index_task(task, -1)
+                task.date_time = date_time
+                self._index_task(task, 1)
+
+    def delete_task(self, user_id, task_id):
+        with self._lock:
+            task = self._tasks.get(user_id, {}).pop(task_id, None)
+            if task is not None:
+                self._index_task(task, -1)
+
+    def pending_load(self, user_id, day):
+        with self._lock:
+            return self._task_load.get((user_id, day), 0)
+
+    def add_mood(self, user_id, date, description, classification):
+        with self._lock:
+            mood = Mood(self._next_mood_id, user_id, date, description, classification)
+            self._next_mood_id += 1
+            self._moods.setdefault(user_id, []).append(mood)
+            if date is not None:
+                score = mood.score
+                daily = self._mood_daily.setdefault(user_id, {}).setdefault(date[:10], [0.0, 0])
+                daily[0] += score
+                daily[1] += 1
+                try:
+                    moment = datetime.strptime(date[:16], "%Y-%m-%d %H:%M")
+                except ValueError:
+                    moment = None
+                if moment is not None:
+                    slot = self._mood_slots.setdefault(
+                        (user_id, (moment.weekday() + 1) % 7, moment.hour), [0.0, 0]
+                    )
+                    slot[0] += score
+                    slot[1] += 1
+            return Mood(mood.id, user_id, date, description, classification)
+
+    def recent_moods(self, user_id, limit=10):
+        with self._lock:
+            moods = reversed(self._moods.get(user_id, [])[-limit:]) if limit > 0 else []
+            return [Mood(mood.id, mood.user_id, mood.date, mood.description, mood.classification) for mood in moods]
+
+    def mood_totals(self, user_id, since_day):
+        with self._lock:
+            score_sum, entries = 0.0, 0
+            for day, (day_sum, day_entries) in self._mood_daily.get(user_id, {}).items():
+                if day >= since_day:
+                    score_sum += day_sum
+                    entries += day_entries
+            return score_sum, entries
+
+    def slot_totals(self, user_id, weekday, hour):
+        with self._lock:
+            score_sum, entries = self._mood_slots.get((user_id, weekday, hour), (0.0, 0))
+            return score_sum, entries
+
+
+class UnsupportedBackendError(RuntimeError):
+    """Raised by features that query SQLite directly when another storage backend is in use"""
+    pass
+
+
+_backend = None
+
+def get_backend():
+    """Returns the storage backend in use, created from STORAGE_BACKEND ('sqlite' or 'memory') on first use."""
+    global _backend
+    if _backend is None:
+        _backend = InMemoryBackend() if STORAGE_BACKEND == "memory" else SQLiteBackend()
+    return _backend
+
+def set_backend(backend):
+    """Replaces the storage backend, e.g. with an InMemoryBackend in tests."""
+    global _backend
+    _backend = backend
+
+def uses_sqlite():
+    """Whether tasks and moods live in SQLite, where the features that query it directly can see them."""
+    return isinstance(get_backend(), SQLiteBackend)
+
+def require_sqlite(feature):
+    """Refuses `feature` (e.g. 'Calendar sync') unless tasks and moods are stored in SQLite."""
+    if not uses_sqlite():
+        raise UnsupportedBackendError(f"{feature} needs the SQLite storage backend (STORAGE_BACKEND=sqlite).")
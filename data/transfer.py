@@ -0,0 +1,277 @@
+import argparse
+import csv
+import hashlib
+import json
+import os
+
+from data.archive import ARCHIVE_COLUMNS, iter_archive
+from data.database import connect, DEFAULT_USER
+from data.repository import require_sqlite
+
+# Columns exported for each table. Ids are kept for reference but new ids
+# are assigned on import; user_id and calendar sync metadata are not
+# portable between accounts, so imported tasks are synced as new ones.
+EXPORT_COLUMNS = {
+    "tasks": ["id", "title", "datetime", "status"],
+    "moods": ["id", "date", "description", "classification"],
+    "interactions": ["id", "command", "response", "timestamp"],
+}
+
+# Columns that can't be NULL; an empty CSV field is read as '' for them
+REQUIRED_COLUMNS = {"tasks": {"title"}}
+
+FORMATS = ("jsonl", "csv", "parquet")
+
+CHUNK_SIZE = 5000
+
+def _format_for(path, fmt=None):
+    fmt = fmt or os.path.splitext(path)[1].lstrip(".").lower()
+    if fmt not in FORMATS:
+        raise ValueError(f"Unsupported format '{fmt}'. Use one of: {', '.join(FORMATS)}")
+    return fmt
+
+def _check_table(table):
+    if table not in EXPORT_COLUMNS:
+        raise ValueError(f"Unknown table '{table}'. Use one of: {', '.join(EXPORT_COLUMNS)}")
+
+# --- Export ---
+
+def iter_rows(table, user_id=DEFAULT_USER, chunk_size=CHUNK_SIZE):
+    """
+    Yields lists of up to `chunk_size` rows of a user's table: first the
+    rows archived to Parquet (see data.archive), then the live rows in id
+    order. Rows are read with fetchmany and archive parts batch by batch,
+    so memory stays bounded by one chunk (plus the archived ids, used to
+    skip rows whose deletion was interrupted after they were archived).
+    """
+    _check_table(table)
+    require_sqlite("Export")
+    columns = EXPORT_COLUMNS[table]
+    archived_ids = set()
+    if table in ARCHIVE_COLUMNS:
+        for rows in iter_archive(table, user_id, columns, chunk_size):
+            archived_ids.update(row[0] for row in rows)
+            yield rows
+
+    query = f"SELECT {', '.join(columns)} FROM {table} WHERE user_id = ?"
+    if table == "tasks":
+        query += " AND deleted = 0"
+    query += " ORDER BY id"
+
+    with connect(user_id) as conn:
+        cursor = conn.cursor()
+        cursor.execute(query, (user_id,))
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                return
+            if archived_ids:
+                rows = [row for row in rows if row[0] not in archived_ids]
+                if not rows:
+                    continue
+            yield rows
+
+def _write_jsonl(path, columns, chunks):
+    count = 0
+    with open(path, "w", encoding="utf-8") as f:
+        for rows in chunks:
+            f.writelines(json.dumps(dict(zip(columns, row)), ensure_ascii=False) + "\n" for row in rows)
+            count += len(rows)
+    return count
+
+def _write_csv(path, columns, chunks):
+    count = 0
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(columns)
+        for rows in chunks:
+            writer.writerows(rows)
+            count += len(rows)
+    return count
+
+def _write_parquet(path, columns, chunks):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.schema([(col, pa.int64() if col == "id" else pa.string()) for col in columns])
+    count = 0
+    with pq.ParquetWriter(path, schema, compression="zstd") as writer:
+        for rows in chunks:
+            # Each chunk becomes one row group
+            writer.write_table(pa.Table.from_arrays(
+                [pa.array(values, type=field.type) for values, field in zip(zip(*rows), schema)],
+                schema=schema
+            ))
+            count += len(rows)
+    return count
+
+_WRITERS = {"jsonl": _write_jsonl, "csv": _write_csv, "parquet": _write_parquet}
+
+def export_table(table, path, fmt=None, user_id=DEFAULT_USER, chunk_size=CHUNK_SIZE):
+    """
+    Streams a user's table to a JSONL, CSV or Parquet file.
+    The format is taken from the file extension unless `fmt` is given.
+    The file is written under a temporary name and renamed when complete.
+    Returns the number of exported rows.
+    """
+    fmt = _format_for(path, fmt)
+    _check_table(table)
+    count = _WRITERS[fmt](path + ".tmp", EXPORT_COLUMNS[table], iter_rows(table, user_id, chunk_size))
+    os.replace(path + ".tmp", path)
+    return count
+
+def export_user(directory, fmt="jsonl", user_id=DEFAULT_USER, chunk_size=CHUNK_SIZE):
+    """
+    Exports a user's tasks, moods and interactions to `directory`
+    as <table>.<fmt> files. Returns the number of rows per table.
+    """
+    os.makedirs(directory, exist_ok=True)
+    return {
+        table: export_table(table, os.path.join(directory, f"{table}.{fmt}"), fmt, user_id, chunk_size)
+        for table in EXPORT_COLUMNS
+    }
+
+# --- Import ---
+
+def _read_jsonl(path, columns, chunk_size, skip, required=()):
+    with open(path, encoding="utf-8") as f:
+        rows = []
+        records = (line for line in f if line.strip())
+        for row_number, line in enumerate(records):
+            if row_number < skip:
+                continue
+            record = json.loads(line)
+            rows.append(tuple(record.get(col) for col in columns))
+            if len(rows) == chunk_size:
+                yield rows
+                rows = []
+        if rows:
+            yield rows
+
+def _read_csv(path, columns, chunk_size, skip, required=()):
+    with open(path, encoding="utf-8", newline="") as f:
+        reader = csv.DictReader(f)
+        rows = []
+        for row_number, record in enumerate(reader):
+            if row_number < skip:
+                continue
+            # CSV has no null: empty fields of nullable columns are read back as None
+            rows.append(tuple(
+                None if record.get(col) == "" and col not in required else record.get(col) for col in columns
+            ))
+            if len(rows) == chunk_size:
+                yield rows
+                rows = []
+        if rows:
+            yield rows
+
+def _read_parquet(path, columns, chunk_size, skip, required=()):
+    import pyarrow.parquet as pq
+
+    parquet_file = pq.ParquetFile(path)
+    available = [col for col in columns if col in parquet_file.schema_arrow.names]
+    seen = 0
+    for batch in parquet_file.iter_batches(batch_size=chunk_size, columns=available):
+        if seen + batch.num_rows <= skip:
+            seen += batch.num_rows
+            continue
+        if seen < skip:
+            batch = batch.slice(skip - seen)
+        seen += batch.num_rows
+        data = batch.to_pydict()
+        yield [tuple(data[col][i] if col in data else None for col in columns) for i in range(batch.num_rows)]
+
+_READERS = {"jsonl": _read_jsonl, "csv": _read_csv, "parquet": _read_parquet}
+
+def _checkpoint_key(table, path):
+    """Identifies an import by table, file and file size, so a changed file starts over."""
+    path = os.path.abspath(path)
+    digest = hashlib.sha1(f"{path}:{os.path.getsize(path)}".encode("utf-8")).hexdigest()
+    return f"import:{table}:{digest}"
+
+def import_table(table, path, fmt=None, user_id=DEFAULT_USER, batch_size=CHUNK_SIZE, notify=None):
+    """
+    Streams rows from a JSONL, CSV or Parquet file into a user's table.
+
+    Rows are inserted in batches of `batch_size`, one transaction each.
+    The number of rows imported so far is saved in sync_state within the
+    same transaction, so an interrupted import resumes after the last
+    committed batch when called again with the same file.
+
+    Rows are written directly rather than through the scheduler, so the
+    checkpoint shares their transaction. `notify` (e.g. the scheduler's
+    notify_task_listeners, so the task cache, reminders and free slots
+    follow) is called as notify('added', task_id, title, date_time, user_id)
+    for each imported pending task once its batch is committed.
+
+    Returns a dictionary with the rows imported now and whether the
+    import resumed from a checkpoint.
+    """
+    fmt = _format_for(path, fmt)
+    _check_table(table)
+    require_sqlite("Import")
+    # Ids are reassigned, so they are not imported
+    columns = [col for col in EXPORT_COLUMNS[table] if col != "id"]
+    insert = f"INSERT INTO {table} (user_id, {', '.join(columns)}) VALUES (?, {', '.join('?' * len(columns))})"
+    key = _checkpoint_key(table, path)
+
+    with connect(user_id) as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT value FROM sync_state WHERE user_id = ? AND key = ?", (user_id, key))
+        row = cursor.fetchone()
+        done = int(row[0]) if row else 0
+        resumed = done > 0
+
+        imported = 0
+        for rows in _READERS[fmt](path, columns, batch_size, done, REQUIRED_COLUMNS.get(table, ())):
+            added = []
+            if table == "tasks":
+                for title, date_time, status in rows:
+                    cursor.execute(insert, (user_id, title, date_time, status or "pending"))
+                    if (status or "pending") == "pending":
+                        added.append((cursor.lastrowid, title, date_time))
+            else:
+                cursor.executemany(insert, ((user_id,) + tuple(values) for values in rows))
+            done += len(rows)
+            imported += len(rows)
+            cursor.execute(
+                "INSERT OR REPLACE INTO sync_state (user_id, key, value) VALUES (?, ?, ?)",
+                (user_id, key, str(done))
+            )
+            conn.commit()
+            if notify:
+                for task_id, title, date_time in added:
+                    notify("added", task_id, title, date_time, user_id)
+
+        cursor.execute("DELETE FROM sync_state WHERE user_id = ? AND key = ?", (user_id, key))
+        conn.commit()
+    return {"imported": imported, "resumed": resumed}
+
+def import_user(directory, fmt="jsonl", user_id=DEFAULT_USER, batch_size=CHUNK_SIZE, notify=None):
+    """
+    Imports the <table>.<fmt> files found in `directory` into a user's data,
+    passing `notify` to import_table. Returns the number of rows imported per table.
+    """
+    result = {}
+    for table in EXPORT_COLUMNS:
+        path = os.path.join(directory, f"{table}.{fmt}")
+        if os.path.exists(path):
+            result[table] = import_table(table, path, fmt, user_id, batch_size, notify)["imported"]
+    return result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export or import a user's tasks, moods and interactions.")
+    parser.add_argument("command", choices=["export", "import"])
+    parser.add_argument("directory")
+    parser.add_argument("--format", choices=FORMATS, default="jsonl")
+    parser.add_argument("--user", default=DEFAULT_USER)
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    args = parser.parse_args()
+
+    if args.command == "export":
+        result = export_user(args.directory, args.format, args.user, args.chunk_size)
+    else:
+        result = import_user(args.directory, args.format, args.user, args.chunk_size)
+    for table, count in result.items():
+        print(f"{table}: {count} rows {args.command}ed")
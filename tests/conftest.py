@@ -0,0 +1,29 @@
+import os
+import sys
+
+import pytest
+
+# Run from anywhere: the packages live at the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data import archive, database
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    """A fresh shared database (with its shard and archive directories) under tmp_path."""
+    monkeypatch.setattr(database, "DB_PATH", str(tmp_path / "user_data.db"))
+    monkeypatch.setattr(database, "USER_DB_DIR", str(tmp_path / "users"))
+    monkeypatch.setattr(database, "STORAGE_MODE", "shared")
+    monkeypatch.setattr(archive, "ARCHIVE_DIR", str(tmp_path / "archive"))
+    database.close_all()
+    database._initialized_paths.clear()
+    yield database
+    database.close_all()
+
+
+@pytest.fixture
+def sharded_db(db, monkeypatch):
+    """Like `db`, with one SQLite file per user."""
+    monkeypatch.setattr(database, "STORAGE_MODE", "sharded")
+    return db
@@ -0,0 +1,74 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from core import scheduler
+from core.action_items import normalize_due, save_action_items
+
+NOW = datetime(2026, 10, 19, 14, 0)
+
+
+@pytest.mark.parametrize("phrase, expected", [
+    ("due 3pm today", "2026-10-19T15:00:00"),
+    ("by 5pm tomorrow", "2026-10-20T17:00:00"),
+    ("tomorrow at 10:30am", "2026-10-20T10:30:00"),
+    ("by today", "2026-10-19T09:00:00"),
+    ("tomorrow", "2026-10-20T09:00:00"),
+    ("before 17:00 today", "2026-10-19T17:00:00"),
+    ("today at noon", "2026-10-19T12:00:00"),
+    ("end of day tomorrow", "2026-10-20T09:00:00"),
+])
+def test_relative_days_anywhere_in_the_phrase(phrase, expected):
+    assert normalize_due(phrase, NOW) == expected
+
+
+def test_dates_keep_their_time_or_get_the_default():
+    year = datetime.now().year
+    may_26 = datetime(year, 5, 26, 17) if datetime(year, 5, 26, 17) > datetime.now() else datetime(year + 1, 5, 26, 17)
+    assert normalize_due("on May 26 at 5pm") == may_26.isoformat()
+    assert normalize_due("on May 26 5pm") == may_26.isoformat()
+    assert normalize_due("by May 26") == may_26.replace(hour=9).isoformat()
+
+
+def test_weekdays():
+    due = datetime.fromisoformat(normalize_due("by friday 4:30 pm"))
+    assert (due.weekday(), due.hour, due.minute) == (4, 16, 30)
+    due = datetime.fromisoformat(normalize_due("next monday"))
+    assert (due.weekday(), due.hour) == (0, 9)
+    assert due.date() > datetime.now().date()
+
+
+@pytest.mark.parametrize("phrase, expected", [
+    ("2026-11-01", "2026-11-01T09:00:00"),
+    ("by 2026-11-01 at 5pm", "2026-11-01T17:00:00"),
+    ("due 2026-11-01T17:30", "2026-11-01T17:30:00"),
+])
+def test_iso_dates(phrase, expected):
+    assert normalize_due(phrase, NOW) == expected
+
+
+@pytest.mark.parametrize("phrase", [None, "", "asap", "when you can"])
+def test_phrases_without_a_date(phrase):
+    assert normalize_due(phrase, NOW) is None
+
+
+@pytest.mark.parametrize("phrase", ["in 2 days", "by the 15th", "on 31/02", "2026-13-01"])
+def test_unreadable_dates_give_no_deadline(phrase):
+    assert normalize_due(phrase, NOW) is None
+
+
+def test_save_action_items_skips_duplicates(db):
+    items = [{"title": "Send the report", "due": "tomorrow 5pm"}, {"title": "Call Ana", "due": None}]
+    first = save_action_items(items)
+    assert len(first["task_ids"]) == 2 and first["duplicates"] == 0
+    assert save_action_items(items) == {"task_ids": [], "duplicates": 2}
+
+    tasks = {task.title: task.date_time for task in scheduler.list_tasks()}
+    tomorrow = (datetime.now() + timedelta(days=1)).date()
+    assert tasks == {"Send the report": f"{tomorrow}T17:00:00", "Call Ana": None}
+
+
+def test_unreadable_deadline_does_not_abort_the_save(db):
+    items = [{"title": "Pay rent", "due": "by the 15th"}, {"title": "Book flights", "due": "in 2 days"}]
+    assert len(save_action_items(items)["task_ids"]) == 2
+    assert {task.title: task.date_time for task in scheduler.list_tasks()} == {"Pay rent": None, "Book flights": None}
@@ -0,0 +1,85 @@
+from datetime import datetime
+
+import pytest
+
+from core import recommender, scheduler
+from core.moods import save_mood
+from data import repository
+
+
+@pytest.fixture(params=["sqlite", "memory"])
+def backend(request, db):
+    backend = repository.SQLiteBackend() if request.param == "sqlite" else repository.InMemoryBackend()
+    repository.set_backend(backend)
+    yield backend
+    repository.set_backend(None)
+
+
+def _rows(db, query, *params):
+    with db.connect() as conn:
+        return conn.execute(query, params).fetchall()
+
+
+def test_mood_triggers_fill_daily_and_slot_totals(db):
+    repository.set_backend(repository.SQLiteBackend())
+    try:
+        save_mood("great", "positive", 0.9, date=datetime(2026, 10, 19, 9, 15))   # Monday
+        save_mood("tired", "negative", 0.5, date=datetime(2026, 10, 19, 9, 40))
+        save_mood("fine", "neutral", 0.7, date=datetime(2026, 10, 20, 18, 0))
+    finally:
+        repository.set_backend(None)
+
+    daily = _rows(db, "SELECT day, entries, positive, negative, score_sum FROM mood_daily ORDER BY day")
+    assert [row[:4] for row in daily] == [("2026-10-19", 2, 1, 1), ("2026-10-20", 1, 0, 0)]
+    assert daily[0][4] == pytest.approx(0.4)
+    assert daily[1][4] == pytest.approx(0.0)
+
+    # SQLite weekdays start on Sunday, so Monday is 1
+    slots = _rows(db, "SELECT weekday, hour, entries, score_sum FROM mood_slots WHERE weekday = 1")
+    assert [row[:3] for row in slots] == [(1, 9, 2)]
+
+
+def test_task_load_follows_every_task_write(db):
+    repository.set_backend(repository.SQLiteBackend())
+    try:
+        first = scheduler.add_task("a", "2026-10-19T09:00:00")
+        second = scheduler.add_task("b", "2026-10-19T10:00:00")
+        scheduler.add_task("c")
+        scheduler.reschedule_tasks([(second, "b", "2026-10-20T10:00:00")])
+        scheduler.mark_task_done(first)
+    finally:
+        repository.set_backend(None)
+
+    load = dict(_rows(db, "SELECT day, pending FROM task_load WHERE pending > 0"))
+    assert load == {"2026-10-20": 1, "": 1}
+
+
+def test_aggregates_are_backfilled_from_existing_rows(db):
+    with db.connect() as conn:
+        conn.execute("INSERT INTO moods (date, classification) VALUES ('2026-10-19 08:00', 'positive (80%)')")
+        conn.execute("INSERT INTO tasks (title, datetime) VALUES ('x', '2026-10-19T08:00:00')")
+        for table in ("mood_daily", "mood_slots", "task_load"):
+            conn.execute(f"DELETE FROM {table}")
+        db._create_schema(conn.cursor())
+        conn.commit()
+
+    assert _rows(db, "SELECT day, entries FROM mood_daily") == [("2026-10-19", 1)]
+    assert _rows(db, "SELECT day, pending FROM task_load") == [("2026-10-19", 1)]
+
+
+def test_recommender_reads_the_summaries(backend):
+    now = datetime(2026, 10, 19, 9, 30)
+    for day in (12, 19):  # Mondays
+        backend.add_mood("default", f"2026-10-{day} 09:00", "x", "positive (90%)")
+    backend.add_mood("default", "2026-10-19 09:30", "x", "negative (30%)")
+    for _ in range(3):
+        backend.add_task("default", "t", "2026-10-19T15:00:00")
+    backend.delete_task("default", backend.add_task("default", "gone", "2026-10-19T16:00:00").id)
+
+    assert recommender.get_mood_trend(days=8, now=now) == pytest.approx((0.9 + 0.9 - 0.3) / 3)
+    assert recommender.get_mood_trend(days=7, now=now) == pytest.approx((0.9 - 0.3) / 2)
+    assert recommender.get_mood_trend(days=7, now=datetime(2026, 11, 30)) is None
+    assert recommender.get_slot_mood(now.weekday(), 9) == (pytest.approx(0.5), 3)
+    assert recommender.get_slot_mood(now.weekday(), 10) == (None, 0)
+    assert recommender.get_pending_load(now) == 3
+    assert recommender.get_latest_mood() == "negative"
@@ -0,0 +1,73 @@
+import pytest
+
+pytest.importorskip("fastapi")
+pytest.importorskip("httpx")
+from fastapi.testclient import TestClient
+
+from api import server
+from core import scheduler
+
+
+class FakeBatcher:
+    async def classify(self, text, language=None):
+        if text == "boom":
+            return {"error": "model failed"}
+        return {"mood": "positive", "confidence": 0.9, "language": language or "en"}
+
+
+@pytest.fixture
+def client(db, monkeypatch):
+    monkeypatch.setattr(server, "API_USERS", {"token-ana": "ana", "token-bob": "bob"})
+    monkeypatch.setattr(server.app.state, "batcher", FakeBatcher(), raising=False)
+    # Without the `with` block the lifespan (worker processes) is not started
+    return TestClient(server.app)
+
+
+def _auth(token):
+    return {"Authorization": f"Bearer {token}"}
+
+
+def test_requests_need_a_known_token(client):
+    assert client.get("/tasks").status_code == 401
+    assert client.get("/tasks", headers=_auth("wrong")).status_code == 401
+    assert client.post("/moods/analyze/batch", json={"texts": ["hi"]}).status_code == 401
+    assert client.get("/health").status_code == 200
+
+
+def test_token_decides_the_user(client):
+    scheduler.add_task("ana's task", user_id="ana")
+    scheduler.add_task("bob's task", user_id="bob")
+    # A user id header no longer selects whose data is read
+    response = client.get("/tasks", headers={**_auth("token-ana"), "X-User-Id": "bob"})
+    assert [task["title"] for task in response.json()] == ["ana's task"]
+
+
+def test_without_tokens_only_the_default_user_is_served(client, monkeypatch):
+    monkeypatch.setattr(server, "API_USERS", {})
+    scheduler.add_task("default task")
+    scheduler.add_task("bob's task", user_id="bob")
+    response = client.get("/tasks", headers={"X-User-Id": "bob"})
+    assert [task["title"] for task in response.json()] == ["default task"]
+
+
+def test_batch_is_capped(client):
+    too_many = {"texts": ["ok"] * (server.MOOD_BATCH_MAX_TEXTS + 1)}
+    assert client.post("/moods/analyze/batch", json=too_many, headers=_auth("token-ana")).status_code == 422
+    response = client.post("/moods/analyze/batch", json={"texts": ["ok", "fine"]}, headers=_auth("token-ana"))
+    assert response.status_code == 200
+    assert [result["mood"] for result in response.json()] == ["positive", "positive"]
+
+
+def test_batch_item_errors_fail_like_single_requests(client):
+    single = client.post("/moods/analyze", json={"text": "boom"}, headers=_auth("token-ana"))
+    assert single.status_code == 500
+    response = client.post("/moods/analyze/batch", json={"texts": ["ok", "boom"]}, headers=_auth("token-ana"))
+    assert response.status_code == 500
+    assert response.json()["detail"] == [{"index": 1, "error": "model failed"}]
+
+
+def test_unknown_search_kind_is_a_bad_request(client):
+    response = client.get("/search", params={"q": "bank", "kinds": "task,foo"}, headers=_auth("token-ana"))
+    assert response.status_code == 400
+    assert "foo" in response.json()["detail"]
+    assert client.get("/search", params={"q": "bank", "kinds": "task"}, headers=_auth("token-ana")).status_code == 200
@@ -0,0 +1,67 @@
+import glob
+from datetime import datetime
+
+import pytest
+
+from core import mood_analytics, recommender, scheduler
+from core.moods import save_mood
+from data import archive
+
+NOW = datetime(2026, 10, 19, 12, 0)
+
+
+def _count(db, table):
+    with db.connect() as conn:
+        return conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+
+
+@pytest.fixture
+def history(db):
+    for day in range(1, 11):
+        save_mood(f"old {day}", "positive", 0.8, date=datetime(2026, 6, day, 9))
+    save_mood("recent", "negative", 0.6, date=datetime(2026, 10, 18, 9))
+
+    done = [scheduler.add_task(f"done {i}", "2026-06-01T09:00:00") for i in range(5)]
+    for task_id in done:
+        scheduler.mark_task_done(task_id)
+    scheduler.add_task("pending", "2026-06-01T09:00:00")
+    # Done tasks are archived by the time of their last change
+    with db.connect() as conn:
+        conn.execute("UPDATE tasks SET updated_at = '2026-06-02T00:00:00.000Z' WHERE status = 'done'")
+        conn.commit()
+    return db
+
+
+def test_old_rows_move_to_parquet(history):
+    result = archive.archive_old_data(days=90, now=NOW, batch_size=3)
+    assert result == {"tasks": 5, "moods": 10}
+    assert _count(history, "moods") == 1
+    assert [task.title for task in scheduler.list_tasks()] == ["pending"]
+
+    # One part per batch
+    assert len(glob.glob(archive.archive_path("moods") + "/*.parquet")) == 4
+    moods = archive.load_archive("moods")
+    assert list(moods["description"]) == [f"old {day}" for day in range(1, 11)]
+    assert list(archive.load_archive("tasks", columns=["title"])["title"]) == [f"done {i}" for i in range(5)]
+
+    assert archive.archive_old_data(days=90, now=NOW) == {"tasks": 0, "moods": 0}
+
+
+def test_archived_moods_still_count(history):
+    before = recommender.get_mood_trend(days=200, now=NOW)
+    archive.archive_old_data(days=90, now=NOW)
+    assert recommender.get_mood_trend(days=200, now=NOW) == pytest.approx(before)
+    assert mood_analytics.compute_mood_analytics()["entries"] == 11
+
+
+def test_filters_skip_row_groups(history):
+    archive.archive_old_data(days=90, now=NOW)
+    moods = archive.load_archive("moods", columns=["date"], filters=[("date", ">=", "2026-06-09")])
+    assert list(moods["date"]) == ["2026-06-09 09:00", "2026-06-10 09:00"]
+
+
+def test_unsynced_calendar_tasks_stay(history):
+    with history.connect() as conn:
+        conn.execute("UPDATE tasks SET event_id = 'evt1', synced_version = version - 1 WHERE title = 'done 0'")
+        conn.commit()
+    assert archive.archive_old_data(days=90, now=NOW)["tasks"] == 4
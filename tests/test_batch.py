@@ -0,0 +1,49 @@
+import json
+
+import pytest
+
+from core import batch
+
+
+def test_worker_skips_the_model_without_moods(monkeypatch):
+    loaded = []
+    monkeypatch.setattr(batch, "get_registry", lambda: type("Registry", (), {"get": lambda self, lang: loaded.append(lang)})())
+    batch._init_worker(moods=False)
+    assert loaded == []
+    batch._init_worker(moods=True)
+    assert loaded == [batch.default_language()]
+
+
+def test_process_file_without_moods(tmp_path):
+    source = tmp_path / "commands.jsonl"
+    source.write_text("\n".join(json.dumps({"text": f"add task call the bank at {hour}am"}) for hour in range(1, 6)))
+    output = tmp_path / "out.jsonl"
+    report = batch.process_file(str(source), str(output), workers=1, chunk_size=2, moods=False, progress=False)
+    assert report["records"] == 5 and report["chunks"] == 3
+    rows = [json.loads(line) for line in output.read_text().splitlines()]
+    assert [row["text"] for row in rows] == [f"add task call the bank at {hour}am" for hour in range(1, 6)]
+    assert all("mood" not in row for row in rows)
+
+
+def test_uninterpretable_text_is_recorded_not_fatal(tmp_path):
+    texts = ["add task call the bank at 9am", "add task pay rent on the 15th", "list tasks"]
+    source = tmp_path / "commands.jsonl"
+    source.write_text("\n".join(json.dumps({"text": text}) for text in texts))
+    output = tmp_path / "out.jsonl"
+
+    report = batch.process_file(str(source), str(output), workers=1, moods=False, progress=False)
+
+    rows = [json.loads(line) for line in output.read_text().splitlines()]
+    assert report["records"] == 3 and report["errors"] == 1
+    assert [row["interpretation"].get("intent") for row in rows] == ["add_task", None, "list_tasks"]
+    assert "error" in rows[1]["interpretation"]
+
+
+def test_failed_run_leaves_no_temporary_file(tmp_path):
+    source = tmp_path / "commands.jsonl"
+    source.write_text('{"text": "list tasks"}\nnot json\n')
+    output = tmp_path / "out.jsonl"
+
+    with pytest.raises(json.JSONDecodeError):
+        batch.process_file(str(source), str(output), workers=1, moods=False, progress=False)
+    assert list(tmp_path.iterdir()) == [source]
@@ -0,0 +1,139 @@
+import time
+
+import pytest
+
+from core import scheduler
+from core.calendar_sync import CalendarBackend, CalendarSyncEngine, FakeCalendarBackend
+
+
+@pytest.fixture
+def calendar(db):
+    return FakeCalendarBackend()
+
+
+@pytest.fixture
+def engine(calendar):
+    return CalendarSyncEngine(calendar)
+
+
+@pytest.fixture
+def events():
+    received = []
+    def listener(event, task_id, title, date_time, user_id):
+        received.append((event, task_id))
+    scheduler.add_task_listener(listener)
+    yield received
+    scheduler.remove_task_listener(listener)
+
+
+def _task(db, task_id):
+    with db.connect() as conn:
+        return conn.execute("SELECT title, datetime, deleted FROM tasks WHERE id = ?", (task_id,)).fetchone()
+
+
+def _live_events(calendar):
+    return [event for event in calendar.events.values() if event["status"] != "cancelled"]
+
+
+def test_backend_is_abstract():
+    with pytest.raises(TypeError):
+        CalendarBackend()
+
+
+def test_push_creates_events_once(engine, calendar):
+    scheduler.add_task("Dentist", "2026-10-20T10:00:00")
+    scheduler.add_task("No time")
+
+    result = engine.sync()
+    assert (result["created"], result["pending"], result["offline"]) == (1, 0, False)
+    assert [event["summary"] for event in _live_events(calendar)] == ["Dentist"]
+
+    requests = calendar.calls["requests"]
+    assert engine.sync()["created"] == 0
+    assert calendar.calls["requests"] == requests
+
+
+def test_offline_changes_are_queued(engine, calendar):
+    task_id = scheduler.add_task("Report", "2026-10-20T10:00:00")
+    engine.sync()
+    time.sleep(0.01)  # updated_at has millisecond precision
+
+    calendar.online = False
+    scheduler.reschedule_tasks([(task_id, "Report", "2026-10-21T15:00:00")])
+    scheduler.add_task("Call", "2026-10-22T09:00:00")
+    result = engine.sync()
+    assert result["offline"] and result["pending"] == 2
+
+    calendar.online = True
+    result = engine.sync()
+    assert (result["created"], result["updated"], result["pending"]) == (1, 1, 0)
+    starts = sorted(event["start"]["dateTime"] for event in _live_events(calendar))
+    assert starts == ["2026-10-21T15:00:00", "2026-10-22T09:00:00"]
+
+
+def test_newer_remote_edit_wins(engine, calendar, db, events):
+    task_id = scheduler.add_task("Gym", "2026-10-20T07:00:00")
+    engine.sync()
+    event_id = _live_events(calendar)[0]["id"]
+
+    scheduler.reschedule_tasks([(task_id, "Gym", "2026-10-20T08:00:00")])
+    time.sleep(0.01)
+    calendar.update_event(event_id, summary="Gym class", start={"dateTime": "2026-10-20T18:00:00"},
+                          end={"dateTime": "2026-10-20T19:00:00"})
+
+    engine.sync()
+    assert _task(db, task_id)[:2] == ("Gym class", "2026-10-20T18:00:00")
+    assert calendar.events[event_id]["start"]["dateTime"] == "2026-10-20T18:00:00"
+    assert ("rescheduled", task_id) in events
+
+
+def test_newer_local_edit_wins(engine, calendar, db):
+    task_id = scheduler.add_task("Gym", "2026-10-20T07:00:00")
+    engine.sync()
+    event_id = _live_events(calendar)[0]["id"]
+    time.sleep(0.01)
+
+    calendar.update_event(event_id, start={"dateTime": "2026-10-20T18:00:00"}, end={"dateTime": "2026-10-20T19:00:00"})
+    time.sleep(0.01)
+    scheduler.reschedule_tasks([(task_id, "Gym", "2026-10-20T08:00:00")])
+
+    engine.sync()
+    assert _task(db, task_id)[1] == "2026-10-20T08:00:00"
+    assert calendar.events[event_id]["start"]["dateTime"] == "2026-10-20T08:00:00"
+
+
+def test_remote_deletion_goes_through_the_scheduler(engine, calendar, db, events):
+    task_id = scheduler.add_task("Lunch", "2026-10-20T12:00:00")
+    engine.sync()
+    calendar.delete_event(_live_events(calendar)[0]["id"])
+
+    engine.sync()
+    assert _task(db, task_id) is None
+    assert ("deleted", task_id) in events
+    assert scheduler.list_tasks() == []
+
+
+def test_local_deletion_removes_the_event_then_the_tombstone(engine, calendar, db, events):
+    task_id = scheduler.add_task("Lunch", "2026-10-20T12:00:00")
+    engine.sync()
+    scheduler.delete_task(task_id)
+    assert _task(db, task_id)[2] == 1  # kept until the event is gone
+
+    result = engine.sync()
+    assert result["deleted"] == 1
+    assert _live_events(calendar) == []
+    assert _task(db, task_id) is None
+    assert events.count(("deleted", task_id)) == 2
+
+
+def test_failed_sync_still_invalidates_the_free_slot_index(calendar, monkeypatch):
+    from core import calendar_sync, free_slots
+
+    free_slots.get_index()
+    def fail(self):
+        raise calendar_sync.CalendarOfflineError("push failed")
+    monkeypatch.setattr(CalendarSyncEngine, "sync", fail)
+
+    with pytest.raises(calendar_sync.CalendarOfflineError):
+        calendar_sync.sincronizar_tarefas_com_calendario(calendar)
+    assert free_slots.DEFAULT_USER not in free_slots._indexes
@@ -0,0 +1,55 @@
+from datetime import datetime
+
+import pytest
+
+from core import free_slots
+from core.commands import execute_command, save_interaction
+from core.nlp import interpret_command
+
+
+@pytest.fixture
+def commands_db(db):
+    free_slots.invalidate()
+    yield db
+    free_slots.invalidate()
+
+
+def test_add_task_command_creates_the_task(commands_db):
+    outcome = execute_command(interpret_command("add task call the bank at 10am"))
+
+    assert outcome["ok"] and outcome["intent"] == "add_task"
+    assert outcome["message"] == "Task added: call the bank"
+    scheduled = outcome["scheduled"]
+    assert not scheduled["placed"]
+    assert datetime.fromisoformat(scheduled["date_time"]).hour == 10
+
+
+def test_untimed_task_is_placed_unless_disabled(commands_db):
+    placed = execute_command(interpret_command("add task water the plants"))
+    kept = execute_command(interpret_command("add task renew passport"), place=False)
+
+    assert placed["scheduled"]["placed"] and ", scheduled " in placed["message"]
+    assert kept["scheduled"]["date_time"] is None
+
+
+def test_list_tasks_command_reads_out_the_first_ones(commands_db):
+    for title in ("one", "two", "three", "four"):
+        execute_command(interpret_command(f"add task {title}"), place=False)
+
+    outcome = execute_command(interpret_command("list tasks"))
+
+    assert len(outcome["tasks"]) == 4
+    assert outcome["message"] == "You have 4 pending tasks: one, two, three, and 1 more."
+
+
+def test_unknown_command_is_not_ok(commands_db):
+    outcome = execute_command({"intent": "unknown"})
+    assert not outcome["ok"] and outcome["message"].startswith("Sorry")
+
+
+def test_save_interaction(commands_db):
+    save_interaction("list tasks", "You have no pending tasks.", user_id="u2")
+    with commands_db.connect("u2") as conn:
+        assert conn.execute("SELECT command, response FROM interactions WHERE user_id = 'u2'").fetchall() == [
+            ("list tasks", "You have no pending tasks.")
+        ]
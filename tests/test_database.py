@@ -0,0 +1,91 @@
+import os
+import sqlite3
+import threading
+
+import pytest
+
+from data import transfer
+
+
+def _in_thread(function):
+    result = {}
+    thread = threading.Thread(target=lambda: result.update(value=function()))
+    thread.start()
+    thread.join()
+    return result["value"]
+
+
+def test_connections_belong_to_their_thread(db):
+    mine = db.connect()
+    assert db.connect() is mine
+    assert _in_thread(db.connect) is not mine
+
+
+def test_transactions_of_different_threads_do_not_mix(db):
+    with db.connect() as conn:
+        conn.execute("INSERT INTO tasks (user_id, title) VALUES ('default', 'rolled back')")
+        # Another thread commits while this transaction is still open
+        def commit_other():
+            with db.connect() as other:
+                other.execute("INSERT INTO tasks (user_id, title) VALUES ('default', 'committed')")
+                other.commit()
+        thread = threading.Thread(target=commit_other)
+        thread.start()
+        thread.join(timeout=1)
+        conn.rollback()
+        thread.join()
+
+    with db.connect() as conn:
+        titles = [row[0] for row in conn.execute("SELECT title FROM tasks")]
+    assert titles == ["committed"]
+
+
+def test_sharded_users_get_their_own_file(sharded_db):
+    for user in ("ana", "bob"):
+        with sharded_db.connect(user) as conn:
+            conn.execute("INSERT INTO tasks (user_id, title) VALUES (?, 'x')", (user,))
+            conn.commit()
+    assert os.path.exists(sharded_db.database_path("ana"))
+    assert sharded_db.database_path("ana") != sharded_db.database_path("bob")
+    assert os.path.basename(sharded_db.database_path("a/b")) == sharded_db.user_file_name("a/b") + ".db"
+    assert len(sharded_db.user_file_name("a/b")) == 40
+
+
+def test_pool_evicts_least_recently_used(sharded_db, monkeypatch):
+    monkeypatch.setattr(sharded_db, "MAX_OPEN_DATABASES", 2)
+    first = sharded_db.connect("u1")
+    sharded_db.connect("u2")
+    sharded_db.connect("u3")
+    with pytest.raises(sqlite3.ProgrammingError):
+        first.execute("SELECT 1")
+    assert sharded_db.connect("u1") is not first
+
+
+def test_pool_keeps_connections_in_use(sharded_db, monkeypatch):
+    monkeypatch.setattr(sharded_db, "MAX_OPEN_DATABASES", 2)
+    with sharded_db.connect("u1") as conn:
+        conn.executemany("INSERT INTO moods (user_id, description) VALUES ('u1', ?)", [(str(i),) for i in range(5)])
+        conn.commit()
+
+    # An export paused between chunks while other users are queried
+    chunks = transfer.iter_rows("moods", "u1", chunk_size=2)
+    rows = list(next(chunks))
+    held = sharded_db.connect("u1")
+    for user in ("u2", "u3", "u4"):
+        with sharded_db.connect(user) as conn:
+            conn.execute("SELECT COUNT(*) FROM tasks").fetchone()
+    for chunk in chunks:
+        rows.extend(chunk)
+    assert [row[2] for row in rows] == ["0", "1", "2", "3", "4"]
+
+    # Closed once the export is done with it
+    with pytest.raises(sqlite3.ProgrammingError):
+        held.execute("SELECT 1")
+
+
+def test_close_all_closes_every_thread(db):
+    other = _in_thread(db.connect)
+    db.close_all()
+    with pytest.raises(sqlite3.ProgrammingError):
+        other.execute("SELECT 1")
+    db.connect().execute("SELECT 1")
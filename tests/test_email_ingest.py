@@ -0,0 +1,117 @@
+import os
+import time
+
+import pytest
+
+from core import email_ingest
+from core.email_ingest import ImapSource, MailSource, MaildirSource, MboxSource, ingest
+from tools.mock_services import MockImap
+
+
+def _message(n, message_id=True):
+    headers = f"From: sender{n}@example.com\nSubject: Message {n}\nDate: Mon, 19 Oct 2026 09:{n:02d}:00 +0000\n"
+    if message_id:
+        headers += f"Message-ID: <m{n}@example.com>\n"
+    return f"{headers}\nBody of message {n}.\n"
+
+
+def _subjects(db):
+    with db.connect() as conn:
+        return [row[0] for row in conn.execute("SELECT subject FROM emails ORDER BY id")]
+
+
+def test_source_is_abstract():
+    with pytest.raises(TypeError):
+        MailSource()
+
+
+def test_mbox_resumes_after_the_last_message(db, tmp_path):
+    path = tmp_path / "inbox.mbox"
+    path.write_text("".join(f"From sender@example.com Mon Oct 19 09:00:00 2026\n{_message(n)}\n" for n in (1, 2)))
+    source = MboxSource(str(path))
+    assert ingest(source, summarize=False) == {"fetched": 2, "new": 2, "duplicates": 0}
+
+    with open(path, "a") as f:
+        f.write(f"From sender@example.com Mon Oct 19 09:00:00 2026\n{_message(3)}\n")
+    assert ingest(source, summarize=False) == {"fetched": 1, "new": 1, "duplicates": 0}
+    assert ingest(source, summarize=False)["fetched"] == 0
+    assert _subjects(db) == ["Message 1", "Message 2", "Message 3"]
+
+
+def _deliver(maildir, name, n, mtime):
+    path = maildir / "new" / name
+    path.write_text(_message(n))
+    os.utime(path, (mtime, mtime))
+    return path
+
+
+def test_maildir_reads_files_with_older_or_equal_times(db, tmp_path):
+    maildir = tmp_path / "Maildir"
+    for folder in ("new", "cur", "tmp"):
+        (maildir / folder).mkdir(parents=True)
+    now = time.time()
+    first = _deliver(maildir, "1000.a.host", 1, now)
+    source = MaildirSource(str(maildir))
+    assert ingest(source, summarize=False)["new"] == 1
+
+    # Same second as the first, and one restored with an older time
+    _deliver(maildir, "1001.b.host", 2, now)
+    _deliver(maildir, "0999.c.host", 3, now - 3600)
+    # Read messages move to cur with flags; they are not read again
+    os.rename(first, maildir / "cur" / "1000.a.host:2,S")
+    assert ingest(source, summarize=False) == {"fetched": 2, "new": 2, "duplicates": 0}
+    assert ingest(source, summarize=False)["fetched"] == 0
+    assert _subjects(db) == ["Message 1", "Message 3", "Message 2"]
+
+
+def test_imap_resumes_after_the_last_uid(db):
+    server = MockImap()
+    for n in (1, 2):
+        server.append(_message(n).encode())
+    source = ImapSource("imap.example.com", "user", "secret", client_factory=server.client)
+    assert ingest(source, summarize=False) == {"fetched": 2, "new": 2, "duplicates": 0}
+
+    # "n:*" returns the newest message even when nothing is new
+    assert ingest(source, summarize=False)["fetched"] == 0
+    server.append(_message(3).encode())
+    assert ingest(source, summarize=False)["new"] == 1
+    assert server.stats["bodies"] == 3
+
+
+def test_imap_recreated_mailbox_skips_known_bodies(db):
+    server = MockImap()
+    for n in (1, 2):
+        server.append(_message(n).encode())
+    source = ImapSource("imap.example.com", "user", "secret", client_factory=server.client)
+    ingest(source, summarize=False)
+
+    server.recreate()
+    for n in (1, 2, 3):
+        server.append(_message(n).encode())
+    assert ingest(source, summarize=False) == {"fetched": 3, "new": 1, "duplicates": 2}
+    # Known messages were recognized by their Message-ID header alone
+    assert server.stats["bodies"] == 3
+    assert _subjects(db) == ["Message 1", "Message 2", "Message 3"]
+
+
+def test_imap_interrupted_fetch_resumes_from_the_last_batch(db, monkeypatch):
+    monkeypatch.setattr(email_ingest, "BATCH_SIZE", 2)
+    server = MockImap()
+    for n in range(1, 6):
+        server.append(_message(n).encode())
+    source = ImapSource("imap.example.com", "user", "secret", client_factory=server.client)
+
+    fetch = source.fetch
+    def failing_fetch(state, is_known, is_seen):
+        for count, item in enumerate(fetch(state, is_known, is_seen)):
+            if count == 3:
+                raise ConnectionError("connection reset")
+            yield item
+    monkeypatch.setattr(source, "fetch", failing_fetch)
+    with pytest.raises(ConnectionError):
+        ingest(source, summarize=False)
+    assert len(_subjects(db)) == 2
+
+    monkeypatch.setattr(source, "fetch", fetch)
+    assert ingest(source, summarize=False) == {"fetched": 3, "new": 3, "duplicates": 0}
+    assert len(_subjects(db)) == 5
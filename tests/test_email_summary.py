@@ -0,0 +1,65 @@
+import pytest
+
+from core import email_summary
+from core.email_summary import EmailSummarizer, SummarizerBackend, SummarizerUnavailable
+from data.database import DEFAULT_USER
+
+
+class RecordingBackend(SummarizerBackend):
+    def __init__(self, name, fail=False):
+        self.name = name
+        self.model = "gpt-3.5-turbo"
+        self.fail = fail
+        self.calls = []
+
+    def summarize(self, email_text, max_tokens, temperature, user_id=None):
+        self.calls.append(user_id)
+        if self.fail:
+            raise SummarizerUnavailable("rate limited")
+        return f"summary by {self.name}"
+
+
+@pytest.fixture
+def summarizer(monkeypatch):
+    monkeypatch.delenv("OPENAI_API_KEY", raising=False)
+    summarizer = EmailSummarizer(local_backend=RecordingBackend("local"), short_email_words=5)
+    summarizer.remote = RecordingBackend("remote")
+    return summarizer
+
+
+def test_backend_is_abstract():
+    with pytest.raises(TypeError):
+        SummarizerBackend()
+
+    class Incomplete(SummarizerBackend):
+        pass
+
+    with pytest.raises(TypeError):
+        Incomplete()
+
+
+def test_routes_pass_the_user_to_every_backend(summarizer):
+    short = summarizer.summarize_email("Lunch at noon?", user_id="u1")
+    assert short["metadata"]["route"] == "short"
+    long = summarizer.summarize_email("Please send the signed contract back before Friday.", user_id="u1")
+    assert long["metadata"]["route"] == "remote"
+    assert summarizer.local.calls == ["u1"]
+    assert summarizer.remote.calls == ["u1"]
+
+
+def test_failed_remote_falls_back_to_local(summarizer):
+    summarizer.remote.fail = True
+    result = summarizer.summarize_email("Please send the signed contract back before Friday.", user_id="u2")
+    assert result["summary"] == "summary by local"
+    assert result["metadata"]["route"] == "remote_failed"
+    assert summarizer.local.calls == ["u2"]
+
+
+def test_openai_backend_records_usage_for_the_default_user(monkeypatch):
+    backend = email_summary.OpenAIBackend.__new__(email_summary.OpenAIBackend)
+    calls = []
+    monkeypatch.setattr(backend, "chat", lambda messages, max_tokens, temperature, operation, user_id: calls.append(
+        (operation, user_id)) or "ok", raising=False)
+    assert backend.summarize("text", 50, 0.2) == "ok"
+    assert backend.summarize("text", 50, 0.2, "u3") == "ok"
+    assert calls == [("summary", DEFAULT_USER), ("summary", "u3")]
@@ -0,0 +1,104 @@
+import random
+from datetime import datetime, timedelta
+
+import pytest
+
+from core import free_slots, scheduler
+from core.free_slots import IntervalIndex
+
+DAY = datetime(2030, 1, 7)  # a Monday
+
+
+def at(hour, minute=0, day=0):
+    return DAY + timedelta(days=day, hours=hour, minutes=minute)
+
+
+def busy_minutes(intervals, start, end):
+    """Brute force: every busy minute in [start, end)."""
+    minutes = set()
+    for s, e in intervals:
+        moment = max(s, start)
+        while moment < min(e, end):
+            minutes.add(moment)
+            moment += timedelta(minutes=1)
+    return minutes
+
+
+def test_blocks_match_brute_force_through_adds_and_removes():
+    rng = random.Random(42)
+    index = IntervalIndex()
+    intervals = {}
+    for _ in range(300):
+        key = rng.randrange(40)
+        if key in intervals and rng.random() < 0.4:
+            index.remove(key)
+            del intervals[key]
+        else:
+            start = at(8, rng.randrange(0, 600, 5))
+            end = start + timedelta(minutes=rng.randrange(5, 120, 5))
+            index.add(key, start, end)
+            intervals[key] = (start, end)
+
+        window = (at(9), at(17))
+        expected = busy_minutes(intervals.values(), *window)
+        assert busy_minutes(index.busy(*window), *window) == expected
+        free = busy_minutes(index.free(*window), *window)
+        assert not free & expected
+        assert len(free) + len(expected) == 8 * 60
+    assert len(index) == len(intervals)
+
+
+def test_overlapping_and_next_free():
+    index = IntervalIndex()
+    index.add("a", at(9), at(10))
+    index.add("b", at(9, 30), at(11))
+    index.add("c", at(13), at(14))
+
+    assert sorted(key for key, _, _ in index.overlapping(at(10, 30), at(13, 30))) == ["b", "c"]
+    assert index.overlapping(at(11), at(13)) == []
+    assert index.next_free(timedelta(hours=2), at(9)) == at(11)
+    assert index.next_free(timedelta(hours=3), at(9)) == at(14)
+    assert index.next_free(timedelta(hours=3), at(9), before=at(16)) is None
+
+
+@pytest.fixture
+def slots(db):
+    free_slots.invalidate()
+    yield free_slots
+    free_slots.invalidate()
+
+
+def test_next_free_slot_stays_in_working_hours(slots):
+    scheduler.add_task("standup", at(9).isoformat())
+    scheduler.add_task("review", at(9, 30).isoformat())
+
+    assert slots.next_free_slot(after=at(8, 50)) == at(10)
+    # After the working day the next slot is on the following morning
+    assert slots.next_free_slot(60, after=at(17, 30)) == at(9, day=1)
+
+
+def test_index_follows_scheduler_events_and_reports_conflicts(slots):
+    task_id = scheduler.add_task("standup", at(9).isoformat())
+    assert slots.free_busy(at(9), at(10))["busy"] == [(at(9).isoformat(), at(9, 30).isoformat())]
+
+    conflicts = slots.find_conflicts(at(9, 15).isoformat())
+    assert [(c["kind"], c["id"]) for c in conflicts] == [("task", task_id)]
+
+    scheduler.reschedule_tasks([(task_id, "standup", at(11).isoformat())])
+    assert slots.find_conflicts(at(9, 15).isoformat()) == []
+    scheduler.mark_task_done(task_id)
+    assert slots.free_busy(at(9), at(12))["busy"] == []
+
+
+def test_place_untimed_tasks_fills_consecutive_slots(slots):
+    scheduler.add_task("standup", at(9).isoformat())
+    first = scheduler.add_task("write report")
+    second = scheduler.add_task("answer email")
+
+    placements = slots.place_untimed_tasks(after=at(9))
+
+    assert placements == [
+        (first, "write report", at(9, 30).isoformat()),
+        (second, "answer email", at(10).isoformat()),
+    ]
+    assert {task.id: task.date_time for task in scheduler.list_tasks()}[second] == at(10).isoformat()
@@ -0,0 +1,63 @@
+import pytest
+
+from core import free_slots, scheduler
+from data import fulltext
+
+
+@pytest.fixture
+def tasks(db):
+    scheduler.add_task("Team meeting about the budget", "2030-01-07T14:00:00")
+    scheduler.add_task("Call the bank")
+    scheduler.add_task("Renew passport")
+    with db.connect() as conn:
+        conn.execute(
+            "INSERT INTO moods (user_id, date, description, classification) "
+            "VALUES ('default', '2030-01-06 20:00', 'tired after the budget meeting', 'negative (80%)')"
+        )
+        conn.commit()
+    yield
+    free_slots.invalidate()
+
+
+def test_match_query_quotes_words():
+    assert fulltext.match_query('meet "OR" NOT*') == '"meet"* AND "or"* AND "not"*'
+    assert fulltext.match_query("call bank", prefix=False, operator="OR") == '"call" OR "bank"'
+
+
+def test_search_matches_prefixes_across_kinds(tasks):
+    results = fulltext.search("budg meet")
+
+    assert {(r["kind"], r["text"]) for r in results} == {
+        ("task", "Team meeting about the budget"),
+        ("mood", "tired after the budget meeting"),
+    }
+    assert all("**" in r["snippet"] for r in results)
+    assert [r["kind"] for r in fulltext.search("budget", kinds=["mood"])] == ["mood"]
+    pages = fulltext.search("budget", limit=1) + fulltext.search("budget", limit=1, offset=1)
+    assert sorted(r["kind"] for r in pages) == ["mood", "task"]
+
+
+def test_search_ignores_other_users_and_deleted_tasks(tasks):
+    task_id = fulltext.search("passport")[0]["id"]
+    scheduler.delete_task(task_id)
+
+    assert fulltext.search("passport") == []
+    assert fulltext.search("bank", user_id="u2") == []
+
+
+def test_similar_tasks_finds_near_duplicates(tasks):
+    similar = fulltext.similar_tasks("call the bank!")
+    assert [task["title"] for task in similar] == ["Call the bank"]
+    assert similar[0]["similarity"] == 1.0
+    assert fulltext.similar_tasks("call mom") == []
+
+
+def test_schedule_task_reports_duplicates(tasks):
+    result = free_slots.schedule_task("Renew the passport", place=False)
+    assert [task["title"] for task in result["duplicates"]] == ["Renew passport"]
+    assert result["date_time"] is None
+
+
+def test_unknown_kinds_are_rejected(tasks):
+    with pytest.raises(ValueError, match="foo"):
+        fulltext.search("budget", kinds=["task", "foo"])
@@ -0,0 +1,57 @@
+import os
+import sqlite3
+import subprocess
+import sys
+
+import pytest
+
+from tools import loadtest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SKIP = ["analyze_mood", "summarize_email", "calendar_list", "calendar_create"]
+
+
+def test_run_uses_the_data_dir_and_passes(tmp_path):
+    result = subprocess.run(
+        [sys.executable, "-m", "tools.loadtest", "--users", "3", "--arrival-rate", "50", "--actions", "5",
+         "--think-time", "0.01", "--skip", *SKIP, "--data-dir", str(tmp_path)],
+        cwd=ROOT, capture_output=True, text=True, timeout=120
+    )
+    assert result.returncode == 0, result.stderr
+    assert "SQLite writes:" in result.stdout
+    with sqlite3.connect(tmp_path / "load.db") as conn:
+        assert conn.execute("SELECT COUNT(*) FROM tasks").fetchone()[0] > 0
+
+
+def test_configure_refuses_an_app_loaded_with_other_paths(tmp_path):
+    import config.settings  # noqa: F401  (already loaded by the app under test)
+
+    with pytest.raises(RuntimeError, match="new process"):
+        loadtest.configure(str(tmp_path))
+
+
+def test_interleaved_transactions_fail_the_run():
+    recorder = loadtest.Recorder()
+    recorder.record("add_task", 0.01, "TransactionInterleaved")
+    recorder.record("list_tasks", 0.01, "TransactionInterleaved")
+    recorder.record("calendar_list", 0.2, "RateLimited")
+
+    assert loadtest.failures(recorder) == {"TransactionInterleaved": 2}
+    assert loadtest.failures(loadtest.Recorder()) == {}
+
+
+def test_report_of_a_run_too_short_to_sample(capsys):
+    report = {
+        "users": 1, "seconds": 0.01, "operations": 0, "throughput": 0.0, "actions": {}, "summary_routes": {},
+        "services": {}, "write_busy_ratio": None, "wal_peak_mb": 0.0, "rss_mb": {"peak": 50.0, "last": None},
+        "failures": {},
+    }
+    loadtest.print_report(report)
+    assert "SQLite writes: not sampled" in capsys.readouterr().out
+
+
+def test_mock_services_must_handle_requests():
+    from tools.mock_services import Latency, MockService
+
+    with pytest.raises(TypeError):
+        MockService(Latency(10, 50))
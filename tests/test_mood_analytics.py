@@ -0,0 +1,73 @@
+from datetime import datetime
+
+import pandas as pd
+import pytest
+
+from core import mood_analytics
+from core.moods import save_mood
+
+
+MOODS = [
+    ("2026-10-12 08:00", "positive", 0.9),
+    ("2026-10-12 20:00", "positive", 0.5),
+    ("2026-10-14 13:00", "negative", 0.8),
+    ("2026-10-15 02:00", "neutral", 0.6),
+    ("2026-10-15 09:00", "neutral", 0.7),
+]
+
+
+@pytest.fixture
+def moods(db):
+    for date, mood, confidence in MOODS:
+        save_mood("x", mood, confidence, date=datetime.strptime(date, "%Y-%m-%d %H:%M"))
+    return mood_analytics.load_moods(chunksize=2)
+
+
+def test_load_moods_types_the_columns(moods):
+    assert len(moods) == 5
+    assert list(moods["score"]) == pytest.approx([0.9, 0.5, -0.8, 0.0, 0.0])
+    assert str(moods["mood"].dtype) == "category"
+
+
+def test_daily_sentiment_skips_empty_days(moods):
+    daily = mood_analytics.daily_sentiment(moods, window=2)
+    assert list(daily["entries"]) == [2, 0, 1, 2]
+    assert pd.isna(daily["score"].iloc[1])
+    assert daily["rolling_score"].iloc[2] == pytest.approx(-0.8)
+
+
+def test_streaks_and_distribution(moods):
+    streaks = mood_analytics.mood_streaks(moods)
+    assert streaks["current"] == {"mood": "neutral", "length": 2}
+    assert streaks["longest"] == {"negative": 1, "neutral": 2, "positive": 2}
+
+    periods = mood_analytics.time_of_day_distribution(moods)
+    assert periods.loc["Night", "neutral"] == 1
+    assert periods.loc["Evening", "positive"] == 1
+
+
+def test_analytics_are_recomputed_only_after_new_moods(db):
+    save_mood("x", "positive", 0.9, date=datetime(2026, 10, 12, 8))
+    first = mood_analytics.get_mood_analytics()
+    assert mood_analytics.get_mood_analytics() is first
+    save_mood("y", "negative", 0.9, date=datetime(2026, 10, 12, 9))
+    assert mood_analytics.get_mood_analytics()["entries"] == 2
+
+
+def test_cache_keeps_only_the_most_recent_users(db, monkeypatch):
+    monkeypatch.setattr(mood_analytics, "MOOD_ANALYTICS_CACHE_SIZE", 2)
+    monkeypatch.setattr(mood_analytics, "_cache", type(mood_analytics._cache)())
+    for user in ("ana", "bob", "ana", "carl"):
+        mood_analytics.get_mood_analytics(user)
+    assert [user for _, user in mood_analytics._cache] == ["ana", "carl"]
+
+
+def test_single_mood_is_a_streak(db):
+    save_mood("x", "positive", 0.9, date=datetime(2026, 10, 12, 8))
+    assert mood_analytics.mood_streaks(mood_analytics.load_moods())["current"] == {"mood": "positive", "length": 1}
+
+
+def test_empty_history(db):
+    analytics = mood_analytics.compute_mood_analytics()
+    assert analytics["entries"] == 0
+    assert analytics["streaks"] == {"current": None, "longest": {}}
@@ -0,0 +1,127 @@
+import threading
+import time
+
+import pytest
+
+torch = pytest.importorskip("torch")
+transformers = pytest.importorskip("transformers")
+safetensors_torch = pytest.importorskip("safetensors.torch")
+
+from core import mood_models
+
+LABELS = {"negative": "negative", "positive": "positive"}
+
+
+@pytest.fixture(scope="module")
+def checkpoint(tmp_path_factory):
+    """A tiny DistilBERT sentiment checkpoint saved as safetensors."""
+    directory = tmp_path_factory.mktemp("tiny-sentiment")
+    vocab = directory / "vocab.txt"
+    vocab.write_text("\n".join(["[PAD]", "[UNK]", "[CLS]", "[SEP]", "[MASK]", "good", "bad", "day"]))
+    transformers.DistilBertTokenizer(str(vocab)).save_pretrained(directory)
+    config = transformers.DistilBertConfig(
+        vocab_size=8, dim=16, hidden_dim=32, n_layers=1, n_heads=2, max_position_embeddings=32,
+        id2label={0: "NEGATIVE", 1: "POSITIVE"}, label2id={"NEGATIVE": 0, "POSITIVE": 1},
+    )
+    torch.manual_seed(0)
+    transformers.DistilBertForSequenceClassification(config).save_pretrained(directory)
+    return directory
+
+
+def _registry(checkpoint, monkeypatch, path=None):
+    monkeypatch.setattr(mood_models.MoodModelRegistry, "_download", staticmethod(lambda name: str(path or checkpoint)))
+    models = {"multilingual": {"checkpoint": "tiny", "labels": LABELS}}
+    return mood_models.MoodModelRegistry(models, memory_budget_mb=64)
+
+
+def _reference(checkpoint, text):
+    return transformers.pipeline("sentiment-analysis", model=str(checkpoint), device=-1)(text)[0]
+
+
+def test_mapped_weights_match_from_pretrained(checkpoint, monkeypatch):
+    registry = _registry(checkpoint, monkeypatch)
+    classifier, _ = registry.get("en")
+    expected = _reference(checkpoint, "good day")
+    result = classifier("good day")[0]
+    assert result["label"] == expected["label"]
+    assert result["score"] == pytest.approx(expected["score"], abs=1e-5)
+
+
+def test_incomplete_weights_fall_back_to_from_pretrained(checkpoint, tmp_path, monkeypatch):
+    # A checkpoint whose weights use other names than the model class
+    renamed = tmp_path / "renamed"
+    renamed.mkdir()
+    for path in checkpoint.iterdir():
+        (renamed / path.name).write_bytes(path.read_bytes())
+    state = safetensors_torch.load_file(str(checkpoint / "model.safetensors"))
+    state["classifier.bias_renamed"] = state.pop("classifier.bias")
+    safetensors_torch.save_file(state, str(renamed / "model.safetensors"), metadata={"format": "pt"})
+
+    loaded_from = []
+    load_pretrained = mood_models.MoodModelRegistry._load_pretrained
+    def spy(source):
+        loaded_from.append(source)
+        return load_pretrained(source)
+    monkeypatch.setattr(mood_models.MoodModelRegistry, "_load_pretrained", staticmethod(spy))
+
+    registry = _registry(checkpoint, monkeypatch, path=renamed)
+    registry.get("en")
+    assert loaded_from == [str(renamed)]
+
+    registry = _registry(checkpoint, monkeypatch)
+    registry.get("en")
+    assert loaded_from == [str(renamed)]
+
+
+def test_unloaded_keys_allow_buffers_and_tied_weights():
+    class Result:
+        missing_keys = ["embeddings.position_ids", "lm_head.weight", "classifier.weight"]
+        unexpected_keys = ["embeddings.position_ids", "pooler.dense.weight"]
+
+    class Model(torch.nn.Module):
+        _tied_weights_keys = ["lm_head.weight"]
+
+        def __init__(self):
+            super().__init__()
+            self.register_buffer("position_ids", torch.zeros(1), persistent=False)
+
+        def named_buffers(self):
+            return [("embeddings.position_ids", self.position_ids)]
+
+    assert mood_models._unloaded_keys(Model(), Result()) == ["classifier.weight", "pooler.dense.weight"]
+
+
+def test_loads_run_outside_the_registry_lock(monkeypatch):
+    models = {
+        "pt": {"checkpoint": "slow", "labels": LABELS},
+        "multilingual": {"checkpoint": "fast", "labels": LABELS},
+    }
+    registry = mood_models.MoodModelRegistry(models, memory_budget_mb=64)
+    release = threading.Event()
+    loads = []
+
+    class Classifier:
+        model = torch.nn.Linear(1, 1)
+
+    def load(checkpoint):
+        loads.append(checkpoint)
+        if checkpoint == "slow":
+            release.wait(5)
+        return Classifier()
+    monkeypatch.setattr(registry, "_load", load)
+
+    slow = [threading.Thread(target=registry.get, args=("pt",)) for _ in range(3)]
+    for thread in slow:
+        thread.start()
+    time.sleep(0.05)
+    # Another checkpoint loads while "slow" is still loading
+    started = time.monotonic()
+    registry.get("en")
+    assert time.monotonic() - started < 1
+    release.set()
+    for thread in slow:
+        thread.join()
+
+    # Concurrent requests for one checkpoint load it once
+    assert sorted(loads) == ["fast", "slow"]
+    assert sorted(registry.loaded()) == ["fast", "slow"]
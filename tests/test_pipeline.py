@@ -0,0 +1,89 @@
+import pytest
+
+pytest.importorskip("speech_recognition")
+pytest.importorskip("pyttsx3")
+
+from core import free_slots
+from voice.pipeline import LatencyTrace, VoicePipeline
+from voice.voice_input import VoiceInputError
+
+
+class FakeSpeech:
+    """Records what would be spoken and reports a fixed playing time."""
+
+    def __init__(self):
+        self.said = []
+
+    def say(self, text, done=None):
+        self.said.append(text)
+        if done:
+            done(0.5)
+
+
+class FakeRecognizer:
+    def __init__(self, text=None, confidence=0.9, error=None):
+        self.text, self.confidence, self.error = text, confidence, error
+
+    def capturar_audio(self, mostrar_feedback=True):
+        if self.error:
+            raise VoiceInputError(self.error)
+        return b"audio"
+
+    def reconhecer_audio(self, audio, mostrar_feedback=True):
+        return self.text, self.confidence
+
+
+@pytest.fixture
+def speech(db):
+    free_slots.invalidate()
+    yield FakeSpeech()
+    free_slots.invalidate()
+
+
+def test_spoken_command_is_carried_out_and_confirmed(speech):
+    pipeline = VoicePipeline(FakeRecognizer("add task call the bank at 10am"), speech, place=False)
+
+    outcome = pipeline.run()
+
+    assert outcome["ok"] and outcome["intent"] == "add_task"
+    assert speech.said == ["Task added: call the bank"]
+    trace = outcome["trace"].as_dict()
+    assert list(trace) == ["capture", "recognition", "parse", "action", "tts", "response_ms"]
+    assert trace["tts"] == 500.0
+    assert trace["response_ms"] < 500
+
+
+def test_low_confidence_is_rejected_without_acting(speech, db):
+    outcome = VoicePipeline(FakeRecognizer("add task call the bank", confidence=0.2), speech).run()
+
+    assert not outcome["ok"] and outcome["intent"] is None
+    with db.connect() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM tasks").fetchone()[0] == 0
+
+
+def test_recognition_errors_are_spoken(speech):
+    outcome = VoicePipeline(FakeRecognizer(error="No speech detected"), speech).run()
+
+    assert not outcome["ok"]
+    assert speech.said == ["Error: No speech detected"]
+
+
+def test_free_speech_can_fall_back_to_a_mood_entry(speech, monkeypatch):
+    import core.commands
+
+    monkeypatch.setattr(core.commands, "analyze_mood", lambda text: {
+        "original_text": text, "mood": "positive", "confidence": 0.9
+    })
+    outcome = VoicePipeline(FakeRecognizer("what a lovely afternoon"), speech).process_text(
+        "what a lovely afternoon", fallback_intent="analyze_mood"
+    )
+    assert outcome["intent"] == "analyze_mood"
+    assert speech.said == ["Your mood is positive"]
+
+
+def test_latency_trace_excludes_speech_from_the_response_time():
+    trace = LatencyTrace()
+    trace.record("capture", 0.1)
+    trace.record("tts", 2.0)
+    assert trace.response_ms == 100.0
+    assert str(trace) == "capture 100 ms · tts 2000 ms"
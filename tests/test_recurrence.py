@@ -0,0 +1,97 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from core import scheduler
+from core.recurrence import (
+    RecurrenceError, extract_recurrence, first_occurrence, format_rule, iter_occurrences, parse_rule
+)
+
+
+def test_parse_rule():
+    assert parse_rule("FREQ=WEEKLY;INTERVAL=2;BYDAY=WE,MO") == {
+        "freq": "WEEKLY", "interval": 2, "byday": [0, 2], "until": None
+    }
+    assert parse_rule("FREQ=DAILY;UNTIL=20261031T090000Z")["until"] == datetime(2026, 10, 31, 9)
+
+
+def test_date_only_until_includes_the_day():
+    assert parse_rule("FREQ=DAILY;UNTIL=20261031")["until"] == datetime(2026, 10, 31, 23, 59, 59)
+    occurrences = list(iter_occurrences("FREQ=DAILY;UNTIL=20261022", datetime(2026, 10, 20, 18),
+                                        datetime(2026, 10, 1), datetime(2026, 12, 1)))
+    assert [o.day for o in occurrences] == [20, 21, 22]
+
+
+@pytest.mark.parametrize("rule", [
+    "FREQ=YEARLY", "FREQ=DAILY;INTERVAL=0", "FREQ=DAILY;INTERVAL=x", "FREQ=WEEKLY;BYDAY=XX",
+    "FREQ=DAILY;UNTIL=2026-10-31", "FREQ=DAILY;UNTIL=20261331", "WEEKLY",
+    # Parts that would change the series if ignored
+    "FREQ=DAILY;COUNT=3", "FREQ=MONTHLY;BYMONTHDAY=15", "FREQ=WEEKLY;FOO=1", "FREQ=MONTHLY;BYDAY=MO",
+])
+def test_invalid_rules_raise_recurrence_error(rule):
+    with pytest.raises(RecurrenceError):
+        parse_rule(rule)
+
+
+def test_format_rule_round_trips():
+    rule = format_rule("WEEKLY", 2, byday=[4, 0], until=datetime(2026, 12, 1, 9))
+    assert rule == "FREQ=WEEKLY;INTERVAL=2;BYDAY=MO,FR;UNTIL=20261201T090000"
+    assert parse_rule(rule)["byday"] == [0, 4]
+
+
+def test_weekly_expansion_in_a_window():
+    dtstart = datetime(2026, 10, 5, 9)  # Monday
+    occurrences = list(iter_occurrences("FREQ=WEEKLY;INTERVAL=2;BYDAY=MO,TH", dtstart,
+                                        datetime(2026, 10, 12), datetime(2026, 11, 3)))
+    assert occurrences == [datetime(2026, 10, 19, 9), datetime(2026, 10, 22, 9), datetime(2026, 11, 2, 9)]
+
+
+def test_monthly_skips_short_months():
+    occurrences = list(iter_occurrences("FREQ=MONTHLY", datetime(2026, 1, 31, 8),
+                                        datetime(2026, 1, 1), datetime(2026, 6, 1)))
+    assert [o.month for o in occurrences] == [1, 3, 5]
+
+
+def test_expansion_jumps_to_the_window():
+    dtstart = datetime(2000, 1, 3, 7)
+    start = datetime(2026, 10, 19)
+    assert list(iter_occurrences("FREQ=DAILY", dtstart, start, start + timedelta(days=2))) == [
+        datetime(2026, 10, 19, 7), datetime(2026, 10, 20, 7)
+    ]
+    assert first_occurrence("FREQ=WEEKLY;BYDAY=FR", dtstart, after=start) == datetime(2026, 10, 23, 7)
+
+
+@pytest.mark.parametrize("text, rule", [
+    ("gym every monday at 7", "FREQ=WEEKLY;BYDAY=MO"),
+    ("standup every weekday at 9am", "FREQ=WEEKLY;BYDAY=MO,TU,WE,TH,FR"),
+    ("review every 2 weeks on fri", "FREQ=WEEKLY;INTERVAL=2;BYDAY=FR"),
+    ("water plants every day", "FREQ=DAILY"),
+    ("call mom tomorrow", None),
+])
+def test_extract_recurrence(text, rule):
+    assert extract_recurrence(text) == rule
+
+
+def test_occurrences_are_indexed_lazily(db):
+    rule_id = scheduler.add_recurring_task("Gym", "FREQ=WEEKLY;BYDAY=MO,WE", "2026-10-05T07:00:00")
+    week = scheduler.list_occurrences(datetime(2026, 10, 19), datetime(2026, 10, 26))
+    assert [row[2] for row in week] == ["2026-10-19T07:00:00", "2026-10-21T07:00:00"]
+
+    scheduler.mark_occurrence_done(rule_id, "2026-10-19T07:00:00")
+    two_weeks = scheduler.list_occurrences(datetime(2026, 10, 12), datetime(2026, 10, 26))
+    assert [row[2] for row in two_weeks] == ["2026-10-12T07:00:00", "2026-10-14T07:00:00", "2026-10-21T07:00:00"]
+
+    with db.connect() as conn:
+        indexed = conn.execute("SELECT indexed_from, indexed_until FROM recurring_tasks").fetchone()
+    assert indexed == ("2026-10-12T00:00:00", "2026-10-26T00:00:00")
+
+    scheduler.delete_recurring_task(rule_id)
+    assert scheduler.list_occurrences(datetime(2026, 10, 12), datetime(2026, 10, 26)) == []
+
+
+def test_create_tables_keeps_existing_data(db):
+    scheduler.add_task("Keep me")
+    scheduler.add_recurring_task("Gym", "FREQ=DAILY", "2026-10-05T07:00:00")
+    db.create_tables()
+    assert [task.title for task in scheduler.list_tasks()] == ["Keep me"]
+    assert len(scheduler.list_occurrences(datetime(2026, 10, 19), datetime(2026, 10, 20))) == 1
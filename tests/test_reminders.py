@@ -0,0 +1,138 @@
+import queue
+from datetime import datetime, timedelta
+
+import pytest
+
+from core import reminders, scheduler
+
+START = datetime(2026, 10, 19, 9, 0)
+
+
+class Clock(datetime):
+    """datetime whose now() is set by the test."""
+    current = START
+
+    @classmethod
+    def now(cls, tz=None):
+        return cls.current
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    Clock.current = START
+    monkeypatch.setattr(reminders, "datetime", Clock)
+    return Clock
+
+
+@pytest.fixture
+def fired():
+    return queue.Queue()
+
+
+@pytest.fixture
+def daemon(db, clock, fired):
+    daemons = []
+    def start(**kwargs):
+        daemon = reminders.ReminderDaemon(callback=fired.put, **kwargs)
+        daemon.start()
+        daemons.append(daemon)
+        return daemon
+    yield start
+    for daemon in daemons:
+        daemon.stop()
+        daemon.join(timeout=2)
+
+
+def _advance(daemon, clock, delta):
+    clock.current += delta
+    with daemon._condition:
+        daemon._condition.notify()
+
+
+def test_fires_when_due(daemon, clock, fired):
+    task_id = scheduler.add_task("Stretch", (START + timedelta(minutes=10)).isoformat())
+    running = daemon(lead_time=timedelta(minutes=5))
+    assert running.pending_reminders() == 1
+
+    _advance(running, clock, timedelta(minutes=4))
+    with pytest.raises(queue.Empty):
+        fired.get(timeout=0.2)
+
+    _advance(running, clock, timedelta(minutes=1))
+    assert fired.get(timeout=2) == {"task_id": task_id, "title": "Stretch", "due": START + timedelta(minutes=10)}
+
+
+def test_tasks_added_after_start_arrive_through_the_listener(daemon, clock, fired):
+    running = daemon()
+    task_id = scheduler.add_task("Call", (START + timedelta(minutes=1)).isoformat())
+    done_id = scheduler.add_task("Done", (START + timedelta(minutes=1)).isoformat())
+    scheduler.mark_task_done(done_id)
+
+    _advance(running, clock, timedelta(minutes=2))
+    assert fired.get(timeout=2)["task_id"] == task_id
+    with pytest.raises(queue.Empty):
+        fired.get(timeout=0.2)
+
+
+def test_late_wake_fires_due_reminders_before_reloading(daemon, clock, fired):
+    scheduler.add_task("Meeting", (START + timedelta(minutes=30)).isoformat())
+    running = daemon(refresh_interval=timedelta(hours=1))
+
+    # The thread wakes after both the reminder and the refresh are due
+    _advance(running, clock, timedelta(hours=2))
+    assert fired.get(timeout=2)["title"] == "Meeting"
+
+
+def test_occurrence_reminders_carry_the_rule(daemon, clock, fired):
+    rule_id = scheduler.add_recurring_task("Pills", "FREQ=DAILY", "2026-10-01T09:05:00")
+    running = daemon()
+
+    _advance(running, clock, timedelta(minutes=5))
+    assert fired.get(timeout=2) == {
+        "task_id": None, "rule_id": rule_id, "occurs_at": "2026-10-19T09:05:00",
+        "title": "Pills", "due": START + timedelta(minutes=5),
+    }
+
+
+def test_recurring_writes_after_start_arrive_through_the_listener(daemon, clock, fired):
+    running = daemon()
+    added = scheduler.add_recurring_task("Pills", "FREQ=DAILY", "2026-10-01T09:05:00")
+    deleted = scheduler.add_recurring_task("Walk", "FREQ=DAILY", "2026-10-01T09:06:00")
+    done = scheduler.add_recurring_task("Water", "FREQ=DAILY", "2026-10-01T09:07:00")
+    assert running.pending_reminders() == 3
+
+    scheduler.delete_recurring_task(deleted)
+    scheduler.mark_occurrence_done(done, "2026-10-19T09:07:00")
+    assert running.pending_reminders() == 1
+
+    _advance(running, clock, timedelta(minutes=10))
+    assert fired.get(timeout=2)["rule_id"] == added
+    with pytest.raises(queue.Empty):
+        fired.get(timeout=0.2)
+
+
+def test_reload_keeps_tasks_changed_while_reading(db, clock, fired, monkeypatch):
+    kept_id = scheduler.add_task("Kept", (START + timedelta(hours=3)).isoformat())
+    moved_id = scheduler.add_task("Moved", (START + timedelta(hours=4)).isoformat())
+    daemon = reminders.ReminderDaemon(callback=fired.put)
+    scheduler.add_task_listener(daemon._on_task_event)
+
+    list_occurrences = scheduler.list_occurrences
+    added = []
+    def write_while_loading(*args, **kwargs):
+        # Runs after the tasks were read: these writes are not in that read
+        added.append(scheduler.add_task("New", (START + timedelta(hours=2)).isoformat()))
+        scheduler.reschedule_tasks([(moved_id, "Moved", (START + timedelta(hours=5)).isoformat())])
+        return list_occurrences(*args, **kwargs)
+    monkeypatch.setattr(reminders.scheduler, "list_occurrences", write_while_loading)
+    try:
+        daemon._load(START)
+    finally:
+        scheduler.remove_task_listener(daemon._on_task_event)
+
+    due = {key[1]: entry[4] for key, entry in daemon._entries.items()}
+    assert due == {
+        kept_id: START + timedelta(hours=3),
+        moved_id: START + timedelta(hours=5),
+        added[0]: START + timedelta(hours=2),
+    }
@@ -0,0 +1,94 @@
+import os
+from datetime import datetime
+
+import pytest
+
+from core import free_slots, mood_analytics, scheduler
+from core.calendar_sync import CalendarSyncEngine, FakeCalendarBackend
+from data import archive, fulltext, repository, transfer
+from data.repository import InMemoryBackend, SQLiteBackend, StorageBackend, Task, UnsupportedBackendError
+
+
+@pytest.fixture(params=["sqlite", "memory"])
+def backend(request, db):
+    backend = SQLiteBackend() if request.param == "sqlite" else InMemoryBackend()
+    repository.set_backend(backend)
+    yield backend
+    repository.set_backend(None)
+
+
+@pytest.fixture
+def memory(db):
+    repository.set_backend(InMemoryBackend())
+    yield db
+    repository.set_backend(None)
+
+
+def test_interface_is_abstract():
+    with pytest.raises(TypeError):
+        StorageBackend()
+
+    class Partial(StorageBackend):
+        def add_task(self, user_id, title, date_time=None):
+            pass
+    with pytest.raises(TypeError):
+        Partial()
+
+
+def test_task_lifecycle(backend):
+    first = backend.add_task("ana", "Write", "2026-10-19T10:00:00")
+    second, third = backend.add_tasks("ana", [("Read", "2026-10-19T11:00:00"), ("Walk", None)])
+    backend.add_task("bob", "Other user")
+
+    assert backend.get_task("ana", first.id) == Task(first.id, "ana", "Write", "2026-10-19T10:00:00")
+    assert backend.get_task("bob", first.id) is None
+    assert {task.title for task in backend.list_tasks("ana")} == {"Write", "Read", "Walk"}
+    assert [task.title for task in backend.list_tasks("ana", due_from="2026-10-19T10:30:00")] == ["Read"]
+
+    backend.set_task_status("ana", first.id, "done")
+    backend.set_task_datetimes("ana", [(second.id, "2026-10-20T09:00:00")])
+    backend.delete_task("ana", third.id)
+    assert [task.title for task in backend.list_tasks("ana", status="done")] == ["Write"]
+    assert [task.title for task in backend.list_tasks("ana")] == ["Read"]
+    assert backend.pending_load("ana", "2026-10-19") == 0
+    assert backend.pending_load("ana", "2026-10-20") == 1
+
+
+def test_mood_totals(backend):
+    backend.add_mood("ana", "2026-10-18 22:00", "tired", "negative (50%)")
+    latest = backend.add_mood("ana", "2026-10-19 09:00", "good", "positive (90%)")
+
+    assert backend.recent_moods("ana", limit=1) == [latest]
+    assert latest.label == "positive" and latest.score == pytest.approx(0.9)
+    assert backend.mood_totals("ana", "2026-10-19") == (pytest.approx(0.9), 1)
+    assert backend.slot_totals("ana", 0, 22) == (pytest.approx(-0.5), 1)  # Sunday
+
+
+def test_returned_moods_are_copies(backend):
+    mood = backend.add_mood("ana", "2026-10-19 09:00", "good", "positive (90%)")
+    mood.description = "changed"
+    backend.recent_moods("ana")[0].classification = "negative (90%)"
+    assert [(m.description, m.classification) for m in backend.recent_moods("ana")] == [("good", "positive (90%)")]
+
+
+def test_features_that_query_sqlite_refuse_the_memory_backend(memory, tmp_path):
+    refused = [
+        lambda: CalendarSyncEngine(FakeCalendarBackend()),
+        lambda: scheduler.add_recurring_task("Gym", "FREQ=DAILY", "2026-10-19T07:00:00"),
+        lambda: scheduler.list_occurrences(datetime(2026, 10, 19), datetime(2026, 10, 20)),
+        lambda: fulltext.search("gym"),
+        lambda: mood_analytics.get_mood_analytics(),
+        lambda: archive.archive_old_data(),
+        lambda: transfer.export_user(str(tmp_path / "export")),
+    ]
+    for call in refused:
+        with pytest.raises(UnsupportedBackendError):
+            call()
+
+
+def test_memory_backend_never_touches_sqlite(memory):
+    free_slots.schedule_task("Write report", "2026-10-19T10:00:00")
+    result = free_slots.schedule_task("Write the report", "2026-10-19T11:00:00")
+    assert [task["title"] for task in result["duplicates"]] == ["Write report"]
+    scheduler.delete_task(result["id"])
+    assert not os.path.exists(memory.DB_PATH)
@@ -0,0 +1,113 @@
+import zlib
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+from core import scheduler, semantic_search
+from core.moods import save_mood
+from data import archive
+
+DIM = 64
+
+
+def fake_embed(texts):
+    """Bag of words hashed into DIM dimensions, L2-normalized."""
+    vectors = np.zeros((len(texts), DIM), dtype=np.float32)
+    for row, text in enumerate(texts):
+        for word in text.lower().split():
+            vectors[row, zlib.crc32(word.encode()) % DIM] += 1
+    return vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+
+
+@pytest.fixture
+def index(db, tmp_path, monkeypatch):
+    index = semantic_search.EmbeddingIndex(directory=str(tmp_path / "search"), embed_fn=fake_embed)
+    monkeypatch.setitem(semantic_search._indexes, "default", index)
+    return index
+
+
+def _titles(results):
+    return [result["text"] for result in results]
+
+
+def test_finds_tasks_and_moods(index):
+    scheduler.add_task("buy milk")
+    scheduler.add_task("call the dentist")
+    save_mood("tired after the dentist", "negative", 0.7)
+
+    assert index.sync() == {"task": 2, "mood": 1}
+    assert index.sync() == {"task": 0, "mood": 0}
+    results = index.search("dentist", k=2)
+    assert sorted(_titles(results)) == ["call the dentist", "tired after the dentist"]
+    assert set(results[0]) == {"kind", "ref_id", "text", "score"}
+    assert _titles(index.search("dentist", kinds=["mood"])) == ["tired after the dentist"]
+
+
+def test_edited_titles_are_embedded_again(index, db):
+    task_id = scheduler.add_task("buy milk")
+    index.sync()
+    with db.connect() as conn:
+        conn.execute("UPDATE tasks SET title = 'buy bread' WHERE id = ?", (task_id,))
+        conn.commit()
+
+    assert index.sync()["task"] == 1
+    assert _titles(index.search("bread", k=5)) == ["buy bread"]
+    assert index.search("milk", k=5)[0]["score"] < 0.9
+
+
+def test_removed_tasks_and_moods_leave_the_index(index, db):
+    kept = scheduler.add_task("water the plants")
+    deleted = scheduler.add_task("water the garden")
+    done = scheduler.add_task("water bill")
+    save_mood("old water mood", "neutral", 0.5, date=datetime(2026, 1, 1, 9))
+    index.sync()
+
+    scheduler.delete_task(deleted)
+    assert "water the garden" not in _titles(index.search("water", k=10))
+
+    # Archiving removes rows without going through the scheduler
+    scheduler.mark_task_done(done)
+    with db.connect() as conn:
+        conn.execute("UPDATE tasks SET updated_at = '2026-01-02T00:00:00.000Z' WHERE id = ?", (done,))
+        conn.commit()
+    archive.archive_old_data(days=90, now=datetime(2026, 10, 19))
+    index.sync()
+    assert _titles(index.search("water", k=10)) == ["water the plants"]
+    assert index.search("water", k=10)[0]["ref_id"] == str(kept)
+
+
+def test_items_removed_elsewhere_are_skipped(index, db):
+    for i in range(5):
+        scheduler.add_task(f"report {i}")
+    index.sync()
+    # Another process deactivates items behind the index's back
+    with db.connect() as conn:
+        conn.execute("UPDATE search_items SET active = 0 WHERE text IN ('report 0', 'report 1')")
+        conn.commit()
+    assert sorted(_titles(index.search("report", k=10))) == ["report 2", "report 3", "report 4"]
+
+
+def test_large_k_stays_under_the_variable_limit(index, db, monkeypatch):
+    monkeypatch.setattr(semantic_search, "SYNC_BATCH", 2000)
+    scheduler.add_tasks([(f"task number {i}", None) for i in range(1500)])
+    index.sync()
+    assert len(index.search("task", k=1200)) == 1200
+
+
+def test_reopened_index_keeps_removed_rows_out(index, db, tmp_path):
+    scheduler.add_task("pay rent")
+    other = scheduler.add_task("pay taxes")
+    index.sync()
+    scheduler.delete_task(other)
+
+    reopened = semantic_search.EmbeddingIndex(directory=str(tmp_path / "search"), embed_fn=fake_embed)
+    assert _titles(reopened.search("pay", k=5)) == ["pay rent"]
+
+
+def test_changes_query_uses_the_index(db):
+    with db.connect() as conn:
+        plan = conn.execute(
+            "EXPLAIN QUERY PLAN " + semantic_search.TASK_CHANGES, ("default", "", "", 0, 10)
+        ).fetchall()
+    assert "idx_tasks_user_updated" in " ".join(str(step) for step in plan)
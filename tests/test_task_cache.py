@@ -0,0 +1,82 @@
+import sqlite3
+
+import pytest
+
+from core import scheduler, task_cache
+
+
+@pytest.fixture
+def cache(db):
+    scheduler.add_task("call the bank", "2030-01-07T10:00:00")
+    scheduler.add_task("buy milk")
+    cache = task_cache.get_task_cache()
+    loads = []
+    original = cache._load
+    cache._load = lambda: (loads.append(1), original())
+    cache.loads = loads
+    yield cache
+    task_cache.invalidate()
+
+
+def write_elsewhere(db, sql):
+    """Runs a write on a connection of its own, like another process using the same file."""
+    conn = sqlite3.connect(db.database_path())
+    with conn:
+        conn.execute(sql)
+    conn.close()
+
+
+def titles(cache):
+    return [view.title for view in cache.tasks()]
+
+
+def test_scheduler_events_are_applied_without_reloading(cache):
+    task_id = scheduler.add_task("dentist", "2030-01-08T09:00:00")
+    scheduler.reschedule_tasks([(task_id, "dentist", "2030-01-09T09:00:00")])
+    scheduler.mark_task_done(cache.tasks()[0].id)
+
+    assert titles(cache) == ["buy milk", "dentist"]
+    assert cache.tasks()[1].when == "Wednesday, January 09 at 09:00 AM"
+    assert cache.has_untimed()
+    assert cache.loads == []
+
+
+def test_writes_from_another_connection_are_picked_up(cache, db):
+    assert len(cache) == 2
+    write_elsewhere(db, "INSERT INTO tasks (user_id, title, datetime) VALUES ('default', 'from the api', '2030-01-08T09:00:00')")
+    assert titles(cache) == ["call the bank", "buy milk", "from the api"]
+
+    write_elsewhere(db, "UPDATE tasks SET status = 'done' WHERE title = 'buy milk'")
+    assert titles(cache) == ["call the bank", "from the api"]
+    assert not cache.has_untimed()
+    assert len(cache.loads) == 2
+
+
+def test_a_write_missed_between_events_forces_a_reload(cache, db):
+    write_elsewhere(db, "DELETE FROM tasks WHERE title = 'call the bank'")
+    # The event's own change is not the only one since the last check
+    scheduler.add_task("dentist")
+
+    assert titles(cache) == ["buy milk", "dentist"]
+    assert len(cache.loads) == 1
+
+
+def test_unchanged_database_is_checked_with_data_version_only(cache, db, monkeypatch):
+    queries = []
+    original = cache._read_version
+    monkeypatch.setattr(cache, "_read_version", lambda: (queries.append(1), original())[1])
+    cache.tasks()
+    cache.tasks()
+    assert queries == []
+
+    # Calendar sync bookkeeping commits, but does not change what is shown
+    write_elsewhere(db, "UPDATE tasks SET event_id = 'evt1', synced_version = version")
+    assert titles(cache) == ["call the bank", "buy milk"]
+    assert queries == [1]
+    assert cache.loads == []
+
+
+def test_other_users_do_not_invalidate_the_cache(cache):
+    scheduler.add_task("someone else's", user_id="u2")
+    assert titles(cache) == ["call the bank", "buy milk"]
+    assert cache.loads == []
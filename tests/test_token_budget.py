@@ -0,0 +1,85 @@
+import pytest
+
+from core import token_budget
+
+MODEL = "gpt-3.5-turbo"
+
+
+@pytest.fixture
+def estimated(monkeypatch):
+    """Counts with the character/word estimate, whether or not tiktoken is installed."""
+    monkeypatch.setitem(token_budget._encodings, MODEL, None)
+
+
+def test_estimate_without_tiktoken(estimated):
+    assert token_budget.count_tokens("a" * 40, MODEL) == 10
+    assert token_budget.count_tokens("a b c d e f", MODEL) == 8
+    assert token_budget.count_message_tokens([{"content": "a" * 40}], MODEL) == 3 + 4 + 10
+
+
+def test_truncate_keeps_whole_words_within_budget(estimated):
+    text = " ".join(f"word{i}" for i in range(200))
+    cut = token_budget.truncate_to_tokens(text, 50, MODEL)
+    assert token_budget.count_tokens(cut, MODEL) <= 50
+    assert text.startswith(cut) and cut.split()[-1] in text.split()
+    assert token_budget.truncate_to_tokens(text, 0, MODEL) == ""
+
+
+def test_truncate_cuts_a_single_long_word(estimated):
+    cut = token_budget.truncate_to_tokens("x" * 4000, 300, MODEL)
+    assert len(cut) == 1200 and token_budget.count_tokens(cut, MODEL) <= 300
+
+
+def test_clean_email_drops_signature_footer_and_disclaimer():
+    email = (
+        "Hi Ana,\r\n\r\nPlease   send the budget by Friday.\r\n\r\n"
+        "Thanks,\r\nJoão Silva\r\nHead of Finance\r\n+55 11 5555-0000\r\n"
+        "Sent from my iPhone\r\n\r\n"
+        "This message is confidential and intended solely for the addressee."
+    )
+    assert token_budget.clean_email(email) == "Hi Ana,\n\nPlease send the budget by Friday."
+    assert token_budget.clean_email("Lunch?\n-- \nBob") == "Lunch?"
+    # A sign-off far from the end is part of the message
+    assert token_budget.clean_email("Thanks,\n" + "\n".join(["more"] * 10)).startswith("Thanks,")
+
+
+def test_output_budget_grows_with_input_within_bounds():
+    assert token_budget.output_budget(100, 300) == 60
+    assert token_budget.output_budget(500, 300) == 150
+    assert token_budget.output_budget(5000, 300) == 300
+    assert token_budget.output_budget(100, 40) == 40
+
+
+def test_fit_messages_cuts_the_last_message(estimated):
+    messages = [{"role": "system", "content": "Summarize."}, {"role": "user", "content": "x" * 4000}]
+
+    fitted, max_tokens, budget = token_budget.fit_messages(messages, MODEL, 200, max_input_tokens=300)
+
+    assert fitted[0] == messages[0]
+    assert token_budget.count_tokens(fitted[1]["content"], MODEL) <= 300
+    assert budget["trimmed_tokens"] == 1000 - token_budget.count_tokens(fitted[1]["content"], MODEL)
+    assert max_tokens == 200
+
+
+def test_fit_messages_respects_the_context_window(estimated, monkeypatch):
+    monkeypatch.setitem(token_budget.MODEL_CONTEXT_TOKENS, "tiny-model", 500)
+    monkeypatch.setitem(token_budget._encodings, "tiny-model", None)
+    messages = [{"role": "user", "content": "x" * 4000}]
+
+    _, max_tokens, budget = token_budget.fit_messages(messages, "tiny-model", 200)
+
+    assert budget["prompt_tokens"] + max_tokens <= 500
+    assert token_budget.context_tokens("gpt-4o-mini") == 128000
+    assert token_budget.context_tokens("unknown") == token_budget.DEFAULT_CONTEXT_TOKENS
+
+
+def test_usage_is_recorded_and_summarized(db):
+    token_budget.record_usage(MODEL, "summarize", 120, 118, 40, max_tokens=60, latency_ms=800)
+    token_budget.record_usage(MODEL, "summarize", 80, 82, 30, max_tokens=60, trimmed_tokens=5, latency_ms=600)
+    token_budget.record_usage(MODEL, "action_items", 50, None, None, user_id="u2")
+
+    assert token_budget.usage_summary() == [{
+        "operation": "summarize", "model": MODEL, "calls": 2, "prompt_tokens": 200, "completion_tokens": 70,
+        "estimated_prompt_tokens": 200, "trimmed_tokens": 5, "avg_latency_ms": 700.0,
+    }]
+    assert token_budget.usage_summary(user_id="u2")[0]["prompt_tokens"] == 0
@@ -0,0 +1,77 @@
+import json
+from datetime import datetime
+
+import pytest
+
+from core import scheduler, task_cache
+from core.moods import save_mood
+from data import archive, transfer
+
+NOW = datetime(2026, 10, 19, 12, 0)
+
+
+@pytest.fixture
+def archived(db):
+    for day in range(1, 6):
+        save_mood(f"old {day}", "positive", 0.8, date=datetime(2026, 6, day, 9))
+    save_mood("recent", "negative", 0.6, date=datetime(2026, 10, 18, 9))
+    done = scheduler.add_task("old report", "2026-06-01T09:00:00")
+    scheduler.mark_task_done(done)
+    scheduler.add_task("pending", "2026-11-01T09:00:00")
+    with db.connect() as conn:
+        conn.execute("UPDATE tasks SET updated_at = '2026-06-02T00:00:00.000Z' WHERE status = 'done'")
+        conn.commit()
+    archive.archive_old_data(days=90, now=NOW, batch_size=2)
+    return db
+
+
+@pytest.mark.parametrize("fmt", ["jsonl", "csv", "parquet"])
+def test_export_includes_archived_rows(archived, tmp_path, fmt):
+    counts = transfer.export_user(str(tmp_path / "export"), fmt, chunk_size=2)
+    assert counts == {"tasks": 2, "moods": 6, "interactions": 0}
+
+
+def test_export_skips_rows_both_archived_and_live(archived, tmp_path):
+    # An archive run stopped between writing its part and deleting the rows
+    with archived.connect() as conn:
+        conn.execute(
+            "INSERT INTO moods (id, user_id, date, description, classification) "
+            "VALUES (1, 'default', '2026-06-01 09:00', 'old 1', 'positive')"
+        )
+        conn.commit()
+    path = tmp_path / "moods.jsonl"
+    assert transfer.export_table("moods", str(path)) == 6
+    ids = [json.loads(line)["id"] for line in path.read_text().splitlines()]
+    assert sorted(ids) == sorted(set(ids))
+
+
+def test_round_trip_notifies_listeners(archived, tmp_path):
+    transfer.export_user(str(tmp_path / "export"))
+    events = []
+    listener = lambda event, task_id, title, date_time, user_id: events.append((event, title, user_id))
+    scheduler.add_task_listener(listener)
+    try:
+        cache = task_cache.get_task_cache("u2")
+        assert len(cache) == 0
+        counts = transfer.import_user(str(tmp_path / "export"), user_id="u2",
+                                      notify=scheduler.notify_task_listeners)
+    finally:
+        scheduler.remove_task_listener(listener)
+
+    assert counts == {"tasks": 2, "moods": 6, "interactions": 0}
+    # Only pending tasks reach the listeners; the archived done one is imported as done
+    assert events == [("added", "pending", "u2")]
+    assert [view.title for view in cache.tasks()] == ["pending"]
+    task_cache.invalidate("u2")
+    with archived.connect("u2") as conn:
+        assert conn.execute("SELECT title, status FROM tasks WHERE user_id = 'u2' ORDER BY id").fetchall() == [
+            ("old report", "done"), ("pending", "pending")
+        ]
+
+
+def test_csv_keeps_empty_required_fields_and_zeros(db, tmp_path):
+    path = tmp_path / "tasks.csv"
+    path.write_text("title,datetime,status\n,,pending\n0,,pending\n")
+    assert transfer.import_table("tasks", str(path))["imported"] == 2
+    with db.connect() as conn:
+        assert conn.execute("SELECT title, datetime FROM tasks ORDER BY id").fetchall() == [("", None), ("0", None)]
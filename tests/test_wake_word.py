@@ -0,0 +1,58 @@
+import os
+
+import numpy as np
+import pytest
+
+from voice import wake_word
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures", "wake_word")
+
+
+@pytest.fixture
+def detector():
+    # Synthetic recordings: the "wake word" is a fixed sequence of formant glides
+    return wake_word.WakeWordDetector.from_dir(os.path.join(FIXTURES, "templates"))
+
+
+def fixture(name):
+    return wake_word.read_wav(os.path.join(FIXTURES, name))
+
+
+def test_detects_the_wake_word_spoken_slower_and_faster(detector):
+    assert detector.detect(fixture("wake.wav")) == [1.52, 2.74]
+
+
+def test_ignores_other_words(detector):
+    assert detector.detect(fixture("other_words.wav")) == []
+    assert detector.last_distance > detector.threshold
+
+
+def test_resampled_stereo_recording_gives_the_same_detections(detector, tmp_path):
+    import wave
+
+    samples = fixture("wake.wav")
+    positions = np.arange(0, len(samples) - 1, wake_word.SAMPLE_RATE / 44100)
+    resampled = np.interp(positions, np.arange(len(samples)), samples)
+    path = str(tmp_path / "stereo.wav")
+    with wave.open(path, "wb") as f:
+        f.setnchannels(2)
+        f.setsampwidth(2)
+        f.setframerate(44100)
+        f.writeframes(np.repeat(resampled[:, None], 2, axis=1).astype("<i2").tobytes())
+
+    assert detector.detect(wake_word.read_wav(path)) == [1.52, 2.74]
+
+
+def test_noise_floor_follows_a_long_loud_background(detector):
+    rng = np.random.default_rng(0)
+    wake = fixture("wake.wav")
+    quiet = rng.normal(0, 80, wake_word.SAMPLE_RATE)
+    fan = rng.normal(0, 1000, 5 * wake_word.SAMPLE_RATE)
+    loud_wake = 2 * wake + rng.normal(0, 1000, len(wake))
+
+    detections = detector.detect(np.concatenate([quiet, fan, loud_wake]))
+
+    # The fan is dropped as a too-long segment and becomes the noise floor,
+    # so speech over it is still told apart
+    assert detector.noise_floor > 500
+    assert detections and detections[0] > 6
@@ -0,0 +1,382 @@
+import argparse
+import os
+import random
+import resource
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from tools.mock_services import Latency, MockCalendar, MockOpenAI
+
+# Simulated users drive the core modules in-process, the way Streamlit
+# sessions do (one thread each), against a throw-away database and local
+# stand-ins for OpenAI and Google Calendar. The app modules are imported
+# only once the run's data directory is set in the environment.
+
+COMMANDS = [
+    "add task call the bank at 10am",
+    "add task team meeting on friday at 2pm",
+    "create task dentist appointment on 12/11 at 9am",
+    "add task buy groceries at 6pm",
+    "create task review pull requests next monday at 11am",
+]
+JOURNAL = [
+    "I feel great today, the project is going well",
+    "I am tired and a bit stressed about the deadline",
+    "Estou muito feliz com o resultado de hoje",
+    "Hoje foi um dia cansativo",
+    "Feeling okay, nothing special happened",
+]
+EMAIL_SENTENCES = [
+    "Please review the attached budget before our meeting on Thursday.",
+    "The client asked for a revised timeline by the end of the month.",
+    "We need to confirm the venue for the offsite and send the invitations.",
+    "Let me know if you have questions about the new onboarding process.",
+    "The quarterly report is almost ready but still needs the sales figures.",
+    "Could you also check whether the contract renewal was signed?",
+]
+
+# Errors that mean a bug rather than load; any of them fails the run
+FATAL_ERRORS = {"TransactionInterleaved"}
+
+# Relative frequency of each action in a simulated session
+ACTIONS = {
+    "add_task": 3,
+    "list_tasks": 4,
+    "analyze_mood": 2,
+    "summarize_email": 1,
+    "calendar_list": 1,
+    "calendar_create": 1,
+}
+
+
+def _email():
+    # Long enough (> SHORT_EMAIL_WORDS) that most go to the hosted model
+    return " ".join(random.choice(EMAIL_SENTENCES) for _ in range(random.randint(8, 30)))
+
+
+class Recorder:
+    """Latencies and errors by action, shared by every simulated user."""
+
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(lambda: defaultdict(int))
+        self.routes = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def record(self, action, seconds, error=None):
+        with self._lock:
+            self.latencies[action].append(seconds)
+            if error is not None:
+                self.errors[action][error] += 1
+
+    def count_route(self, route):
+        with self._lock:
+            self.routes[route] += 1
+
+
+def _percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+def _rss_mb():
+    """Current resident set size in MB (Linux), or None elsewhere."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except (OSError, ValueError):
+        return None
+
+
+def failures(recorder):
+    """Count of each of the FATAL_ERRORS recorded, over all actions."""
+    counts = defaultdict(int)
+    for errors in recorder.errors.values():
+        for name, count in errors.items():
+            if name in FATAL_ERRORS:
+                counts[name] += count
+    return dict(counts)
+
+
+class WriteProbe(threading.Thread):
+    """
+    Samples how busy SQLite writers are without taking any lock: every
+    `interval` seconds it reads PRAGMA data_version on its own connection,
+    which changes when another connection committed in between. The share
+    of samples with a commit estimates how much of the time writers hold
+    the lock other processes (Streamlit, the API, batch jobs) would queue
+    on. The WAL file size shows whether checkpoints keep up.
+    """
+
+    def __init__(self, path, interval=0.01):
+        super().__init__(daemon=True)
+        self.path = path
+        self.interval = interval
+        self.samples = 0
+        self.busy = 0
+        self.wal_mb = 0.0
+        self.rss = []
+        self._stopped = threading.Event()
+
+    def run(self):
+        conn = sqlite3.connect(self.path, isolation_level=None)
+        version = conn.execute("PRAGMA data_version").fetchone()[0]
+        last_rss = 0.0
+        while not self._stopped.wait(self.interval):
+            current = conn.execute("PRAGMA data_version").fetchone()[0]
+            self.busy += current != version
+            version = current
+            self.samples += 1
+            if time.monotonic() - last_rss >= 0.5:
+                last_rss = time.monotonic()
+                self.rss.append(_rss_mb())
+                try:
+                    self.wal_mb = max(self.wal_mb, os.path.getsize(self.path + "-wal") / 2**20)
+                except OSError:
+                    pass
+        conn.close()
+
+    def stop(self):
+        self._stopped.set()
+        self.join()
+
+
+def configure(workdir, storage_mode="shared"):
+    """
+    Points the app's settings at `workdir` through the environment and
+    returns the data.database module. Settings are read when the app is
+    first imported, so this runs before any app module is loaded; a
+    process can run load tests against one data directory only.
+    """
+    settings = {
+        "DB_PATH": os.path.join(workdir, "load.db"),
+        "USER_DB_DIR": os.path.join(workdir, "users"),
+        "STORAGE_MODE": storage_mode,
+        "ARCHIVE_DIR": os.path.join(workdir, "archive"),
+        "SEARCH_INDEX_DIR": os.path.join(workdir, "search"),
+    }
+    if "config.settings" in sys.modules:
+        loaded = sys.modules["config.settings"]
+        mismatched = [name for name, value in settings.items() if getattr(loaded, name) != value]
+        if mismatched:
+            raise RuntimeError(
+                f"The app was already imported with other settings ({', '.join(mismatched)}); "
+                "run the load test in a new process"
+            )
+    os.environ.update(settings)
+    import data.database as database
+    return database
+
+
+class SimulatedUser(threading.Thread):
+    """One user session: `actions` random actions separated by think time."""
+
+    def __init__(self, user_id, recorder, actions, think_time, enabled, summarizer_factory):
+        super().__init__(daemon=True)
+        self.user_id = user_id
+        self.recorder = recorder
+        self.actions = actions
+        self.think_time = think_time
+        self.enabled = enabled
+        self.summarizer_factory = summarizer_factory
+
+    def run(self):
+        # Imported here so the settings of the run are already in place
+        from core.nlp import interpret_command
+        from core.scheduler import add_task, list_tasks
+        from core.emotion_analysis import analyze_mood
+        from core.calendar_integration import listar_eventos_google_calendar, criar_evento_google_calendar
+
+        weights = [ACTIONS[action] for action in self.enabled]
+        for _ in range(self.actions):
+            action = random.choices(self.enabled, weights)[0]
+            started = time.perf_counter()
+            error = None
+            try:
+                if action == "add_task":
+                    result = interpret_command(random.choice(COMMANDS))
+                    add_task(result["title"], result.get("datetime"), self.user_id)
+                elif action == "list_tasks":
+                    list_tasks(self.user_id)
+                elif action == "analyze_mood":
+                    result = analyze_mood(random.choice(JOURNAL))
+                    if "error" in result:
+                        error = "ModelError"
+                elif action == "summarize_email":
+                    result = self.summarizer_factory().summarize_email(_email())
+                    self.recorder.count_route(result["metadata"]["route"])
+                elif action == "calendar_list":
+                    listar_eventos_google_calendar(datetime.now(), datetime.now() + timedelta(days=7), 50)
+                elif action == "calendar_create":
+                    inicio = datetime.now().replace(second=0, microsecond=0) + timedelta(days=random.randint(1, 14))
+                    criar_evento_google_calendar(f"Load test {self.user_id}", inicio)
+            except Exception as e:
+                error = type(e).__name__
+                if isinstance(e, sqlite3.OperationalError) and "locked" in str(e):
+                    error = "DatabaseLocked"
+                elif isinstance(e, sqlite3.OperationalError) and "transaction" in str(e):
+                    # Two threads interleaving transactions on the same pooled connection
+                    error = "TransactionInterleaved"
+                elif "429" in str(e) or "Rate" in type(e).__name__:
+                    error = "RateLimited"
+            self.recorder.record(action, time.perf_counter() - started, error)
+            time.sleep(random.expovariate(1 / self.think_time) if self.think_time else 0)
+
+
+def _calendar_service_factory(base_url):
+    """
+    Google Calendar clients pointed at the mock server, one per thread
+    (the client and its httplib2 connection are not thread-safe).
+    """
+    import httplib2
+    from googleapiclient.discovery import build
+
+    local = threading.local()
+
+    def service():
+        if not hasattr(local, "service"):
+            local.service = build(
+                "calendar", "v3", http=httplib2.Http(timeout=30), static_discovery=True,
+                client_options={"api_endpoint": f"{base_url}/calendar/v3/"}
+            )
+        return local.service
+    return service
+
+
+class LeadSentencesBackend:
+    """Stand-in for the local summarization model: the email's first sentences."""
+    name = "lead-sentences"
+
+    def summarize(self, email_text, max_tokens, temperature, user_id=None):
+        return " ".join(email_text.split(". ")[:2])
+
+    def available(self):
+        return True
+
+
+def run(users=20, arrival_rate=2.0, actions=20, think_time=0.5, storage_mode="shared",
+        openai_latency=(800, 4000), openai_rate_limit=0.05,
+        calendar_latency=(150, 900), calendar_rate_limit=0.02,
+        skip=(), local_summary_model=False, data_dir=None):
+    """
+    Runs a load test and returns its report.
+
+    Users arrive as a Poisson process at `arrival_rate` users per second;
+    each runs `actions` random actions (weighted by ACTIONS) with
+    exponentially distributed think time. All data goes to `data_dir`
+    (default: a new temporary directory), and OpenAI and Google Calendar
+    are replaced by local mock servers with log-normal latency (median,
+    p99 in ms) and a 429 rate. The report's `failures` counts the
+    FATAL_ERRORS seen; the run failed when it is not empty.
+    """
+    workdir = data_dir or tempfile.mkdtemp(prefix="smartroutine-load-")
+    database = configure(workdir, storage_mode)
+    database.create_tables()
+
+    enabled = [action for action in ACTIONS if action not in skip]
+    recorder = Recorder()
+
+    with MockOpenAI(Latency(*openai_latency), openai_rate_limit) as openai_mock, \
+            MockCalendar(Latency(*calendar_latency), calendar_rate_limit) as calendar_mock:
+        os.environ["OPENAI_API_KEY"] = "sk-load-test"
+        os.environ["OPENAI_BASE_URL"] = f"{openai_mock.url}/v1"
+
+        from core import calendar_integration
+        from core.email_summary import EmailSummarizer, LocalBackend
+        calendar_integration.autenticar_google_calendar = _calendar_service_factory(calendar_mock.url)
+        local_backend = LocalBackend() if local_summary_model else LeadSentencesBackend()
+        summarizer_factory = lambda: EmailSummarizer(local_backend=local_backend)
+
+        # In sharded mode this watches the first user's file
+        probe = WriteProbe(database.database_path("load0"))
+        probe.start()
+        started = time.monotonic()
+        threads = []
+        for index in range(users):
+            user = SimulatedUser(f"load{index}", recorder, actions, think_time, enabled, summarizer_factory)
+            user.start()
+            threads.append(user)
+            time.sleep(random.expovariate(arrival_rate))
+        for user in threads:
+            user.join()
+        elapsed = time.monotonic() - started
+        probe.stop()
+        services = {"openai": dict(openai_mock.stats), "calendar": dict(calendar_mock.stats)}
+
+    report = {
+        "users": users,
+        "seconds": round(elapsed, 2),
+        "operations": sum(len(values) for values in recorder.latencies.values()),
+        "actions": {},
+        "summary_routes": dict(recorder.routes),
+        "services": services,
+        "write_busy_ratio": round(probe.busy / probe.samples, 4) if probe.samples else None,
+        "wal_peak_mb": round(probe.wal_mb, 1),
+        "rss_mb": {
+            "peak": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+            "last": round(probe.rss[-1], 1) if probe.rss and probe.rss[-1] else None,
+        },
+        "database_dir": workdir,
+    }
+    report["throughput"] = round(report["operations"] / elapsed, 2)
+    for action, values in recorder.latencies.items():
+        report["actions"][action] = {
+            "count": len(values),
+            "p50_ms": round(_percentile(values, 0.50) * 1000, 1),
+            "p90_ms": round(_percentile(values, 0.90) * 1000, 1),
+            "p99_ms": round(_percentile(values, 0.99) * 1000, 1),
+            "max_ms": round(max(values) * 1000, 1),
+            "errors": dict(recorder.errors[action]),
+        }
+    report["failures"] = failures(recorder)
+    return report
+
+
+def print_report(report):
+    print(f"{report['users']} users, {report['operations']} operations in {report['seconds']}s "
+          f"({report['throughput']} ops/s)")
+    print(f"{'action':<16}{'count':>7}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}{'max ms':>10}  errors")
+    for action, stats in sorted(report["actions"].items()):
+        errors = ", ".join(f"{name}={count}" for name, count in stats["errors"].items()) or "-"
+        print(f"{action:<16}{stats['count']:>7}{stats['p50_ms']:>10}{stats['p90_ms']:>10}"
+              f"{stats['p99_ms']:>10}{stats['max_ms']:>10}  {errors}")
+    if report["summary_routes"]:
+        print("Summary routes:", ", ".join(f"{route}={count}" for route, count in report["summary_routes"].items()))
+    for name, stats in report["services"].items():
+        print(f"Mock {name}: {stats['requests']} requests, {stats['rate_limited']} rate limited")
+    busy = report["write_busy_ratio"]
+    busy = f"a commit in {busy:.1%} of samples" if busy is not None else "not sampled"
+    print(f"SQLite writes: {busy}, WAL peak {report['wal_peak_mb']} MB")
+    print(f"RSS: peak {report['rss_mb']['peak']} MB, last {report['rss_mb']['last']} MB")
+    if report["failures"]:
+        print("FAILED:", ", ".join(f"{name}={count}" for name, count in report["failures"].items()))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load test the core modules with simulated users.")
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--arrival-rate", type=float, default=2.0, help="New users per second")
+    parser.add_argument("--actions", type=int, default=20, help="Actions per user session")
+    parser.add_argument("--think-time", type=float, default=0.5, help="Mean seconds between a user's actions")
+    parser.add_argument("--storage-mode", choices=["shared", "sharded"], default="shared")
+    parser.add_argument("--openai-latency", type=float, nargs=2, default=(800, 4000), metavar=("MEDIAN_MS", "P99_MS"))
+    parser.add_argument("--openai-429", type=float, default=0.05, help="Fraction of OpenAI requests rejected")
+    parser.add_argument("--calendar-latency", type=float, nargs=2, default=(150, 900), metavar=("MEDIAN_MS", "P99_MS"))
+    parser.add_argument("--calendar-429", type=float, default=0.02, help="Fraction of Calendar requests rejected")
+    parser.add_argument("--skip", nargs="*", default=[], choices=list(ACTIONS), help="Actions left out")
+    parser.add_argument("--local-summary-model", action="store_true",
+                        help="Use the real local summarization model for fallbacks (slow to load)")
+    parser.add_argument("--data-dir", help="Directory for the run's databases (default: a new temporary one)")
+    args = parser.parse_args()
+
+    report = run(
+        args.users, args.arrival_rate, args.actions, args.think_time, args.storage_mode,
+        tuple(args.openai_latency), args.openai_429, tuple(args.calendar_latency), args.calendar_429,
+        set(args.skip), args.local_summary_model, args.data_dir
+    )
+    print_report(report)
+    sys.exit(1 if report["failures"] else 0)
@@ -0,0 +1,245 @@
+import itertools
+import json
+import math
+import random
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from email.parser import BytesHeaderParser
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+# Local stand-ins for the OpenAI and Google Calendar HTTP APIs, used by the
+# load test. Each answers after a random latency and rejects a fraction of
+# requests with 429, like the real services under load. MockImap stands in
+# for an IMAP server in-process, for mail ingestion.
+
+
+class Latency:
+    """
+    Log-normal response time: most requests take about `median_ms`, with a
+    long tail where the 99th percentile is about `p99_ms`.
+    """
+
+    def __init__(self, median_ms, p99_ms):
+        self.mu = math.log(median_ms / 1000)
+        self.sigma = max(math.log(p99_ms / median_ms) / 2.326, 0.0)
+
+    def sample(self):
+        return random.lognormvariate(self.mu, self.sigma)
+
+
+class MockService(ABC):
+    """
+    HTTP server on a free local port, running in a daemon thread.
+    Use as a context manager; `url` is its base URL and `stats` counts the
+    requests served and rejected.
+    """
+
+    def __init__(self, latency, rate_limit=0.0):
+        self.latency = latency
+        self.rate_limit = rate_limit
+        self.stats = {"requests": 0, "rate_limited": 0}
+        self._lock = threading.Lock()
+        self._server = None
+
+    @abstractmethod
+    def handle(self, method, path, query, body):
+        """Returns (status, payload) for a request. Implemented by each service."""
+
+    def rejected(self):
+        """(status, payload) of a rate-limited request."""
+        return 429, {"error": {"message": "Rate limit exceeded", "code": 429}}
+
+    def __enter__(self):
+        service = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def _serve(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                body = json.loads(self.rfile.read(length) or b"null") if length else None
+                time.sleep(service.latency.sample())
+                with service._lock:
+                    service.stats["requests"] += 1
+                    limited = random.random() < service.rate_limit
+                    if limited:
+                        service.stats["rate_limited"] += 1
+                url = urlparse(self.path)
+                if limited:
+                    status, payload = service.rejected()
+                else:
+                    status, payload = service.handle(self.command, url.path, parse_qs(url.query), body)
+                data = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                if status == 429:
+                    self.send_header("Retry-After", "1")
+                self.end_headers()
+                self.wfile.write(data)
+
+            do_GET = do_POST = do_PATCH = do_DELETE = _serve
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self._server.shutdown()
+        self._server.server_close()
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self._server.server_address[1]}"
+
+
+class MockOpenAI(MockService):
+    """Chat completions endpoint (POST /v1/chat/completions) answering with a canned summary."""
+
+    def __init__(self, latency=Latency(800, 4000), rate_limit=0.05):
+        super().__init__(latency, rate_limit)
+        self._ids = itertools.count(1)
+
+    def rejected(self):
+        return 429, {"error": {"message": "Rate limit reached for requests", "type": "requests",
+                               "code": "rate_limit_exceeded", "param": None}}
+
+    def handle(self, method, path, query, body):
+        if method != "POST" or not path.endswith("/chat/completions"):
+            return 404, {"error": {"message": f"Unknown path {path}"}}
+        prompt = body["messages"][-1]["content"]
+        words = prompt.split()
+        content = "Summary: " + " ".join(words[:min(len(words), body.get("max_tokens") or 50, 40)])
+        return 200, {
+            "id": f"chatcmpl-mock{next(self._ids)}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "mock"),
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": len(words), "completion_tokens": len(content.split()),
+                      "total_tokens": len(words) + len(content.split())},
+        }
+
+
+class MockCalendar(MockService):
+    """
+    Google Calendar v3 events collection (list and insert on
+    /calendar/v3/calendars/<id>/events), kept in memory.
+    """
+
+    def __init__(self, latency=Latency(150, 900), rate_limit=0.02):
+        super().__init__(latency, rate_limit)
+        self.events = []
+
+    def rejected(self):
+        return 429, {"error": {"code": 429, "message": "Rate Limit Exceeded",
+                               "errors": [{"reason": "rateLimitExceeded", "message": "Rate Limit Exceeded"}]}}
+
+    def handle(self, method, path, query, body):
+        if not path.endswith("/events"):
+            return 404, {"error": {"code": 404, "message": f"Unknown path {path}"}}
+        if method == "POST":
+            event = dict(body, id=uuid.uuid4().hex, status="confirmed", updated=time.strftime("%Y-%m-%dT%H:%M:%S.000Z"))
+            event["htmlLink"] = f"{self.url}/event?eid={event['id']}"
+            with self._lock:
+                self.events.append(event)
+            return 200, event
+        time_min = query.get("timeMin", [""])[0]
+        time_max = query.get("timeMax", ["~"])[0]
+        limit = int(query.get("maxResults", ["250"])[0])
+        with self._lock:
+            items = [e for e in self.events if time_min <= e["start"].get("dateTime", "") < time_max]
+        return 200, {"kind": "calendar#events", "items": items[:limit]}
+
+
+class MockImap:
+    """
+    In-memory IMAP mailboxes with an imaplib-like client, for ImapSource's
+    `client_factory`. Messages get increasing UIDs per mailbox; `recreate`
+    empties a mailbox and changes its UIDVALIDITY. `stats` counts the
+    logins and the message bodies downloaded.
+    """
+
+    def __init__(self, mailboxes=("INBOX",)):
+        self.mailboxes = {name: {"validity": 1, "next_uid": 1, "messages": {}} for name in mailboxes}
+        self.stats = {"logins": 0, "bodies": 0}
+        self._lock = threading.Lock()
+
+    def append(self, raw, mailbox="INBOX"):
+        """Adds a message (bytes) and returns its UID."""
+        with self._lock:
+            box = self.mailboxes[mailbox]
+            uid = box["next_uid"]
+            box["next_uid"] += 1
+            box["messages"][uid] = raw
+            return uid
+
+    def recreate(self, mailbox="INBOX"):
+        with self._lock:
+            box = self.mailboxes[mailbox]
+            box.update(validity=box["validity"] + 1, next_uid=1, messages={})
+
+    def client(self):
+        return _MockImapClient(self)
+
+
+class _MockImapClient:
+    """The subset of imaplib.IMAP4 used by ImapSource."""
+
+    def __init__(self, server):
+        self.server = server
+        self.box = None
+
+    def login(self, username, password):
+        with self.server._lock:
+            self.server.stats["logins"] += 1
+        return "OK", [b"LOGIN completed"]
+
+    def logout(self):
+        return "BYE", [b"Logging out"]
+
+    def select(self, mailbox="INBOX", readonly=False):
+        self.box = self.server.mailboxes.get(mailbox)
+        if self.box is None:
+            return "NO", [b"Mailbox does not exist"]
+        return "OK", [str(len(self.box["messages"])).encode()]
+
+    def response(self, code):
+        if code == "UIDVALIDITY" and self.box is not None:
+            return code, [str(self.box["validity"]).encode()]
+        return code, [None]
+
+    def uid(self, command, *args):
+        with self.server._lock:
+            uids = sorted(self.box["messages"])
+            if command == "SEARCH":
+                start = int(args[1].split()[1].split(":")[0])
+                # Like real servers, "n:*" includes the newest message even below n
+                found = [uid for uid in uids if uid >= start] or uids[-1:]
+                return "OK", [" ".join(map(str, found)).encode()]
+            if command == "FETCH":
+                wanted = [int(uid) for uid in args[0].split(",")]
+                headers_only = "HEADER.FIELDS" in args[1]
+                data = []
+                for uid in wanted:
+                    raw = self.box["messages"].get(uid)
+                    if raw is None:
+                        continue
+                    if headers_only:
+                        section = "BODY[HEADER.FIELDS (MESSAGE-ID)]"
+                        message_id = BytesHeaderParser().parsebytes(raw).get("Message-ID")
+                        raw = (f"Message-ID: {message_id}\r\n" if message_id else "").encode() + b"\r\n"
+                    else:
+                        section = "BODY[]"
+                        self.server.stats["bodies"] += 1
+                    data.append((f"{uid} (UID {uid} {section} {{{len(raw)}}}".encode(), raw))
+                    data.append(b")")
+                return "OK", data
+        return "BAD", [f"Unknown command {command}".encode()]
@@ -1,6 +1,7 @@
 import streamlit as st
 import sys, os
 import time
+import hashlib
 from dotenv import load_dotenv
 
 # Carrega as variáveis de ambiente do arquivo .env
@@ -9,20 +10,33 @@ load_dotenv()
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 from core.nlp import interpret_command
-from core.scheduler import add_task, list_tasks, delete_task
+from core.commands import execute_command
+from core.scheduler import mark_task_done, list_occurrences, mark_occurrence_done
+from core.task_cache import get_task_cache
+from core.free_slots import place_untimed_tasks
+from core.reminders import start_reminder_daemon
 from core.emotion_analysis import analyze_mood
 from core.recommender import suggest_routine
+from core.mood_analytics import get_mood_analytics
+from core.semantic_search import search, index_email_summary
 from core.email_summary import EmailSummarizer
-from data.database import connect
+from core.action_items import save_action_items
+from core.email_ingest import ingest, list_emails, source_from_url, get_summary_queue
+from core.token_budget import usage_summary
+from core.moods import save_mood, get_mood_history
+from data.database import DEFAULT_USER
+from data.fulltext import search as fulltext_search
+from config.settings import MAIL_SOURCE, MAIL_PASSWORD
 from datetime import datetime, timedelta
 from voice.voice_input import VoiceRecognizer, VoiceInputError
 from voice.voice_out import VoiceOutput
+from voice.pipeline import VoicePipeline
 from core.calendar_integration import (
     listar_eventos_google_calendar,
-    criar_evento_google_calendar,
     deletar_evento_google_calendar,
     CalendarError
 )
+from core.calendar_sync import sincronizar_tarefas_com_calendario
 
 # Verifica se a chave da API do OpenAI está configurada
 if not os.getenv("OPENAI_API_KEY"):
@@ -33,6 +47,14 @@ st.set_page_config(page_title="SmartRoutine AI", layout="centered")
 st.title("🧠 SmartRoutine AI")
 st.subheader("Your intelligent personal assistant")
 
+# --- Current user ---
+# Every read and write below is scoped to this user's partition (or database file)
+if "user_id" not in st.session_state:
+    st.session_state.user_id = DEFAULT_USER
+
+st.sidebar.text_input("👤 User", key="user_id")
+user_id = st.session_state.user_id.strip() or DEFAULT_USER
+
 # --- Session state flags ---
 if "last_command" not in st.session_state:
     st.session_state.last_command = ""
@@ -49,19 +71,119 @@ if "voice_output" not in st.session_state:
 if "email_summarizer" not in st.session_state:
     st.session_state.email_summarizer = EmailSummarizer()
 
+# One reminder daemon per user and server process, shared by that user's sessions
+@st.cache_resource
+def get_reminder_daemon(user_id):
+    return start_reminder_daemon(user_id=user_id)
+
+get_reminder_daemon(user_id)
+
 # Create placeholder for temporary messages
 if "message_placeholder" not in st.session_state:
     st.session_state.message_placeholder = st.empty()
 
-# --- Save mood to database ---
-def save_mood_to_db(text, mood, confidence):
-    with connect() as conn:
-        cursor = conn.cursor()
-        cursor.execute(
-            "INSERT INTO moods (date, description, classification) VALUES (?, ?, ?)",
-            (datetime.now().strftime("%Y-%m-%d %H:%M"), text, f"{mood} ({confidence*100:.0f}%)")
-        )
-        conn.commit()
+# --- Cached data reads ---
+# Each loader is cleared explicitly by the code paths that write its data.
+# The user id is an argument so that each user gets their own cache entries.
+@st.cache_data(show_spinner=False, ttl=3600)
+def load_upcoming_occurrences(user_id, days=7):
+    # Only the visible window of each recurring task is expanded
+    inicio = datetime.now().replace(minute=0, second=0, microsecond=0)
+    return list_occurrences(inicio, inicio + timedelta(days=days), user_id=user_id)
+
+@st.cache_data(show_spinner=False)
+def load_mood_history(user_id, limit=10):
+    return get_mood_history(limit, user_id)
+
+@st.cache_data(show_spinner=False, ttl=300)
+def load_calendar_events(periodo):
+    # Define o período baseado na seleção
+    data_inicio = datetime.now()
+    if periodo == "Today":
+        data_fim = data_inicio + timedelta(days=1)
+    elif periodo == "Next 7 days":
+        data_fim = data_inicio + timedelta(days=7)
+    else:  # Next 30 days
+        data_fim = data_inicio + timedelta(days=30)
+
+    return listar_eventos_google_calendar(
+        data_inicio=data_inicio,
+        data_fim=data_fim,
+        max_resultados=50
+    )
+
+# --- Voice commands ---
+def clear_command_caches(outcome):
+    # Drop the cached reads that a command's intent may have changed
+    # (pending tasks follow the scheduler on their own)
+    if outcome["intent"] == "add_task":
+        load_upcoming_occurrences.clear()
+    elif outcome["intent"] == "analyze_mood":
+        load_mood_history.clear()
+
+def run_voice_command(fallback_intent=None):
+    """
+    Listens for a command and carries it out right away; the spoken
+    confirmation plays in the background. The latency trace is kept for
+    the sidebar.
+    """
+    st.session_state.message_placeholder.info("🎙️ Listening...")
+    pipeline = VoicePipeline(
+        st.session_state.voice_recognizer, user_id=user_id, place=st.session_state.get("auto_place", True)
+    )
+    outcome = pipeline.run(fallback_intent=fallback_intent)
+    st.session_state.voice_trace = outcome["trace"]
+    if not outcome["ok"]:
+        st.session_state.message_placeholder.warning(f"⚠️ {outcome['message']}")
+        return
+    clear_command_caches(outcome)
+    if outcome["intent"] == "suggest_routine":
+        st.session_state.routine_suggestion = outcome["routine"]
+    st.session_state.message_placeholder.success(f"🎙️ {outcome['text']} → {outcome['message']}")
+
+# --- Semantic search ---
+SEARCH_ICONS = {"task": "📋", "mood": "😊", "email": "📧"}
+
+st.sidebar.divider()
+search_query = st.sidebar.text_input("🔎 Search tasks, moods and emails", key="search_query")
+if search_query:
+    results = search(search_query, k=8, user_id=user_id)
+    if results:
+        for result in results:
+            st.sidebar.write(f"{SEARCH_ICONS.get(result['kind'], '•')} {result['text']}")
+    else:
+        st.sidebar.write("No matches found.")
+
+# --- Full-text search ---
+HISTORY_ICONS = {"task": "📋", "mood": "😊", "interaction": "💬"}
+HISTORY_PAGE_SIZE = 5
+
+history_query = st.sidebar.text_input("🔤 Search history by words", key="history_query")
+if history_query:
+    if st.session_state.get("history_query_last") != history_query:
+        st.session_state.history_query_last = history_query
+        st.session_state.history_page = 0
+    page = st.session_state.history_page
+    # One extra result tells whether there is a next page
+    results = fulltext_search(history_query, user_id=user_id, limit=HISTORY_PAGE_SIZE + 1, offset=page * HISTORY_PAGE_SIZE)
+    for result in results[:HISTORY_PAGE_SIZE]:
+        st.sidebar.markdown(f"{HISTORY_ICONS[result['kind']]} {result['snippet']}")
+    if not results:
+        st.sidebar.write("No matches found.")
+
+    def change_history_page(delta):
+        st.session_state.history_page += delta
+
+    prev_col, next_col = st.sidebar.columns(2)
+    prev_col.button("◀ Previous", key="history_prev", disabled=page == 0,
+                    on_click=change_history_page, args=(-1,))
+    next_col.button("Next ▶", key="history_next", disabled=len(results) <= HISTORY_PAGE_SIZE,
+                    on_click=change_history_page, args=(1,))
+
+# Stages of the last voice command (speech is filled in once it has played)
+if "voice_trace" in st.session_state:
+    st.sidebar.divider()
+    st.sidebar.caption(f"⏱️ Last voice command: {st.session_state.voice_trace}")
 
 # Create tabs
 tasks_tab, mood_tab, routine_tab, calendar_tab, email_tab = st.tabs([
@@ -69,7 +191,8 @@ tasks_tab, mood_tab, routine_tab, calendar_tab, email_tab = st.tabs([
 ])
 
 # --- Tasks Tab ---
-with tasks_tab:
+@st.fragment
+def render_tasks_tab():
     st.subheader("Manage Your Tasks")
     
     # Initialize task_input in session state if not exists
@@ -80,9 +203,25 @@ with tasks_tab:
         if st.session_state.task_input:
             result = interpret_command(st.session_state.task_input)
             if result["intent"] == "add_task":
-                add_task(result["title"], result.get("datetime"))
-                st.session_state.message_placeholder.success(f"✅ Task added: {result['title']}")
-                st.session_state.voice_output.speak(f"Task added: {result['title']}")
+                outcome = execute_command(result, user_id, place=st.session_state.get("auto_place", True))
+                clear_command_caches(outcome)
+                scheduled = outcome.get("scheduled")
+                if scheduled is None:
+                    st.session_state.message_placeholder.success(f"🔁 Recurring task added: {result['title']}")
+                else:
+                    warnings = []
+                    if scheduled["conflicts"]:
+                        warnings.append(f"⚠️ '{result['title']}' overlaps {len(scheduled['conflicts'])} other task(s) or event(s).")
+                    if scheduled["duplicates"]:
+                        warnings.append(f"⚠️ Similar pending task: '{scheduled['duplicates'][0]['title']}'.")
+                    if warnings:
+                        st.session_state.task_warning = " ".join(warnings)
+                    if scheduled["placed"]:
+                        placed_at = datetime.fromisoformat(scheduled["date_time"]).strftime("%A, %B %d at %I:%M %p")
+                        st.session_state.message_placeholder.success(f"✅ Task added: {result['title']} — scheduled {placed_at}")
+                    else:
+                        st.session_state.message_placeholder.success(f"✅ Task added: {result['title']}")
+                st.session_state.voice_output.speak(outcome["message"])
                 st.session_state.task_input = ""
                 time.sleep(1)
                 st.session_state.message_placeholder.empty()
@@ -93,35 +232,14 @@ with tasks_tab:
                 st.session_state.message_placeholder.empty()
     
     def voice_input_callback():
-        try:
-            st.session_state.message_placeholder.info("🎙️ Listening...")
-            st.session_state.voice_output.speak("Listening...")
-            texto, confianca = st.session_state.voice_recognizer.ouvir_comando(mostrar_feedback=False)
-            
-            if confianca >= 0.6:
-                st.session_state.task_input = texto
-                st.session_state.message_placeholder.success(f"✅ Recognized: {texto}")
-                st.session_state.voice_output.speak(f"Recognized: {texto}")
-                time.sleep(1)
-                st.session_state.message_placeholder.empty()
-            else:
-                st.session_state.message_placeholder.warning(f"⚠️ Low confidence ({confianca:.2%}). Please try again.")
-                st.session_state.voice_output.speak("Low confidence. Please try again.")
-                time.sleep(2)
-                st.session_state.message_placeholder.empty()
-                
-        except VoiceInputError as e:
-            st.session_state.message_placeholder.error(f"❌ Error: {str(e)}")
-            st.session_state.voice_output.speak(f"Error: {str(e)}")
-            time.sleep(2)
-            st.session_state.message_placeholder.empty()
+        run_voice_command()
     
     # Create two columns for text input and voice button
     col1, col2 = st.columns([0.8, 0.2])
     
     with col1:
         task_input = st.text_input(
-            "Add/Create task (e.g., 'Team Meeting on June 15 at 2pm' or 'Project Review on 20/06 at 10am'):",
+            "Add/Create task (e.g., 'Team Meeting on June 15 at 2pm' or 'Project Review on 20/06 at 10am' or 'Standup every weekday at 9am'):",
             key="task_input"
         )
     
@@ -129,38 +247,57 @@ with tasks_tab:
         st.button("🎙️ Voice Input", key="voice_input_btn", on_click=voice_input_callback)
     
     st.button("Add Task", key="add_task_btn", on_click=add_task_callback)
+    st.checkbox("🗓️ Put tasks without a time in the next free slot", value=True, key="auto_place")
+
+    if st.session_state.get("task_warning"):
+        st.warning(st.session_state.pop("task_warning"))
     
     # Display tasks
     st.divider()
     st.subheader("📋 Pending Tasks")
     
-    tasks = list_tasks()
+    # Parsed and formatted once; kept current by the scheduler's write APIs
+    task_cache = get_task_cache(user_id)
+    tasks = task_cache.tasks()
+    if task_cache.has_untimed():
+        if st.button("🗓️ Schedule tasks without a time", key="place_untimed_btn"):
+            placements = place_untimed_tasks(user_id)
+            st.session_state.voice_output.speak(f"{len(placements)} tasks scheduled")
+            st.rerun(scope="fragment")
     if tasks:
         for task in tasks:
             col1, col2 = st.columns([0.8, 0.2])
             with col1:
-                # Parse the datetime string
-                try:
-                    if task[2]:  # if datetime exists
-                        task_datetime = datetime.fromisoformat(task[2])
-                        # Format the date and time
-                        date_str = task_datetime.strftime("%A, %B %d")  # e.g., "Monday, January 1"
-                        time_str = task_datetime.strftime("%I:%M %p")   # e.g., "09:00 AM"
-                        st.write(f"📅 {date_str} at {time_str} — {task[1]}")
-                    else:
-                        st.write(f"⏰ No time set — {task[1]}")
-                except (ValueError, TypeError):
-                    st.write(f"⏰ {task[2] or 'No time set'} — {task[1]}")
+                if task.moment:
+                    st.write(f"📅 {task.when} — {task.title}")
+                else:
+                    st.write(f"⏰ {task.when or 'No time set'} — {task.title}")
             with col2:
-                if st.button("✔️ Done", key=f"done_{task[0]}"):
-                    delete_task(task[0])
-                    st.session_state.voice_output.speak(f"Task completed: {task[1]}")
-                    st.rerun()
+                if st.button("✔️ Done", key=f"done_{task.id}"):
+                    mark_task_done(task.id, user_id)
+                    st.session_state.voice_output.speak(f"Task completed: {task.title}")
+                    st.rerun(scope="fragment")
     else:
         st.write("No pending tasks.")
 
+    occurrences = load_upcoming_occurrences(user_id)
+    if occurrences:
+        st.subheader("🔁 Recurring — next 7 days")
+        for rule_id, title, occurs_at, _status in occurrences:
+            occurrence_datetime = datetime.fromisoformat(occurs_at)
+            col1, col2 = st.columns([0.8, 0.2])
+            with col1:
+                st.write(f"🔁 {occurrence_datetime.strftime('%A, %B %d')} at {occurrence_datetime.strftime('%I:%M %p')} — {title}")
+            with col2:
+                if st.button("✔️ Done", key=f"done_occ_{rule_id}_{occurs_at}"):
+                    mark_occurrence_done(rule_id, occurs_at, user_id)
+                    load_upcoming_occurrences.clear()
+                    st.session_state.voice_output.speak(f"Task completed: {title}")
+                    st.rerun(scope="fragment")
+
 # --- Mood Tab ---
-with mood_tab:
+@st.fragment
+def render_mood_tab():
     st.subheader("How are you feeling?")
     
     # Initialize mood_input in session state if not exists
@@ -176,42 +313,24 @@ with mood_tab:
                 time.sleep(3)
                 st.session_state.message_placeholder.empty()
             else:
-                emoji = "😄" if mood_result["mood"] == "positive" else "😞"
+                emoji = {"positive": "😄", "negative": "😞"}.get(mood_result["mood"], "😐")
                 mood_message = f"{emoji} Mood: {mood_result['mood'].capitalize()} ({mood_result['confidence'] * 100:.0f}% confidence)"
                 st.session_state.message_placeholder.success(mood_message)
                 st.session_state.voice_output.speak(f"Your mood is {mood_result['mood']}")
-                save_mood_to_db(
+                save_mood(
                     mood_result["original_text"],
                     mood_result["mood"],
-                    mood_result["confidence"]
+                    mood_result["confidence"],
+                    user_id
                 )
+                load_mood_history.clear()
                 st.session_state.mood_input = ""
                 time.sleep(3)
                 st.session_state.message_placeholder.empty()
     
     def voice_mood_callback():
-        try:
-            st.session_state.message_placeholder.info("🎙️ Listening...")
-            st.session_state.voice_output.speak("Listening...")
-            texto, confianca = st.session_state.voice_recognizer.ouvir_comando(mostrar_feedback=False)
-            
-            if confianca >= 0.6:
-                st.session_state.mood_input = texto
-                st.session_state.message_placeholder.success(f"✅ Recognized: {texto}")
-                st.session_state.voice_output.speak(f"Recognized: {texto}")
-                time.sleep(1)
-                st.session_state.message_placeholder.empty()
-            else:
-                st.session_state.message_placeholder.warning(f"⚠️ Low confidence ({confianca:.2%}). Please try again.")
-                st.session_state.voice_output.speak("Low confidence. Please try again.")
-                time.sleep(2)
-                st.session_state.message_placeholder.empty()
-                
-        except VoiceInputError as e:
-            st.session_state.message_placeholder.error(f"❌ Error: {str(e)}")
-            st.session_state.voice_output.speak(f"Error: {str(e)}")
-            time.sleep(2)
-            st.session_state.message_placeholder.empty()
+        # Anything that isn't a command is taken as a journal entry
+        run_voice_command(fallback_intent="analyze_mood")
     
     # Create two columns for text input and voice button
     col1, col2 = st.columns([0.8, 0.2])
@@ -232,26 +351,49 @@ with mood_tab:
     st.divider()
     st.subheader("Mood History")
     
-    with connect() as conn:
-        cursor = conn.cursor()
-        cursor.execute("SELECT date, description, classification FROM moods ORDER BY id DESC LIMIT 10")
-        moods = cursor.fetchall()
-    
+    moods = load_mood_history(user_id)
+
     if moods:
         for mood in moods:
-            st.write(f"🗓️ {mood[0]} — _{mood[2]}_\n> {mood[1]}")
+            st.write(f"🗓️ {mood.date} — _{mood.classification}_\n> {mood.description}")
     else:
         st.write("No mood entries recorded yet.")
 
+    # Display mood trends
+    analytics = get_mood_analytics(user_id)
+    if analytics["entries"]:
+        st.divider()
+        st.subheader("📈 Mood Trends")
+
+        st.write("**Daily sentiment** (7-day rolling average)")
+        st.line_chart(analytics["daily"][["score", "rolling_score"]])
+
+        streaks = analytics["streaks"]
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            current = streaks["current"]
+            st.metric("Current streak", f"{current['length']} {current['mood']}")
+        with col2:
+            st.metric("Longest positive streak", streaks["longest"].get("positive", 0))
+        with col3:
+            st.metric("Longest negative streak", streaks["longest"].get("negative", 0))
+
+        st.write("**Mood by time of day**")
+        st.bar_chart(analytics["time_of_day"])
+
+        st.write("**Average sentiment by hour**")
+        st.bar_chart(analytics["hourly"])
+
 # --- Routine Tab ---
-with routine_tab:
+@st.fragment
+def render_routine_tab():
     st.subheader("Your Daily Routine")
     
     if st.button("🧭 Generate New Routine Suggestion"):
-        suggestion = suggest_routine()
+        suggestion = suggest_routine(user_id)
         st.session_state.routine_suggestion = suggestion
         st.session_state.voice_output.speak("Here's your new routine suggestion")
-        st.rerun()
+        st.rerun(scope="fragment")
     
     if "routine_suggestion" in st.session_state:
         st.markdown(f"### 🧭 Suggested Routine\n> {st.session_state.routine_suggestion}")
@@ -259,30 +401,30 @@ with routine_tab:
         st.info("Click the button above to get a personalized routine suggestion!")
 
 # --- Calendar Tab ---
-with calendar_tab:
+@st.fragment
+def render_calendar_tab():
     st.subheader("Google Calendar Integration")
     
-    # Botão para sincronizar tarefas com o Google Calendar
+    # Botão para sincronizar tarefas com o Google Calendar (nos dois sentidos)
     if st.button("🔄 Sync Tasks with Calendar"):
         try:
-            tasks = list_tasks()
-            for task in tasks:
-                if task[2]:  # se tiver datetime
-                    try:
-                        task_datetime = datetime.fromisoformat(task[2])
-                        criar_evento_google_calendar(
-                            titulo=task[1],
-                            data_hora_inicio=task_datetime,
-                            duracao_min=30,
-                            descricao=f"Task from SmartRoutine AI: {task[1]}"
-                        )
-                    except (ValueError, TypeError) as e:
-                        st.warning(f"Could not sync task '{task[1]}': Invalid datetime format")
-                    except CalendarError as e:
-                        st.error(f"Error syncing task '{task[1]}': {str(e)}")
-            
-            st.success("✅ Tasks synchronized with Google Calendar!")
-            st.session_state.voice_output.speak("Tasks synchronized with Google Calendar")
+            resultado = sincronizar_tarefas_com_calendario(user_id=user_id)
+            load_upcoming_occurrences.clear()
+            load_calendar_events.clear()
+
+            for erro in resultado["errors"]:
+                st.error(f"Error syncing {erro}")
+
+            if resultado["offline"]:
+                st.warning(f"📴 Google Calendar is unreachable. {resultado['pending']} change(s) will be sent on the next sync.")
+                st.session_state.voice_output.speak("Google Calendar is unreachable. Changes will be sent on the next sync")
+            else:
+                st.success(
+                    f"✅ Tasks synchronized with Google Calendar! "
+                    f"({resultado['created']} created, {resultado['updated']} updated, "
+                    f"{resultado['deleted']} removed, {resultado['pulled']} calendar changes received)"
+                )
+                st.session_state.voice_output.speak("Tasks synchronized with Google Calendar")
             time.sleep(2)
             st.rerun()
             
@@ -301,21 +443,8 @@ with calendar_tab:
             ["Today", "Next 7 days", "Next 30 days"]
         )
         
-        # Define o período baseado na seleção
-        data_inicio = datetime.now()
-        if periodo == "Today":
-            data_fim = data_inicio + timedelta(days=1)
-        elif periodo == "Next 7 days":
-            data_fim = data_inicio + timedelta(days=7)
-        else:  # Next 30 days
-            data_fim = data_inicio + timedelta(days=30)
-        
-        # Busca eventos
-        eventos = listar_eventos_google_calendar(
-            data_inicio=data_inicio,
-            data_fim=data_fim,
-            max_resultados=50
-        )
+        # Busca eventos (em cache até a próxima alteração no calendário)
+        eventos = load_calendar_events(periodo)
         
         if eventos:
             for evento in eventos:
@@ -343,10 +472,11 @@ with calendar_tab:
                         if st.button("🗑️ Delete", key=f"del_{evento['id']}"):
                             try:
                                 deletar_evento_google_calendar(evento['id'])
+                                load_calendar_events.clear()
                                 st.success("✅ Event deleted!")
                                 st.session_state.voice_output.speak("Event deleted")
                                 time.sleep(1)
-                                st.rerun()
+                                st.rerun(scope="fragment")
                             except CalendarError as e:
                                 st.error(f"❌ Error: {str(e)}")
                                 st.session_state.voice_output.speak(f"Error: {str(e)}")
@@ -362,7 +492,8 @@ with calendar_tab:
         st.info("Please make sure you have configured your Google Calendar credentials correctly.")
 
 # --- Email Tab ---
-with email_tab:
+@st.fragment
+def render_email_tab():
     st.subheader("Email Analysis")
     
     # Initialize email_input in session state if not exists
@@ -373,23 +504,40 @@ with email_tab:
         if st.session_state.email_input:
             try:
                 # Análise do e-mail
-                summary_result = st.session_state.email_summarizer.summarize_email(st.session_state.email_input)
-                sentiment_result = st.session_state.email_summarizer.analyze_sentiment(st.session_state.email_input)
+                summary_result = st.session_state.email_summarizer.summarize_email(
+                    st.session_state.email_input, user_id=user_id
+                )
+                sentiment_result = st.session_state.email_summarizer.analyze_sentiment(
+                    st.session_state.email_input, user_id=user_id
+                )
                 
                 # Exibe o resumo
                 st.markdown("### 📝 Email Summary")
                 st.write(summary_result["summary"])
+
+                # Guarda o resumo no índice de busca semântica
+                email_id = hashlib.sha1(st.session_state.email_input.encode("utf-8")).hexdigest()
+                index_email_summary(email_id, summary_result["summary"], user_id)
                 
                 # Exibe metadados
                 with st.expander("📊 Analysis Details"):
                     st.write("**Original Length:**", summary_result["metadata"]["original_length"], "characters")
+                    st.write("**Sent to the model:**", summary_result["metadata"]["cleaned_length"], "characters,",
+                             summary_result["metadata"]["input_tokens"], "tokens")
+                    st.write("**Summary Budget:**", summary_result["metadata"]["max_tokens"], "tokens")
                     st.write("**Summary Length:**", summary_result["metadata"]["summary_length"], "characters")
                     st.write("**Model:**", summary_result["metadata"]["model"])
+                    st.write("**Backend:**", summary_result["metadata"]["backend"], f"({summary_result['metadata']['route']})")
                     st.write("**Timestamp:**", summary_result["metadata"]["timestamp"])
                 
                 # Exibe análise de sentimento
                 st.markdown("### 😊 Sentiment Analysis")
                 st.write(sentiment_result["sentiment"])
+
+                # Itens de ação, convertidos em tarefas pelo botão abaixo
+                st.session_state.action_items = st.session_state.email_summarizer.extract_action_items(
+                    st.session_state.email_input, user_id=user_id
+                )
                 
                 # Feedback de voz
                 st.session_state.voice_output.speak("Email analysis complete")
@@ -436,3 +584,65 @@ with email_tab:
         st.button("🎙️ Voice Input", key="voice_email_btn", on_click=voice_email_callback)
     
     st.button("Analyze Email", key="analyze_email_btn", on_click=analyze_email_callback)
+
+    def add_action_items_callback():
+        result = save_action_items(st.session_state.action_items, user_id)
+        st.session_state.action_items = []
+        st.success(f"✅ {len(result['task_ids'])} tasks added ({result['duplicates']} already added before)")
+
+    if st.session_state.get("action_items"):
+        st.markdown("### ✅ Action Items")
+        for item in st.session_state.action_items:
+            st.write(f"- {item['title']}" + (f" — *{item['due']}*" if item["due"] else ""))
+        st.button("➕ Add action items as tasks", key="add_action_items_btn", on_click=add_action_items_callback)
+
+    # --- Inbox ---
+    st.markdown("### 📥 Inbox")
+    mail_source = st.text_input(
+        "Mailbox (mbox:/path, maildir:/path or imaps://user@host/INBOX)",
+        value=MAIL_SOURCE,
+        key="mail_source"
+    )
+    if st.button("Fetch new emails", key="fetch_emails_btn") and mail_source:
+        try:
+            with st.spinner("Fetching new emails..."):
+                counts = ingest(source_from_url(mail_source, MAIL_PASSWORD or None), user_id)
+            st.success(f"✅ {counts['new']} new emails ({counts['duplicates']} already stored)")
+        except Exception as e:
+            st.error(f"❌ Error fetching emails: {str(e)}")
+
+    pending = get_summary_queue(user_id).pending()
+    if pending:
+        st.caption(f"⏳ {pending} emails waiting to be summarized")
+
+    for email_id, sender, subject, date, summary, status in list_emails(user_id=user_id):
+        with st.expander(f"{subject or '(no subject)'} — {sender}"):
+            st.caption(date or "")
+            if summary:
+                st.write(summary)
+            elif status == "error":
+                st.warning("Could not summarize this email.")
+            else:
+                st.info("Summary pending...")
+
+    # --- Token usage ---
+    usage = usage_summary(days=30, user_id=user_id)
+    if usage:
+        with st.expander("🔢 OpenAI token usage (last 30 days)"):
+            st.dataframe(usage, hide_index=True)
+
+# Each tab is a fragment, so interacting with one tab only reruns that tab
+with tasks_tab:
+    render_tasks_tab()
+
+with mood_tab:
+    render_mood_tab()
+
+with routine_tab:
+    render_routine_tab()
+
+with calendar_tab:
+    render_calendar_tab()
+
+with email_tab:
+    render_email_tab()
@@ -0,0 +1,114 @@
+import time
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+from config.settings import VOICE_MIN_CONFIDENCE
+from core.commands import execute_command, save_interaction
+from core.nlp import interpret_command
+from data.database import DEFAULT_USER
+from voice.voice_input import VoiceRecognizer, VoiceInputError
+from voice.voice_out import SpeechQueue, get_speech_queue
+
+class LatencyTrace:
+    """
+    Time spent in each stage of a voice command, in milliseconds.
+    Stages run in order: capture, recognition, parse, action, tts.
+    The tts stage is filled in later, when the confirmation finishes playing.
+    """
+    STAGES = ("capture", "recognition", "parse", "action", "tts")
+
+    def __init__(self):
+        self.stages: Dict[str, float] = {}
+
+    @contextmanager
+    def stage(self, name: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - started)
+
+    def record(self, name: str, seconds: float) -> None:
+        self.stages[name] = seconds * 1000
+
+    @property
+    def response_ms(self) -> float:
+        """Milliseconds from the start of capture until the action is done (before speech)."""
+        return sum(ms for name, ms in self.stages.items() if name != "tts")
+
+    def as_dict(self) -> Dict[str, float]:
+        trace = {name: round(self.stages[name], 1) for name in self.STAGES if name in self.stages}
+        trace["response_ms"] = round(self.response_ms, 1)
+        return trace
+
+    def __str__(self) -> str:
+        return " · ".join(f"{name} {self.stages[name]:.0f} ms" for name in self.STAGES if name in self.stages)
+
+
+class VoicePipeline:
+    """
+    Runs a spoken command end to end: capture, recognition,
+    interpret_command and execute_command, then queues the spoken
+    confirmation without waiting for it. One call is one interaction,
+    instead of copying the text into a form to be submitted afterwards.
+    """
+
+    def __init__(self, recognizer: VoiceRecognizer, speech: Optional[SpeechQueue] = None,
+                 user_id: str = DEFAULT_USER, min_confidence: float = VOICE_MIN_CONFIDENCE, place: bool = True):
+        """
+        Args:
+            recognizer (VoiceRecognizer): Microphone and speech recognition
+            speech (SpeechQueue, optional): Where confirmations are spoken. Defaults to the shared queue.
+            user_id (str): User whose tasks and moods are changed
+            min_confidence (float): Recognitions below this confidence are rejected
+            place (bool): Whether tasks without a time go to the next free slot
+        """
+        self.recognizer = recognizer
+        self.speech = speech or get_speech_queue()
+        self.user_id = user_id
+        self.min_confidence = min_confidence
+        self.place = place
+
+    def _reply(self, outcome: dict, trace: LatencyTrace) -> dict:
+        self.speech.say(outcome["message"], done=lambda seconds: trace.record("tts", seconds))
+        outcome["trace"] = trace
+        return outcome
+
+    def run(self, fallback_intent: Optional[str] = None) -> dict:
+        """
+        Listens for one command and carries it out.
+
+        Args:
+            fallback_intent (str, optional): Intent used when the command isn't
+                recognized, e.g. 'analyze_mood' to treat free speech as a journal entry
+
+        Returns:
+            dict: Outcome of execute_command plus 'text', 'confidence' and 'trace'
+                (a LatencyTrace); 'ok' is False when nothing usable was heard
+        """
+        trace = LatencyTrace()
+        try:
+            with trace.stage("capture"):
+                audio = self.recognizer.capturar_audio(mostrar_feedback=False)
+            with trace.stage("recognition"):
+                text, confidence = self.recognizer.reconhecer_audio(audio, mostrar_feedback=False)
+        except VoiceInputError as e:
+            return self._reply({"ok": False, "intent": None, "message": f"Error: {str(e)}"}, trace)
+        return self.process_text(text, confidence, fallback_intent, trace)
+
+    def process_text(self, text: str, confidence: float = 1.0, fallback_intent: Optional[str] = None,
+                     trace: Optional[LatencyTrace] = None) -> dict:
+        """Runs the stages after recognition on already recognized text. Returns the same as run()."""
+        trace = trace or LatencyTrace()
+        if confidence < self.min_confidence:
+            outcome = {"ok": False, "intent": None, "message": "Low confidence. Please try again."}
+        else:
+            with trace.stage("parse"):
+                result = interpret_command(text)
+                if result["intent"] == "unknown" and fallback_intent == "analyze_mood":
+                    result = {"intent": "analyze_mood", "text": text}
+            with trace.stage("action"):
+                outcome = execute_command(result, self.user_id, self.place)
+                save_interaction(text, outcome["message"], self.user_id)
+        outcome.update(text=text, confidence=confidence)
+        return self._reply(outcome, trace)
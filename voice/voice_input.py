@@ -38,57 +38,74 @@ class VoiceRecognizer:
         except Exception as e:
             raise VoiceInputError(f"Erro ao calibrar microfone: {str(e)}")
     
-    def ouvir_comando(self, mostrar_feedback: bool = True) -> Tuple[str, float]:
+    def capturar_audio(self, mostrar_feedback: bool = True) -> "sr.AudioData":
         """
-        Captura e reconhece o comando de voz.
+        Captura uma frase do microfone.
         
         Args:
             mostrar_feedback (bool): Se True, mostra mensagens de feedback. Defaults to True.
             
         Returns:
-            Tuple[str, float]: Texto reconhecido e confiança do reconhecimento
+            sr.AudioData: Áudio capturado
             
         Raises:
-            VoiceInputError: Se houver erro no reconhecimento
+            VoiceInputError: Se nenhum áudio for detectado ou o microfone falhar
         """
         try:
             with sr.Microphone() as source:
                 if mostrar_feedback:
                     print("🎙️ Aguardando comando de voz...")
                 
-                # Captura o áudio
-                audio = self.recognizer.listen(
+                return self.recognizer.listen(
                     source,
                     timeout=self.timeout,
                     phrase_time_limit=self.phrase_time_limit
                 )
-                
-                if mostrar_feedback:
-                    print("🎯 Processando...")
-                
-                # Reconhece o áudio
-                resultado = self.recognizer.recognize_google(
-                    audio,
-                    language=self.language,
-                    show_all=True  # Retorna todos os resultados possíveis
-                )
-                
-                if not resultado or not resultado.get('alternative'):
-                    raise VoiceInputError("Não foi possível reconhecer o áudio.")
-                
-                # Pega o resultado com maior confiança
-                melhor_resultado = resultado['alternative'][0]
-                texto = melhor_resultado['transcript']
-                confianca = melhor_resultado.get('confidence', 0.0)
-                
-                if mostrar_feedback:
-                    print(f"✅ Reconhecido: {texto}")
-                    print(f"📊 Confiança: {confianca:.2%}")
-                
-                return texto, confianca
-                
         except sr.WaitTimeoutError:
             raise VoiceInputError("Tempo de espera esgotado. Nenhum áudio detectado.")
+        except Exception as e:
+            raise VoiceInputError(f"Erro inesperado: {str(e)}")
+    
+    def reconhecer_audio(self, audio: "sr.AudioData", mostrar_feedback: bool = True) -> Tuple[str, float]:
+        """
+        Reconhece o texto de um áudio capturado.
+        
+        Args:
+            audio (sr.AudioData): Áudio retornado por capturar_audio
+            mostrar_feedback (bool): Se True, mostra mensagens de feedback. Defaults to True.
+            
+        Returns:
+            Tuple[str, float]: Texto reconhecido e confiança do reconhecimento
+            
+        Raises:
+            VoiceInputError: Se houver erro no reconhecimento
+        """
+        try:
+            if mostrar_feedback:
+                print("🎯 Processando...")
+            
+            resultado = self.recognizer.recognize_google(
+                audio,
+                language=self.language,
+                show_all=True  # Retorna todos os resultados possíveis
+            )
+            
+            if not resultado or not resultado.get('alternative'):
+                raise VoiceInputError("Não foi possível reconhecer o áudio.")
+            
+            # Pega o resultado com maior confiança
+            melhor_resultado = resultado['alternative'][0]
+            texto = melhor_resultado['transcript']
+            confianca = melhor_resultado.get('confidence', 0.0)
+            
+            if mostrar_feedback:
+                print(f"✅ Reconhecido: {texto}")
+                print(f"📊 Confiança: {confianca:.2%}")
+            
+            return texto, confianca
+            
+        except VoiceInputError:
+            raise
         except sr.UnknownValueError:
             raise VoiceInputError("Não foi possível entender o áudio.")
         except sr.RequestError as e:
@@ -96,6 +113,22 @@ class VoiceRecognizer:
         except Exception as e:
             raise VoiceInputError(f"Erro inesperado: {str(e)}")
     
+    def ouvir_comando(self, mostrar_feedback: bool = True) -> Tuple[str, float]:
+        """
+        Captura e reconhece o comando de voz.
+        
+        Args:
+            mostrar_feedback (bool): Se True, mostra mensagens de feedback. Defaults to True.
+            
+        Returns:
+            Tuple[str, float]: Texto reconhecido e confiança do reconhecimento
+            
+        Raises:
+            VoiceInputError: Se houver erro no reconhecimento
+        """
+        audio = self.capturar_audio(mostrar_feedback)
+        return self.reconhecer_audio(audio, mostrar_feedback)
+    
     def reconhecer_comando_loop(self, max_tentativas: int = 3) -> Optional[str]:
         """
         Tenta reconhecer um comando de voz várias vezes.
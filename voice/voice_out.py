@@ -1,5 +1,8 @@
+import queue
+import threading
+import time
 import pyttsx3
-from typing import Optional
+from typing import Callable, Optional
 
 class VoiceOutput:
     def __init__(self, rate: int = 180, voice: str = 'brazil'):
@@ -45,6 +48,61 @@ class VoiceOutput:
         except Exception as e:
             print(f"Error stopping speech: {str(e)}")
 
+class SpeechQueue:
+    """
+    Speaks text on a background thread so callers don't wait for the
+    synthesis to finish. Messages are spoken in order by one engine,
+    created on that thread (pyttsx3 engines must stay on the thread that
+    drives them).
+    """
+
+    def __init__(self, rate: int = 180, voice: str = 'brazil'):
+        self.rate = rate
+        self.voice = voice
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self) -> None:
+        output = None
+        while True:
+            text, done = self._queue.get()
+            started = time.perf_counter()
+            try:
+                output = output or VoiceOutput(rate=self.rate, voice=self.voice)
+                output.speak(text)
+            except Exception as e:
+                print(f"Error in speech synthesis: {str(e)}")
+            if done:
+                done(time.perf_counter() - started)
+            self._queue.task_done()
+
+    def say(self, text: str, done: Optional[Callable[[float], None]] = None) -> None:
+        """
+        Queues text to be spoken and returns immediately.
+        
+        Args:
+            text (str): Text to be spoken
+            done (callable, optional): Called with the seconds spent speaking once finished
+        """
+        self._queue.put((text, done))
+
+    def wait(self) -> None:
+        """Blocks until everything queued has been spoken."""
+        self._queue.join()
+
+
+_speech_queue = None
+_speech_queue_lock = threading.Lock()
+
+def get_speech_queue() -> SpeechQueue:
+    """Returns the process-wide speech queue (there is one audio output)."""
+    global _speech_queue
+    with _speech_queue_lock:
+        if _speech_queue is None:
+            _speech_queue = SpeechQueue()
+        return _speech_queue
+
 # Função de conveniência para uso rápido
 def speak_text(text: str, rate: Optional[int] = None, voice: Optional[str] = None) -> None:
     """
@@ -0,0 +1,335 @@
+import argparse
+import os
+import threading
+import wave
+from typing import Callable, Iterable, List, Optional
+
+import numpy as np
+
+from config.settings import WAKE_WORD_DIR, WAKE_WORD_THRESHOLD
+
+# Audio is processed as 16 kHz mono, in 20 ms frames
+SAMPLE_RATE = 16000
+FRAME = 320
+# MFCC analysis: 25 ms windows every 10 ms, 26 mel bands, 13 coefficients (c0 dropped)
+WINDOW = 400
+HOP = 160
+N_FFT = 512
+N_MELS = 26
+N_MFCC = 13
+
+# Energy gate: a frame is speech when its RMS is this many times the noise
+# floor (and above an absolute minimum for digital silence)
+SPEECH_RATIO = 3.0
+MIN_RMS = 200.0
+# Quiet frames that end a segment, and the shortest segment worth matching
+HANGOVER_FRAMES = 10
+MIN_SEGMENT_FRAMES = 10
+# When trimming recordings, frames this far below the loudest one are always kept
+TRIM_PEAK_FRACTION = 0.1
+# Threshold when only one template is enrolled (mean MFCC distance per frame)
+DEFAULT_THRESHOLD = 12.0
+# Auto threshold: the largest distance between two enrolled templates times this
+THRESHOLD_MARGIN = 1.3
+
+
+def read_wav(path: str) -> np.ndarray:
+    """Reads a PCM WAV file as 16 kHz mono float samples (int16 scale)."""
+    with wave.open(path, "rb") as f:
+        channels, width, rate = f.getnchannels(), f.getsampwidth(), f.getframerate()
+        data = f.readframes(f.getnframes())
+    if width != 2:
+        raise ValueError(f"{path}: only 16-bit PCM WAV files are supported")
+    samples = np.frombuffer(data, dtype="<i2").astype(np.float32)
+    samples = samples.reshape(-1, channels).mean(axis=1)
+    if rate != SAMPLE_RATE:
+        positions = np.arange(0, len(samples) - 1, rate / SAMPLE_RATE)
+        samples = np.interp(positions, np.arange(len(samples)), samples).astype(np.float32)
+    return samples
+
+def write_wav(path: str, samples: np.ndarray) -> None:
+    """Writes float samples (int16 scale) as a 16 kHz mono WAV file."""
+    with wave.open(path, "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(SAMPLE_RATE)
+        f.writeframes(np.clip(samples, -32768, 32767).astype("<i2").tobytes())
+
+def frames(samples: np.ndarray) -> Iterable[np.ndarray]:
+    """Splits samples into consecutive FRAME-sized frames (the last partial one is dropped)."""
+    for start in range(0, len(samples) - FRAME + 1, FRAME):
+        yield samples[start:start + FRAME]
+
+
+def _mel_filterbank() -> np.ndarray:
+    mel = lambda hz: 2595 * np.log10(1 + hz / 700)
+    hz = lambda m: 700 * (10 ** (m / 2595) - 1)
+    edges = hz(np.linspace(mel(0), mel(SAMPLE_RATE / 2), N_MELS + 2))
+    bins = np.floor((N_FFT + 1) * edges / SAMPLE_RATE).astype(int)
+    bank = np.zeros((N_MELS, N_FFT // 2 + 1))
+    for i in range(N_MELS):
+        left, center, right = bins[i], bins[i + 1], bins[i + 2]
+        bank[i, left:center] = (np.arange(left, center) - left) / max(center - left, 1)
+        bank[i, center:right] = (right - np.arange(center, right)) / max(right - center, 1)
+    return bank
+
+_MEL_BANK = _mel_filterbank()
+_DCT = np.cos(np.pi / N_MELS * (np.arange(N_MELS) + 0.5)[None, :] * np.arange(N_MFCC)[:, None])
+_HAMMING = np.hamming(WINDOW)
+
+def mfcc(samples: np.ndarray) -> np.ndarray:
+    """
+    MFCC features of an utterance, one row per 10 ms, without c0 and with
+    the utterance mean removed (so loudness and microphone don't matter).
+    """
+    samples = np.append(samples[0], samples[1:] - 0.97 * samples[:-1])
+    if len(samples) < WINDOW:
+        samples = np.pad(samples, (0, WINDOW - len(samples)))
+    count = 1 + (len(samples) - WINDOW) // HOP
+    windows = np.lib.stride_tricks.as_strided(
+        samples, (count, WINDOW), (samples.strides[0] * HOP, samples.strides[0])
+    ) * _HAMMING
+    power = np.abs(np.fft.rfft(windows, N_FFT)) ** 2 / N_FFT
+    features = np.log(power @ _MEL_BANK.T + 1e-10) @ _DCT.T
+    features = features[:, 1:]
+    return features - features.mean(axis=0)
+
+def dtw_distance(query: np.ndarray, template: np.ndarray) -> float:
+    """
+    Mean per-frame distance between two MFCC sequences after dynamic time
+    warping. Each query frame matches the same, the next, or the one after
+    next template frame, so the query may be spoken up to twice as fast or
+    (by repeating template frames) slower than the template.
+    """
+    cost = np.sqrt(((query[:, None, :] - template[None, :, :]) ** 2).sum(axis=2))
+    n, m = cost.shape
+    total = np.full(m, np.inf)
+    total[0] = cost[0, 0]
+    for i in range(1, n):
+        previous = total
+        best = previous.copy()
+        best[1:] = np.minimum(best[1:], previous[:-1])
+        best[2:] = np.minimum(best[2:], previous[:-2])
+        total = cost[i] + best
+    return float(total[-1] / n)
+
+
+class WakeWordDetector:
+    """
+    Spots a wake word in a stream of 20 ms audio frames by comparing what
+    was said to a few enrolled recordings of it (MFCC + DTW).
+
+    Most of the time nothing is spoken, and then a frame costs one RMS: an
+    adaptive energy gate tracks the noise floor and only collects frames
+    while someone is talking. When a segment of speech ends (or grows
+    longer than any template could match), its MFCCs are compared to each
+    template. No audio leaves the device.
+    """
+
+    def __init__(self, templates: List[np.ndarray], threshold: Optional[float] = None):
+        """
+        Args:
+            templates (list): Recordings of the wake word (16 kHz samples)
+            threshold (float, optional): Largest DTW distance still accepted.
+                Defaults to WAKE_WORD_THRESHOLD, or a value derived from how much the templates differ.
+        """
+        if not templates:
+            raise ValueError("At least one wake word recording is needed")
+        self.templates = [mfcc(trim_silence(samples)) for samples in templates]
+        self.threshold = threshold or WAKE_WORD_THRESHOLD or self._auto_threshold()
+        longest = max(len(template) for template in self.templates) * HOP // FRAME
+        self.max_segment_frames = 2 * longest
+        self.noise_floor = None
+        self.last_distance = None
+        self._segment = []
+        self._levels = []
+        self._quiet = 0
+
+    @classmethod
+    def from_dir(cls, directory: str = WAKE_WORD_DIR, threshold: Optional[float] = None) -> "WakeWordDetector":
+        """Loads every .wav file in `directory` as a template."""
+        paths = sorted(os.path.join(directory, name) for name in os.listdir(directory) if name.endswith(".wav"))
+        return cls([read_wav(path) for path in paths], threshold)
+
+    def _auto_threshold(self) -> float:
+        if len(self.templates) < 2:
+            return DEFAULT_THRESHOLD
+        distances = [
+            dtw_distance(a, b)
+            for i, a in enumerate(self.templates) for j, b in enumerate(self.templates) if i != j
+        ]
+        return max(distances) * THRESHOLD_MARGIN
+
+    def reset(self) -> None:
+        """Forgets any speech collected so far (e.g. after the microphone was used for a command)."""
+        self._segment = []
+        self._levels = []
+        self._quiet = 0
+
+    def match(self, samples: np.ndarray) -> bool:
+        """Whether an utterance (16 kHz samples) is the wake word."""
+        features = mfcc(samples)
+        self.last_distance = min(dtw_distance(features, template) for template in self.templates)
+        return self.last_distance <= self.threshold
+
+    def process(self, frame: np.ndarray) -> bool:
+        """
+        Feeds one FRAME of samples. Returns True on the frame where a
+        segment of speech that matches the wake word ends.
+        """
+        rms = float(np.sqrt(np.mean(np.square(frame, dtype=np.float64))))
+        if self.noise_floor is None:
+            self.noise_floor = rms
+        speech = rms > max(self.noise_floor * SPEECH_RATIO, MIN_RMS)
+
+        if not self._segment:
+            if not speech:
+                # Follow the background noise slowly while nobody talks
+                self.noise_floor = 0.95 * self.noise_floor + 0.05 * rms
+                return False
+            self._quiet = 0
+        self._segment.append(frame)
+        self._levels.append(rms)
+        self._quiet = 0 if speech else self._quiet + 1
+
+        if self._quiet < HANGOVER_FRAMES and len(self._segment) < self.max_segment_frames:
+            return False
+        segment = self._segment[:len(self._segment) - self._quiet]
+        levels = self._levels
+        self.reset()
+        if len(segment) >= self.max_segment_frames:
+            # Too long for a wake word: a louder background (fan, TV, traffic)
+            # started, so it becomes the noise floor instead of being gated as speech
+            self.noise_floor = float(np.median(levels))
+            return False
+        if len(segment) < MIN_SEGMENT_FRAMES:
+            return False
+        return self.match(np.concatenate(segment))
+
+    def detect(self, samples: np.ndarray) -> List[float]:
+        """Seconds into `samples` at which the wake word was detected (for recordings)."""
+        detections = []
+        for index, frame in enumerate(frames(samples)):
+            if self.process(frame):
+                detections.append(round((index + 1) * FRAME / SAMPLE_RATE, 2))
+        return detections
+
+
+def trim_silence(samples: np.ndarray) -> np.ndarray:
+    """Cuts the quiet start and end of a recording, using the same energy gate as the detector."""
+    rms = np.array([np.sqrt(np.mean(np.square(frame, dtype=np.float64))) for frame in frames(samples)])
+    if not len(rms):
+        return samples
+    # Capped by the peak so a recording that is already trimmed isn't cut into
+    threshold = min(np.percentile(rms, 10) * SPEECH_RATIO, rms.max() * TRIM_PEAK_FRACTION)
+    voiced = np.flatnonzero(rms > max(threshold, MIN_RMS))
+    if not len(voiced):
+        return samples
+    return samples[voiced[0] * FRAME:(voiced[-1] + 1) * FRAME]
+
+def enroll(paths: List[str], directory: str = WAKE_WORD_DIR) -> List[str]:
+    """
+    Saves recordings of the wake word as templates in `directory`,
+    trimmed and converted to 16 kHz mono. Returns the saved paths.
+    """
+    os.makedirs(directory, exist_ok=True)
+    saved = []
+    for path in paths:
+        target = os.path.join(directory, os.path.splitext(os.path.basename(path))[0] + ".wav")
+        write_wav(target + ".tmp", trim_silence(read_wav(path)))
+        os.replace(target + ".tmp", target)
+        saved.append(target)
+    return saved
+
+
+class HandsFreeListener:
+    """
+    Hands-free voice mode: listens locally for the wake word and only then
+    runs a full voice command (VoicePipeline: Google recognition, dispatch
+    and spoken reply). Runs on a background thread until stop().
+    """
+
+    def __init__(self, detector: WakeWordDetector, pipeline, on_result: Optional[Callable[[dict], None]] = None):
+        """
+        Args:
+            detector (WakeWordDetector): Wake word to listen for
+            pipeline (VoicePipeline): Runs the command spoken after the wake word
+            on_result (callable, optional): Called with each command's outcome
+        """
+        self.detector = detector
+        self.pipeline = pipeline
+        self.on_result = on_result
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def _wait_for_wake_word(self) -> bool:
+        import speech_recognition as sr
+        with sr.Microphone(sample_rate=SAMPLE_RATE, chunk_size=FRAME) as source:
+            while not self._stopped.is_set():
+                data = source.stream.read(FRAME)
+                if self.detector.process(np.frombuffer(data, dtype="<i2").astype(np.float32)):
+                    return True
+        return False
+
+    def _run(self) -> None:
+        while self._wait_for_wake_word():
+            # The microphone is released before the command is captured
+            outcome = self.pipeline.run()
+            self.detector.reset()
+            if self.on_result:
+                self.on_result(outcome)
+
+    def start(self) -> "HandsFreeListener":
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def join(self) -> None:
+        if self._thread:
+            self._thread.join()
+
+    def stop(self) -> None:
+        self._stopped.set()
+        self.join()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local wake word detection for hands-free voice commands.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    enroll_parser = commands.add_parser("enroll", help="Save recordings of the wake word as templates")
+    enroll_parser.add_argument("wavs", nargs="+")
+    detect_parser = commands.add_parser("detect", help="Print where the wake word occurs in recordings")
+    detect_parser.add_argument("wavs", nargs="+")
+    listen_parser = commands.add_parser("listen", help="Hands-free mode on the microphone")
+    listen_parser.add_argument("--user", default=None)
+    for sub in (enroll_parser, detect_parser, listen_parser):
+        sub.add_argument("--templates", default=WAKE_WORD_DIR, help="Template directory")
+    for sub in (detect_parser, listen_parser):
+        sub.add_argument("--threshold", type=float, default=None)
+    args = parser.parse_args()
+
+    if args.command == "enroll":
+        for path in enroll(args.wavs, args.templates):
+            print(f"Saved {path}")
+        print(f"Threshold: {WakeWordDetector.from_dir(args.templates).threshold:.2f}")
+    elif args.command == "detect":
+        detector = WakeWordDetector.from_dir(args.templates, args.threshold)
+        for path in args.wavs:
+            detector.reset()
+            times = detector.detect(read_wav(path))
+            print(f"{path}: {', '.join(f'{t:.2f}s' for t in times) or 'no wake word'}")
+    else:
+        from data.database import DEFAULT_USER
+        from voice.pipeline import VoicePipeline
+        from voice.voice_input import VoiceRecognizer
+
+        detector = WakeWordDetector.from_dir(args.templates, args.threshold)
+        pipeline = VoicePipeline(VoiceRecognizer(), user_id=args.user or DEFAULT_USER)
+        listener = HandsFreeListener(
+            detector, pipeline, on_result=lambda outcome: print(f"{outcome.get('text', '')} → {outcome['message']} ({outcome['trace']})")
+        )
+        print("👂 Listening for the wake word. Ctrl+C to stop.")
+        try:
+            listener.start().join()
+        except KeyboardInterrupt:
+            listener.stop()